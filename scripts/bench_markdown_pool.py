@@ -0,0 +1,163 @@
+"""Benchmark: markdown on the event loop vs in CRAWL4AI_MCP_MARKDOWN_WORKERS.
+
+Runs a crawl_many-shaped batch without a browser: each page "fetches" by
+sleeping, then has its markdown made by the server's own generator
+(PruningContentFilter and html2text, as build_run_config sets it up),
+either inline inside arun as crawl4ai does, or through offload_markdown and
+a MarkdownPool. Reports pages per second, and how late a 10ms ticker on the
+same loop ran, which is how long a heartbeat or another client's tool call
+waits behind the markdown.
+
+    uv run python scripts/bench_markdown_pool.py
+    uv run python scripts/bench_markdown_pool.py --workers 8 --pages 200
+
+The HTML goes to the generator as crawl4ai hands it over, after scraping,
+so the numbers are the filter and the markdown conversion only.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import warnings
+
+from crawl4ai import CrawlResult
+
+from crawl4ai_mcp.markdown_pool import MarkdownPool, offload_markdown
+from crawl4ai_mcp.profiles import ProfileManager, build_run_config
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+_WORDS = (
+    "install configure client server request response token cache page crawl "
+    "markdown filter browser session profile timeout retry header cookie proxy "
+    "sitemap frontier depth link table image script style query result error"
+).split()
+
+
+def _page(seed: int, kb: int) -> str:
+    """A docs-like page of about kb kilobytes: nav, sections, code, footer."""
+    rng = random.Random(seed)
+    parts = ["<html><body><nav>" + " | ".join(_WORDS[:12]) + "</nav><main>"]
+    size = 0
+    while size < kb * 1024:
+        heading = " ".join(rng.choices(_WORDS, k=3)).title()
+        para = " ".join(rng.choices(_WORDS, k=rng.randint(40, 120)))
+        items = "".join(
+            f"<li><a href='/docs/{rng.choice(_WORDS)}'>{rng.choice(_WORDS)}</a></li>"
+            for _ in range(rng.randint(3, 8))
+        )
+        block = (
+            f"<section><h2>{heading}</h2><p>{para}.</p><ul>{items}</ul>"
+            f"<pre><code>pip install {rng.choice(_WORDS)}</code></pre></section>"
+        )
+        parts.append(block)
+        size += len(block)
+    parts.append("</main><footer>" + " ".join(_WORDS) + "</footer></body></html>")
+    return "".join(parts)
+
+
+class _Crawler:
+    """arun sleeps for the fetch, then makes markdown as aprocess_html does."""
+
+    def __init__(self, pages: list[str], fetch_s: float) -> None:
+        self.pages = pages
+        self.fetch_s = fetch_s
+
+    async def arun(self, url, config=None, **_):
+        await asyncio.sleep(self.fetch_s)
+        html = self.pages[int(url.rsplit("/", 1)[1]) % len(self.pages)]
+        markdown = config.markdown_generator.generate_markdown(
+            input_html=html, base_url=url
+        )
+        return CrawlResult(url=url, html="", success=True, markdown=markdown)
+
+
+async def _ticker(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        began = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - began - 0.01)
+
+
+async def _batch(crawler, config, pages: int, concurrency: int) -> dict:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> int:
+        async with gate:
+            result = await crawler.arun(f"https://bench.test/{i}", config=config)
+            return len(result.markdown.fit_markdown or "")
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    began = time.perf_counter()
+    sizes = await asyncio.gather(*(one(i) for i in range(pages)))
+    elapsed = time.perf_counter() - began
+    stop.set()
+    await ticker
+    lags.sort()
+    return {
+        "seconds": elapsed,
+        "pages_s": pages / elapsed,
+        "lag_p50_ms": statistics.median(lags) * 1000,
+        "lag_p99_ms": lags[int(len(lags) * 0.99) - 1] * 1000,
+        "lag_max_ms": lags[-1] * 1000,
+        "chars": sum(sizes),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=80)
+    parser.add_argument("--kb", type=int, default=300, help="HTML per page")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--fetch-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--workers", type=int, nargs="*", default=None, help="default: 2 and cores"
+    )
+    args = parser.parse_args()
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({2, cores})
+
+    html = [_page(i, args.kb) for i in range(16)]
+    config = build_run_config(ProfileManager(), None)
+    print(
+        f"{args.pages} pages of ~{args.kb}KB, {args.concurrency} at a time, "
+        f"{args.fetch_ms:g}ms fetch each, {cores} core(s)\n"
+    )
+    print(
+        f"{'markdown':<14}{'seconds':>9}{'pages/s':>9}{'speedup':>9}"
+        f"{'lag p50':>10}{'lag p99':>10}{'lag max':>10}"
+    )
+
+    rows = [("inline", _Crawler(html, args.fetch_ms / 1000), None)]
+    for n in workers:
+        crawler = _Crawler(html, args.fetch_ms / 1000)
+        pool = MarkdownPool(n)
+        offload_markdown(crawler, pool)
+        rows.append((f"{n} worker(s)", crawler, pool))
+
+    baseline = None
+    for name, crawler, pool in rows:
+        if pool is not None:
+            # Worker start-up is paid once per server, not per batch.
+            await _batch(crawler, config, pool.workers, pool.workers)
+        stats = await _batch(crawler, config, args.pages, args.concurrency)
+        if pool is not None:
+            pool.close()
+        baseline = baseline or stats
+        if stats["chars"] != baseline["chars"]:
+            raise SystemExit(f"{name}: markdown differs from inline")
+        print(
+            f"{name:<14}{stats['seconds']:>9.2f}{stats['pages_s']:>9.1f}"
+            f"{stats['pages_s'] / baseline['pages_s']:>8.2f}x"
+            f"{stats['lag_p50_ms']:>8.1f}ms{stats['lag_p99_ms']:>8.1f}ms"
+            f"{stats['lag_max_ms']:>8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
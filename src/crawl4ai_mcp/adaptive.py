@@ -0,0 +1,335 @@
+"""Adaptive concurrency: let each host say how hard it can be crawled.
+
+A fixed max_concurrent is a guess made before the first response. Too low and
+a CDN-backed docs site that would happily serve twenty pages at once gets
+three; too high and a small origin starts answering 429 halfway through the
+batch, and every page after that is a retry or a failure.
+
+adaptive_concurrency=True turns max_concurrent into a ceiling and lets an
+AIMD controller (additive increase, multiplicative decrease, the scheme TCP
+uses for the same problem) pick the working limit per host:
+
+- it starts at INITIAL_LIMIT and grows by one page per round of completions
+  while the host's latency stays within LATENCY_TOLERANCE of the best it has
+  shown. A latency climb means the host is queueing, and growth stops there.
+- a 429 or 503, a page crawl4ai's anti-bot check flagged in crawl_stats, or a
+  Retry-After header halves it. Only once per latency period, so the ten
+  pages already in flight when the host pushed back do not halve it ten times.
+- a Retry-After pauses new pages to that host for as long as it asks, up to
+  MAX_PAUSE_S.
+
+The controller belongs to one call. It runs underneath the process-wide host
+scheduler rather than instead of it: the scheduler still caps what all calls
+together put on a host, and this only ever admits fewer.
+
+A page's host slot has to be taken before the call's max_concurrent slot,
+or pages waiting on a host that is cut back or paused hold every slot of
+the batch and the other hosts wait with them. The dispatchers therefore
+take it through admitted() before their semaphore, and the frontier hands
+out the next URL whose host has room; the arun wrapper only takes a slot
+for the pages nobody took one for.
+"""
+
+import asyncio
+import contextvars
+import email.utils
+import functools
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from crawl4ai_mcp.metrics import antibot_blocks
+from crawl4ai_mcp.scheduler import host_key, starts_deep_crawl
+
+INITIAL_LIMIT = 2
+
+# Growth stops once the smoothed latency is this many times the best seen.
+LATENCY_TOLERANCE = 1.5
+
+# Share of the newest sample in the smoothed latency.
+LATENCY_SMOOTHING = 0.3
+
+# How far the best-seen latency may drift up per sample. Without it, one
+# unusually fast early page would freeze the limit for the rest of the batch.
+BASELINE_DRIFT = 0.01
+
+DECREASE_FACTOR = 0.5
+
+# Longest a Retry-After is honoured for. A host asking for an hour is better
+# reported as a failure than waited on inside one tool call.
+MAX_PAUSE_S = 120.0
+
+# Cut-backs closer together than this are one event, whatever the latency.
+MIN_CUT_INTERVAL_S = 1.0
+
+_THROTTLE_STATUSES = {429: "429", 503: "503"}
+
+# The running call's controller, None when it did not ask for one. A
+# ContextVar like _call_overrides: arun is shared by every call.
+_controller: contextvars.ContextVar["AdaptiveConcurrency | None"] = (
+    contextvars.ContextVar("crawl4ai_adaptive_concurrency", default=None)
+)
+
+# The URL whose slot the running task already holds, and its sample, so the
+# arun wrapper records on it rather than waiting for a second slot.
+_held: contextvars.ContextVar["tuple[str, Sample] | None"] = contextvars.ContextVar(
+    "crawl4ai_adaptive_held", default=None
+)
+
+
+def retry_after_seconds(headers: object) -> float | None:
+    """Seconds a Retry-After header asks for, as delta-seconds or an HTTP date."""
+    if not isinstance(headers, dict):
+        return None
+    value = next(
+        (v for k, v in headers.items() if str(k).lower() == "retry-after"), None
+    )
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+def throttle_reason(status: object, headers: object, blocked: int) -> str | None:
+    """Why a response counts as the host pushing back, or None if it does not."""
+    if blocked:
+        return "anti-bot"
+    if isinstance(status, int) and status in _THROTTLE_STATUSES:
+        return _THROTTLE_STATUSES[status]
+    if retry_after_seconds(headers) is not None:
+        return "Retry-After"
+    return None
+
+
+@dataclass
+class Sample:
+    """What one fetch reported, filled in by whoever made the fetch."""
+
+    status: int | None = None
+    headers: dict | None = None
+    blocked: int = 0
+    recorded: bool = False
+    started: float = 0.0
+
+    def record(self, status: object, headers: object, blocked: int = 0) -> None:
+        self.status = status if isinstance(status, int) else None
+        self.headers = headers if isinstance(headers, dict) else None
+        self.blocked = blocked
+        self.recorded = True
+
+
+@dataclass
+class _HostLimit:
+    limit: float
+    in_flight: int = 0
+    peak: float = 0.0
+    latency: float | None = None
+    baseline: float | None = None
+    paused_until: float = 0.0
+    last_cut: float = float("-inf")
+    cuts: Counter = field(default_factory=Counter)
+    ready: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+
+class AdaptiveConcurrency:
+    """Per-host AIMD limits for one call, capped at that call's max_concurrent."""
+
+    def __init__(self, ceiling: int) -> None:
+        self.ceiling = max(int(ceiling), 1)
+        self._hosts: dict[str, _HostLimit] = {}
+
+    def has_room(self, key: str | None, starting: int = 0) -> bool:
+        """Whether a page for host key would be admitted without waiting.
+
+        starting counts pages for the host that were handed out but have not
+        asked for their slot yet.
+        """
+        if key is None:
+            return True
+        host = self._hosts.get(key)
+        if host is None:
+            return starting < min(INITIAL_LIMIT, self.ceiling)
+        if host.paused_until > time.monotonic():
+            return False
+        return host.in_flight + starting < int(host.limit)
+
+    def _host(self, key: str) -> _HostLimit:
+        host = self._hosts.get(key)
+        if host is None:
+            start = float(min(INITIAL_LIMIT, self.ceiling))
+            host = self._hosts[key] = _HostLimit(limit=start, peak=start)
+        return host
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[Sample]:
+        """Wait for room under the host's limit, then time the fetch made inside.
+
+        The caller records the response on the yielded Sample. An unrecorded
+        sample (the fetch raised, or returned nothing) leaves the limit alone.
+        """
+        sample = Sample()
+        key = host_key(url)
+        if key is None:
+            yield sample
+            return
+        host = self._host(key)
+        async with host.ready:
+            while True:
+                pause = host.paused_until - time.monotonic()
+                if pause <= 0 and host.in_flight < int(host.limit):
+                    break
+                try:
+                    await asyncio.wait_for(
+                        host.ready.wait(), timeout=pause if pause > 0 else None
+                    )
+                except TimeoutError:
+                    pass
+            host.in_flight += 1
+        sample.started = time.monotonic()
+        try:
+            yield sample
+        finally:
+            if sample.recorded:
+                self._observe(host, time.monotonic() - sample.started, sample)
+            async with host.ready:
+                host.in_flight -= 1
+                host.ready.notify_all()
+
+    def _observe(self, host: _HostLimit, seconds: float, sample: Sample) -> None:
+        now = time.monotonic()
+        reason = throttle_reason(sample.status, sample.headers, sample.blocked)
+        if reason:
+            wait = retry_after_seconds(sample.headers)
+            if wait:
+                host.paused_until = max(host.paused_until, now + min(wait, MAX_PAUSE_S))
+            if now - host.last_cut >= max(host.latency or 0.0, MIN_CUT_INTERVAL_S):
+                host.limit = max(host.limit * DECREASE_FACTOR, 1.0)
+                host.last_cut = now
+                host.cuts[reason] += 1
+            return
+        if sample.status is not None and sample.status >= 400:
+            return  # a 404 says nothing about how busy the host is
+        host.latency = (
+            seconds
+            if host.latency is None
+            else host.latency * (1 - LATENCY_SMOOTHING) + seconds * LATENCY_SMOOTHING
+        )
+        host.baseline = (
+            host.latency
+            if host.baseline is None
+            else min(host.latency, host.baseline * (1 + BASELINE_DRIFT))
+        )
+        # Only grow a limit that is actually being used: a batch of three
+        # pages says nothing about whether the host would take ten.
+        saturated = host.in_flight >= int(host.limit)
+        if saturated and host.latency <= host.baseline * LATENCY_TOLERANCE:
+            host.limit = min(host.limit + 1 / host.limit, float(self.ceiling))
+            host.peak = max(host.peak, host.limit)
+
+    def summary(self) -> str | None:
+        """One sentence for the result's note, or None when nothing was fetched."""
+        if not self._hosts:
+            return None
+        parts = []
+        for key, host in sorted(
+            self._hosts.items(), key=lambda item: -sum(item[1].cuts.values())
+        )[:5]:
+            part = (
+                f"{key} ended at {int(host.limit)} of {self.ceiling} "
+                f"(peak {int(host.peak)})"
+            )
+            if host.cuts:
+                why = ", ".join(f"{r} ×{n}" for r, n in host.cuts.most_common())
+                part += f", cut back on {why}"
+            parts.append(part)
+        more = len(self._hosts) - len(parts)
+        if more > 0:
+            parts.append(f"{more} more host{'s' if more > 1 else ''}")
+        return "Adaptive concurrency: " + "; ".join(parts) + "."
+
+
+@contextmanager
+def adaptive_scope(
+    controller: "AdaptiveConcurrency | None",
+) -> Iterator["AdaptiveConcurrency | None"]:
+    """Make controller govern the crawls started inside this block.
+
+    Like _call_scope, anything that spawns tasks has to be started inside.
+    """
+    token = _controller.set(controller)
+    try:
+        yield controller
+    finally:
+        _controller.reset(token)
+
+
+def has_room(key: str | None, starting: int = 0) -> bool:
+    """Whether the running call would admit a page for host key right now."""
+    controller = _controller.get()
+    return controller is None or controller.has_room(key, starting)
+
+
+@asynccontextmanager
+async def admitted(url: str) -> AsyncIterator[Sample]:
+    """The running call's slot for url; free and unrecorded when not adaptive.
+
+    Inside the block, admitted(url) again yields the same sample without
+    waiting, timed from then: a dispatcher takes the slot before its own
+    semaphore, and the fetch it makes under both is what gets timed.
+    """
+    held = _held.get()
+    if held is not None and held[0] == url:
+        held[1].started = time.monotonic()
+        yield held[1]
+        return
+    controller = _controller.get()
+    if controller is None:
+        yield Sample()
+        return
+    async with controller.slot(url) as sample:
+        token = _held.set((url, sample))
+        try:
+            yield sample
+        finally:
+            _held.reset(token)
+
+
+def adapt_crawler(crawler: Any) -> None:
+    """Put every page this crawler fetches under the running call's controller.
+
+    Installed outside the host scheduler's wrapper, so a page waits for its
+    call's limit before it takes a host slot that other calls could use. A
+    page whose dispatcher already holds its slot records on that slot. The
+    outer deep-crawl call goes straight through for the same reason it does
+    there.
+    """
+    arun = crawler.arun
+    if getattr(arun, "_adaptive", False) is True:
+        return
+
+    @functools.wraps(arun)
+    async def adaptive_arun(url: str, config: Any = None, **kwargs):
+        if _controller.get() is None or starts_deep_crawl(config):
+            return await arun(url, config=config, **kwargs)
+        async with admitted(url) as sample:
+            result = await arun(url, config=config, **kwargs)
+            sample.record(
+                getattr(result, "status_code", None),
+                getattr(result, "response_headers", None),
+                antibot_blocks(result),
+            )
+            return result
+
+    adaptive_arun._adaptive = True
+    crawler.arun = adaptive_arun
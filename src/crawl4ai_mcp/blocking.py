@@ -0,0 +1,189 @@
+"""Per-call blocking of page subresources the markdown never uses.
+
+This server returns text. Every image, web font, video and analytics beacon a
+page pulls in is bandwidth and load time spent on something the caller never
+sees, and on a sitemap crawl those bytes are most of the transfer.
+
+crawl4ai can block some of this, but only through BrowserConfig (text_mode,
+avoid_css, avoid_ads), which is fixed for the life of the browser and shared
+by every call. Blocking per call or per profile therefore goes through the
+same route this server uses for per-call headers: the `_call_overrides`
+ContextVar carries a ResourceBlocker, and the before_goto hook installs it as
+a Playwright route on the page about to navigate.
+
+Only requests that are never made are counted, so there is no byte figure to
+report for them: the size of a response nobody downloaded is not known. The
+counts by category are what is reported.
+"""
+
+import fnmatch
+import logging
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Playwright's request.resource_type values, minus "document": blocking the
+# document would block the page being crawled.
+RESOURCE_TYPES = frozenset(
+    {
+        "image",
+        "media",
+        "font",
+        "stylesheet",
+        "script",
+        "texttrack",
+        "xhr",
+        "fetch",
+        "eventsource",
+        "websocket",
+        "manifest",
+        "other",
+    }
+)
+
+TRACKERS = "trackers"
+
+# Hosts whose requests are analytics, ads or session recording, matched on the
+# host or any subdomain of it. The same set crawl4ai's avoid_ads blocks, which
+# is only reachable there as a browser-wide flag.
+TRACKER_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "adsystem.com",
+    "adzerk.net",
+    "adnxs.com",
+    "ads.linkedin.com",
+    "facebook.net",
+    "analytics.twitter.com",
+    "ads-twitter.com",
+    "hotjar.com",
+    "clarity.ms",
+    "scorecardresearch.com",
+    "pixel.wp.com",
+    "amazon-adsystem.com",
+    "mixpanel.com",
+    "segment.com",
+)
+
+# Anything containing one of these is read as a URL pattern rather than a
+# misspelt resource type. "images" is refused with the valid names; "*.png"
+# and "cdn.example.com/ads/" are patterns.
+_PATTERN_CHARS = "*?/.:"
+
+
+def _is_tracker(url: str) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == h or host.endswith("." + h) for h in TRACKER_HOSTS)
+
+
+@dataclass
+class ResourceBlocker:
+    """What one call blocks, and how many requests it has blocked so far.
+
+    One instance per tool call, shared by every page in it. Counts are
+    updated from route handlers on the single event loop, so they need no
+    locking.
+    """
+
+    types: frozenset[str] = frozenset()
+    patterns: tuple[str, ...] = ()
+    trackers: bool = False
+    counts: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def parse(cls, spec: object) -> tuple["ResourceBlocker | None", str | None]:
+        """Build a blocker from a block_resources value. Returns (blocker, error).
+
+        None or an empty list means no blocking, not an error.
+        """
+        if not spec:
+            return None, None
+        if isinstance(spec, str):
+            spec = [spec]
+        if not isinstance(spec, list):
+            return None, "block_resources must be a list of strings."
+        types: set[str] = set()
+        patterns: list[str] = []
+        trackers = False
+        for raw in spec:
+            entry = str(raw).strip()
+            lowered = entry.lower()
+            if lowered in RESOURCE_TYPES:
+                types.add(lowered)
+            elif lowered == TRACKERS:
+                trackers = True
+            elif lowered == "document":
+                return None, (
+                    "block_resources cannot block 'document': that is the page "
+                    "being crawled."
+                )
+            elif any(c in entry for c in _PATTERN_CHARS):
+                patterns.append(entry)
+            else:
+                valid = ", ".join(sorted(RESOURCE_TYPES | {TRACKERS}))
+                return None, (
+                    f"block_resources entry {entry!r} is neither a resource type "
+                    f"nor a URL pattern. Resource types: {valid}. A URL pattern "
+                    "is a glob such as '*.mp4' or '*://cdn.example.com/*'."
+                )
+        return cls(frozenset(types), tuple(patterns), trackers), None
+
+    def category(self, resource_type: str, url: str) -> str | None:
+        """The reason a request is blocked, or None to let it through."""
+        if resource_type in self.types:
+            return resource_type
+        if self.trackers and _is_tracker(url):
+            return TRACKERS
+        if any(fnmatch.fnmatchcase(url, p) for p in self.patterns):
+            return "pattern"
+        return None
+
+    async def handle(self, route) -> None:
+        """Playwright route handler: abort what matches, continue the rest."""
+        request = route.request
+        if request.resource_type == "document":
+            # Frames are documents too. Never block navigation, only what the
+            # navigated page pulls in.
+            await route.continue_()
+            return
+        reason = self.category(request.resource_type, request.url)
+        if reason is None:
+            await route.continue_()
+            return
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        await route.abort("blockedbyclient")
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> str | None:
+        """One sentence for a note or footer, or None when nothing was blocked."""
+        if not self.total:
+            return None
+        parts = ", ".join(
+            f"{n} {reason}"
+            for reason, n in sorted(self.counts.items(), key=lambda kv: -kv[1])
+        )
+        return f"Blocked {self.total} requests ({parts})."
+
+
+async def route_page(page, blocker: ResourceBlocker | None) -> None:
+    """Point a page's routing at this call's blocker, or remove a stale one.
+
+    Session pages are reused across calls, so a page may already carry the
+    handler of an earlier call. It is swapped out rather than stacked, and
+    removed when this call blocks nothing: the earlier call's settings must not
+    leak into this one, and neither should its counts.
+    """
+    previous = getattr(page, "_crawl4ai_mcp_route", None)
+    if previous is not None:
+        await page.unroute("**/*", previous)
+        page._crawl4ai_mcp_route = None
+    if blocker is not None:
+        await page.route("**/*", blocker.handle)
+        page._crawl4ai_mcp_route = blocker.handle
@@ -0,0 +1,174 @@
+"""Character budgets for what a crawl returns inline.
+
+A batch result is only as useful as the part of it a caller can read. One
+include_links deep crawl of 200 pages runs to tens of MB, most of it link
+lists, and every byte of it is built into PageResults, validated and
+serialized on the event loop the other calls share, for a client that will
+truncate it anyway. max_chars_per_page and max_total_chars set the budget
+up front instead:
+
+- a page longer than max_chars_per_page is cut at the last markdown block
+  boundary that fits, never inside a fenced code block, and not just after
+  a heading that would be left with no body.
+- max_total_chars is shared by the whole batch in the order pages are
+  returned. Markdown, links and tables all draw on it. The page that
+  crosses the line is cut like an over-long one; every page after it is
+  returned with no content at all, and its links and tables are never
+  converted.
+
+Each page says how much of its markdown was cut, and the result's note says
+what the budget did to the batch as a whole.
+"""
+
+import re
+
+# A fence opens with three or more backticks or tildes, optionally indented.
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_HEADING = re.compile(r"^ {0,3}#{1,6}(\s|$)")
+
+
+def _block_ends(text: str) -> list[tuple[int, bool]]:
+    """Where each markdown block ends, and whether that block is a heading.
+
+    A block is a run of lines up to a blank line. Blank lines inside a
+    fenced code block do not end one: cutting there would leave a fence
+    open and the rest of the document read as code.
+    """
+    ends: list[tuple[int, bool]] = []
+    fence: str | None = None
+    block: list[str] = []
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        start, pos = pos, pos + len(line)
+        match = _FENCE.match(line)
+        if fence is not None:
+            marker = match.group(1) if match else ""
+            if marker[:1] == fence[0] and len(marker) >= len(fence):
+                fence = None
+        elif match:
+            fence = match.group(1)
+        elif not line.strip():
+            if block:
+                ends.append((start, _is_heading(block)))
+                block = []
+            continue
+        block.append(line)
+    if block and fence is None:
+        ends.append((pos, _is_heading(block)))
+    return ends
+
+
+def _is_heading(block: list[str]) -> bool:
+    return len(block) == 1 and bool(_HEADING.match(block[0]))
+
+
+def truncate_markdown(text: str, limit: int) -> str:
+    """text cut to at most limit characters at a block boundary.
+
+    Falls back to the last line break, and then to a hard cut, only when
+    the first block alone is longer than limit.
+    """
+    if len(text) <= limit:
+        return text
+    ends = [(end, heading) for end, heading in _block_ends(text) if end <= limit]
+    # A heading with nothing under it reads as if the section were empty.
+    while ends and ends[-1][1]:
+        ends.pop()
+    if ends:
+        return text[: ends[-1][0]].rstrip()
+    cut = text.rfind("\n", 0, limit + 1)
+    return text[: cut if cut > 0 else limit].rstrip()
+
+
+class CharBudget:
+    """The budget one call's pages draw on, and what it cut."""
+
+    def __init__(
+        self, max_total: int | None = None, max_per_page: int | None = None
+    ) -> None:
+        self.max_total = max_total
+        self.max_per_page = max_per_page
+        self.used = 0
+        self.cut_pages = 0
+        self.cut_chars = 0
+        self.emptied = 0
+
+    @classmethod
+    def of(cls, max_total: int | None, max_per_page: int | None) -> "CharBudget | None":
+        """A budget, or None when the call set no limit."""
+        if max_total is None and max_per_page is None:
+            return None
+        return cls(max_total, max_per_page)
+
+    @property
+    def remaining(self) -> float:
+        if self.max_total is None:
+            return float("inf")
+        return max(self.max_total - self.used, 0)
+
+    @property
+    def spent(self) -> bool:
+        return self.remaining <= 0
+
+    def markdown(self, text: str) -> tuple[str | None, int]:
+        """text as far as the budget allows, and how many characters were cut.
+
+        None means the budget was already spent and the page gets no
+        content at all.
+        """
+        if self.spent:
+            self.emptied += 1
+            self.cut_chars += len(text)
+            return None, len(text)
+        per_page = self.max_per_page or float("inf")
+        remaining = self.remaining
+        limit = min(remaining, per_page)
+        kept = text if len(text) <= limit else truncate_markdown(text, int(limit))
+        self.used += len(kept)
+        cut = len(text) - len(kept)
+        if cut:
+            self.cut_pages += 1
+            self.cut_chars += cut
+            # Only a cut the total made closes it; max_per_page's do not.
+            if remaining < per_page:
+                self._close()
+        return kept, cut
+
+    def items(self, sizes: list[int]) -> int:
+        """How many of a page's links or tables, of these sizes, fit.
+
+        Per-page limits are for markdown; links and tables draw only on the
+        total, so a caller who asked for them gets every one the total can
+        hold.
+        """
+        kept = 0
+        for size in sizes:
+            if size > self.remaining:
+                self._close()
+                break
+            self.used += size
+            kept += 1
+        return kept
+
+    def _close(self) -> None:
+        # The total cut something, so this page crossed the line. Whatever
+        # is left is too little to be worth a fragment of the next page.
+        self.used = self.max_total
+
+    def note(self) -> str | None:
+        """What the budget did to the batch, or None if it cut nothing."""
+        parts = []
+        if self.cut_pages:
+            parts.append(f"{self.cut_pages} page(s) cut short at a block boundary")
+        if self.emptied:
+            parts.append(
+                f"{self.emptied} page(s) returned without content once "
+                f"max_total_chars={self.max_total} was spent"
+            )
+        if not parts:
+            return None
+        return (
+            f"Character budget: {'; '.join(parts)}, {self.cut_chars:,} characters "
+            "left out in all. Each page's truncated field says how much of it "
+            "was cut; raise the limits, or use output_dir, to get everything."
+        )
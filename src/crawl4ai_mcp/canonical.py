@@ -0,0 +1,271 @@
+"""Canonical URLs, so one page listed several ways is fetched once.
+
+crawl_many and crawl_sitemap handed the caller's URLs to arun_many as they
+came, and every URL costs a browser render. Sitemaps generated by a CMS
+routinely list one page two or three ways, and link-harvested URL lists are
+worse:
+
+    https://Docs.Example.com:443/guide/?utm_source=feed#install
+    https://docs.example.com/guide/
+    https://docs.example.com/guide/?b=2&a=1   and   ?a=1&b=2
+
+Canonicalizer reduces a URL to a key, and a batch fetches only the first
+URL of each key. What "the same" means is the mode:
+
+- "standard" (the default) only merges what names one resource: scheme and
+  host case, the default port, the fragment (never sent to the server),
+  tracking parameters (utm_*, fbclid, gclid and the like, plus any listed
+  in CRAWL4AI_MCP_TRACKING_PARAMS) and the order of query parameters.
+- "loose" also treats /guide and /guide/ as one page. Most sites serve the
+  same page at both, or redirect one to the other, but nothing requires it.
+- "off" fetches every URL as given.
+
+Parameters are compared and sorted as written, not decoded and re-encoded,
+so a key is a URL that fetches what the original did.
+
+Every URL a batch does not fetch is listed in replaced, with the URL that
+was fetched in its place, so the tools can return a page for each URL the
+caller passed.
+
+With rel_canonical it also learns during the crawl. A page that declares
+<link rel=canonical> for a different URL says that URL is the same page, so
+that URL is not fetched later in the batch or the deep crawl. Only URLs not
+yet started are saved this way, and only a declaration by a page that was
+fetched counts. It is off unless asked for: which of two URLs is fetched
+then depends on which page finishes first, and the one fetched may be the
+print view rather than the page it names.
+"""
+
+import logging
+import os
+import re
+from collections.abc import Iterable
+from urllib.parse import unquote_plus, urljoin, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+CANONICALIZE_MODES = ["standard", "loose", "off"]
+DEFAULT_CANONICALIZE = "standard"
+
+TRACKING_PARAMS_ENV = "CRAWL4AI_MCP_TRACKING_PARAMS"
+# Names, or prefixes ending in "*", of query parameters that only say where
+# a click came from. "ref" is not here: on some sites it selects content.
+TRACKING_PARAMS = (
+    "utm_*",
+    "fbclid",
+    "gclid",
+    "gclsrc",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# The canonical link is in <head>; reading further costs time for nothing.
+HEAD_BYTES = 256 * 1024
+_LINK = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+_ATTR = re.compile(r"""([a-zA-Z-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+
+# Examples of merged URLs the note shows.
+_EXAMPLES = 3
+
+
+def tracking_params_from_env() -> tuple[str, ...]:
+    """The built-in tracking parameters plus any listed in the environment."""
+    raw = os.environ.get(TRACKING_PARAMS_ENV, "")
+    extra = tuple(p.strip().lower() for p in raw.split(",") if p.strip())
+    return TRACKING_PARAMS + extra
+
+
+def declared_canonical(html: str | None, base_url: str) -> str | None:
+    """The absolute href of a page's <link rel=canonical>, if it has one."""
+    if not html:
+        return None
+    for tag in _LINK.finditer(html, 0, HEAD_BYTES):
+        attrs = {
+            m.group(1).lower(): m.group(2) or m.group(3) or m.group(4) or ""
+            for m in _ATTR.finditer(tag.group(0))
+        }
+        if "canonical" in attrs.get("rel", "").lower().split() and attrs.get("href"):
+            return urljoin(base_url, attrs["href"].strip())
+    return None
+
+
+class Canonicalizer:
+    """URL keys for one crawl, and what they saved.
+
+    One per call: it remembers which keys the call has claimed and which
+    URLs fetched pages named as canonical, and counts the fetches that
+    saved.
+    """
+
+    def __init__(
+        self,
+        mode: str = DEFAULT_CANONICALIZE,
+        tracking: Iterable[str] | None = None,
+        rel_canonical: bool = False,
+    ) -> None:
+        self.mode = mode
+        self.rel_canonical = rel_canonical
+        params = tuple(tracking_params_from_env() if tracking is None else tracking)
+        self._exact = {p for p in params if not p.endswith("*")}
+        self._prefixes = tuple(p[:-1] for p in params if p.endswith("*"))
+        # Key -> the URL that claimed it, which is the one fetched.
+        self._claimed: dict[str, str] = {}
+        # Key of a URL a fetched page named as canonical -> that page's URL.
+        self._covered: dict[str, str] = {}
+        # URLs that differ from their key and were already counted.
+        self._folded: set[str] = set()
+        # Keys skip() said yes to, so each counts once however often linked.
+        self._skipped: set[str] = set()
+        # URL not fetched -> the URL fetched in its place.
+        self.replaced: dict[str, str] = {}
+        self.duplicates = 0
+        self.canonical_skips = 0
+        self.examples: list[tuple[str, str]] = []
+
+    @classmethod
+    def of(cls, mode: str, rel_canonical: bool = False) -> "Canonicalizer | None":
+        """The call's canonicalizer, or None when mode is "off"."""
+        return None if mode == "off" else cls(mode, rel_canonical=rel_canonical)
+
+    def _tracking(self, name: str) -> bool:
+        name = unquote_plus(name).lower()
+        return name in self._exact or name.startswith(self._prefixes)
+
+    def key(self, url: str) -> str:
+        """url with everything that does not change the page taken out."""
+        try:
+            parts = urlsplit(url.strip())
+            port = parts.port
+        except ValueError:
+            return url
+        scheme = parts.scheme.lower()
+        if scheme not in _DEFAULT_PORTS or not parts.hostname:
+            return url
+        host = parts.hostname
+        if ":" in host:
+            host = f"[{host}]"
+        if port is not None and port != _DEFAULT_PORTS[scheme]:
+            host = f"{host}:{port}"
+        if parts.username is not None:
+            auth = parts.netloc.rpartition("@")[0]
+            host = f"{auth}@{host}"
+        path = parts.path or "/"
+        if self.mode == "loose" and len(path) > 1:
+            path = path.rstrip("/") or "/"
+        pairs = [
+            pair
+            for pair in parts.query.split("&")
+            if pair and not self._tracking(pair.partition("=")[0])
+        ]
+        # Stable: a repeated name keeps the order its values came in.
+        pairs.sort(key=lambda pair: pair.partition("=")[0])
+        return urlunsplit((scheme, host, path, "&".join(pairs), ""))
+
+    def _replace(self, url: str, fetched: str) -> None:
+        if url != fetched:
+            self.replaced.setdefault(url, fetched)
+        if len(self.examples) < _EXAMPLES:
+            self.examples.append((url, fetched))
+
+    def dedupe(self, urls: Iterable[str]) -> list[str]:
+        """The first URL of each key, in the order given."""
+        first: dict[str, str] = {}
+        kept = []
+        for url in urls:
+            key = self.key(url)
+            if key in first:
+                self.duplicates += 1
+                self._replace(url, first[key])
+                continue
+            first[key] = url
+            self._claimed.setdefault(key, url)
+            kept.append(url)
+        return kept
+
+    def claim(self, url: str) -> bool:
+        """True the first time url's key is seen, for URLs that stream in."""
+        key = self.key(url)
+        if key in self._claimed:
+            self.duplicates += 1
+            self._replace(url, self._claimed[key])
+            return False
+        self._claimed[key] = url
+        return True
+
+    def fold(self, url: str, key: str, already_queued: bool) -> None:
+        """Count a link that differs from its key, once per distinct link.
+
+        For a crawl whose own frontier is what remembers keys: a link
+        whose key was queued already is a fetch saved, and the link that
+        queued the key is not.
+        """
+        if url == key or url in self._folded:
+            return
+        self._folded.add(url)
+        if already_queued:
+            self.duplicates += 1
+            self._replace(url, key)
+
+    def learn(self, result) -> None:
+        """Remember the URL a fetched page declares as its canonical one."""
+        if not self.rel_canonical or not getattr(result, "success", False):
+            return
+        html = getattr(result, "html", None)
+        page_url = getattr(result, "url", None)
+        if not isinstance(html, str) or not isinstance(page_url, str):
+            return
+        declared = declared_canonical(html, page_url)
+        if declared is None:
+            return
+        key = self.key(declared)
+        if key != self.key(page_url):
+            self._covered.setdefault(key, page_url)
+
+    def covered(self, url: str) -> str | None:
+        """The fetched page that named url as its canonical URL, if any."""
+        return self._covered.get(self.key(url))
+
+    def skip(self, url: str) -> bool:
+        """Whether url need not be fetched, counting each such URL once."""
+        if not self.rel_canonical:
+            return False
+        page = self.covered(url)
+        if page is None or page == url:
+            return False
+        key = self.key(url)
+        if key not in self._skipped:
+            self._skipped.add(key)
+            self.canonical_skips += 1
+            self._replace(url, page)
+        return True
+
+    @property
+    def saved(self) -> int:
+        return self.duplicates + self.canonical_skips
+
+    def note(self) -> str | None:
+        if not self.saved:
+            return None
+        parts = []
+        if self.duplicates:
+            parts.append(
+                f"{self.duplicates} were the same as another URL once normalized"
+            )
+        if self.canonical_skips:
+            parts.append(
+                f"{self.canonical_skips} were named by a fetched page's rel=canonical"
+            )
+        examples = "; ".join(f"{url} -> {same}" for url, same in self.examples)
+        return (
+            f"Canonical URLs ({self.mode}): {self.saved} duplicate URL(s) were not "
+            f"fetched: {' and '.join(parts)} (e.g. {examples}). "
+            'canonicalize="off" fetches every URL as given.'
+        )
@@ -0,0 +1,314 @@
+"""Checkpoints that let a long crawl pick up where it stopped.
+
+A crawl of a few thousand pages runs for hours, and hours is long enough for
+a client idle timeout, a deploy or an OOM to end it. Every restart used to
+pay for the whole crawl again. A call given a job_id keeps a checkpoint
+instead, and a second call with the same job_id continues from it:
+
+- job.json: which tool the job belongs to, the arguments that identify it,
+  the URL list it is working through (crawl_many, crawl_sitemap) or
+  crawl4ai's own deep-crawl state (deep_crawl), and whether it finished.
+  Rewritten whole, through a temporary file and a rename, so it is always
+  either the old version or the new one.
+- pages.jsonl: one line per page as it finishes, the same PageResult the
+  caller gets back. Appended and fsynced in batches by ManifestWriter, so a
+  crash costs at most the last few seconds of pages.
+
+On resume, pages that succeeded are returned from the checkpoint and not
+fetched again. Failures are tried again: most of them were a timeout or a
+dropped connection, and the point of resuming is to end up with the page.
+
+The checkpoint lives in output_dir when the call has one, next to the files
+it describes, and in the state directory otherwise.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from crawl4ai_mcp.output import ManifestWriter, write_atomic
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR_ENV = "CRAWL4AI_MCP_STATE_DIR"
+DEFAULT_STATE_DIR = Path.home() / ".crawl4ai-mcp"
+
+JOB_FILE = "job.json"
+PAGES_FILE = "pages.jsonl"
+
+# deep_crawl's state is every URL it has seen, rewritten whole. Per page that
+# is quadratic over a long crawl, so it is saved at most this often.
+FRONTIER_SAVE_INTERVAL_S = 2.0
+
+# A job_id becomes a directory name, so it is held to characters that are
+# safe as one on every platform and cannot climb out of the state directory.
+_JOB_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,127}")
+
+
+class CheckpointMismatch(ValueError):
+    """The job_id names a checkpoint for a different crawl."""
+
+
+def state_dir() -> Path:
+    """Where jobs without an output_dir keep their checkpoints."""
+    raw = os.environ.get(STATE_DIR_ENV, "").strip()
+    return Path(raw).expanduser() if raw else DEFAULT_STATE_DIR
+
+
+def job_id_error(job_id: str) -> str | None:
+    """Why job_id cannot be used, or None when it can."""
+    if _JOB_ID.fullmatch(job_id):
+        return None
+    return (
+        f"job_id {job_id!r} is not usable: use 1-128 letters, digits, '.', '_' "
+        "or '-', starting with a letter or digit."
+    )
+
+
+def checkpoint_dir(job_id: str, output_dir: str | None) -> str:
+    if output_dir:
+        return os.path.join(output_dir, ".jobs", job_id)
+    return str(state_dir() / "jobs" / job_id)
+
+
+def resumable_state(state: dict, finished: set[str]) -> dict:
+    """crawl4ai's deep-crawl state, with the pages it never finished put back.
+
+    crawl4ai marks a whole level (BFS) or batch (best-first) visited before
+    fetching any of it, and only saves the links found so far as pending. A
+    crawl that dies halfway through a level would resume with the rest of
+    that level visited and never fetched. Everything visited that did not
+    finish successfully is moved back into the frontier here.
+    """
+    state = dict(state)
+    visited = state.get("visited") or []
+    unfinished = [url for url in visited if url not in finished]
+    state["visited"] = [url for url in visited if url in finished]
+    depths = state.get("depths") or {}
+    if state.get("strategy_type") == "best_first":
+        queued = {item["url"] for item in state.get("queue_items") or []}
+        state["queue_items"] = list(state.get("queue_items") or []) + [
+            {"score": 0.0, "depth": depths.get(url, 0), "url": url, "parent_url": None}
+            for url in unfinished
+            if url not in queued
+        ]
+    else:
+        pending = {item["url"] for item in state.get("pending") or []}
+        state["pending"] = [
+            {"url": url, "parent_url": None} for url in unfinished if url not in pending
+        ] + list(state.get("pending") or [])
+    # crawl4ai's count includes pages fetched after the last saved line.
+    state["pages_crawled"] = len(finished)
+    return state
+
+
+class Checkpoint:
+    """One job's checkpoint: what it is crawling, and what it has finished."""
+
+    def __init__(self, path: str, job_id: str, tool: str, identity: dict) -> None:
+        self.path = path
+        self.job_id = job_id
+        self.tool = tool
+        self.identity = identity
+        self.spec: dict = {}
+        self.frontier: dict | None = None
+        self.complete = False
+        self.resumed = False
+        # Pages restored from earlier runs, one per URL, the latest kept.
+        self.pages: list[dict] = []
+        self.error: OSError | None = None
+        self._writer: ManifestWriter | None = None
+        self._frontier_saved_at = 0.0
+        # Builds the latest frontier when one is written, for FrontierCrawl.
+        self._frontier_source: Callable[[], dict] | None = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def open(
+        cls, job_id: str, output_dir: str | None, tool: str, identity: dict
+    ) -> "Checkpoint":
+        """Load the job's checkpoint, or start one.
+
+        Raises CheckpointMismatch when job_id was used for a different crawl,
+        and OSError when the checkpoint cannot be read or created.
+        """
+        checkpoint = cls(checkpoint_dir(job_id, output_dir), job_id, tool, identity)
+        await asyncio.to_thread(checkpoint._load)
+        checkpoint._writer = await ManifestWriter(
+            checkpoint.path, append=True, name=PAGES_FILE
+        ).open()
+        return checkpoint
+
+    def _load(self) -> None:
+        job_path = os.path.join(self.path, JOB_FILE)
+        if not os.path.exists(job_path):
+            os.makedirs(self.path, exist_ok=True)
+            self._save_job()
+            return
+        with open(job_path, encoding="utf-8") as f:
+            job = json.load(f)
+        if job.get("tool") != self.tool or job.get("identity") != self.identity:
+            raise CheckpointMismatch(
+                f"job_id {self.job_id!r} belongs to a different crawl "
+                f"({job.get('tool')} with {json.dumps(job.get('identity'))}). "
+                "Use a new job_id for this one."
+            )
+        self.resumed = True
+        self.spec = job.get("spec") or {}
+        self.frontier = job.get("frontier")
+        self.complete = bool(job.get("complete"))
+        lines = _read_lines(self.path)
+        # frontier_store="disk" commits each page's links to its own file
+        # before the page is recorded here, so every recorded page stands.
+        if self.tool == "deep_crawl" and self.identity.get("frontier_store") != "disk":
+            # Pages recorded after the last saved frontier had their links
+            # discovered into a frontier that was never written. Keeping
+            # them would drop those links, so they are fetched again.
+            lines = lines[: job.get("frontier_pages", 0)] if self.frontier else []
+        self.pages = _latest(lines)
+        self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite pages.jsonl to what was kept, so resumes do not pile up."""
+        path = os.path.join(self.path, PAGES_FILE)
+        write_atomic(
+            path, "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in self.pages)
+        )
+
+    def _save_job(self) -> None:
+        job = {
+            "job_id": self.job_id,
+            "tool": self.tool,
+            "identity": self.identity,
+            "spec": self.spec,
+            "frontier": self.frontier,
+            "frontier_pages": len(self.pages)
+            + (self._writer.written if self._writer else 0),
+            "complete": self.complete,
+            "updated": time.time(),
+        }
+        write_atomic(os.path.join(self.path, JOB_FILE), json.dumps(job))
+
+    @property
+    def finished(self) -> set[str]:
+        """URLs restored as successes, which this run does not fetch again."""
+        return {page["url"] for page in self.pages if page.get("success")}
+
+    def pending(self, urls: list[str]) -> list[str]:
+        finished = self.finished
+        return [url for url in urls if url not in finished]
+
+    def resume_state(self) -> dict | None:
+        """The deep-crawl state to hand the strategy, or None to start fresh."""
+        if not self.frontier:
+            return None
+        return resumable_state(self.frontier, self.finished)
+
+    async def save_spec(self, **spec) -> None:
+        self.spec.update(spec)
+        await self._save()
+
+    async def record(self, page: dict) -> None:
+        """Append one finished page. A failing disk stops checkpointing, not the crawl."""
+        if self.error is not None:
+            return
+        try:
+            await self._writer.write(page)
+        except OSError as exc:
+            self._failed(exc)
+
+    async def save_frontier(self, state: dict | Callable[[], dict]) -> None:
+        """crawl4ai's on_state_change callback: keep the latest, write it now and then.
+
+        FrontierCrawl hands over the function that builds its state instead,
+        which is called only when the state is written: copying a large
+        frontier after every page, to keep one copy in FRONTIER_SAVE_INTERVAL_S,
+        is most of the work of a big deep crawl.
+        """
+        if callable(state):
+            self._frontier_source = state
+        else:
+            self.frontier = state
+        if time.monotonic() - self._frontier_saved_at >= FRONTIER_SAVE_INTERVAL_S:
+            await self._save()
+
+    async def close(self, complete: bool) -> None:
+        """Write the final state. complete=True means there is nothing left to resume."""
+        self.complete = complete
+        if self.error is None:
+            await self._save()
+        if self._writer is not None:
+            try:
+                await self._writer.close()
+            except OSError as exc:
+                self._failed(exc)
+
+    async def _save(self) -> None:
+        if self.error is not None:
+            return
+        async with self._lock:
+            if self._frontier_source is not None:
+                # On the loop, before the thread: the crawl mutates it here.
+                self.frontier = self._frontier_source()
+            try:
+                await asyncio.to_thread(self._save_job)
+            except OSError as exc:
+                self._failed(exc)
+            self._frontier_saved_at = time.monotonic()
+
+    def _failed(self, exc: OSError) -> None:
+        logger.warning("checkpoint %s stopped: %s", self.path, exc)
+        self.error = exc
+
+    def note(self) -> str | None:
+        """What the result should say about the checkpoint, if anything."""
+        if self.error is not None:
+            return (
+                f"Checkpointing job {self.job_id!r} stopped "
+                f"({self.error.strerror or self.error}); a resume will repeat "
+                "the pages after that point."
+            )
+        if self.resumed:
+            return (
+                f"Resumed job {self.job_id!r}: {len(self.finished)} pages came "
+                "from its checkpoint and were not fetched again."
+            )
+        return None
+
+
+def read_pages(directory: str) -> list[dict]:
+    """The pages a checkpoint directory records, the latest line per URL.
+
+    For reading a job's progress from outside the call that is running it;
+    the running call only ever appends, so a read here never disturbs it.
+    """
+    return _latest(_read_lines(directory))
+
+
+def _read_lines(directory: str) -> list[dict]:
+    pages = []
+    try:
+        with open(os.path.join(directory, PAGES_FILE), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # a line cut short by the crash that ended the run
+                if isinstance(page, dict) and "url" in page:
+                    pages.append(page)
+    except FileNotFoundError:
+        pass
+    return pages
+
+
+def _latest(lines: list[dict]) -> list[dict]:
+    latest: dict[str, dict] = {}
+    for page in lines:
+        latest.pop(page["url"], None)
+        latest[page["url"]] = page
+    return list(latest.values())
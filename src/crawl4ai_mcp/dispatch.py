@@ -0,0 +1,114 @@
+"""A semaphore dispatcher that streams, for crawl_many and crawl_sitemap.
+
+crawl4ai ships two dispatchers. SemaphoreDispatcher is the one these tools
+want: a fixed number of pages in flight, no other conditions. It has no
+run_urls_stream, so arun_many with it hands back nothing until the last page
+of the batch is done. MemoryAdaptiveDispatcher streams, but it also stops
+dispatching whenever system memory passes a threshold, and a crawl that
+stalls because some other process on the machine is busy is not a trade
+worth making for progress messages.
+
+StreamingSemaphoreDispatcher is SemaphoreDispatcher plus the missing method.
+Each page still goes through the parent's crawl_url, so the rate limiter, the
+session permit and the DispatchResult timings behave exactly as they did;
+results just come out in the order they finish rather than all at once.
+
+Under adaptive concurrency each page waits for its host's room before it
+waits for the semaphore. The other way round, pages for a host that is cut
+back or paused by Retry-After would sit on the batch's slots and every
+other host would wait with them.
+
+canonical, a canonical.Canonicalizer with rel_canonical on, is asked about
+each URL just before it would start, and a URL it skips is never fetched or
+yielded.
+Each page it fetches is shown to it before the slot is handed on, so a URL
+that a page fetched earlier in the batch named as its rel=canonical is
+dropped by the time its turn comes. The answer changes while the batch
+runs, which is why it is asked at the last moment rather than when the task
+is made.
+"""
+
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from typing import Any
+
+from crawl4ai import SemaphoreDispatcher
+
+from crawl4ai_mcp.adaptive import admitted
+
+
+class StreamingSemaphoreDispatcher(SemaphoreDispatcher):
+    """SemaphoreDispatcher whose arun_many can stream, in completion order."""
+
+    def __init__(self, *args, canonical: Any = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.canonical = canonical
+
+    async def crawl_admitted(
+        self, url: str, config: Any, task_id: str, semaphore: asyncio.Semaphore
+    ) -> Any:
+        """crawl_url, once url's host has room under the call's adaptive limit."""
+        async with admitted(url):
+            return await self.crawl_url(url, config, task_id, semaphore)
+
+    async def _crawl_unless_skipped(
+        self,
+        url: str,
+        config: Any,
+        task_id: str,
+        semaphore: asyncio.Semaphore,
+        turn: asyncio.Semaphore,
+    ) -> Any:
+        # crawl_url takes its semaphore inside; turn is held around it so
+        # the question is asked once a slot is free, not when the task starts,
+        # and the page is learned from before the next one is asked about.
+        # The host's slot comes first, as in crawl_admitted.
+        async with admitted(url), turn:
+            if self.canonical.skip(url):
+                return None
+            task_result = await self.crawl_url(url, config, task_id, semaphore)
+            self.canonical.learn(task_result.result)
+            return task_result
+
+    async def run_urls_stream(
+        self, crawler: Any, urls: list[str], config: Any
+    ) -> AsyncIterator[Any]:
+        """Yield each page's CrawlerTaskResult as soon as it finishes.
+
+        Every URL gets its task up front, exactly as run_urls does, and the
+        semaphore decides how many are past it. If the consumer stops early
+        (the tool call is cancelled, or the generator is closed), the pages
+        still waiting or in flight are cancelled rather than left running
+        against a browser nobody is reading from.
+        """
+        self.crawler = crawler
+        if self.monitor:
+            self.monitor.start()
+        semaphore = asyncio.Semaphore(self.semaphore_count)
+        turn = asyncio.Semaphore(self.semaphore_count)
+        tasks = []
+        for url in urls:
+            task_id = str(uuid.uuid4())
+            if self.monitor:
+                self.monitor.add_task(task_id, url)
+            if self.canonical is None or not self.canonical.rel_canonical:
+                crawl = self.crawl_admitted(url, config, task_id, semaphore)
+            else:
+                crawl = self._crawl_unless_skipped(
+                    url, config, task_id, semaphore, turn
+                )
+            tasks.append(asyncio.create_task(crawl))
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                if result is not None:
+                    yield result
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            if self.monitor:
+                self.monitor.stop()
@@ -0,0 +1,38 @@
+"""Numbers read from CRAWL4AI_MCP_* environment variables.
+
+Every tunable the server reads from the environment is unset by default,
+and a value that does not parse is logged and ignored rather than stopping
+the server: a typo in a client's MCP config should cost the setting, not
+the server.
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def env_number(name: str, default: float, minimum: float = 0.0) -> float:
+    """A number of at least minimum from the environment, or default."""
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        logger.warning("%s=%r is not a number — using %g", name, raw, default)
+        return default
+    return max(value, minimum)
+
+
+def env_int(name: str, default: int, minimum: int = 0) -> int:
+    """An integer of at least minimum from the environment, or default."""
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        logger.warning("%s=%r is not an integer — using %d", name, raw, default)
+        return default
+    return max(value, minimum)
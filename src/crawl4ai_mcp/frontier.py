@@ -0,0 +1,364 @@
+"""A deep-crawl frontier the server runs itself, one page at a time.
+
+deep_crawl used to hand the whole crawl to crawl4ai's BFSDeepCrawlStrategy
+or BestFirstCrawlingStrategy, and inherited three things with them:
+
+- Level barriers. BFS fetches a whole depth level through arun_many and only
+  then starts the next, so while the level's slowest page loads, every other
+  slot sits idle. On a site where most pages take 300ms and a few take 20s,
+  most of the crawl is spent waiting on those few.
+- No dispatcher choice. The strategies call arun_many without a dispatcher,
+  so crawl4ai builds a MemoryAdaptiveDispatcher, which stops dispatching
+  whenever system memory passes a threshold. crawl_many and crawl_sitemap
+  avoid it for exactly that reason.
+- An off-by-one in streaming BFS, which counts the max_pages-th page and
+  breaks before yielding it. deep_crawl padded max_pages and truncated.
+
+FrontierCrawl replaces the strategy with a continuous work queue:
+
+- A slot that frees up is refilled at once from the frontier, whatever depth
+  the next URL is at. There are no levels to wait for.
+- Frontier hands URLs out round-robin across hosts, so a crawl that has
+  spread to several hosts does not spend every slot on whichever host it
+  found the most links on. Within a host, BFS takes URLs first in, first
+  out, which is shallowest first; best-first takes the highest score.
+- Pages go through the same StreamingSemaphoreDispatcher crawl_many uses:
+  its semaphore, its rate limiter, and crawler.arun per page, which is where
+  the host scheduler and adaptive concurrency already hook in.
+- Under adaptive concurrency a freed slot goes to the next URL whose host
+  has room, so a host that is cut back or paused by Retry-After does not
+  fill the slots while the other hosts have work. Only when every queued
+  host is waiting and nothing is in flight is a page started to wait for
+  its host.
+- max_pages is exact. A page is started only while the pages succeeded plus
+  the pages in flight are fewer than max_pages, so the crawl never fetches a
+  page it would have to throw away. Failures do not count, as in crawl4ai,
+  and a failed page's slot goes to the next URL.
+
+Which links are followed is unchanged: the same normalization, the same
+include_external rule and the same FilterChain, with depth 0 exempt from
+the chain, as crawl4ai's link_discovery and can_process_url apply.
+
+The state it reports through on_state_change has the shape of crawl4ai's
+BFS state (visited, pending, depths, pages_crawled), so a job checkpoint
+resumes with the same resumable_state whichever engine wrote it. Unlike
+crawl4ai, it hands over the state method rather than a copy after every
+page, and the checkpoint builds the copy only when it writes one.
+
+With a canonical.Canonicalizer, each link is queued under its canonical
+key, so links that differ only by tracking parameters or query order are
+one URL, and a URL a fetched page named as its rel=canonical is neither
+queued nor, if it was queued already, started.
+
+With a near_duplicates.NearDuplicates, a page whose content nearly repeats
+an earlier page's is yielded but its links are not followed: they are the
+links the earlier page already led to, and following them is how a
+paginated archive or a faceted listing eats a crawl's max_pages.
+
+Frontier keeps all of that in memory. FrontierCrawl takes any object with
+the same add, pop, done and `in` as its frontier, which is how
+frontier_store.DiskFrontier swaps in a SQLite file for a crawl too large
+to hold.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import uuid
+from collections import Counter, deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+from crawl4ai.models import DispatchResult
+from crawl4ai.utils import normalize_url_for_deep_crawl
+
+from crawl4ai_mcp.adaptive import has_room
+from crawl4ai_mcp.scheduler import host_key
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_TYPE = "frontier"
+
+
+@dataclass(order=True)
+class FrontierItem:
+    """One URL waiting to be crawled. Ordered for best-first's heap."""
+
+    rank: tuple = field(compare=True)
+    url: str = field(compare=False)
+    depth: int = field(compare=False, default=0)
+    parent_url: str | None = field(compare=False, default=None)
+
+
+class Frontier:
+    """URLs waiting to be crawled, handed out round-robin across hosts.
+
+    Every URL is added at most once: seen holds everything ever added,
+    crawled or not, which is what stops a link back to a page already in
+    hand from queueing it again. started holds what pop handed out,
+    finished or not, which is the state's visited.
+    """
+
+    def __init__(self, best_first: bool = False) -> None:
+        self.best_first = best_first
+        self.seen: set[str] = set()
+        self.started: set[str] = set()
+        self.depths: dict[str, int] = {}
+        self._queues: dict[str, Any] = {}
+        # Hosts with something queued, in the order they take turns.
+        self._turns: deque[str] = deque()
+        self._order = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.seen
+
+    def add(
+        self, url: str, depth: int, parent_url: str | None = None, score: float = 0.0
+    ) -> bool:
+        """Queue url unless it was ever queued before. True if it was added."""
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        self.depths[url] = depth
+        # Best-first: highest score, then shallowest, then first found.
+        # BFS: first found, which is shallowest first within a host.
+        rank = (-score, depth, next(self._order)) if self.best_first else ()
+        item = FrontierItem(rank, url, depth, parent_url)
+        host = host_key(url)
+        queue = self._queues.get(host)
+        if queue is None:
+            queue = self._queues[host] = [] if self.best_first else deque()
+            self._turns.append(host)
+        if self.best_first:
+            heapq.heappush(queue, item)
+        else:
+            queue.append(item)
+        self._size += 1
+        return True
+
+    def pop(self, ready: Callable[[str], bool] | None = None) -> FrontierItem | None:
+        """The next URL from the host whose turn it is, or None when empty.
+
+        With ready, hosts it refuses keep their turn and are passed over;
+        None when it refuses them all.
+        """
+        host = next((h for h in self._turns if ready is None or ready(h)), None)
+        if host is None:
+            return None
+        self._turns.remove(host)
+        queue = self._queues[host]
+        item = heapq.heappop(queue) if self.best_first else queue.popleft()
+        if queue:
+            self._turns.append(host)
+        else:
+            del self._queues[host]
+        self._size -= 1
+        self.started.add(item.url)
+        return item
+
+    def done(self, item: FrontierItem, success: bool) -> None:
+        """Nothing to record: started and the pages yielded say it all."""
+
+    def pending(self) -> list[FrontierItem]:
+        """Everything still queued, in no particular order."""
+        return [item for queue in self._queues.values() for item in queue]
+
+
+def _followable(url: str) -> bool:
+    # crawl4ai's can_process_url, minus the filter chain.
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and "." in parts.netloc
+
+
+class FrontierCrawl:
+    """A deep crawl from start_url, run through a dispatcher page by page."""
+
+    def __init__(
+        self,
+        start_url: str,
+        *,
+        max_depth: int,
+        max_pages: int,
+        include_external: bool = False,
+        filter_chain: Any = None,
+        url_scorer: Any = None,
+        resume_state: dict | None = None,
+        on_state_change: Callable[[Callable[[], dict]], Awaitable[None]] | None = None,
+        frontier: Any = None,
+        canonical: Any = None,
+        near_duplicates: Any = None,
+    ) -> None:
+        """frontier replaces the in-memory Frontier, e.g. with a DiskFrontier.
+
+        A frontier passed in carries its own state, so resume_state does not
+        apply to it; it counts the pages it already saw succeed in crawled.
+        """
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.include_external = include_external
+        self.filter_chain = filter_chain
+        self.url_scorer = url_scorer
+        self.on_state_change = on_state_change
+        self.canonical = canonical
+        self.near_duplicates = near_duplicates
+        if canonical is not None:
+            start_url = canonical.key(start_url)
+        self.start_url = start_url
+        self.pages_crawled = 0
+        if frontier is not None:
+            self.frontier = frontier
+            self.pages_crawled = frontier.crawled
+            # Already in the store when it is being resumed.
+            self.frontier.add(start_url, 0)
+            return
+        self.frontier = Frontier(best_first=url_scorer is not None)
+        if resume_state:
+            self._resume(resume_state)
+        else:
+            self.frontier.add(start_url, 0)
+
+    def _resume(self, state: dict) -> None:
+        depths = state.get("depths") or {}
+        # BFS writes pending; best-first writes queue_items. Either resumes.
+        items = list(state.get("pending") or []) + list(state.get("queue_items") or [])
+        for item in items:
+            url = item["url"]
+            self.frontier.add(
+                url, depths.get(url, item.get("depth", 0)), item.get("parent_url")
+            )
+        for url in state.get("visited") or []:
+            self.frontier.seen.add(url)
+            self.frontier.started.add(url)
+        self.frontier.depths.update(depths)
+        self.pages_crawled = int(state.get("pages_crawled") or 0)
+
+    def state(self) -> dict:
+        return {
+            "strategy_type": STRATEGY_TYPE,
+            "visited": list(self.frontier.started),
+            "pending": [
+                {"url": item.url, "parent_url": item.parent_url}
+                for item in self.frontier.pending()
+            ],
+            "depths": self.frontier.depths,
+            "pages_crawled": self.pages_crawled,
+        }
+
+    async def run(
+        self, crawler: Any, config: Any, dispatcher: Any
+    ) -> AsyncIterator[Any]:
+        """Yield each page's CrawlResult as it finishes, failures included.
+
+        config is used as it is for every page; it must not carry a
+        deep_crawl_strategy, or each page would start a deep crawl of its
+        own. Closing the generator cancels the pages in flight.
+        """
+        dispatcher.crawler = crawler
+        semaphore = asyncio.Semaphore(dispatcher.semaphore_count)
+        in_flight: dict[asyncio.Task, Any] = {}
+
+        def refill() -> None:
+            # Pages handed out in this pass have not taken their host's slot.
+            starting: Counter = Counter()
+            while (
+                len(in_flight) < dispatcher.semaphore_count
+                and self.pages_crawled + len(in_flight) < self.max_pages
+            ):
+                item = self.frontier.pop(lambda host: has_room(host, starting[host]))
+                if item is None and not in_flight:
+                    # Every queued host is paused or full: one page waits.
+                    item = self.frontier.pop()
+                if item is None:
+                    return
+                starting[host_key(item.url)] += 1
+                if self.canonical is not None and self.canonical.skip(item.url):
+                    # Named canonical by a page fetched since it was queued.
+                    # Not a success, so it does not count towards max_pages.
+                    self.frontier.done(item, False)
+                    continue
+                task = asyncio.create_task(
+                    dispatcher.crawl_admitted(
+                        item.url, config, str(uuid.uuid4()), semaphore
+                    )
+                )
+                in_flight[task] = item
+
+        try:
+            refill()
+            while in_flight:
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    item = in_flight.pop(task)
+                    result = self._page(task.result(), item)
+                    if result.success:
+                        self.pages_crawled += 1
+                        if self.canonical is not None:
+                            self.canonical.learn(result)
+                        if self.near_duplicates is None or not (
+                            self.near_duplicates.prune(result)
+                        ):
+                            await self._discover(result, item)
+                    self.frontier.done(item, result.success)
+                    yield result
+                    if self.on_state_change is not None:
+                        await self.on_state_change(self.state)
+                refill()
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+    def _page(self, task_result: Any, item: FrontierItem) -> Any:
+        # What arun_many does to each dispatcher result, plus what the
+        # strategies add: the page's depth and the page that linked to it.
+        result = task_result.result
+        result.dispatch_result = DispatchResult(
+            task_id=task_result.task_id,
+            memory_usage=task_result.memory_usage,
+            peak_memory=task_result.peak_memory,
+            start_time=task_result.start_time,
+            end_time=task_result.end_time,
+            error_message=task_result.error_message,
+        )
+        metadata = result.metadata if isinstance(result.metadata, dict) else {}
+        metadata["depth"] = item.depth
+        metadata["parent_url"] = item.parent_url
+        if item.rank and item.rank[0]:
+            metadata["score"] = -item.rank[0]
+        result.metadata = metadata
+        return result
+
+    async def _discover(self, result: Any, item: FrontierItem) -> None:
+        depth = item.depth + 1
+        if depth > self.max_depth:
+            return
+        links = result.links if isinstance(result.links, dict) else {}
+        found = list(links.get("internal") or [])
+        if self.include_external:
+            found += list(links.get("external") or [])
+        for link in found:
+            href = link.get("href") if isinstance(link, dict) else None
+            url = normalize_url_for_deep_crawl(href, item.url)
+            if url and self.canonical is not None:
+                key = self.canonical.key(url)
+                queued = key in self.frontier
+                self.canonical.fold(url, key, queued)
+                if queued or self.canonical.skip(key):
+                    continue
+                url = key
+            if not url or url in self.frontier or not _followable(url):
+                continue
+            if self.filter_chain is not None and not await self.filter_chain.apply(url):
+                continue
+            score = self.url_scorer.score(url) if self.url_scorer else 0.0
+            self.frontier.add(url, depth, item.url, score)
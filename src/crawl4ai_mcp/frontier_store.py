@@ -0,0 +1,263 @@
+"""A deep-crawl frontier and visited set kept in SQLite rather than memory.
+
+FrontierCrawl's in-memory Frontier holds every URL it has ever seen, and a
+crawl discovers far more URLs than it fetches: a 100,000-page crawl of a
+site with a few hundred links per page sees millions. Held as Python sets,
+deques and dicts that is gigabytes, and all of it is lost when the process
+ends. DiskFrontier keeps the same frontier in one SQLite file instead:
+
+- One row per URL ever added: its host, depth, parent, score, the order it
+  was found in, and whether it is queued, started, done or failed. The URL
+  is the primary key, so "seen before?" is an index lookup and a URL can
+  only ever be queued once.
+- Hosts take turns as they do in memory. The ring of hosts with something
+  queued is the one thing held in memory; it grows with hosts, not pages.
+- A Bloom filter answers "seen before?" for URLs that were not, which is
+  most links on a page the crawl has not reached before, without touching
+  the file. A filter can only say "maybe" for URLs it holds, so a "maybe"
+  still asks SQLite and a false positive costs a lookup, never a URL. Past
+  its capacity it says "maybe" more often and gets slower, not wrong.
+- Writes are committed once per finished page, in done(), with the file in
+  WAL mode and synchronous=NORMAL, so a commit is an append to the log
+  rather than an fsync and a page costs microseconds of SQLite work on the
+  event loop. FrontierCrawl calls done() after adding the page's links and
+  before yielding it, so by the time a job checkpoint records a page, the
+  links it led to are already in the file.
+
+It is also its own checkpoint. Opened again on the same file, it puts back
+in the queue every URL that was started but not finished, retries the ones
+that failed, and marks done whatever the job checkpoint has as finished.
+No state is rewritten whole, so resuming costs the same at page 90,000 as
+at page 10.
+"""
+
+import hashlib
+import math
+import sqlite3
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
+
+from crawl4ai_mcp.env import env_int
+from crawl4ai_mcp.frontier import FrontierItem
+from crawl4ai_mcp.scheduler import host_key
+
+BLOOM_CAPACITY_ENV = "CRAWL4AI_MCP_FRONTIER_BLOOM_CAPACITY"
+# 1.2 MB of bits for a million URLs at a 1% false-positive rate.
+DEFAULT_BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 0.01
+
+FRONTIER_FILE = "frontier.sqlite3"
+
+QUEUED, STARTED, DONE, FAILED = range(4)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    parent_url TEXT,
+    score REAL NOT NULL,
+    seq INTEGER NOT NULL,
+    state INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_fifo ON urls (host, state, seq);
+CREATE INDEX IF NOT EXISTS urls_best ON urls (host, state, score DESC, depth, seq);
+"""
+
+
+def bloom_capacity_from_env() -> int:
+    """URLs the visited-set Bloom filter is sized for; 0 turns it off."""
+    return env_int(BLOOM_CAPACITY_ENV, DEFAULT_BLOOM_CAPACITY)
+
+
+class BloomFilter:
+    """A set that can say "not in it" for certain and "in it" only maybe."""
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE) -> None:
+        self.bits = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.bits / capacity * math.log(2)), 1)
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key: str) -> list[int]:
+        # Two hashes from one digest, combined k ways (Kirsch-Mitzenmacher).
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little")
+        b = int.from_bytes(digest[8:], "little") | 1
+        return [(a + i * b) % self.bits for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key)
+        )
+
+
+class DiskFrontier:
+    """Frontier's add, pop, done and `in`, over a SQLite file.
+
+    Synchronous, like Frontier: every call is an indexed statement against
+    a local file, committed once per page, which is cheaper than a thread
+    hop. open() is the exception, since a resume scans the file, and is
+    meant to be run through asyncio.to_thread.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        best_first: bool = False,
+        bloom_capacity: int | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.best_first = best_first
+        capacity = (
+            bloom_capacity_from_env() if bloom_capacity is None else bloom_capacity
+        )
+        self.bloom = BloomFilter(capacity) if capacity > 0 else None
+        self.crawled = 0
+        # Lookups the Bloom filter answered without SQLite, for the note.
+        self.bloom_skips = 0
+        self._db: sqlite3.Connection | None = None
+        self._turns: deque[str] = deque()
+        self._queued_hosts: set[str] = set()
+        self._size = 0
+        self._seq = 0
+
+    @classmethod
+    def open(
+        cls,
+        path: str | Path,
+        best_first: bool = False,
+        finished: set[str] | frozenset = frozenset(),
+        bloom_capacity: int | None = None,
+    ) -> "DiskFrontier":
+        """Open path, creating it, or resume the crawl it holds.
+
+        finished is what the job checkpoint recorded as succeeded, which
+        is never fetched again whatever the file says about it.
+        """
+        store = cls(path, best_first, bloom_capacity)
+        store.path.parent.mkdir(parents=True, exist_ok=True)
+        # The crawl's own task is the only user, on one thread at a time.
+        db = store._db = sqlite3.connect(store.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_SCHEMA)
+        db.executemany(
+            "UPDATE urls SET state = ? WHERE url = ?", ((DONE, u) for u in finished)
+        )
+        # Started and never finished, or failed: both go round again.
+        db.execute(
+            "UPDATE urls SET state = ? WHERE state IN (?, ?)",
+            (QUEUED, STARTED, FAILED),
+        )
+        db.commit()
+        store._load()
+        return store
+
+    def _load(self) -> None:
+        db = self._db
+        self._seq = db.execute("SELECT COALESCE(MAX(seq), 0) FROM urls").fetchone()[0]
+        self.crawled = db.execute(
+            "SELECT COUNT(*) FROM urls WHERE state = ?", (DONE,)
+        ).fetchone()[0]
+        self._size = db.execute(
+            "SELECT COUNT(*) FROM urls WHERE state = ?", (QUEUED,)
+        ).fetchone()[0]
+        for (host,) in db.execute(
+            "SELECT host FROM urls WHERE state = ? GROUP BY host ORDER BY MIN(seq)",
+            (QUEUED,),
+        ):
+            self._turns.append(host)
+            self._queued_hosts.add(host)
+        if self.bloom is not None:
+            for (url,) in db.execute("SELECT url FROM urls"):
+                self.bloom.add(url)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, url: str) -> bool:
+        if self.bloom is not None and url not in self.bloom:
+            self.bloom_skips += 1
+            return False
+        row = self._db.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def add(
+        self, url: str, depth: int, parent_url: str | None = None, score: float = 0.0
+    ) -> bool:
+        """Queue url unless it was ever queued before. True if it was added."""
+        if url in self:
+            return False
+        self._seq += 1
+        host = host_key(url)
+        self._db.execute(
+            "INSERT INTO urls VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, host, depth, parent_url, score, self._seq, QUEUED),
+        )
+        if self.bloom is not None:
+            self.bloom.add(url)
+        if host not in self._queued_hosts:
+            self._queued_hosts.add(host)
+            self._turns.append(host)
+        self._size += 1
+        return True
+
+    def pop(self, ready: Callable[[str], bool] | None = None) -> FrontierItem | None:
+        """The next URL from the host whose turn it is, or None when empty.
+
+        ready passes hosts over as in Frontier.pop.
+        """
+        host = next((h for h in self._turns if ready is None or ready(h)), None)
+        if host is None:
+            return None
+        self._turns.remove(host)
+        order = "score DESC, depth, seq" if self.best_first else "seq"
+        rows = self._db.execute(
+            "SELECT url, depth, parent_url, score, seq FROM urls "
+            f"WHERE host = ? AND state = ? ORDER BY {order} LIMIT 2",
+            (host, QUEUED),
+        ).fetchall()
+        url, depth, parent_url, score, seq = rows[0]
+        self._db.execute("UPDATE urls SET state = ? WHERE url = ?", (STARTED, url))
+        if len(rows) > 1:
+            self._turns.append(host)
+        else:
+            self._queued_hosts.discard(host)
+        self._size -= 1
+        rank = (-score, depth, seq) if self.best_first else ()
+        return FrontierItem(rank, url, depth, parent_url)
+
+    def done(self, item: FrontierItem, success: bool) -> None:
+        self._db.execute(
+            "UPDATE urls SET state = ? WHERE url = ?",
+            (DONE if success else FAILED, item.url),
+        )
+        if success:
+            self.crawled += 1
+        self._db.commit()
+
+    def close(self) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.commit()
+        finally:
+            self._db.close()
+            self._db = None
+
+    def note(self) -> str:
+        bloom = (
+            f"; the Bloom filter answered {self.bloom_skips} visited check(s) "
+            "without reading the file"
+            if self.bloom is not None
+            else ""
+        )
+        return (
+            f"Frontier kept on disk in {self.path}: {self.crawled} page(s) done, "
+            f"{self._size} URL(s) still queued{bloom}."
+        )
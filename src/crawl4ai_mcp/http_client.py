@@ -0,0 +1,102 @@
+"""The one HTTP client the server's non-browser fetches share.
+
+Sitemaps, cache revalidation, render="http" pages and the update check all
+go over plain HTTP, and each used to open its own httpx.AsyncClient: one per
+sitemap, one per sub-sitemap, one per batch, one per check. A client is a
+connection pool, so a fresh one means a fresh DNS lookup, TCP connect and
+TLS handshake. A sitemap index with 300 children on one host paid for 300 of
+each, to fetch files one kept-alive connection would have carried.
+
+The lifespan builds one client with shared_client() and keeps it on
+AppContext.http:
+
+- Connections are kept alive and pooled across every call, up to
+  CRAWL4AI_MCP_HTTP_MAX_CONNECTIONS in all.
+- HTTP/2 when the h2 package is importable. httpx[http2] is what crawl4ai
+  itself depends on, so it normally is; without it the client speaks
+  HTTP/1.1 and says so once in the log. Over HTTP/2, concurrent requests
+  to one host share a single connection instead of each opening one.
+- How many requests go to one host at once stays the host scheduler's job:
+  every fetch already holds a _host_scheduler slot, bounded by
+  CRAWL4AI_MCP_HOST_CONCURRENCY, so a pool-wide limit is all this needs.
+- There is no separate DNS cache. A name is resolved when a connection is
+  opened, and pooled connections are reused rather than reopened, so a host
+  is looked up once per connection instead of once per request.
+- Cookies are never kept. The client is shared by unrelated calls, and a
+  cookie one call's site set must not ride along on another call's request.
+
+Every caller takes the client as an argument and opens a one-off client of
+its own when handed None, so the helpers still work outside a running
+server, the way they always have.
+"""
+
+import importlib.util
+import logging
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+
+from crawl4ai_mcp.env import env_int
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS_ENV = "CRAWL4AI_MCP_HTTP_MAX_CONNECTIONS"
+DEFAULT_HTTP_MAX_CONNECTIONS = 100
+
+# How long an idle connection is kept for the next request to the same host.
+# Long enough to carry a batch's pages and a crawl's sub-sitemaps; short
+# enough that a server does not hold sockets to hosts it finished with.
+KEEPALIVE_EXPIRY_S = 60.0
+
+# A default only: each caller passes the timeout it always used.
+DEFAULT_TIMEOUT_S = 30.0
+
+
+def http2_available() -> bool:
+    """Whether httpx can speak HTTP/2 here, which takes the h2 package."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _no_cookies() -> CookieJar:
+    # A policy allowing no domain refuses every cookie a response sets.
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+def shared_client(max_connections: int | None = None) -> httpx.AsyncClient:
+    """The server-wide client: pooled, kept alive, HTTP/2 where possible."""
+    if max_connections is None:
+        max_connections = env_int(
+            HTTP_MAX_CONNECTIONS_ENV, DEFAULT_HTTP_MAX_CONNECTIONS
+        )
+    max_connections = max(max_connections, 1)
+    http2 = http2_available()
+    if not http2:
+        logger.info("h2 is not installed — plain-HTTP fetches use HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=http2,
+        follow_redirects=True,
+        timeout=DEFAULT_TIMEOUT_S,
+        cookies=_no_cookies(),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=KEEPALIVE_EXPIRY_S,
+        ),
+    )
+
+
+@asynccontextmanager
+async def client_or_own(
+    client: httpx.AsyncClient | None, make: Callable[[], httpx.AsyncClient]
+) -> AsyncIterator[httpx.AsyncClient]:
+    """client as it is, or one from make() that is closed on the way out.
+
+    The shared client is never closed here: it outlives the call using it.
+    """
+    if client is not None:
+        yield client
+        return
+    async with make() as own:
+        yield own
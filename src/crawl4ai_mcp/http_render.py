@@ -0,0 +1,220 @@
+"""Plain-HTTP fetching for pages that do not need a browser.
+
+Most of a documentation sitemap is static HTML: the server sends the finished
+page and the JavaScript only adds search boxes and theme toggles. Rendering
+those pages in Chromium costs a navigation, a renderer process's worth of
+memory, and a wait for the load event, all to produce the same DOM the
+response body already contained.
+
+This module fetches such pages with httpx and hands the body to crawl4ai as a
+`raw:` URL. crawl4ai processes raw input without touching the browser unless
+the run config asks for something only a browser can do, and it runs the same
+scraping, DefaultMarkdownGenerator and Pruning/BM25 filter build_run_config
+set up. The markdown therefore comes out of the same pipeline as a browser
+crawl, just without the browser.
+
+What it cannot do is tell, from the outside, which pages are static. The
+`auto` mode guesses from the fetched body and escalates to the browser when
+the page looks like it needs JavaScript to say anything: an empty body, a
+<noscript> wall asking for JavaScript, or too few words to be the real page.
+The guess is deliberately biased toward escalating; a wrong escalation costs
+one browser crawl, a wrong non-escalation returns an app shell as the page.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+
+import httpx
+from crawl4ai import CacheMode
+from crawl4ai.models import CrawlResultContainer
+
+logger = logging.getLogger(__name__)
+
+RENDER_MODES = ["browser", "http", "auto"]
+DEFAULT_RENDER = "browser"
+
+HTTP_TIMEOUT_S = 30.0
+
+# Below this many visible words the fetched body is taken to be an app shell
+# or a loading screen rather than the page. A real docs page clears it easily
+# even after boilerplate; a React root with a spinner does not come close.
+MIN_VISIBLE_WORDS = 50
+
+# A <noscript> asking for JavaScript only counts as a wall when the rest of
+# the page is this thin. Static docs sites often carry the same message for a
+# search widget above several thousand words of perfectly readable content.
+NOSCRIPT_WALL_WORDS = 200
+
+# Run-config settings that only mean something inside a real page. crawl4ai
+# routes a raw: URL through the browser when most of these are set, so they
+# are refused under render="http" and force the browser under "auto" rather
+# than being silently dropped. session_id is here because a session IS a
+# browser page, and headers and cookies because crawl_url injects them through
+# Playwright hooks.
+BROWSER_ONLY_SETTINGS = (
+    "headers",
+    "cookies",
+    "js_code",
+    "js_code_before_wait",
+    "wait_for",
+    "session_id",
+    "scan_full_page",
+    "remove_overlay_elements",
+    "remove_consent_popups",
+    "simulate_user",
+    "override_navigator",
+    "magic",
+    "process_iframes",
+    "process_in_browser",
+    "screenshot",
+    "pdf",
+    "capture_mhtml",
+    "capture_console_messages",
+    "capture_network_requests",
+)
+
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+_INVISIBLE_BLOCKS = re.compile(
+    r"<(script|style|template|noscript|svg)\b[^>]*>.*?</\1\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+_NOSCRIPT = re.compile(
+    r"<noscript\b[^>]*>(.*?)</noscript\s*>", re.IGNORECASE | re.DOTALL
+)
+_COMMENTS = re.compile(r"<!--.*?-->", re.DOTALL)
+_TAGS = re.compile(r"<[^>]+>")
+_WORD = re.compile(r"\w{2,}")
+_ASKS_FOR_JS = re.compile(
+    r"\b(enable|requires?|turn on|needs?)\b.{0,40}javascript", re.I
+)
+
+
+def browser_only_settings(settings: dict) -> list[str]:
+    """The settings in an effective merge that need a real browser page."""
+    return [k for k in BROWSER_ONLY_SETTINGS if settings.get(k)]
+
+
+def visible_words(html: str) -> int:
+    """Count words a reader would see, ignoring scripts, styles and markup.
+
+    A regex pass rather than a parse: this runs on every page in auto mode,
+    and it only has to tell 20 words from 2,000, not reproduce the DOM.
+    """
+    text = _COMMENTS.sub(" ", html)
+    text = _INVISIBLE_BLOCKS.sub(" ", text)
+    text = _TAGS.sub(" ", text)
+    return len(_WORD.findall(text))
+
+
+@dataclass
+class HttpPage:
+    """One plain-HTTP response, kept only as long as it takes to render it."""
+
+    url: str
+    final_url: str
+    status_code: int
+    headers: dict = field(default_factory=dict)
+    html: str = ""
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+def escalation_reason(page: HttpPage) -> str | None:
+    """Why this response should be re-fetched in a browser, or None if it need not.
+
+    Returns a short category rather than a sentence, so a batch note can count
+    them: "12 too little text, 1 noscript wall".
+
+    Error statuses escalate too. A 403 or 429 from a plain client is often a
+    bot check a real browser passes, and a browser crawl that gets the same
+    answer reports it with crawl4ai's own diagnostics.
+    """
+    if page.status_code >= 400:
+        return "error status"
+    if page.content_type and page.content_type not in _HTML_TYPES:
+        return "non-HTML content"
+    if not page.html.strip():
+        return "empty body"
+    words = visible_words(page.html)
+    if words < NOSCRIPT_WALL_WORDS and any(
+        _ASKS_FOR_JS.search(_TAGS.sub(" ", block))
+        for block in _NOSCRIPT.findall(page.html)
+    ):
+        return "noscript wall"
+    if words < MIN_VISIBLE_WORDS:
+        return "too little text"
+    return None
+
+
+def page_headers(user_agent: str | None = None) -> dict[str, str]:
+    """The headers a page fetch sends.
+
+    A browser-like Accept header, so servers that content-negotiate hand back
+    the same HTML a browser would get rather than a JSON or text variant.
+    Sent per request rather than set on a client, because the client is
+    usually the server's shared one and the user agent is per call.
+    """
+    headers = {"Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8"}
+    if user_agent:
+        headers["User-Agent"] = user_agent
+    return headers
+
+
+def make_client(
+    max_connections: int, user_agent: str | None = None
+) -> httpx.AsyncClient:
+    """A client for one batch, for when there is no shared client to use."""
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=HTTP_TIMEOUT_S,
+        headers=page_headers(user_agent),
+        limits=httpx.Limits(
+            max_connections=max(max_connections, 1),
+            max_keepalive_connections=max(max_connections, 1),
+        ),
+    )
+
+
+async def fetch_page(
+    client: httpx.AsyncClient, url: str, headers: dict[str, str] | None = None
+) -> tuple[HttpPage | None, str]:
+    """GET one URL. Returns (page, "") or (None, error) -- never raises for the network."""
+    try:
+        response = await client.get(url, headers=headers, timeout=HTTP_TIMEOUT_S)
+    except httpx.HTTPError as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+    return (
+        HttpPage(
+            url=url,
+            final_url=str(response.url),
+            status_code=response.status_code,
+            headers={k.lower(): v for k, v in response.headers.items()},
+            html=response.text,
+        ),
+        "",
+    )
+
+
+async def render_page(crawler, page: HttpPage, config):
+    """Run a fetched body through crawl4ai's pipeline and label it as the real URL.
+
+    base_url makes relative links resolve against where the page actually
+    landed after redirects. cache_mode is forced to bypass because crawl4ai
+    would otherwise key its cache on the raw: string, which is the whole body.
+    The result is relabelled afterwards since crawl4ai reports the raw: string
+    as its url and 200 as its status, and every reader downstream uses both.
+    """
+    run_cfg = config.clone(base_url=page.final_url, cache_mode=CacheMode.BYPASS)
+    result = await crawler.arun(url="raw:" + page.html, config=run_cfg)
+    if isinstance(result, CrawlResultContainer):
+        # The container forwards reads to its first result but not writes.
+        result = result[0]
+    result.url = page.url
+    result.status_code = page.status_code
+    result.response_headers = page.headers
+    result.redirected_url = page.final_url
+    return result
@@ -0,0 +1,187 @@
+"""The table behind start_crawl_job, job_status, job_results and cancel_job.
+
+Every crawl tool holds its MCP request open for the whole crawl, kept alive
+by progress notifications. That ties crawl length to the client's patience:
+a tool call is one request, so an agent waits on it, and a client that
+gives up on a long request takes the crawl with it. A background job is the
+other way round. start_crawl_job answers at once with an id, the crawl runs
+in the server, and the caller polls.
+
+The table is bounded: at most CRAWL4AI_MCP_MAX_JOBS jobs are remembered.
+When it is full, the oldest finished job is forgotten to make room, and if
+every job is still running, a new one is refused rather than queued without
+limit.
+
+It is persisted. jobs.json in the state directory is rewritten atomically on
+every change of state, and each finished job's result is stored next to it.
+A restart finds the table as it was; jobs that were running when the process
+died are marked interrupted. Each job runs with its id as the crawl's job_id,
+so starting an interrupted job again resumes it from its checkpoint.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+
+from crawl4ai_mcp.checkpoint import state_dir
+from crawl4ai_mcp.env import env_int
+from crawl4ai_mcp.output import write_atomic
+
+logger = logging.getLogger(__name__)
+
+MAX_JOBS_ENV = "CRAWL4AI_MCP_MAX_JOBS"
+DEFAULT_MAX_JOBS = 100
+
+JOB_TOOLS = ("crawl_many", "crawl_sitemap", "deep_crawl")
+
+RUNNING = "running"
+# States a job does not leave without being started again.
+FINISHED = ("done", "failed", "cancelled", "interrupted")
+
+
+def max_jobs_from_env() -> int:
+    return env_int(MAX_JOBS_ENV, DEFAULT_MAX_JOBS, 1)
+
+
+@dataclass
+class Job:
+    """One background crawl. Everything but task and cancel_requested is persisted."""
+
+    job_id: str
+    tool: str
+    arguments: dict
+    state: str = RUNNING
+    created: float = field(default_factory=time.time)
+    finished: float | None = None
+    progress: float = 0
+    total: float | None = None
+    message: str | None = None
+    crawled: int | None = None
+    pages: int | None = None
+    error: str | None = None
+    task: asyncio.Task | None = field(default=None, repr=False, compare=False)
+    # Tells cancel_job's cancellation apart from the server shutting down.
+    cancel_requested: bool = field(default=False, repr=False, compare=False)
+
+    def to_json(self) -> dict:
+        # Not asdict: it deep-copies every field, and a Task cannot be copied.
+        return {
+            f.name: getattr(self, f.name)
+            for f in fields(self)
+            if f.name not in ("task", "cancel_requested")
+        }
+
+
+class JobTable:
+    """Background jobs by id, bounded, and saved to directory/jobs.json."""
+
+    def __init__(self, directory: Path, limit: int = DEFAULT_MAX_JOBS) -> None:
+        self.directory = Path(directory)
+        self.limit = max(int(limit), 1)
+        self._jobs: dict[str, Job] = {}
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "JobTable":
+        table = cls(state_dir() / "background", max_jobs_from_env())
+        table.load()
+        return table
+
+    @property
+    def path(self) -> Path:
+        return self.directory / "jobs.json"
+
+    def result_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.result.json"
+
+    def load(self) -> None:
+        """Read the saved table. A missing or unreadable file is an empty one."""
+        try:
+            records = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logger.warning("could not read %s, starting empty: %s", self.path, exc)
+            return
+        for record in records if isinstance(records, list) else []:
+            try:
+                job = Job(**record)
+            except TypeError:
+                continue
+            if job.state == RUNNING:
+                # The process that ran it is gone.
+                job.state = "interrupted"
+                job.finished = job.finished or time.time()
+            self._jobs[job.job_id] = job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        return sorted(self._jobs.values(), key=lambda job: job.created)
+
+    def running(self) -> list[Job]:
+        return [job for job in self._jobs.values() if job.state == RUNNING]
+
+    async def add(self, job: Job) -> str | None:
+        """Enter job in the table, or say why it cannot be.
+
+        A finished job with the same id is replaced: starting it again is how
+        an interrupted or cancelled job is resumed.
+        """
+        existing = self._jobs.get(job.job_id)
+        if existing is not None and existing.state == RUNNING:
+            return f"Job {job.job_id!r} is already running."
+        if existing is None and len(self._jobs) >= self.limit:
+            finished = [j for j in self.jobs() if j.state != RUNNING]
+            if not finished:
+                return (
+                    f"All {self.limit} job slots are running crawls. Wait for one "
+                    f"to finish or cancel one; {MAX_JOBS_ENV} raises the limit."
+                )
+            await self.forget(finished[0].job_id, save=False)
+        self._jobs[job.job_id] = job
+        await self.save()
+        return None
+
+    async def forget(self, job_id: str, save: bool = True) -> None:
+        self._jobs.pop(job_id, None)
+        try:
+            await asyncio.to_thread(self.result_path(job_id).unlink, missing_ok=True)
+        except OSError as exc:
+            logger.warning("could not remove the result of job %s: %s", job_id, exc)
+        if save:
+            await self.save()
+
+    async def save(self) -> None:
+        """Write the table. A disk that refuses costs persistence, not the job."""
+        text = json.dumps([job.to_json() for job in self.jobs()])
+        async with self._lock:
+            try:
+                await asyncio.to_thread(self._write, self.path, text)
+            except OSError as exc:
+                logger.warning("could not save %s: %s", self.path, exc)
+
+    async def store_result(self, job_id: str, result: dict) -> None:
+        try:
+            await asyncio.to_thread(
+                self._write, self.result_path(job_id), json.dumps(result)
+            )
+        except OSError as exc:
+            logger.warning("could not save the result of job %s: %s", job_id, exc)
+
+    async def load_result(self, job_id: str) -> dict | None:
+        def read() -> dict | None:
+            try:
+                return json.loads(self.result_path(job_id).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return None
+
+        return await asyncio.to_thread(read)
+
+    def _write(self, path: Path, text: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(str(path), text)
@@ -0,0 +1,251 @@
+"""Content filtering and markdown generation in worker processes.
+
+crawl4ai turns a page into markdown inside arun, synchronously, on the
+event loop: the scraping strategy cleans the HTML, then
+DefaultMarkdownGenerator runs PruningContentFilter or BM25ContentFilter
+over it and html2text over both. All of it is pure Python. A 2MB docs page
+keeps the loop busy for a few hundred milliseconds, and while it does,
+nothing else in the server runs: not the other nineteen pages of a 20-way
+crawl_many, not their progress heartbeats, not another client's tool call.
+A faster machine does not help, because one loop only ever uses one core.
+
+With CRAWL4AI_MCP_MARKDOWN_WORKERS set above 0 (the default, 0, keeps it
+all inline), the filter and the markdown conversion run in a
+ProcessPoolExecutor of that many processes instead:
+
+- offload_markdown wraps each crawler's arun, as schedule_crawler does. For
+  the page it is crawling, PooledMarkdownGenerator's generate_markdown
+  records the HTML it was handed and returns an empty result at once; when
+  arun returns, the real generation runs in a worker and its result replaces
+  the empty one before anything reads it. The wrapper is the outermost one,
+  so the page's host slot and adaptive-concurrency sample are given back
+  before the markdown is made, not after.
+- Only the generator's input crosses to the worker: the cleaned HTML that
+  crawl4ai picked by content_source, which is a fraction of the raw page,
+  as one str, plus the generator with its filter, pickled in about 1.5KB.
+  What comes back is five strings.
+- Queueing is bounded. At most QUEUE_PER_WORKER pages per worker are handed
+  to the executor at a time; the rest wait on a semaphore, without holding
+  the loop, so a 10,000-page batch does not stack every page's HTML in the
+  executor's call queue.
+- Pages that crawl4ai caches, and pages with an extraction strategy, are
+  made inline as before: both read the markdown inside arun, before it
+  could come back from a worker.
+- A worker that dies (a segfault in lxml, the OOM killer) fails only the
+  pool, not the page: the page is made inline, and the next one starts a
+  fresh pool.
+
+Scraping itself stays inside arun. It is the smaller part of the work, and
+its result is what crawl4ai reads links, media and tables from.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from crawl4ai.cache_context import CacheMode
+from crawl4ai.models import MarkdownGenerationResult
+
+from crawl4ai_mcp import timings
+from crawl4ai_mcp.env import env_int
+from crawl4ai_mcp.scheduler import starts_deep_crawl
+from crawl4ai_mcp.timings import PageTimings, TimedMarkdownGenerator
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN_WORKERS_ENV = "CRAWL4AI_MCP_MARKDOWN_WORKERS"
+DEFAULT_MARKDOWN_WORKERS = 0
+# Pages per worker in the executor at once: one running, one ready to go.
+QUEUE_PER_WORKER = 2
+
+# Cache modes under which crawl4ai writes the result, markdown and all,
+# before arun returns.
+_CACHE_WRITES = {CacheMode.ENABLED, CacheMode.WRITE_ONLY}
+
+
+def markdown_workers_from_env() -> int:
+    """Worker processes for markdown generation; 0 keeps it on the loop."""
+    if os.environ.get(MARKDOWN_WORKERS_ENV, "").strip() == "auto":
+        return os.cpu_count() or 1
+    return env_int(MARKDOWN_WORKERS_ENV, DEFAULT_MARKDOWN_WORKERS)
+
+
+@dataclass
+class _Deferred:
+    """What generate_markdown was asked to do, to be done after arun."""
+
+    generator: Any = None
+    input_html: str = ""
+    kwargs: dict = field(default_factory=dict)
+
+
+# The page this task is crawling, while offload_markdown defers its markdown.
+_deferred: ContextVar[_Deferred | None] = ContextVar(
+    "crawl4ai_markdown_deferred", default=None
+)
+
+_EMPTY = MarkdownGenerationResult(
+    raw_markdown="", markdown_with_citations="", references_markdown=""
+)
+
+
+class PooledMarkdownGenerator(TimedMarkdownGenerator):
+    """TimedMarkdownGenerator that can hand its work to offload_markdown.
+
+    Outside a deferring arun, and in the worker itself, it is exactly
+    TimedMarkdownGenerator.
+    """
+
+    def generate_markdown(self, input_html, *args, **kwargs):
+        slot = _deferred.get()
+        if slot is None or args:
+            return super().generate_markdown(input_html, *args, **kwargs)
+        # crawl4ai may process a page more than once (anti-bot retries); the
+        # last call is the one its result comes from.
+        slot.generator = self
+        slot.input_html = input_html
+        slot.kwargs = kwargs
+        return _EMPTY
+
+
+def _generate(
+    generator: Any, input_html: str, kwargs: dict, timed: bool
+) -> tuple[MarkdownGenerationResult, float]:
+    """The worker's half: the markdown, and the filter's share of the time."""
+    if not timed:
+        return generator.generate_markdown(input_html, **kwargs), 0.0
+    timer = PageTimings()
+    with timings.page(timer):
+        result = generator.generate_markdown(input_html, **kwargs)
+    return result, timer.filter_s
+
+
+class MarkdownPool:
+    """The server's markdown workers, started on first use."""
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._gate = asyncio.Semaphore(max(workers, 1) * QUEUE_PER_WORKER)
+        self.pages = 0
+        self.inline = 0
+
+    @classmethod
+    def from_env(cls) -> "MarkdownPool":
+        return cls(markdown_workers_from_env())
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the server has threads (Playwright's driver,
+            # to_thread workers) that a forked child would inherit mid-lock.
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def applies(self, config: Any) -> bool:
+        """Whether a page crawled with config can have its markdown deferred."""
+        if not self.enabled or config is None:
+            return False
+        if not isinstance(config.markdown_generator, PooledMarkdownGenerator):
+            return False
+        if config.extraction_strategy is not None:
+            return False
+        return config.cache_mode not in _CACHE_WRITES
+
+    async def generate(
+        self, generator: Any, input_html: str, **kwargs: Any
+    ) -> MarkdownGenerationResult:
+        """Run generator over input_html in a worker, or inline if the pool broke.
+
+        Reports to the page's timer as the inline generator would, with the
+        wait for a worker counted as markdown time.
+        """
+        timer = timings.current_page()
+        if timer is not None:
+            timer.mark("markdown_start")
+        try:
+            async with self._gate:
+                pool = self._pool()
+                loop = asyncio.get_running_loop()
+                try:
+                    result, filter_s = await loop.run_in_executor(
+                        pool,
+                        _generate,
+                        generator,
+                        input_html,
+                        kwargs,
+                        timer is not None,
+                    )
+                except BrokenProcessPool:
+                    logger.warning(
+                        "markdown worker died; this page is made in process "
+                        "and the next one starts a new pool"
+                    )
+                    if self._executor is pool:
+                        self._executor = None
+                        pool.shutdown(wait=False, cancel_futures=True)
+                    self.inline += 1
+                    result = generator.generate_markdown(input_html, **kwargs)
+                    filter_s = 0.0
+            self.pages += 1
+            if timer is not None:
+                timer.filter_s += filter_s
+            return result
+        finally:
+            if timer is not None:
+                timer.mark("markdown_end")
+
+    async def finish(self, result: Any, slot: _Deferred) -> None:
+        """Put the deferred markdown into every result arun returned."""
+        if slot.generator is None:
+            return
+        markdown = await self.generate(slot.generator, slot.input_html, **slot.kwargs)
+        for page in getattr(result, "_results", None) or [result]:
+            page.markdown = markdown
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def offload_markdown(crawler: Any, pool: MarkdownPool) -> None:
+    """Make the markdown of every page this crawler fetches in pool.
+
+    Installed last, so it wraps the host scheduler and adaptive concurrency
+    and a page has given their slots back before its markdown is made. Does
+    nothing when the pool is off. The outer deep-crawl call goes straight
+    through; its pages come back through arun one by one.
+    """
+    arun = crawler.arun
+    if not pool.enabled or getattr(arun, "_markdown_pooled", False) is True:
+        return
+
+    @functools.wraps(arun)
+    async def pooled_arun(url: str, config: Any = None, **kwargs):
+        if starts_deep_crawl(config) or not pool.applies(config):
+            return await arun(url, config=config, **kwargs)
+        slot = _Deferred()
+        token = _deferred.set(slot)
+        try:
+            result = await arun(url, config=config, **kwargs)
+        finally:
+            _deferred.reset(token)
+        await pool.finish(result, slot)
+        return result
+
+    pooled_arun._markdown_pooled = True
+    crawler.arun = pooled_arun
@@ -0,0 +1,397 @@
+"""In-process counters and histograms, readable as a tool or as Prometheus text.
+
+Until this existed the only record of what the server did was its stderr log,
+which an MCP client swallows and nobody aggregates. How many pages an hour it
+crawls, what share of them come back 4xx or behind a bot wall, how long a
+crawl_many takes at p99, how often the browser has had to be restarted: none
+of it could be answered, so there was nothing to size a deployment against.
+
+Everything here is kept in plain dicts on the server's one event loop and
+costs a few dictionary updates per call. There is no client library: the
+Prometheus text format is a few lines of string building, and a dependency
+for it would be the only one this server has that is not for crawling.
+
+The HTTP endpoint is off unless CRAWL4AI_MCP_METRICS_PORT is set, and binds
+to 127.0.0.1 unless CRAWL4AI_MCP_METRICS_HOST says otherwise: the numbers
+include which tools are called how often, which is not something to publish
+on every interface by default.
+"""
+
+import asyncio
+import bisect
+import contextvars
+import logging
+import math
+import os
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT_ENV = "CRAWL4AI_MCP_METRICS_PORT"
+METRICS_HOST_ENV = "CRAWL4AI_MCP_METRICS_HOST"
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+# Call latency buckets, in seconds. A crawl_url is a second or two; a sitemap
+# crawl can run for many minutes, so the top buckets go well past an hour.
+LATENCY_BUCKETS = (
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+    900.0,
+    3600.0,
+)
+
+# Durations kept per tool for the percentiles the metrics tool reports. The
+# histogram above is what Prometheus computes quantiles from; this is for a
+# human reading the tool output, who wants a p99 and not fourteen buckets.
+LATENCY_WINDOW = 1024
+
+PERCENTILES = (50, 90, 99)
+
+_PREFIX = "crawl4ai_mcp"
+
+
+def status_class(status_code: object) -> str:
+    """'2xx' through '5xx', or 'none' when no response was received."""
+    if isinstance(status_code, int) and 100 <= status_code < 600:
+        return f"{status_code // 100}xx"
+    return "none"
+
+
+def antibot_blocks(result: object) -> int:
+    """How many of a result's attempts crawl4ai's anti-bot check flagged.
+
+    Read from crawl_stats the same defensive way _failure_diagnostics reads
+    it: it is None on a plain single-attempt failure, which is normal.
+    """
+    stats = getattr(result, "crawl_stats", None)
+    if not isinstance(stats, dict):
+        return 0
+    attempts = stats.get("proxies_used")
+    if not isinstance(attempts, list):
+        return 0
+    return sum(1 for a in attempts if isinstance(a, dict) and a.get("blocked"))
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list. 0.0 for an empty one."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+@dataclass
+class ToolStats:
+    """Everything recorded against one tool name."""
+
+    calls: dict[str, int] = field(default_factory=dict)  # by outcome
+    pages: dict[str, int] = field(default_factory=dict)  # by status class
+    failed_pages: int = 0
+    antibot_blocked: int = 0
+    markdown_bytes: int = 0
+    latency_sum: float = 0.0
+    latency_buckets: list[int] = field(
+        default_factory=lambda: [0] * len(LATENCY_BUCKETS)
+    )
+    recent: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    @property
+    def call_count(self) -> int:
+        return sum(self.calls.values())
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latency_sum += seconds
+        self.recent.append(seconds)
+        i = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        if i < len(self.latency_buckets):
+            self.latency_buckets[i] += 1
+
+
+@dataclass
+class CallRecord:
+    """The tool call in progress, so page counts land against the right tool."""
+
+    metrics: "Metrics"
+    tool: str
+    outcome: str = "exception"
+
+
+@dataclass
+class _Queued:
+    remaining: int
+
+
+# The metered call this task belongs to. The dispatcher's page tasks inherit
+# it, which is how pages crawled inside crawl4ai are counted against the tool
+# that asked for them.
+_call: contextvars.ContextVar[CallRecord | None] = contextvars.ContextVar(
+    "crawl4ai_metrics_call", default=None
+)
+_queued: contextvars.ContextVar[_Queued | None] = contextvars.ContextVar(
+    "crawl4ai_metrics_queued", default=None
+)
+
+
+class Metrics:
+    """Process-wide counters. One instance lives on the AppContext."""
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self.tools: dict[str, ToolStats] = {}
+        self.browser_restarts: dict[str, int] = {}
+        self.queue_depth = 0
+
+    def _tool(self, name: str) -> ToolStats:
+        stats = self.tools.get(name)
+        if stats is None:
+            stats = self.tools[name] = ToolStats()
+        return stats
+
+    @contextmanager
+    def call(self, tool: str) -> Iterator[CallRecord]:
+        """Count one tool call and time it. Set record.outcome before leaving.
+
+        An exception leaves the outcome at "exception", which is what a tool
+        raising for an unexpected failure is.
+        """
+        record = CallRecord(self, tool)
+        token = _call.set(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            _call.reset(token)
+            stats = self._tool(tool)
+            stats.calls[record.outcome] = stats.calls.get(record.outcome, 0) + 1
+            stats.observe_latency(time.perf_counter() - start)
+
+    def restart(self, reason: str) -> None:
+        self.browser_restarts[reason] = self.browser_restarts.get(reason, 0) + 1
+
+    @contextmanager
+    def queued(self, pages: int) -> Iterator[None]:
+        """Count pages handed to a dispatcher until each one gets a page open.
+
+        page_started() takes one off as each page opens; whatever is left when
+        the batch ends (pages that failed before opening) comes off here.
+        """
+        entry = _Queued(pages)
+        self.queue_depth += pages
+        token = _queued.set(entry)
+        try:
+            yield
+        finally:
+            _queued.reset(token)
+            self.queue_depth -= entry.remaining
+            entry.remaining = 0
+
+    def restarts(self, counted_elsewhere: dict[str, int] | None = None) -> dict:
+        """Restarts recorded here, plus any the pool keeps count of itself."""
+        merged = dict(self.browser_restarts)
+        for reason, n in (counted_elsewhere or {}).items():
+            merged[reason] = merged.get(reason, 0) + n
+        return {reason: n for reason, n in merged.items() if n}
+
+    def snapshot(
+        self, gauges: dict[str, float], restarts: dict[str, int] | None = None
+    ) -> str:
+        """A readable summary for the metrics tool."""
+        uptime = time.time() - self.started_at
+        lines = [f"Uptime: {uptime / 3600:.1f}h"]
+        for name, value in gauges.items():
+            lines.append(f"{name.replace('_', ' ').capitalize()}: {value:g}")
+        restarted = ", ".join(
+            f"{n} {reason}" for reason, n in sorted(self.restarts(restarts).items())
+        )
+        lines.append(f"Browser restarts: {restarted or 'none'}")
+        if not self.tools:
+            lines.append("No tool calls yet.")
+            return "\n".join(lines)
+        for name in sorted(self.tools):
+            stats = self.tools[name]
+            recent = list(stats.recent)
+            outcomes = ", ".join(f"{n} {o}" for o, n in sorted(stats.calls.items()))
+            pct = ", ".join(f"p{p} {percentile(recent, p):.2f}s" for p in PERCENTILES)
+            lines.append("")
+            lines.append(f"{name}: {stats.call_count} calls ({outcomes}); {pct}")
+            if stats.pages:
+                classes = ", ".join(f"{n} {c}" for c, n in sorted(stats.pages.items()))
+                lines.append(
+                    f"  pages: {sum(stats.pages.values())} ({classes}), "
+                    f"{stats.failed_pages} failed, "
+                    f"{stats.antibot_blocked} anti-bot blocks"
+                )
+            if stats.markdown_bytes:
+                lines.append(f"  markdown returned: {stats.markdown_bytes:,} bytes")
+        return "\n".join(lines)
+
+    def exposition(
+        self, gauges: dict[str, float], restarts: dict[str, int] | None = None
+    ) -> str:
+        """Prometheus text exposition format, version 0.0.4."""
+        out: list[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> str:
+            full = f"{_PREFIX}_{name}"
+            out.append(f"# HELP {full} {help_text}")
+            out.append(f"# TYPE {full} {kind}")
+            return full
+
+        name = family("tool_calls_total", "counter", "Tool calls by outcome.")
+        for tool, stats in sorted(self.tools.items()):
+            for outcome, n in sorted(stats.calls.items()):
+                out.append(f'{name}{{tool="{tool}",outcome="{outcome}"}} {n}')
+
+        name = family("pages_total", "counter", "Pages returned by HTTP status class.")
+        for tool, stats in sorted(self.tools.items()):
+            for cls, n in sorted(stats.pages.items()):
+                out.append(f'{name}{{tool="{tool}",status_class="{cls}"}} {n}')
+
+        name = family(
+            "pages_failed_total", "counter", "Pages crawl4ai reported as failed."
+        )
+        for tool, stats in sorted(self.tools.items()):
+            if stats.pages:
+                out.append(f'{name}{{tool="{tool}"}} {stats.failed_pages}')
+
+        name = family(
+            "antibot_blocked_total",
+            "counter",
+            "Attempts crawl4ai's anti-bot detection flagged, from crawl_stats.",
+        )
+        for tool, stats in sorted(self.tools.items()):
+            if stats.pages:
+                out.append(f'{name}{{tool="{tool}"}} {stats.antibot_blocked}')
+
+        name = family(
+            "markdown_bytes_total", "counter", "Bytes of markdown returned inline."
+        )
+        for tool, stats in sorted(self.tools.items()):
+            if stats.markdown_bytes:
+                out.append(f'{name}{{tool="{tool}"}} {stats.markdown_bytes}')
+
+        name = family("tool_duration_seconds", "histogram", "Tool call latency.")
+        for tool, stats in sorted(self.tools.items()):
+            running = 0
+            for bound, n in zip(LATENCY_BUCKETS, stats.latency_buckets):
+                running += n
+                out.append(f'{name}_bucket{{tool="{tool}",le="{bound:g}"}} {running}')
+            out.append(f'{name}_bucket{{tool="{tool}",le="+Inf"}} {stats.call_count}')
+            out.append(f'{name}_sum{{tool="{tool}"}} {stats.latency_sum:.6f}')
+            out.append(f'{name}_count{{tool="{tool}"}} {stats.call_count}')
+
+        name = family(
+            "browser_restarts_total", "counter", "Browser restarts by reason."
+        )
+        for reason, n in sorted(self.restarts(restarts).items()):
+            out.append(f'{name}{{reason="{reason}"}} {n}')
+
+        for gauge, value in gauges.items():
+            full = family(gauge, "gauge", gauge.replace("_", " ").capitalize() + ".")
+            out.append(f"{full} {value:g}")
+        return "\n".join(out) + "\n"
+
+
+def observe_pages(results: list, markdown_bytes: int = 0) -> None:
+    """Count finished pages against the metered call this task belongs to.
+
+    A no-op outside one, so the helpers that call it stay usable on their own.
+    """
+    record = _call.get()
+    if record is None:
+        return
+    stats = record.metrics._tool(record.tool)
+    for result in results:
+        cls = status_class(getattr(result, "status_code", None))
+        stats.pages[cls] = stats.pages.get(cls, 0) + 1
+        if not getattr(result, "success", False):
+            stats.failed_pages += 1
+        stats.antibot_blocked += antibot_blocks(result)
+    stats.markdown_bytes += markdown_bytes
+
+
+def page_started() -> None:
+    """A dispatched page has a browser page open, so it is no longer queued."""
+    entry = _queued.get()
+    record = _call.get()
+    if entry is None or record is None or entry.remaining <= 0:
+        return
+    entry.remaining -= 1
+    record.metrics.queue_depth -= 1
+
+
+def metrics_port_from_env() -> int | None:
+    """The port for the /metrics endpoint, or None when it is off."""
+    raw = os.environ.get(METRICS_PORT_ENV, "").strip()
+    if not raw:
+        return None
+    try:
+        port = int(raw)
+    except ValueError:
+        logger.warning("%s=%r is not a port — /metrics is off", METRICS_PORT_ENV, raw)
+        return None
+    if not 0 < port < 65536:
+        logger.warning(
+            "%s=%d is out of range — /metrics is off", METRICS_PORT_ENV, port
+        )
+        return None
+    return port
+
+
+async def serve_metrics(
+    render: Callable[[], str], port: int, host: str | None = None
+) -> asyncio.Server:
+    """Serve GET /metrics on host:port. The caller closes the returned server.
+
+    A bare asyncio server rather than a web framework: it answers one path
+    with one string, and the MCP transport is stdio, so there is no HTTP
+    stack in the process to mount it on.
+    """
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            parts = request.decode("latin-1").split()
+            # Drain the headers; nothing in them changes the answer.
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1] == "/metrics":
+                status, body = "200 OK", render().encode()
+                ctype = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status, body = "404 Not Found", b"Only /metrics is served here.\n"
+                ctype = "text/plain; charset=utf-8"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (TimeoutError, ConnectionError) as exc:
+            logger.debug("metrics request dropped: %s", exc)
+        finally:
+            writer.close()
+
+    bind = host or os.environ.get(METRICS_HOST_ENV, "").strip() or DEFAULT_METRICS_HOST
+    server = await asyncio.start_server(handle, bind, port)
+    logger.info("Serving metrics on http://%s:%d/metrics", bind, port)
+    return server
@@ -0,0 +1,208 @@
+"""Near-duplicate pages within one crawl, found by SimHash over the markdown.
+
+Canonical URLs catch one page listed several ways. They do not catch
+different pages that say the same thing: faceted listings sorted another
+way, print views, paginated archives whose pages share everything but a
+few lines, a calendar with one page per empty day. After the content
+filter these come out as near-identical markdown, and an agent reading the
+batch pays for every copy.
+
+NearDuplicates fingerprints each successful page's filtered markdown and
+compares it with the pages before it:
+
+- The fingerprint is a 64-bit SimHash of the page's 3-word shingles, each
+  weighted by how often it occurs. Pages that share most of their shingles
+  get fingerprints a few bits apart; unrelated pages land about 32 apart.
+- Two pages are near duplicates when their fingerprints differ in at most
+  MAX_DISTANCE bits: about a word or two changed in a 60-word page, ten
+  or so in a 1,000-word one. Pages with nothing in common stay 15 or more
+  bits apart even at 30 words. The index splits each fingerprint into
+  MAX_DISTANCE + 1 bands, and any two fingerprints that close agree on at
+  least one band exactly, so a page is compared only with the pages sharing
+  a band rather than with every page so far. It keeps 8 bytes and a URL per page.
+- A resumed job carries the index over: each original's fingerprint is
+  recorded with its page in the checkpoint, and restore() puts it back, so
+  a page fetched after the resume is compared with the pages fetched before
+  it. Pages recorded while near_duplicates was "off" have no fingerprint
+  and are not compared.
+- The first page seen is the original and the later ones point at it. A
+  duplicate is never indexed itself, so nothing ends up a duplicate of a
+  duplicate.
+- Pages under MIN_WORDS words are not fingerprinted. A shingle or two is not
+  enough to tell "the same" from "both short".
+
+The mode says what happens to a duplicate: "flag" keeps it and sets its
+duplicate_of, "collapse" keeps only that (no markdown, no file), and "drop"
+leaves it out of the result. deep_crawl follows no links from a duplicate,
+whatever the mode, since its links are the original's links.
+"""
+
+import hashlib
+import re
+from collections import Counter
+
+NEAR_DUPLICATE_MODES = ["off", "flag", "collapse", "drop"]
+
+MAX_DISTANCE = 6
+MIN_WORDS = 30
+SHINGLE = 3
+
+_BANDS = MAX_DISTANCE + 1
+_BAND_BITS = 64 // _BANDS
+_WORD = re.compile(r"\w+")
+
+# Sums 64 bit counters at once: each bit of a hash is spread into a lane of
+# its own, so adding spread hashes counts every bit position in one add.
+_LANE = 32
+_LANE_MASK = (1 << _LANE) - 1
+_SPREAD = [
+    sum(1 << (bit * _LANE) for bit in range(8) if byte >> bit & 1)
+    for byte in range(256)
+]
+
+
+def simhash(text: str) -> int | None:
+    """text's 64-bit SimHash, or None when it has too few words to judge."""
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = Counter(
+        " ".join(words[i : i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)
+    )
+    total = 0
+    for shingle, weight in shingles.items():
+        digest = hashlib.blake2b(shingle.encode(), digest_size=8).digest()
+        spread = 0
+        for i, byte in enumerate(digest):
+            spread |= _SPREAD[byte] << (i * 8 * _LANE)
+        total += spread * weight
+    half = sum(shingles.values()) / 2
+    fingerprint = 0
+    for bit in range(64):
+        if (total >> (bit * _LANE)) & _LANE_MASK > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def _content(result) -> str:
+    md = getattr(result, "markdown", None)
+    if not md:
+        return ""
+    text = md.fit_markdown or md.raw_markdown
+    return text if isinstance(text, str) else ""
+
+
+class NearDuplicates:
+    """The fingerprints of one crawl's pages, and which pages repeat which."""
+
+    def __init__(self, mode: str = "flag") -> None:
+        self.mode = mode
+        self._bands: list[dict[int, list[tuple[int, str]]]] = [
+            {} for _ in range(_BANDS)
+        ]
+        # Every page checked, and the original it repeats or None.
+        self._checked: dict[str, str | None] = {}
+        # The fingerprint of every page indexed, for the checkpoint.
+        self._fingerprints: dict[str, int] = {}
+        self.found = 0
+        # Duplicates deep_crawl followed no links from.
+        self.pruned = 0
+        self.examples: list[tuple[str, str]] = []
+
+    @classmethod
+    def of(cls, mode: str) -> "NearDuplicates | None":
+        """The call's index, or None when mode is "off"."""
+        return None if mode == "off" else cls(mode)
+
+    @property
+    def drops(self) -> bool:
+        return self.mode == "drop"
+
+    @property
+    def keeps_content(self) -> bool:
+        return self.mode == "flag"
+
+    def check(self, result) -> str | None:
+        """The URL of an earlier page result repeats, or None.
+
+        Asked again about the same URL, answers as it did the first time,
+        so deep_crawl's frontier and the output can both ask.
+        """
+        url = result.url
+        if url in self._checked:
+            return self._checked[url]
+        original = None
+        if getattr(result, "success", False):
+            fingerprint = simhash(_content(result))
+            if fingerprint is not None:
+                original = self._match(fingerprint)
+                if original is None:
+                    self._index(fingerprint, url)
+        self._checked[url] = original
+        if original is not None:
+            self.found += 1
+            if len(self.examples) < 3:
+                self.examples.append((url, original))
+        return original
+
+    def prune(self, result) -> bool:
+        """Whether a crawl should follow no links from result, and count it."""
+        if self.check(result) is None:
+            return False
+        self.pruned += 1
+        return True
+
+    def duplicate_of(self, url: str) -> str | None:
+        return self._checked.get(url)
+
+    def fingerprint(self, url: str) -> int | None:
+        """url's fingerprint when it was indexed as an original, else None."""
+        return self._fingerprints.get(url)
+
+    def restore(
+        self, url: str, fingerprint: int | None, duplicate_of: str | None
+    ) -> None:
+        """Take back a page checked by an earlier run of a resumed job.
+
+        Not counted in found: the earlier run reported it.
+        """
+        if url in self._checked:
+            return
+        self._checked[url] = duplicate_of
+        if duplicate_of is None and fingerprint is not None:
+            self._index(fingerprint, url)
+
+    def _keys(self, fingerprint: int) -> list[int]:
+        mask = (1 << _BAND_BITS) - 1
+        return [(fingerprint >> (i * _BAND_BITS)) & mask for i in range(_BANDS)]
+
+    def _match(self, fingerprint: int) -> str | None:
+        for band, key in zip(self._bands, self._keys(fingerprint)):
+            for other, url in band.get(key, ()):
+                if (fingerprint ^ other).bit_count() <= MAX_DISTANCE:
+                    return url
+        return None
+
+    def _index(self, fingerprint: int, url: str) -> None:
+        self._fingerprints[url] = fingerprint
+        for band, key in zip(self._bands, self._keys(fingerprint)):
+            band.setdefault(key, []).append((fingerprint, url))
+
+    def note(self) -> str | None:
+        if not self.found:
+            return None
+        done = {
+            "flag": "flagged with duplicate_of",
+            "collapse": "returned without content, with duplicate_of set",
+            "drop": "left out of the result",
+        }[self.mode]
+        examples = "; ".join(f"{url} ~ {original}" for url, original in self.examples)
+        pruned = (
+            f" No links were followed from {self.pruned} of them."
+            if self.pruned
+            else ""
+        )
+        return (
+            f"Near duplicates: {self.found} page(s) had almost the same content "
+            f"as an earlier page and were {done} (e.g. {examples}).{pruned}"
+        )
@@ -0,0 +1,131 @@
+"""Write a batch to output_dir page by page, as the pages finish.
+
+output_dir used to be written once, at the end: every page of the batch was
+held in memory until the last one finished, and then every .md file and
+manifest.json went out in one synchronous pass on the event loop. That has
+two costs on a large sitemap:
+
+- nothing reaches the disk until everything is done. A client idle timeout,
+  a deploy or an OOM 4,000 pages in leaves an empty directory, and the whole
+  crawl is paid for again.
+- peak memory is the whole batch, markdown and all, however little of it the
+  caller wants back inline.
+
+A ManifestWriter is the other way round. Each page's .md file is written the
+moment the page arrives, and a line for it is appended to manifest.jsonl,
+one JSON object per page. Both writes run in a worker thread, so a slow disk
+never stalls the crawl sharing the event loop. The manifest is flushed per
+line and fsynced every SYNC_EVERY lines or SYNC_INTERVAL_S seconds, whichever
+comes first, and once more on close: a crash loses at most that window, and
+whatever made it into the file is whole lines a reader can parse.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+MANIFEST_JSONL = "manifest.jsonl"
+
+# fsync is the expensive part of an append, and per line it would dominate a
+# crawl of small pages on a laptop disk. These bound what a crash can lose.
+SYNC_EVERY = 50
+SYNC_INTERVAL_S = 5.0
+
+
+class ManifestWriter:
+    """Appends pages to output_dir/manifest.jsonl, one line per page.
+
+    append=True keeps the lines already there, for a resumed job adding to
+    the manifest its earlier runs wrote. name lets a checkpoint reuse the
+    same durable append for its own record of finished pages.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        sync_every: int = SYNC_EVERY,
+        sync_interval: float = SYNC_INTERVAL_S,
+        append: bool = False,
+        name: str = MANIFEST_JSONL,
+    ) -> None:
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir, name)
+        self.append = append
+        self.sync_every = max(int(sync_every), 1)
+        self.sync_interval = sync_interval
+        self.written = 0
+        self._file = None
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        # The .md files can go out in parallel; manifest lines cannot.
+        self._lock = asyncio.Lock()
+
+    async def open(self) -> "ManifestWriter":
+        """Create output_dir and start a manifest.jsonl in it, fresh unless appending."""
+        await asyncio.to_thread(self._open)
+        return self
+
+    def _open(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        mode = "a" if self.append else "w"
+        self._file = open(self.manifest_path, mode, encoding="utf-8")
+
+    async def write(self, entry: dict, content: str | None = None) -> None:
+        """Write one page: its file first, then its manifest line.
+
+        entry["file"] names the file content goes to. A line is only ever
+        appended after its file is complete, so the manifest never points at
+        a file that is not there.
+        """
+        if content is not None:
+            path = os.path.join(self.output_dir, entry["file"])
+            await asyncio.to_thread(_write_text, path, content)
+        async with self._lock:
+            await asyncio.to_thread(self._append, entry)
+
+    def _append(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.written += 1
+        self._unsynced += 1
+        if (
+            self._unsynced >= self.sync_every
+            or time.monotonic() - self._synced_at >= self.sync_interval
+        ):
+            self._sync()
+
+    def _sync(self) -> None:
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    async def close(self) -> None:
+        """Sync whatever is left and close the manifest. Safe to call twice."""
+        if self._file is None:
+            return
+        async with self._lock:
+            await asyncio.to_thread(self._close)
+
+    def _close(self) -> None:
+        try:
+            if self._unsynced:
+                self._sync()
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def _write_text(path: str, content: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def write_atomic(path: str, text: str) -> None:
+    """Replace path with text so a reader sees the old file or the new, never half."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
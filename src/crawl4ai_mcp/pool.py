@@ -0,0 +1,471 @@
+"""A pool of independent crawlers, each with its own Chromium process.
+
+One AsyncWebCrawler means one browser process, one BrowserManager and one
+context cache for every tool call the server handles. Chromium renders each
+page in its own renderer, but the browser process that routes their events is
+single-threaded, and on an 8-core box it saturates long before the CPUs do.
+Starting N crawlers gives N of everything, and nothing is shared between them
+except this module's bookkeeping.
+
+Three rules decide which crawler a call gets:
+
+- a call naming a session goes to the crawler that owns that session. A
+  session is a page inside one browser; sending the next call to another
+  browser would silently start a fresh, cookie-less session there.
+- otherwise, the crawler with the fewest pages in flight. A batch counts as
+  its page count, not as one call, so one 500-URL crawl_many does not look as
+  light as a single crawl_url.
+- never a slot being replaced, unless there is nothing else.
+
+The pool does not know how to start a browser. It is handed the same coroutine
+the server uses at startup, so a slot that dies is replaced by exactly what
+startup would have built.
+
+Browsers are also recycled on purpose, before anything crashes. A Chromium
+left up for days grows: renderer memory that is never returned, contexts
+crawl4ai cached and never closed. A RecyclePolicy restarts a browser after N
+pages, T hours, or once its process tree passes an RSS ceiling. Recycling is
+a swap, not a stop: the new browser takes the slot first, so new calls never
+wait, and the old one is closed only after every call already holding it has
+finished. A browser with a live session is left alone, because its session's
+cookies and page exist nowhere else.
+
+The RSS ceiling reads the process tree through psutil, which crawl4ai
+installs today but this package does not declare. Without it the ceiling is
+logged and ignored; the page and age limits do not need it.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from crawl4ai_mcp.env import env_int, env_number
+
+logger = logging.getLogger(__name__)
+
+BROWSERS_ENV = "CRAWL4AI_MCP_BROWSERS"
+DEFAULT_BROWSERS = 1
+HEALTH_CHECK_INTERVAL_S = 30.0
+RECYCLE_PAGES_ENV = "CRAWL4AI_MCP_RECYCLE_PAGES"
+RECYCLE_HOURS_ENV = "CRAWL4AI_MCP_RECYCLE_HOURS"
+RECYCLE_RSS_MB_ENV = "CRAWL4AI_MCP_RECYCLE_RSS_MB"
+
+StartFn = Callable[[], Awaitable[tuple[Any, str]]]
+
+
+def pool_size_from_env() -> int:
+    """Number of browsers to run, from the environment. At least one."""
+    return env_int(BROWSERS_ENV, DEFAULT_BROWSERS, 1)
+
+
+@dataclass(frozen=True)
+class RecyclePolicy:
+    """When a healthy browser should be restarted anyway. 0 disables a limit.
+
+    All three are off by default. A recycle costs a browser launch and throws
+    away every cached context, and a server that only lives for one client
+    session never gets near any of these limits.
+    """
+
+    max_pages: int = 0
+    max_age_s: float = 0.0
+    max_rss_bytes: int = 0
+
+    @classmethod
+    def from_env(cls) -> "RecyclePolicy":
+        max_rss_bytes = int(env_number(RECYCLE_RSS_MB_ENV, 0.0) * 1024 * 1024)
+        if max_rss_bytes and not psutil_available():
+            logger.warning(
+                "%s is set but psutil is not installed — browsers are not "
+                "recycled by memory",
+                RECYCLE_RSS_MB_ENV,
+            )
+            max_rss_bytes = 0
+        return cls(
+            max_pages=int(env_number(RECYCLE_PAGES_ENV, 0.0)),
+            max_age_s=env_number(RECYCLE_HOURS_ENV, 0.0) * 3600,
+            max_rss_bytes=max_rss_bytes,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_pages or self.max_age_s or self.max_rss_bytes)
+
+
+def psutil_available() -> bool:
+    """Whether browser RSS can be read here, which takes the psutil package."""
+    return importlib.util.find_spec("psutil") is not None
+
+
+def _driver_pid(crawler: Any) -> int | None:
+    """PID of the Playwright driver process behind one crawler.
+
+    crawl4ai starts a separate Playwright per BrowserManager, and each one
+    spawns its own node driver, which is the parent of that crawler's
+    Chromium. Its subtree is therefore exactly one browser's processes. The
+    path is Playwright-internal, so any drift returns None and RSS recycling
+    is skipped for that browser rather than guessed at.
+    """
+    try:
+        playwright = crawler.crawler_strategy.browser_manager.playwright
+        return playwright._impl_obj._connection._transport._proc.pid
+    except AttributeError:
+        return None
+
+
+def crawler_rss(crawler: Any) -> int | None:
+    """Resident memory of one crawler's browser process tree, in bytes.
+
+    Summed RSS counts pages shared between Chromium processes more than once,
+    so this overstates real use. That is the safe direction for a ceiling:
+    it recycles somewhat early, never late.
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+    pid = _driver_pid(crawler)
+    if pid is None:
+        return None
+    try:
+        root = psutil.Process(pid)
+        procs = [root, *root.children(recursive=True)]
+    except psutil.Error:
+        return None
+    total = 0
+    for proc in procs:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+@dataclass
+class PoolSlot:
+    """One crawler and what the pool knows about it."""
+
+    crawler: Any
+    started_at: float = field(default_factory=time.time)
+    outstanding: int = 0
+    pages: int = 0
+    restarts: int = 0
+    draining: bool = False
+
+
+def _browser_connected(crawler: Any) -> bool:
+    """Whether a crawler's Chromium is still attached.
+
+    Reads crawl4ai's BrowserManager.browser, the Playwright Browser it
+    launched. An attribute missing from a future crawl4ai layout counts as
+    healthy: a health check that cannot see must not tear down a working
+    browser every interval.
+    """
+    try:
+        browser = crawler.crawler_strategy.browser_manager.browser
+    except AttributeError:
+        return True
+    if browser is None:
+        return False
+    try:
+        return bool(browser.is_connected())
+    except Exception:
+        return False
+
+
+class CrawlerPool:
+    """Least-outstanding pool of crawlers with session pinning and replacement.
+
+    Every method runs on the server's one event loop. The only awaits that
+    change slot state are in replace() and close(), and replace() swaps the
+    crawler in place, so a lease already holding the old one finishes on it.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        start: StartFn,
+        policy: RecyclePolicy | None = None,
+        rss_probe: Callable[[Any], int | None] = crawler_rss,
+    ) -> None:
+        self.size = size
+        self._start = start
+        self.policy = policy or RecyclePolicy()
+        self._rss_probe = rss_probe
+        self.slots: list[PoolSlot] = []
+        self.session_owner: dict[str, PoolSlot] = {}
+        self.recycled = 0
+        self.replaced = 0  # crashed browsers replaced by the health check
+        self._replace_lock = asyncio.Lock()
+        # Leases held per crawler object (by id), as opposed to per slot. A
+        # recycled slot holds a new crawler while calls on the old one are
+        # still running, and it is the old one's count that says when it can
+        # be closed.
+        self._in_flight: dict[int, int] = {}
+        self._retiring: dict[int, tuple[Any, asyncio.Task]] = {}
+
+    @property
+    def primary(self) -> Any:
+        """The first live crawler, or None when the pool is empty."""
+        return self.slots[0].crawler if self.slots else None
+
+    @property
+    def crawlers(self) -> list[Any]:
+        return [slot.crawler for slot in self.slots]
+
+    async def start(self) -> str:
+        """Start browsers until the pool is full. Returns the last failure, if any.
+
+        Browsers launch concurrently: each one is a separate process, and
+        starting eight in sequence would put eight launch times in front of
+        the server's first response.
+        """
+        missing = self.size - len(self.slots)
+        if missing <= 0:
+            return ""
+        started = await asyncio.gather(*(self._start() for _ in range(missing)))
+        error = ""
+        for crawler, err in started:
+            if crawler is None:
+                error = err
+                logger.error("Pool browser failed to start: %s", err)
+            else:
+                self.slots.append(PoolSlot(crawler=crawler))
+        if self.slots:
+            logger.info("Browser pool: %d of %d running", len(self.slots), self.size)
+        return error
+
+    def adopt(self, crawler: Any) -> None:
+        """Put an already-started crawler at the front of the pool.
+
+        _repair_browser starts one crawler itself so it can report on it;
+        this lets the pool own it rather than start a duplicate.
+        """
+        if any(slot.crawler is crawler for slot in self.slots):
+            return
+        self.slots.insert(0, PoolSlot(crawler=crawler))
+
+    def pick(self, session_id: str | None = None) -> PoolSlot | None:
+        """Choose the slot for one call without reserving it."""
+        if session_id is not None:
+            owner = self.session_owner.get(session_id)
+            if owner is not None and owner in self.slots:
+                return owner
+        candidates = [s for s in self.slots if not s.draining] or self.slots
+        if not candidates:
+            return None
+        return min(candidates, key=lambda s: (s.outstanding, s.pages))
+
+    @asynccontextmanager
+    async def lease(
+        self, session_id: str | None = None, weight: int = 1
+    ) -> AsyncIterator[Any]:
+        """Reserve a crawler for the duration of one tool call.
+
+        weight is the number of pages the call will crawl, so least-outstanding
+        compares pages and not calls. The session, if any, is pinned to the
+        chosen slot before the crawl starts: crawl4ai registers a session
+        during page setup, before navigation, so it exists on that browser
+        even if the crawl then fails.
+        """
+        slot = self.pick(session_id)
+        if slot is None:
+            raise RuntimeError("Browser pool is empty")
+        if session_id is not None:
+            self.session_owner[session_id] = slot
+        crawler = slot.crawler
+        slot.outstanding += weight
+        self._in_flight[id(crawler)] = self._in_flight.get(id(crawler), 0) + 1
+        try:
+            yield crawler
+        finally:
+            slot.outstanding -= weight
+            slot.pages += weight
+            remaining = self._in_flight[id(crawler)] - 1
+            if remaining:
+                self._in_flight[id(crawler)] = remaining
+            else:
+                del self._in_flight[id(crawler)]
+
+    def owner(self, session_id: str) -> Any:
+        """The crawler holding a session, or None if it was never pinned."""
+        slot = self.session_owner.get(session_id)
+        return slot.crawler if slot is not None and slot in self.slots else None
+
+    def forget_session(self, session_id: str) -> None:
+        self.session_owner.pop(session_id, None)
+
+    def sessions_on(self, slot: PoolSlot) -> list[str]:
+        return [sid for sid, owner in self.session_owner.items() if owner is slot]
+
+    def live_sessions(self, slot: PoolSlot) -> list[str]:
+        """Sessions pinned to a slot that crawl4ai still holds open.
+
+        A pin outlives its session when crawl4ai expires it after the idle
+        TTL, and a stale pin must not block recycling forever, so the
+        browser's own registry decides. If that registry cannot be read, every
+        pin counts as live: refusing a recycle is recoverable, killing a
+        session is not.
+        """
+        pinned = self.sessions_on(slot)
+        try:
+            manager = slot.crawler.crawler_strategy.browser_manager
+            native = dict(manager.sessions)
+            ttl = float(manager.session_ttl)
+        except (AttributeError, TypeError, ValueError):
+            return pinned
+        now = time.time()
+        live = []
+        for sid in pinned:
+            entry = native.get(sid)
+            if entry is not None and now - entry[2] <= ttl:
+                live.append(sid)
+        return live
+
+    def recycle_reason(self, slot: PoolSlot) -> str | None:
+        """Why the policy wants this slot recycled, or None."""
+        policy = self.policy
+        if policy.max_pages and slot.pages >= policy.max_pages:
+            return f"served {slot.pages} pages (limit {policy.max_pages})"
+        age = time.time() - slot.started_at
+        if policy.max_age_s and age >= policy.max_age_s:
+            return f"up {age / 3600:.1f}h (limit {policy.max_age_s / 3600:g}h)"
+        if policy.max_rss_bytes:
+            rss = self._rss_probe(slot.crawler)
+            if rss is not None and rss >= policy.max_rss_bytes:
+                return (
+                    f"browser RSS {rss // (1024 * 1024)} MB "
+                    f"(limit {policy.max_rss_bytes // (1024 * 1024)} MB)"
+                )
+        return None
+
+    async def recycle_due(self) -> int:
+        """Recycle every slot the policy flags and no live session holds."""
+        if not self.policy.enabled:
+            return 0
+        recycled = 0
+        for slot in list(self.slots):
+            if slot.draining:
+                continue
+            reason = self.recycle_reason(slot)
+            if reason is None:
+                continue
+            sessions = self.live_sessions(slot)
+            if sessions:
+                logger.info(
+                    "Not recycling browser (%s): %d live session(s) on it: %s",
+                    reason,
+                    len(sessions),
+                    ", ".join(sorted(sessions)),
+                )
+                continue
+            if await self.replace(slot, reason, drain=True):
+                recycled += 1
+                self.recycled += 1
+        return recycled
+
+    async def _retire(self, crawler: Any) -> None:
+        """Close a swapped-out crawler once no call is still using it."""
+        try:
+            while self._in_flight.get(id(crawler), 0):
+                await asyncio.sleep(0.5)
+            await crawler.close()
+        except Exception as exc:
+            logger.debug("closing retired browser failed: %s", exc)
+        finally:
+            self._retiring.pop(id(crawler), None)
+
+    async def replace(self, slot: PoolSlot, reason: str, drain: bool = False) -> bool:
+        """Start a new browser for a slot and retire the old one.
+
+        The new browser takes the slot before the old one is touched, so no
+        call ever waits on a restart. With drain, the old browser is closed
+        only once every lease on it is released: that is a recycle, and the
+        calls on it are healthy. Without drain it is closed at once, because
+        it has crashed and the calls on it are failing anyway.
+
+        Sessions pinned to the slot are unpinned: their pages lived in the old
+        browser and are gone with it. The next call naming one of them gets a
+        fresh session wherever the pool puts it, which is also what crawl4ai
+        does itself when a session expires.
+        """
+        async with self._replace_lock:
+            if slot not in self.slots:
+                return False
+            logger.warning("Replacing pool browser (%s)", reason)
+            slot.draining = True
+            crawler, err = await self._start()
+            if crawler is None:
+                slot.draining = False
+                logger.error("Replacement browser failed to start: %s", err)
+                return False
+            old = slot.crawler
+            slot.crawler = crawler
+            slot.started_at = time.time()
+            slot.pages = 0
+            slot.restarts += 1
+            slot.draining = False
+            for sid in self.sessions_on(slot):
+                self.forget_session(sid)
+        if drain:
+            self._retiring[id(old)] = (old, asyncio.create_task(self._retire(old)))
+            return True
+        try:
+            await old.close()
+        except Exception as exc:
+            logger.debug("closing replaced browser failed: %s", exc)
+        return True
+
+    async def check(self) -> int:
+        """Replace every slot whose browser has disconnected. Returns how many."""
+        replaced = 0
+        for slot in list(self.slots):
+            if slot.draining or _browser_connected(slot.crawler):
+                continue
+            if await self.replace(slot, "browser disconnected"):
+                replaced += 1
+                self.replaced += 1
+        return replaced
+
+    async def run_health_checks(
+        self,
+        interval: float = HEALTH_CHECK_INTERVAL_S,
+        on_change: Callable[[], None] | None = None,
+    ) -> None:
+        """Check health forever. Meant to run as a task cancelled at shutdown."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # Only top up a pool that has a working browser. An empty one
+                # means Chromium itself is missing, and that is repair's job.
+                if self.slots and self.size > len(self.slots):
+                    await self.start()
+                await self.check()
+                await self.recycle_due()
+            except Exception as exc:  # pragma: no cover - never kill the loop
+                logger.error("Browser pool health check failed: %s", exc)
+            if on_change is not None:
+                on_change()
+
+    async def close(self) -> None:
+        # Shutdown does not wait for a drain: the calls holding a retiring
+        # browser are being torn down along with everything else.
+        for old, task in list(self._retiring.values()):
+            task.cancel()
+            try:
+                await old.close()
+            except Exception as exc:
+                logger.debug("closing retiring browser failed: %s", exc)
+        self._retiring.clear()
+        for slot in self.slots:
+            try:
+                await slot.crawler.close()
+            except Exception as exc:
+                logger.debug("closing pool browser failed: %s", exc)
+        self.slots.clear()
+        self.session_owner.clear()
@@ -12,6 +12,8 @@ Design constraints:
     from the merged dict and routed to PruningContentFilter instead.
   - Unknown keys (not in KNOWN_KEYS union per-call-only keys) are stripped with
     a warning log — they never reach CrawlerRunConfig(**merged).
+  - block_resources is a server-side key: accepted from profiles, read by the
+    server from merged_settings, and removed before CrawlerRunConfig.
 """
 
 import inspect
@@ -21,7 +23,8 @@ from pathlib import Path
 import yaml
 from crawl4ai import CrawlerRunConfig
 from crawl4ai.content_filter_strategy import BM25ContentFilter, PruningContentFilter
-from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+
+from crawl4ai_mcp.markdown_pool import PooledMarkdownGenerator
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +60,11 @@ _RESERVED_KEYS: frozenset[str] = frozenset({"verbose", "markdown_generator"})
 # through to CrawlerRunConfig.
 _FILTER_KEYS: frozenset[str] = frozenset({"word_count_threshold", "query"})
 
+# Read by the server from the merged settings and applied outside
+# CrawlerRunConfig, which has no per-call equivalent. Accepted in a profile,
+# never passed through.
+_SERVER_KEYS: frozenset[str] = frozenset({"block_resources"})
+
 
 class ProfileManager:
     """Loads and manages YAML crawl profiles.
@@ -114,6 +122,26 @@ class ProfileManager:
         return sorted(self._profiles.keys())
 
 
+def merged_settings(
+    profile_manager: ProfileManager,
+    profile: str | None,
+    **per_call_overrides,
+) -> dict:
+    """Return the three-layer merge build_run_config starts from, unfiltered.
+
+    default profile <- named profile <- per_call_overrides, right side wins.
+    An unknown profile contributes nothing, exactly as in build_run_config.
+
+    Exposed on its own because the effective settings are what identify a
+    crawl. The server's result cache keys on them: two calls that merge to the
+    same settings produce the same markdown, whichever layer each value came
+    from.
+    """
+    default = profile_manager.get("default")
+    named = profile_manager.get(profile) if profile in profile_manager.names else {}
+    return {**default, **named, **per_call_overrides}
+
+
 def build_run_config(
     profile_manager: ProfileManager,
     profile: str | None,
@@ -138,22 +166,16 @@ def build_run_config(
     Returns:
         A fully configured CrawlerRunConfig instance.
     """
-    default = profile_manager.get("default")
-
     if profile is not None and profile not in profile_manager.names:
         logger.warning(
             "Profile %r not found — falling back to default profile only", profile
         )
-        named: dict = {}
-    else:
-        named = profile_manager.get(profile) if profile else {}
 
-    # Three-layer merge: default <- named <- per-call (right wins)
-    merged = {**default, **named, **per_call_overrides}
+    merged = merged_settings(profile_manager, profile, **per_call_overrides)
 
     # Strip keys CrawlerRunConfig does not accept, checked against the live
     # signature so this cannot fall behind upstream. See _valid_config_keys.
-    unknown = set(merged) - _valid_config_keys() - _FILTER_KEYS
+    unknown = set(merged) - _valid_config_keys() - _FILTER_KEYS - _SERVER_KEYS
     if unknown:
         logger.warning(
             "Stripping unknown profile keys %s — not valid CrawlerRunConfig kwargs",
@@ -166,6 +188,8 @@ def build_run_config(
     # CrawlerRunConfig defaults verbose=True which causes Rich Console to write
     # to stdout, immediately corrupting the MCP stdio JSON-RPC transport.
     merged["verbose"] = False
+    for key in _SERVER_KEYS:
+        merged.pop(key, None)
 
     # word_count_threshold goes to PruningContentFilter, not CrawlerRunConfig.
     #
@@ -204,7 +228,11 @@ def build_run_config(
             preserve_tags=["pre", "code"],
         )
 
-    merged["markdown_generator"] = DefaultMarkdownGenerator(
+    # The timed subclass only differs when a call asked for include_timings,
+    # and the pooled one when CRAWL4AI_MCP_MARKDOWN_WORKERS hands the work to
+    # worker processes; otherwise it is DefaultMarkdownGenerator plus two
+    # ContextVar reads.
+    merged["markdown_generator"] = PooledMarkdownGenerator(
         content_filter=content_filter
     )
 
@@ -219,7 +247,7 @@ def effective_profile_keys(settings: dict) -> tuple[dict, dict]:
     The tool that exists to say what a profile does was reporting settings that
     do not apply.
     """
-    valid = _valid_config_keys() | _FILTER_KEYS
+    valid = _valid_config_keys() | _FILTER_KEYS | _SERVER_KEYS
     applied = {k: v for k, v in settings.items() if k in valid}
     ignored = {k: v for k, v in settings.items() if k not in valid}
     return applied, ignored
@@ -0,0 +1,322 @@
+"""Server-owned cache of finished crawl results.
+
+crawl4ai's own cache stores the RAW page and re-runs nothing on a hit, so the
+filtered markdown this server exists to produce is lost: a BM25-filtered page
+read back from it came out twelve times larger than the crawl that stored it.
+That is why DEFAULT_CACHE_MODE is "bypass" and why every repeat crawl pays a
+full browser navigation.
+
+This cache stores what the caller actually received instead -- the final
+markdown plus the title, description, links and tables -- keyed on the URL
+AND the effective settings that produced it. A lookup therefore only ever
+returns content the same call would have produced fresh, which is the
+property crawl4ai's cache lacks.
+
+Bounded two ways: entries expire after a TTL, and the least recently used
+entries are evicted once the total stored size passes a byte budget. Both are
+read from the environment once at startup.
+
+An expired entry whose response carried an ETag or Last-Modified is not thrown
+away. It is kept as stale, and the next lookup asks the origin with a
+conditional GET whether it changed: a 304 costs one round trip with no body,
+where re-rendering costs a browser navigation plus the filter pass. Most of a
+large docs sitemap is unchanged between runs, so most of a re-crawl becomes
+304s.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+
+import httpx
+
+from crawl4ai_mcp.env import env_number
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_TTL_ENV = "CRAWL4AI_MCP_RESULT_CACHE_TTL"
+RESULT_CACHE_MB_ENV = "CRAWL4AI_MCP_RESULT_CACHE_MB"
+DEFAULT_RESULT_CACHE_TTL_S = 3600
+DEFAULT_RESULT_CACHE_MB = 256
+REVALIDATE_TIMEOUT_S = 10.0
+
+# Settings that change how a page is fetched or paced, never what it says.
+# Leaving them out of the key means a caller who raises page_timeout still
+# hits the entry an identical crawl stored a minute ago.
+_KEY_IGNORED: frozenset[str] = frozenset(
+    {
+        "cache_mode",
+        "page_timeout",
+        "session_id",
+        "semaphore_count",
+        "mean_delay",
+        "max_range",
+        "deep_crawl_strategy",
+        "stream",
+        "verbose",
+    }
+)
+
+# Per-crawl metadata that describes where a page sat in ONE crawl rather than
+# the page itself. A page reached at depth 2 in one deep crawl is not at depth
+# 2 in the next, so these are never stored.
+_CRAWL_METADATA = ("depth", "parent_url", "score")
+
+
+def cache_key(url: str, settings: dict) -> str:
+    """Hash a URL together with the merged settings that shape its markdown.
+
+    `settings` is the full default <- profile <- per-call merge, so query,
+    word_count_threshold, the selectors, js_code and wait_for are all in it
+    along with everything a profile contributes. Values that are not JSON
+    are keyed by repr, which is stable for the enums and plain containers
+    that reach this point.
+    """
+    blob = json.dumps([url, _relevant(settings)], sort_keys=True, default=repr)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def settings_digest(settings: dict) -> str:
+    """Hash the settings cache_key covers, without a URL.
+
+    A checkpoint records it in its identity, so a job resumed under
+    settings that would make different pages is refused rather than mixing
+    the two.
+    """
+    blob = json.dumps(_relevant(settings), sort_keys=True, default=repr)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _relevant(settings: dict) -> dict:
+    return {k: v for k, v in settings.items() if k not in _KEY_IGNORED}
+
+
+@dataclass(frozen=True)
+class CachedMarkdown:
+    """Stands in for crawl4ai's MarkdownGenerationResult on a cached page.
+
+    Only the final content is kept. Both attributes return it so every reader
+    written against `fit_markdown or raw_markdown` works unchanged.
+    """
+
+    content: str
+
+    @property
+    def fit_markdown(self) -> str:
+        return self.content
+
+    @property
+    def raw_markdown(self) -> str:
+        return self.content
+
+
+@dataclass
+class CachedPage:
+    """A finished page, shaped like the parts of CrawlResult this server reads.
+
+    Duck-typed on purpose: a cache hit drops into the same results list as a
+    fresh crawl and goes through _page_results and _persist_results without
+    either of them knowing the difference.
+    """
+
+    url: str
+    status_code: int | None
+    content: str
+    metadata: dict = field(default_factory=dict)
+    links: dict = field(default_factory=dict)
+    tables: list = field(default_factory=list)
+    response_headers: dict = field(default_factory=dict)
+    stored_at: float = 0.0
+    size: int = 0
+    # Set on the copy refresh() hands out, so a caller can report which hits
+    # were confirmed by a 304 rather than served inside their TTL.
+    revalidated: bool = False
+
+    success = True
+    error_message = None
+    crawl_stats = None
+    redirected_url = None
+
+    @property
+    def markdown(self) -> CachedMarkdown:
+        return CachedMarkdown(self.content)
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """Conditional-request headers built from the stored response.
+
+        Playwright lower-cases response header names and httpx does not, so
+        the lookup ignores case rather than trusting either.
+        """
+        lowered = {str(k).lower(): v for k, v in self.response_headers.items()}
+        out: dict[str, str] = {}
+        if lowered.get("etag"):
+            out["If-None-Match"] = str(lowered["etag"])
+        if lowered.get("last-modified"):
+            out["If-Modified-Since"] = str(lowered["last-modified"])
+        return out
+
+    @classmethod
+    def from_result(cls, result, stored_at: float) -> "CachedPage | None":
+        """Snapshot a CrawlResult, or None when it must not be cached.
+
+        Only a 2xx success is stored. A 404 body is a successful crawl by
+        crawl4ai's definition, and serving it back for the next hour would
+        turn one bad moment on the target into a sticky failure.
+        """
+        status = getattr(result, "status_code", None)
+        if not getattr(result, "success", False):
+            return None
+        if not isinstance(status, int) or not 200 <= status < 300:
+            return None
+
+        md = result.markdown
+        content = (md.fit_markdown or md.raw_markdown) if md else ""
+        meta = result.metadata if isinstance(result.metadata, dict) else {}
+        links = getattr(result, "links", None)
+        tables = getattr(result, "tables", None)
+        headers = getattr(result, "response_headers", None)
+        page = cls(
+            url=result.url,
+            status_code=status,
+            content=content or "",
+            metadata={k: v for k, v in meta.items() if k not in _CRAWL_METADATA},
+            links=links if isinstance(links, dict) else {},
+            tables=tables if isinstance(tables, list) else [],
+            response_headers=dict(headers) if isinstance(headers, dict) else {},
+            stored_at=stored_at,
+        )
+        page.size = _estimate_size(page)
+        return page
+
+
+def _estimate_size(page: CachedPage) -> int:
+    """Approximate bytes held by one entry, for the eviction budget.
+
+    Links and tables are counted by their JSON length. That overstates
+    Python's in-memory footprint for short strings and understates it for
+    nothing that matters here; it is a budget, not an accounting.
+    """
+    size = len(page.content.encode("utf-8"))
+    try:
+        size += len(json.dumps([page.links, page.tables, page.metadata], default=str))
+    except (TypeError, ValueError):  # pragma: no cover - crawl4ai shape drift
+        pass
+    return size
+
+
+class ResultCache:
+    """TTL + size-bounded LRU of CachedPage entries.
+
+    Single event loop, so no locking: every method runs to completion between
+    awaits. get() returns a copy, so a caller stamping per-crawl metadata on a
+    hit cannot corrupt what the next caller reads.
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = DEFAULT_RESULT_CACHE_TTL_S,
+        max_bytes: int = DEFAULT_RESULT_CACHE_MB * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries: OrderedDict[str, CachedPage] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidated = 0
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        ttl = env_number(RESULT_CACHE_TTL_ENV, DEFAULT_RESULT_CACHE_TTL_S)
+        mb = env_number(RESULT_CACHE_MB_ENV, DEFAULT_RESULT_CACHE_MB)
+        return cls(ttl_s=ttl, max_bytes=int(mb * 1024 * 1024))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _expired(self, entry: CachedPage) -> bool:
+        return self._clock() - entry.stored_at > self.ttl_s
+
+    def get(self, key: str) -> CachedPage | None:
+        """Return a fresh copy of the entry, or None on a miss or expiry.
+
+        An expired entry with no validators is dropped here, since nothing
+        can ever make it servable again. One with validators stays, for
+        stale() and refresh().
+        """
+        entry = self._entries.get(key)
+        if entry is None or self._expired(entry):
+            if entry is not None and not entry.validators:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return replace(entry, metadata=dict(entry.metadata))
+
+    def stale(self, key: str) -> CachedPage | None:
+        """Return the expired entry under key if it can be revalidated."""
+        entry = self._entries.get(key)
+        if entry is None or not self._expired(entry) or not entry.validators:
+            return None
+        return entry
+
+    def refresh(self, key: str) -> CachedPage | None:
+        """Restart an entry's TTL after the origin answered 304, and return it."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry.stored_at = self._clock()
+        self._entries.move_to_end(key)
+        self.revalidated += 1
+        return replace(entry, metadata=dict(entry.metadata), revalidated=True)
+
+    def put(self, key: str, result) -> bool:
+        """Store a crawl result under key. Returns whether it was cacheable."""
+        page = CachedPage.from_result(result, stored_at=self._clock())
+        if page is None or page.size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = page
+        self._bytes += page.size
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+        return True
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+
+async def revalidate(client: httpx.AsyncClient, url: str, page: CachedPage) -> bool:
+    """Ask the origin whether a stale page changed. True means it did not.
+
+    Streams the response and closes it unread, so a 200 -- the page did
+    change -- costs the headers and not the body; the browser is about to
+    fetch that body anyway. Any failure counts as "changed": the fallback is
+    the crawl the caller would have had without a cache, never a stale page.
+    """
+    try:
+        async with client.stream(
+            "GET", url, headers=page.validators, timeout=REVALIDATE_TIMEOUT_S
+        ) as response:
+            return response.status_code == 304
+    except httpx.HTTPError as exc:
+        logger.debug("revalidation of %s failed: %s", url, exc)
+        return False
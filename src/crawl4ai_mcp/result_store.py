@@ -0,0 +1,136 @@
+"""Server-side store for batch results read a slice at a time.
+
+A 500-page crawl_sitemap used to come back as one CrawlBatchResult holding
+every page's markdown. That is megabytes of JSON built, validated and
+serialized in one go on the event loop, and parsed in one go by a client
+that may only want the first few pages. A call passing page_size gets the
+first page_size pages and a cursor instead. The rest wait here, and
+get_pages or the crawl://<batch>/<index> resources read them on demand.
+
+Bounded like the result cache: a batch expires RESULT_STORE_TTL seconds
+after it was last read, and the least recently read batches are evicted
+once the total held passes a byte budget. A cursor into an evicted batch
+says so rather than returning an empty slice that looks like the end.
+"""
+
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from crawl4ai_mcp.env import env_number
+
+RESULT_STORE_TTL_ENV = "CRAWL4AI_MCP_RESULT_STORE_TTL"
+RESULT_STORE_MB_ENV = "CRAWL4AI_MCP_RESULT_STORE_MB"
+DEFAULT_RESULT_STORE_TTL_S = 1800
+DEFAULT_RESULT_STORE_MB = 256
+
+
+def make_cursor(batch_id: str, offset: int) -> str:
+    return f"{batch_id}:{offset}"
+
+
+def parse_cursor(cursor: str) -> tuple[str, int] | None:
+    """(batch_id, offset) from a cursor, or None when it is not one."""
+    batch_id, sep, offset = cursor.rpartition(":")
+    if not sep or not batch_id or not offset.isdigit():
+        return None
+    return batch_id, int(offset)
+
+
+@dataclass
+class StoredBatch:
+    pages: list
+    size: int
+    read_at: float
+
+
+class ResultStore:
+    """TTL + size-bounded LRU of batches of PageResult, by batch id.
+
+    Single event loop, so no locking. Pages are kept as the PageResult
+    objects the tool built, so a later read serializes only its slice.
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = DEFAULT_RESULT_STORE_TTL_S,
+        max_bytes: int = DEFAULT_RESULT_STORE_MB * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._batches: OrderedDict[str, StoredBatch] = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "ResultStore":
+        ttl = env_number(RESULT_STORE_TTL_ENV, DEFAULT_RESULT_STORE_TTL_S)
+        mb = env_number(RESULT_STORE_MB_ENV, DEFAULT_RESULT_STORE_MB)
+        return cls(ttl_s=ttl, max_bytes=int(mb * 1024 * 1024))
+
+    def __len__(self) -> int:
+        return len(self._batches)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def put(self, pages: list) -> str | None:
+        """Keep pages and return their batch id, or None if they cannot fit."""
+        self._expire()
+        size = sum(_page_size(page) for page in pages)
+        if size > self.max_bytes:
+            return None
+        batch_id = secrets.token_hex(8)
+        self._batches[batch_id] = StoredBatch(pages, size, self._clock())
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._drop(next(iter(self._batches)))
+            self.evictions += 1
+        return batch_id
+
+    def get(self, batch_id: str) -> list | None:
+        """The batch's pages, or None once it expired or was evicted.
+
+        Reading restarts the TTL: a caller paging through a large batch
+        keeps it alive as long as it keeps reading.
+        """
+        self._expire()
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return None
+        batch.read_at = self._clock()
+        self._batches.move_to_end(batch_id)
+        return batch.pages
+
+    def _expire(self) -> None:
+        now = self._clock()
+        # Ordered by last read, so the expired ones are all at the front.
+        while self._batches:
+            batch_id, batch = next(iter(self._batches.items()))
+            if now - batch.read_at <= self.ttl_s:
+                break
+            self._drop(batch_id)
+
+    def _drop(self, batch_id: str) -> None:
+        batch = self._batches.pop(batch_id, None)
+        if batch is not None:
+            self._bytes -= batch.size
+
+
+def _page_size(page) -> int:
+    """Approximate bytes one page holds: its markdown, plus a flat allowance.
+
+    Links and tables are not counted exactly; measuring them would mean
+    serializing every page once more, which is the cost this store avoids.
+    """
+    markdown = getattr(page, "markdown", None) or ""
+    links = getattr(page, "links", None)
+    extra = 0
+    if links is not None:
+        extra += 100 * (len(links.internal) + len(links.external))
+    return len(markdown.encode("utf-8")) + 512 + extra
@@ -0,0 +1,214 @@
+"""Per-host politeness shared by every tool call in the process.
+
+delay and max_concurrent are per call. Each crawl_many or crawl_sitemap
+builds its own RateLimiter and SemaphoreDispatcher, and deep_crawl runs
+crawl4ai's internal dispatcher, so none of them knows about the others. Three
+agents crawling the same docs site at max_concurrent=10 put thirty pages in
+flight against it, and nothing here noticed.
+
+A HostScheduler is the one place that does notice. Every fetch the server
+makes, browser or plain HTTP, takes a slot for its host first:
+
+- a concurrency cap: at most N fetches in flight per host, across all calls.
+- a token bucket: at most R fetches started per second per host, with bursts
+  of up to B. Off by default; the cap alone stops the pile-up, and a rate is
+  a judgement about a particular origin that the operator should make.
+
+The per-call settings still apply underneath. A call asking for delay=2 keeps
+its two seconds between pages, and its max_concurrent still bounds that call;
+the scheduler only ever makes a call wait longer, never shorter.
+
+Hosts are keyed by hostname, not origin. http and https, or two ports, of one
+host are the same machine to the person running it.
+
+The browser's fetches are reached by wrapping each crawler's arun, which is
+what crawl_url, arun_many's dispatcher and the deep-crawl strategies all end
+up calling per page. The outer call that starts a deep crawl is let through:
+it holds no page of its own, and holding a slot for the whole crawl would
+starve the pages it is about to fetch from the same host.
+"""
+
+import asyncio
+import functools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+from crawl4ai.deep_crawling import DeepCrawlDecorator
+
+from crawl4ai_mcp.env import env_number
+
+HOST_CONCURRENCY_ENV = "CRAWL4AI_MCP_HOST_CONCURRENCY"
+HOST_RATE_ENV = "CRAWL4AI_MCP_HOST_RATE"
+HOST_BURST_ENV = "CRAWL4AI_MCP_HOST_BURST"
+
+# The same as crawl_many's default max_concurrent, so one call on its own
+# runs exactly as fast as it did before the scheduler existed.
+DEFAULT_HOST_CONCURRENCY = 10
+
+# Idle hosts whose bucket state is kept before a sweep drops the refilled
+# ones. A sitemap crawl across many domains must not grow this forever.
+MAX_IDLE_HOSTS = 1024
+
+
+def host_key(url: str) -> str | None:
+    """The host a URL is scheduled under, or None for raw:, file: and the like."""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    return parts.hostname.lower()
+
+
+@dataclass
+class _Host:
+    """One host's state. slots is dropped whenever nobody is using it."""
+
+    tokens: float
+    updated: float
+    slots: asyncio.Semaphore | None = None
+    users: int = 0
+
+
+class HostScheduler:
+    """Per-host concurrency caps and token buckets for the whole process."""
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_HOST_CONCURRENCY,
+        rate: float = 0.0,
+        burst: float = 1.0,
+    ) -> None:
+        self.concurrency = max(int(concurrency), 1)
+        self.rate = max(rate, 0.0)
+        self.burst = max(burst, 1.0)
+        self._hosts: dict[str, _Host] = {}
+        # Fetches currently waiting for a slot or a token, across all hosts.
+        self.waiting = 0
+
+    @classmethod
+    def from_env(cls) -> "HostScheduler":
+        return cls(
+            concurrency=int(
+                env_number(HOST_CONCURRENCY_ENV, DEFAULT_HOST_CONCURRENCY, 1)
+            ),
+            rate=env_number(HOST_RATE_ENV, 0.0, 0.0),
+            burst=env_number(HOST_BURST_ENV, 1.0, 1.0),
+        )
+
+    def _refill(self, host: _Host, now: float) -> None:
+        if self.rate:
+            host.tokens = min(
+                self.burst, host.tokens + max(now - host.updated, 0.0) * self.rate
+            )
+        host.updated = now
+
+    def _sweep(self) -> None:
+        """Forget idle hosts whose bucket is full again: they are as good as new."""
+        now = time.monotonic()
+        for key, host in list(self._hosts.items()):
+            if host.users:
+                continue
+            self._refill(host, now)
+            if host.tokens >= self.burst:
+                del self._hosts[key]
+
+    def _host(self, key: str) -> _Host:
+        host = self._hosts.get(key)
+        if host is None:
+            if len(self._hosts) >= MAX_IDLE_HOSTS:
+                self._sweep()
+            host = self._hosts[key] = _Host(self.burst, time.monotonic())
+        if host.slots is None:
+            host.slots = asyncio.Semaphore(self.concurrency)
+        return host
+
+    async def _take_token(self, host: _Host) -> None:
+        """Reserve the next token, sleeping until it exists.
+
+        The bucket is allowed to go negative: each waiter takes its token up
+        front and sleeps until the refill would have produced it, so waiters
+        start in the order they arrived without polling.
+        """
+        if not self.rate:
+            return
+        self._refill(host, time.monotonic())
+        host.tokens -= 1
+        if host.tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-host.tokens / self.rate)
+        except asyncio.CancelledError:
+            host.tokens += 1
+            raise
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[None]:
+        """Hold one of the URL's host slots for the duration of the block."""
+        key = host_key(url)
+        if key is None:
+            yield
+            return
+        host = self._host(key)
+        host.users += 1
+        try:
+            self.waiting += 1
+            try:
+                await host.slots.acquire()
+            except BaseException:
+                self.waiting -= 1
+                raise
+            try:
+                try:
+                    await self._take_token(host)
+                finally:
+                    self.waiting -= 1
+                yield
+            finally:
+                host.slots.release()
+        finally:
+            host.users -= 1
+            if not host.users:
+                host.slots = None
+                if not self.rate:
+                    self._hosts.pop(key, None)
+
+
+def starts_deep_crawl(config: Any) -> bool:
+    """Whether an arun call is the outer one that runs a whole deep crawl.
+
+    crawl4ai's decorator marks the crawl active before the strategy fetches
+    its first page, so the pages themselves come back through arun with the
+    flag set and are not mistaken for the outer call.
+    """
+    return (
+        getattr(config, "deep_crawl_strategy", None) is not None
+        and not DeepCrawlDecorator.deep_crawl_active.get()
+    )
+
+
+def schedule_crawler(crawler: Any, scheduler: HostScheduler) -> None:
+    """Route every page this crawler fetches through the scheduler.
+
+    Wraps the instance's arun, which crawl4ai has already wrapped with its
+    deep-crawl decorator. A call carrying a deep-crawl strategy that is not
+    yet inside a deep crawl is the outer call, and goes straight through.
+    """
+    arun = crawler.arun
+    if getattr(arun, "_host_scheduled", False) is True:
+        return
+
+    @functools.wraps(arun)
+    async def scheduled_arun(url: str, config: Any = None, **kwargs):
+        if starts_deep_crawl(config):
+            return await arun(url, config=config, **kwargs)
+        async with scheduler.slot(url):
+            return await arun(url, config=config, **kwargs)
+
+    scheduled_arun._host_scheduled = True
+    crawler.arun = scheduled_arun
@@ -1,19 +1,20 @@
 # src/crawl4ai_mcp/server.py
 import asyncio
 import contextvars
-import gzip
+import functools
 import hashlib
 import importlib.metadata
+import inspect
 import json
 import logging
 import os
 import re
+import sqlite3
 import subprocess
 import sys
 import time
 import uuid
 import xml.etree.ElementTree as ET
-from urllib.parse import urljoin
 
 # MUST be first: configure all logging to stderr before any library imports emit output.
 # Any output to stdout corrupts the MCP stdio JSON-RPC transport.
@@ -25,22 +26,24 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
+from contextlib import aclosing, asynccontextmanager, contextmanager
 from dataclasses import dataclass, field
 from pathlib import Path
+from types import SimpleNamespace
 
 from crawl4ai import (
     AsyncWebCrawler,
     BrowserConfig,
     CacheMode,
     CrawlerRunConfig,
+    CrawlResult,
     JsonCssExtractionStrategy,
     JsonXPathExtractionStrategy,
     LLMConfig,
     LLMExtractionStrategy,
     RegexExtractionStrategy,
 )
-from crawl4ai.async_dispatcher import RateLimiter, SemaphoreDispatcher
+from crawl4ai.async_dispatcher import RateLimiter
 from crawl4ai.deep_crawling import (
     BestFirstCrawlingStrategy,
     BFSDeepCrawlStrategy,
@@ -51,15 +54,84 @@ from crawl4ai.deep_crawling.filters import DomainFilter
 from crawl4ai.deep_crawling.scorers import KeywordRelevanceScorer
 import httpx
 from mcp.server.mcpserver import Context, MCPServer
+from mcp.server.mcpserver.exceptions import ResourceError
 from mcp.types import ToolAnnotations
 from packaging.version import Version
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
+from crawl4ai_mcp.adaptive import (
+    AdaptiveConcurrency,
+    adapt_crawler,
+    adaptive_scope,
+    admitted,
+)
+from crawl4ai_mcp.blocking import ResourceBlocker, route_page
+from crawl4ai_mcp.budget import CharBudget, truncate_markdown
+from crawl4ai_mcp.canonical import (
+    CANONICALIZE_MODES,
+    DEFAULT_CANONICALIZE,
+    Canonicalizer,
+)
+from crawl4ai_mcp.checkpoint import (
+    Checkpoint,
+    CheckpointMismatch,
+    checkpoint_dir,
+    job_id_error,
+    read_pages,
+)
+from crawl4ai_mcp.dispatch import StreamingSemaphoreDispatcher
+from crawl4ai_mcp.frontier import FrontierCrawl
+from crawl4ai_mcp.frontier_store import FRONTIER_FILE, DiskFrontier
+from crawl4ai_mcp.http_client import client_or_own, shared_client
+from crawl4ai_mcp.http_render import (
+    DEFAULT_RENDER,
+    RENDER_MODES,
+    browser_only_settings,
+    escalation_reason,
+    fetch_page,
+    make_client,
+    page_headers,
+    render_page,
+)
+from crawl4ai_mcp.jobs import JOB_TOOLS, RUNNING, Job, JobTable
+from crawl4ai_mcp.markdown_pool import MarkdownPool, offload_markdown
+from crawl4ai_mcp.metrics import (
+    Metrics,
+    metrics_port_from_env,
+    observe_pages,
+    page_started,
+    serve_metrics,
+)
+from crawl4ai_mcp.near_duplicates import NEAR_DUPLICATE_MODES, NearDuplicates
+from crawl4ai_mcp.output import ManifestWriter
+from crawl4ai_mcp.pool import CrawlerPool, RecyclePolicy, pool_size_from_env
 from crawl4ai_mcp.profiles import (
     ProfileManager,
     build_run_config,
     effective_profile_keys,
+    merged_settings,
+)
+from crawl4ai_mcp.result_cache import (
+    REVALIDATE_TIMEOUT_S,
+    ResultCache,
+    cache_key,
+    revalidate,
+    settings_digest,
 )
+from crawl4ai_mcp.result_store import ResultStore, make_cursor, parse_cursor
+from crawl4ai_mcp.scheduler import HostScheduler, schedule_crawler
+from crawl4ai_mcp.sitemap import (
+    ORDERS,
+    SITEMAP_TIMEOUT_S,
+    SitemapEntry,
+    SitemapReader,
+    SitemapSelection,
+    parse_lastmod,
+    sitemap_concurrency_from_env,
+)
+from crawl4ai_mcp.sitemap_state import SitemapState
+from crawl4ai_mcp import timings
+from crawl4ai_mcp.timings import PageTimings, collect_timings, start_page
 
 
 AUTO_REPAIR_ENV = "CRAWL4AI_MCP_AUTO_REPAIR"
@@ -69,6 +141,17 @@ BROWSER_INSTALL_TIMEOUT_S = 1800
 # can never run two downloads into the same cache directory at once.
 _repair_lock = asyncio.Lock()
 
+# Per-host concurrency caps and rate limits for every fetch the process makes.
+# Module-level rather than on AppContext because it is installed on crawlers
+# as they start, including ones a repair or a recycle starts, and because one
+# origin is one origin however many calls, browsers or repairs are involved.
+_host_scheduler = HostScheduler.from_env()
+
+# Worker processes for content filtering and markdown, when the environment
+# asks for them. Module-level for the same reason: every crawler a repair or
+# a recycle starts is wrapped with it, and the workers outlive them all.
+_markdown_pool = MarkdownPool.from_env()
+
 
 @dataclass
 class BrowserState:
@@ -189,6 +272,9 @@ async def _start_crawler() -> tuple[AsyncWebCrawler | None, str]:
         # Installed once, for the crawler's lifetime. They read per-call data
         # from a ContextVar, so they must never be set or cleared per call.
         _install_override_hooks(crawler)
+        schedule_crawler(crawler, _host_scheduler)
+        adapt_crawler(crawler)
+        offload_markdown(crawler, _markdown_pool)
         return crawler, ""
     except Exception as e:
         try:
@@ -229,10 +315,55 @@ async def _repair_browser(app_ctx: "AppContext") -> tuple[bool, str]:
         app_ctx.crawler = crawler
         app_ctx.browser.status = "ready"
         app_ctx.browser.detail = ""
+        app_ctx.metrics.restart("repair")
+        if app_ctx.pool is not None:
+            # The pool owns the crawler from here on. Its other browsers start
+            # in the background so the caller waiting on this repair gets an
+            # answer as soon as one is usable.
+            app_ctx.pool.adopt(crawler)
+            asyncio.create_task(app_ctx.pool.start())
         logger.info("Browser repaired — crawler is operational")
         return True, "browser installed and crawler started"
 
 
+@asynccontextmanager
+async def _lease_crawler(
+    app: "AppContext", session_id: str | None = None, weight: int = 1
+) -> AsyncIterator[AsyncWebCrawler]:
+    """Hold a crawler from the pool for one tool call.
+
+    Goes through _require_crawler first so a dead browser still produces the
+    error that says how to fix it. Without a pool (or with a stand-in context)
+    that crawler is the one used; with one, the pool picks: the session's
+    owner when session_id is given, otherwise the least-loaded browser.
+    """
+    crawler = _require_crawler(app)
+    pool = getattr(app, "pool", None)
+    if not isinstance(pool, CrawlerPool) or not pool.slots:
+        yield crawler
+        return
+    async with pool.lease(session_id, weight) as leased:
+        yield leased
+
+
+def _session_crawler(app: "AppContext", session_id: str) -> AsyncWebCrawler:
+    """The crawler a session lives on: its pool owner, else the primary."""
+    pool = getattr(app, "pool", None)
+    if isinstance(pool, CrawlerPool):
+        owner = pool.owner(session_id)
+        if owner is not None:
+            return owner
+    return _require_crawler(app)
+
+
+def _all_crawlers(app: "AppContext") -> list[AsyncWebCrawler]:
+    """Every live crawler, for the tools that read state across all of them."""
+    pool = getattr(app, "pool", None)
+    if isinstance(pool, CrawlerPool) and pool.slots:
+        return pool.crawlers
+    return [app.crawler] if app.crawler is not None else []
+
+
 def _require_crawler(app: "AppContext") -> AsyncWebCrawler:
     """Return the live crawler, or raise an error that says how to fix it.
 
@@ -279,12 +410,42 @@ class AppContext:
     process exiting and the MCP client showing a bare "failed to connect".
 
     browser carries that readiness state and the remediation detail.
+
+    pool holds every browser when CRAWL4AI_MCP_BROWSERS asks for more than one,
+    and crawler is always its first slot, so everything written against a
+    single crawler keeps working. Tools take a crawler through _lease_crawler,
+    which is what spreads load across the pool.
+
+    result_cache holds finished pages for callers passing result_cache=True.
+    It outlives browser repairs on purpose: a relaunched Chromium renders the
+    same page the same way, so nothing in it goes stale by the restart.
+
+    metrics counts calls, pages and restarts for the metrics tool and the
+    optional /metrics endpoint. It lives for the process, like result_cache.
+
+    results holds the pages a page_size call held back, for get_pages and
+    the crawl:// resources. Bounded and TTL-evicted, like result_cache.
+
+    jobs is the table of background crawls started by start_crawl_job. It is
+    read from the state directory at startup, so a restart still knows the
+    jobs the last process ran, and saved back on every change of state.
+
+    http is the one pooled HTTP client every non-browser fetch shares:
+    sitemaps, revalidation, render="http" pages and the update check. The
+    lifespan opens it and closes it last. None outside a running server,
+    where each fetch opens a client of its own as before.
     """
 
     crawler: AsyncWebCrawler | None
     profile_manager: ProfileManager
     sessions: dict[str, float]
     browser: "BrowserState" = field(default_factory=lambda: BrowserState())
+    result_cache: ResultCache = field(default_factory=ResultCache.from_env)
+    pool: CrawlerPool | None = None
+    metrics: Metrics = field(default_factory=Metrics)
+    results: ResultStore = field(default_factory=ResultStore.from_env)
+    jobs: JobTable = field(default_factory=JobTable.from_env)
+    http: httpx.AsyncClient | None = None
 
 
 @asynccontextmanager
@@ -297,7 +458,11 @@ async def app_lifespan(server: MCPServer) -> AsyncIterator[AppContext]:
     """
     logger.info("crawl4ai MCP server starting — initializing browser")
 
-    crawler, err = await _start_crawler()
+    pool = CrawlerPool(
+        pool_size_from_env(), _start_crawler, policy=RecyclePolicy.from_env()
+    )
+    err = await pool.start()
+    crawler = pool.primary
     state = BrowserState()
     if crawler is not None:
         logger.info("Browser ready — crawl4ai MCP server is operational")
@@ -311,16 +476,42 @@ async def app_lifespan(server: MCPServer) -> AsyncIterator[AppContext]:
         "Loaded %d profile(s): %s", len(profile_manager.names), profile_manager.names
     )
 
+    # Kept alive for the whole process, so every sitemap, revalidation and
+    # plain-HTTP page to a host reuses the connections already open to it.
+    http = shared_client()
+
     # Fire-and-forget version check — never blocks server readiness
-    asyncio.create_task(_startup_version_check())
+    asyncio.create_task(_startup_version_check(http))
 
     app_ctx = AppContext(
         crawler=crawler,
         profile_manager=profile_manager,
         sessions={},
         browser=state,
+        pool=pool,
+        http=http,
     )
 
+    def _sync_primary() -> None:
+        # A health check may have replaced slot 0. Only ever move crawler from
+        # one live browser to another here; None is repair's state to set.
+        if pool.primary is not None:
+            app_ctx.crawler = pool.primary
+
+    health_task = asyncio.create_task(pool.run_health_checks(on_change=_sync_primary))
+
+    # Optional Prometheus endpoint. A port that cannot be bound is logged and
+    # skipped: the crawl tools are the point of the process, not the scrape.
+    metrics_server = None
+    metrics_port = metrics_port_from_env()
+    if metrics_port is not None:
+        try:
+            metrics_server = await serve_metrics(
+                lambda: _metrics_exposition(app_ctx), metrics_port
+            )
+        except OSError as exc:
+            logger.error("Could not serve metrics on port %d: %s", metrics_port, exc)
+
     # A missing browser is repairable, so repair it — but in the background.
     # MCP_TIMEOUT bounds server STARTUP (its documented example is 10 seconds),
     # while tool calls get a far longer budget. Downloading ~150MB of Chromium
@@ -342,17 +533,36 @@ async def app_lifespan(server: MCPServer) -> AsyncIterator[AppContext]:
     try:
         yield app_ctx
     finally:
+        health_task.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
+        # Background jobs stop before the browser they crawl with. Each one
+        # saves its checkpoint and is recorded as interrupted, to be resumed
+        # by starting it again.
+        tasks = [job.task for job in app_ctx.jobs.running() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            logger.info("Interrupting %d background job(s)", len(tasks))
+            await asyncio.gather(*tasks, return_exceptions=True)
         # Read app_ctx.crawler, not the local: a repair may have replaced it.
         live = app_ctx.crawler
         if live is not None:
             # Clean up active sessions before closing browser
             for sid in list(app_ctx.sessions.keys()):
                 try:
-                    await live.crawler_strategy.kill_session(sid)
+                    await _session_crawler(app_ctx, sid).crawler_strategy.kill_session(
+                        sid
+                    )
                 except Exception:
                     pass
             logger.info("Shutting down browser")
-            await live.close()
+            if live not in pool.crawlers:
+                await live.close()
+            await pool.close()
+        _markdown_pool.close()
+        # Last: the jobs and sessions closed above may still have been using it.
+        await http.aclose()
         logger.info("Shutdown complete")
 
 
@@ -754,6 +964,12 @@ class PageResult(BaseModel):
     """The page's meta description, when it has one."""
     markdown: str | None = None
     """Page content. None on failure, and None when output_dir wrote it to disk."""
+    truncated: int | None = None
+    """Characters of markdown left out by max_chars_per_page or max_total_chars.
+
+    None when nothing was cut. Equal to the page's whole length, with
+    markdown None, when max_total_chars was spent before this page.
+    """
     error: str | None = None
     """Why the page failed. None on success."""
     depth: int | None = None
@@ -762,10 +978,33 @@ class PageResult(BaseModel):
     """The page this one was discovered from. deep_crawl only."""
     file: str | None = None
     """Filename written under output_dir. None unless output_dir was set."""
+    duplicate_of: str | None = None
+    """The earlier page this one nearly repeats, under near_duplicates.
+
+    None when near_duplicates is "off" or the page's content is its own.
+    Under "collapse" a page with duplicate_of set has no markdown, links,
+    tables or file: the page it names has them.
+
+    Also set, with nothing but url and success, on a URL that was not
+    fetched because canonicalize or rel_canonical found it to be the same
+    page as the URL named here, which was fetched instead.
+    """
     links: PageLinks | None = None
     """Outgoing links. None unless include_links was set on the call."""
     tables: list[PageTable] | None = None
     """Tabular data found on the page. None unless include_tables was set."""
+    timings: dict[str, float] | None = None
+    """Milliseconds per crawl phase. None unless include_timings was set.
+
+    Keys, in order, for the phases that ran: queue (waiting in the
+    dispatcher for a slot and the rate limiter), fetch (plain-HTTP pages
+    only), navigation (goto up to wait_until), wait_for (scrolling, image
+    waits, js_code_before_wait and the wait_for condition), js_code, delay
+    (delay_before_return_html), capture (reading the HTML out of the page),
+    filter (the content filter), markdown (the markdown conversion), and
+    total. total includes the scraping between capture and filter, so the
+    phases do not add up to it exactly.
+    """
 
 
 class CrawlBatchResult(BaseModel):
@@ -783,9 +1022,11 @@ class CrawlBatchResult(BaseModel):
     output_dir: str | None = None
     """Directory the pages were written to, when output_dir was set."""
     manifest: str | None = None
-    """Path to manifest.json, when output_dir was set."""
+    """Path to manifest.json, or manifest.jsonl under stream_to_disk."""
     note: str | None = None
     """Anything the caller should know, e.g. that a sitemap was truncated."""
+    next_cursor: str | None = None
+    """Where get_pages picks up, when page_size held pages back. None otherwise."""
     error: str | None = None
     """Why the crawl produced nothing at all.
 
@@ -883,6 +1124,9 @@ def _page_results(
     include_content: bool = True,
     include_links: bool = False,
     include_tables: bool = False,
+    timing_sink: dict[str, PageTimings] | None = None,
+    budget: CharBudget | None = None,
+    near_duplicates: NearDuplicates | None = None,
 ) -> list[PageResult]:
     """Convert crawl4ai CrawlResult objects into the wire model.
 
@@ -893,35 +1137,58 @@ def _page_results(
     discarded here until they were asked for, because both can dwarf the page
     content: one Wikipedia article carries 997 internal links. They are opt-in
     per call rather than always-on for that reason.
+
+    timing_sink is what collect_timings gathered, keyed by URL. The queue
+    phase needs the dispatcher's start time, which crawl4ai only attaches to
+    the result, so the phases are worked out here rather than in the hooks.
+
+    budget is the call's character budget, spent in the order pages are
+    returned. Once it is gone, links and tables are not converted at all.
+
+    near_duplicates is the call's fingerprint index, asked about every
+    success in the order given. Its mode decides whether a near duplicate
+    keeps its content, keeps only duplicate_of, or is left out.
     """
     pages: list[PageResult] = []
+    returned_bytes = 0
     for result in sorted(results, key=lambda r: not r.success):
         meta = result.metadata if isinstance(result.metadata, dict) else {}
+        phases = _page_phases(result, timing_sink)
         if result.success:
+            duplicate_of = near_duplicates.check(result) if near_duplicates else None
+            if duplicate_of and near_duplicates.drops:
+                continue
             md = result.markdown
             content = (md.fit_markdown or md.raw_markdown) if md else ""
-            pages.append(
-                PageResult(
-                    url=result.url,
-                    success=True,
-                    status_code=result.status_code,
-                    title=meta.get("title"),
-                    description=meta.get("description"),
-                    markdown=content if include_content else None,
-                    depth=meta.get("depth"),
-                    parent_url=meta.get("parent_url"),
-                    links=(
-                        _page_links(getattr(result, "links", None))
-                        if include_links
-                        else None
-                    ),
-                    tables=(
-                        _page_tables(getattr(result, "tables", None))
-                        if include_tables
-                        else None
-                    ),
-                )
+            # Under "collapse" the original carries all of it.
+            own = duplicate_of is None or near_duplicates.keeps_content
+            convert = own and (budget is None or not budget.spent)
+            page = PageResult(
+                url=result.url,
+                success=True,
+                status_code=result.status_code,
+                title=meta.get("title"),
+                description=meta.get("description"),
+                markdown=content if include_content and own else None,
+                depth=meta.get("depth"),
+                parent_url=meta.get("parent_url"),
+                duplicate_of=duplicate_of,
+                links=(
+                    _page_links(getattr(result, "links", None))
+                    if include_links and convert
+                    else None
+                ),
+                tables=(
+                    _page_tables(getattr(result, "tables", None))
+                    if include_tables and convert
+                    else None
+                ),
+                timings=phases,
             )
+            _spend(page, budget)
+            if isinstance(page.markdown, str):
+                returned_bytes += len(page.markdown.encode())
+            pages.append(page)
         else:
             # Same diagnostics the single-page tools report. A batch is where
             # they matter most: crawling 50 URLs and having 10 come back
@@ -939,23 +1206,78 @@ def _page_results(
                     error=error or None,
                     depth=meta.get("depth"),
                     parent_url=meta.get("parent_url"),
+                    timings=phases,
                 )
             )
+    observe_pages(results, returned_bytes)
     return pages
 
 
+def _spend(page: PageResult, budget: CharBudget | None) -> None:
+    """Cut a page's markdown, links and tables to what the budget has left."""
+    if budget is None or not page.success:
+        return
+    if page.markdown is not None:
+        page.markdown, cut = budget.markdown(page.markdown)
+        page.truncated = cut or None
+    if page.links is not None:
+        links = [*page.links.internal, *page.links.external]
+        kept = budget.items(
+            [
+                len(link.href) + len(link.text or "") + len(link.title or "")
+                for link in links
+            ]
+        )
+        internal = min(kept, len(page.links.internal))
+        page.links = PageLinks(
+            internal=page.links.internal[:internal],
+            external=page.links.external[: kept - internal],
+        )
+    if page.tables is not None:
+        kept = budget.items(
+            [
+                sum(len(cell) for row in [t.headers, *t.rows] for cell in row)
+                + len(t.caption or "")
+                for t in page.tables
+            ]
+        )
+        page.tables = page.tables[:kept]
+
+
+def _page_phases(
+    result, timing_sink: dict[str, PageTimings] | None
+) -> dict[str, float] | None:
+    """One result's phase timings in milliseconds, or None when not recorded."""
+    if timing_sink is None:
+        return None
+    timer = timing_sink.get(result.url)
+    if timer is None:
+        return None
+    dispatch = getattr(result, "dispatch_result", None)
+    start = getattr(dispatch, "start_time", None)
+    return timer.phases(start if isinstance(start, (int, float)) else None)
+
+
 def _batch_result(
     results: list,
     note: str | None = None,
     include_links: bool = False,
     include_tables: bool = False,
+    timing_sink: dict[str, PageTimings] | None = None,
+    budget: CharBudget | None = None,
+    near_duplicates: NearDuplicates | None = None,
 ) -> CrawlBatchResult:
     """Build the structured result returned by every multi-page crawl tool."""
     return CrawlBatchResult(
         crawled=sum(1 for r in results if r.success),
         total=len(results),
         pages=_page_results(
-            results, include_links=include_links, include_tables=include_tables
+            results,
+            include_links=include_links,
+            include_tables=include_tables,
+            timing_sink=timing_sink,
+            budget=budget,
+            near_duplicates=near_duplicates,
         ),
         note=note,
     )
@@ -991,22 +1313,226 @@ def _sanitize_filename(url: str) -> str:
     return f"{name}_{digest}"
 
 
-def _output_dir_failed_note(output_dir: str, exc: OSError, note: str | None) -> str:
+def _output_dir_failed_note(
+    output_dir: str, exc: OSError, note: str | None, written: int = 0
+) -> str:
     """Explain a failed write without discarding the crawl it belonged to."""
     detail = (
         f"Could not write to output_dir {output_dir!r} ({exc.strerror or exc}). "
         f"The crawl itself succeeded, so the page content is returned inline "
         f"below instead of being written to disk."
     )
+    if written:
+        detail = (
+            f"Writing to output_dir {output_dir!r} failed after {written} pages "
+            f"({exc.strerror or exc}). Those pages are on disk and listed with "
+            f"their file; the crawl carried on, and the pages after them are "
+            f"returned inline below."
+        )
     return f"{note} {detail}" if note else detail
 
 
+def _check_stream_to_disk(stream_to_disk: bool, output_dir: str | None) -> str | None:
+    """stream_to_disk without an output_dir has nowhere to stream to."""
+    if stream_to_disk and not output_dir:
+        return (
+            "stream_to_disk writes each page to output_dir as it finishes; "
+            "set output_dir as well, or leave stream_to_disk off to get the "
+            "pages inline."
+        )
+    return None
+
+
+def _check_page_size(page_size: int | None) -> str | None:
+    if page_size is not None and page_size < 1:
+        return f"page_size must be 1 or more, got {page_size}."
+    return None
+
+
+def _check_char_limits(
+    max_total_chars: int | None, max_chars_per_page: int | None
+) -> str | None:
+    for name, value in (
+        ("max_total_chars", max_total_chars),
+        ("max_chars_per_page", max_chars_per_page),
+    ):
+        if value is not None and value < 1:
+            return f"{name} must be 1 or more, got {value}."
+    return None
+
+
+def _capped(content: str, max_chars: int | None) -> str:
+    """crawl_url's markdown cut to max_chars, with a footer saying so."""
+    if max_chars is None or len(content) <= max_chars:
+        return content
+    kept = truncate_markdown(content, max_chars)
+    return (
+        f"{kept}\n\n--- Truncated ---\n{len(content) - len(kept):,} of "
+        f"{len(content):,} characters left out at a block boundary "
+        f"(max_chars={max_chars})."
+    )
+
+
+def _paginated(
+    app: "AppContext", result: CrawlBatchResult, page_size: int | None
+) -> CrawlBatchResult:
+    """Cut a batch to its first page_size pages and keep the rest for get_pages.
+
+    The whole batch goes into the result store, so get_pages and the
+    crawl:// resources index one list however the caller reads it. A batch
+    too large for the store is returned whole, with a note saying why.
+    """
+    if page_size is None or result.error or len(result.pages) <= page_size:
+        return result
+    batch_id = app.results.put(result.pages)
+    if batch_id is None:
+        result.note = _join_notes(
+            result.note,
+            "The batch is larger than CRAWL4AI_MCP_RESULT_STORE_MB, so it is "
+            "returned whole instead of a page_size slice.",
+        )
+        return result
+    total = len(result.pages)
+    result.pages = result.pages[:page_size]
+    result.next_cursor = make_cursor(batch_id, page_size)
+    result.note = _join_notes(
+        result.note,
+        f"Returned the first {page_size} of {total} pages. Pass next_cursor to "
+        f"get_pages for the rest; page i is also the resource "
+        f"crawl://{batch_id}/<i>.",
+    )
+    return result
+
+
+async def _open_checkpoint(
+    job_id: str | None, output_dir: str | None, tool: str, identity: dict
+) -> tuple[Checkpoint | None, str | None]:
+    """The call's checkpoint and None, or None and why there cannot be one."""
+    if job_id is None:
+        return None, None
+    bad = job_id_error(job_id)
+    if bad:
+        return None, bad
+    try:
+        return await Checkpoint.open(job_id, output_dir, tool, identity), None
+    except CheckpointMismatch as exc:
+        return None, str(exc)
+    except (OSError, ValueError) as exc:
+        return None, f"Could not open the checkpoint for job {job_id!r}: {exc}"
+
+
+@asynccontextmanager
+async def _checkpointed(checkpoint: Checkpoint | None) -> AsyncIterator[None]:
+    """Close checkpoint when the block ends, complete only if it ran to the end.
+
+    A cancelled or failed call still writes its latest state, which is the
+    whole point: the next call with the same job_id starts from there.
+    """
+    if checkpoint is None:
+        yield
+        return
+    try:
+        yield
+    except BaseException:
+        await checkpoint.close(complete=False)
+        raise
+    await checkpoint.close(complete=True)
+
+
+async def _open_disk_frontier(
+    checkpoint: Checkpoint | None, output_dir: str, best_first: bool
+) -> tuple[DiskFrontier | None, str | None]:
+    """deep_crawl's on-disk frontier and None, or None and why it failed.
+
+    A job keeps the file in its checkpoint directory, to be resumed. Without
+    one it is scratch in output_dir, started afresh and removed at the end.
+    """
+    if checkpoint is not None:
+        path = os.path.join(checkpoint.path, FRONTIER_FILE)
+        finished = checkpoint.finished
+    else:
+        path = os.path.join(output_dir, f".{FRONTIER_FILE}")
+        finished = set()
+        await asyncio.to_thread(_remove_disk_frontier, path)
+    try:
+        store = await asyncio.to_thread(DiskFrontier.open, path, best_first, finished)
+    except (OSError, sqlite3.Error) as exc:
+        return None, f"Could not open the on-disk frontier at {path}: {exc}"
+    return store, None
+
+
+def _remove_disk_frontier(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+@asynccontextmanager
+async def _closing_frontier(
+    store: DiskFrontier | None, scratch: bool
+) -> AsyncIterator[None]:
+    """Commit and close store when the block ends; delete it if scratch."""
+    if store is None:
+        yield
+        return
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(store.close)
+        if scratch:
+            await asyncio.to_thread(_remove_disk_frontier, str(store.path))
+
+
+def _manifest_entry(
+    result, near_duplicates: NearDuplicates | None = None
+) -> tuple[dict, str | None]:
+    """One page's manifest entry, and the markdown its file should hold.
+
+    Shared by manifest.json and manifest.jsonl so the two never describe a
+    page differently. A failure has no file, and None for content. Neither
+    has a near duplicate under "collapse": its entry names the original in
+    duplicate_of instead. Under "drop" the caller leaves the entry out.
+    """
+    if not result.success:
+        return {
+            "url": result.url,
+            "success": False,
+            "error": result.error_message,
+        }, None
+    md = result.markdown
+    content = (md.fit_markdown or md.raw_markdown) if md else ""
+    duplicate_of = near_duplicates.check(result) if near_duplicates else None
+    own = duplicate_of is None or near_duplicates.keeps_content
+    entry: dict = {"url": result.url}
+    if own:
+        entry["file"] = f"{_sanitize_filename(result.url)}.md"
+    entry["success"] = True
+    if duplicate_of:
+        entry["duplicate_of"] = duplicate_of
+    if result.metadata and isinstance(result.metadata, dict):
+        if "depth" in result.metadata:
+            entry["depth"] = result.metadata["depth"]
+        if "parent_url" in result.metadata:
+            entry["parent_url"] = result.metadata["parent_url"]
+    return entry, (content or "") if own else None
+
+
+def _dropped(entry: dict, near_duplicates: NearDuplicates | None) -> bool:
+    """Whether near_duplicates="drop" leaves this page out of the output."""
+    return bool(near_duplicates and near_duplicates.drops and entry.get("duplicate_of"))
+
+
 def _persist_results(
     results: list,
     output_dir: str,
     note: str | None = None,
     include_links: bool = False,
     include_tables: bool = False,
+    timing_sink: dict[str, PageTimings] | None = None,
+    budget: CharBudget | None = None,
+    near_duplicates: NearDuplicates | None = None,
 ) -> CrawlBatchResult:
     """Write per-page .md files and a manifest.json to output_dir.
 
@@ -1017,6 +1543,7 @@ def _persist_results(
     Requested links and tables still come back inline. Only the markdown has a
     file to be written to; inventing a second on-disk format for the structured
     data would leave the caller parsing files to get what they just asked for.
+    The files are never cut by a budget; only what comes back inline is.
     """
     # A disk failure must not destroy the crawl.
     #
@@ -1039,6 +1566,9 @@ def _persist_results(
             note=_output_dir_failed_note(output_dir, exc, note),
             include_links=include_links,
             include_tables=include_tables,
+            timing_sink=timing_sink,
+            budget=budget,
+            near_duplicates=near_duplicates,
         )
 
     successes = [r for r in results if r.success]
@@ -1047,31 +1577,18 @@ def _persist_results(
 
     try:
         for result in successes:
-            stem = _sanitize_filename(result.url)
-            filename = f"{stem}.md"
-            filepath = os.path.join(output_dir, filename)
-
-            md = result.markdown
-            content = (md.fit_markdown or md.raw_markdown) if md else ""
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(content)
-
-            entry: dict = {"url": result.url, "file": filename, "success": True}
-            if result.metadata and isinstance(result.metadata, dict):
-                if "depth" in result.metadata:
-                    entry["depth"] = result.metadata["depth"]
-                if "parent_url" in result.metadata:
-                    entry["parent_url"] = result.metadata["parent_url"]
+            entry, content = _manifest_entry(result, near_duplicates)
+            if _dropped(entry, near_duplicates):
+                continue
+            if content is not None:
+                with open(
+                    os.path.join(output_dir, entry["file"]), "w", encoding="utf-8"
+                ) as f:
+                    f.write(content)
             manifest_entries.append(entry)
 
         for result in failures:
-            manifest_entries.append(
-                {
-                    "url": result.url,
-                    "success": False,
-                    "error": result.error_message,
-                }
-            )
+            manifest_entries.append(_manifest_entry(result)[0])
 
         manifest_path = os.path.join(output_dir, "manifest.json")
         with open(manifest_path, "w", encoding="utf-8") as f:
@@ -1082,6 +1599,9 @@ def _persist_results(
             note=_output_dir_failed_note(output_dir, exc, note),
             include_links=include_links,
             include_tables=include_tables,
+            timing_sink=timing_sink,
+            budget=budget,
+            near_duplicates=near_duplicates,
         )
 
     # Same shape as an inline crawl, but pointing at files instead of carrying
@@ -1091,12 +1611,15 @@ def _persist_results(
         include_content=False,
         include_links=include_links,
         include_tables=include_tables,
+        timing_sink=timing_sink,
+        budget=budget,
+        near_duplicates=near_duplicates,
     )
     by_url = {e["url"]: e for e in manifest_entries if e.get("success")}
     for page in pages:
         entry = by_url.get(page.url)
         if entry:
-            page.file = entry["file"]
+            page.file = entry.get("file")
 
     return CrawlBatchResult(
         crawled=len(successes),
@@ -1108,150 +1631,504 @@ def _persist_results(
     )
 
 
-# Zero-width and BOM characters seen inside real <loc> elements. They survive
-# .strip() and produce a URL that looks right and does not resolve.
-_INVISIBLE_CHARS = "​‌‍﻿⁠"
+class _IncrementalOutput:
+    """Pages of one stream_to_disk or job_id call, handled as they arrive.
 
-# Bounds sitemap-index recursion. A sitemap index that references itself, or two
-# that reference each other, would otherwise recurse until the process dies.
-MAX_SITEMAP_DEPTH = 5
+    Each page is written and then reduced to its content-less PageResult the
+    moment it arrives, so the batch in memory is a list of small summaries
+    rather than every page's HTML and markdown. The one exception is a disk
+    that fails partway: the pages already written stay written, and every
+    page after that keeps its markdown and is returned inline, as
+    _persist_results does for a directory it could not write at all.
 
+    Without an output_dir (a job_id call returning pages inline) nothing is
+    written, and each page is converted with its content instead. Either
+    way, a checkpoint is handed every page as soon as it exists, and the
+    pages it restored from earlier runs start the list.
 
-def _clean_loc(text: str | None, base_url: str) -> str | None:
-    """Normalize one <loc> value, or None if there is nothing usable in it.
+    limit caps the pages accepted, for deep_crawl's max_pages. Whatever
+    arrives past it is dropped unwritten, where the batch path truncated it
+    after the fact.
 
-    Strips invisible characters and resolves relative paths against the sitemap
-    that contained them. The sitemap protocol requires absolute URLs, but
-    relative ones appear in the wild and are unusable if passed through as-is.
+    budget is spent in finish(), over the pages in the order they are
+    returned, so the checkpoint always records pages whole.
+
+    near_duplicates is asked about each page as it arrives. A page that
+    near_duplicates="drop" leaves out is still recorded to the checkpoint,
+    with its duplicate_of, so a resumed job does not fetch it again, and
+    finish() leaves it out of the result like the rest. An original is
+    recorded with its fingerprint, and the pages restored from the
+    checkpoint go back into near_duplicates, so a resumed job compares its
+    new pages with the earlier run's too.
     """
-    if not text:
-        return None
-    cleaned = text.strip().strip(_INVISIBLE_CHARS).strip()
-    if not cleaned:
-        return None
-    return urljoin(base_url, cleaned)
+
+    def __init__(
+        self,
+        output_dir: str | None,
+        include_links: bool = False,
+        include_tables: bool = False,
+        timing_sink: dict[str, PageTimings] | None = None,
+        limit: int | None = None,
+        checkpoint: Checkpoint | None = None,
+        budget: CharBudget | None = None,
+        near_duplicates: NearDuplicates | None = None,
+    ) -> None:
+        self.output_dir = output_dir
+        self.budget = budget
+        self.near_duplicates = near_duplicates
+        self.include_links = include_links
+        self.include_tables = include_tables
+        self.timing_sink = timing_sink
+        self.limit = limit
+        self.checkpoint = checkpoint
+        self.writer: ManifestWriter | None = None
+        self.error: OSError | None = None
+        self.written = 0
+        self.pages: list[PageResult] = []
+        self.restored: dict[str, PageResult] = {
+            p["url"]: PageResult.model_validate(p)
+            for p in (checkpoint.pages if checkpoint else [])
+        }
+        if near_duplicates is not None:
+            for p in checkpoint.pages if checkpoint else []:
+                if p.get("success"):
+                    near_duplicates.restore(
+                        p["url"], p.get("simhash"), p.get("duplicate_of")
+                    )
+
+    @property
+    def accepted(self) -> int:
+        return len(self.restored) + len(self.pages)
+
+    async def open(self) -> "_IncrementalOutput":
+        if not self.output_dir:
+            return self
+        try:
+            self.writer = await ManifestWriter(
+                self.output_dir,
+                append=self.checkpoint is not None and self.checkpoint.resumed,
+            ).open()
+        except OSError as exc:
+            self.error = exc
+        return self
+
+    def _page(self, result, include_content: bool) -> PageResult:
+        pages = _page_results(
+            [result],
+            include_content=include_content,
+            include_links=self.include_links,
+            include_tables=self.include_tables,
+            timing_sink=self.timing_sink,
+            near_duplicates=self.near_duplicates,
+        )
+        if pages:
+            return pages[0]
+        # Dropped as a near duplicate: recorded, never returned.
+        meta = result.metadata if isinstance(result.metadata, dict) else {}
+        return PageResult(
+            url=result.url,
+            success=True,
+            status_code=result.status_code,
+            depth=meta.get("depth"),
+            parent_url=meta.get("parent_url"),
+            duplicate_of=self.near_duplicates.duplicate_of(result.url),
+        )
+
+    def _kept(self, page: PageResult) -> bool:
+        return page.duplicate_of is None or not (
+            self.near_duplicates and self.near_duplicates.drops
+        )
+
+    async def add(self, result) -> None:
+        if self.limit is not None and self.accepted >= self.limit:
+            return
+        page = None
+        if self.writer is not None and self.error is None:
+            entry, content = _manifest_entry(result, self.near_duplicates)
+            dropped = _dropped(entry, self.near_duplicates)
+            try:
+                if not dropped:
+                    await self.writer.write(entry, content)
+            except OSError as exc:
+                self.error = exc
+            else:
+                page = self._page(result, include_content=False)
+                page.file = entry.get("file")
+                self.written += not dropped
+        if page is None:
+            page = self._page(result, include_content=True)
+        # Replaces a failure restored from the checkpoint that was retried.
+        self.restored.pop(page.url, None)
+        self.pages.append(page)
+        if self.checkpoint is not None:
+            record = page.model_dump(exclude_none=True)
+            if self.near_duplicates is not None:
+                fingerprint = self.near_duplicates.fingerprint(page.url)
+                if fingerprint is not None:
+                    record["simhash"] = fingerprint
+            await self.checkpoint.record(record)
+
+    async def finish(self, note: str | None) -> CrawlBatchResult:
+        """Close the manifest and build the result from what was handled."""
+        if self.writer is not None:
+            try:
+                await self.writer.close()
+            except OSError as exc:
+                # Every line was flushed; only the last fsync failed.
+                logger.warning("closing %s failed: %s", self.writer.manifest_path, exc)
+        # Successes first, as _page_results orders a batch; depth next, so a
+        # deep crawl reads level by level however its pages finished.
+        handled = [*self.restored.values(), *self.pages]
+        pages = sorted(
+            filter(self._kept, handled),
+            key=lambda p: (not p.success, p.depth or 0),
+        )
+        for page in pages:
+            _spend(page, self.budget)
+        if self.error is not None:
+            note = _output_dir_failed_note(
+                self.output_dir, self.error, note, written=self.written
+            )
+        opened = self.writer is not None
+        return CrawlBatchResult(
+            crawled=sum(1 for p in handled if p.success),
+            total=len(handled),
+            pages=pages,
+            output_dir=self.output_dir if opened else None,
+            manifest=self.writer.manifest_path if opened else None,
+            note=note,
+        )
 
 
-# The two bytes every gzip stream starts with. Checking these is what makes
-# decompression depend on what actually arrived rather than on the URL.
-_GZIP_MAGIC = b"\x1f\x8b"
+def _join_notes(*notes: str | None) -> str | None:
+    """Combine the notes a batch tool collected, dropping the empty ones."""
+    joined = " ".join(n for n in notes if n)
+    return joined or None
 
 
-def _maybe_gunzip(content: bytes) -> bytes:
-    """Decompress only if the bytes really are gzip, whatever the URL said.
+REVALIDATE_CONCURRENCY = 16
 
-    This used to key off `sitemap_url.endswith(".gz")`, which is a claim about
-    the request rather than the response, and the two disagree in both
-    directions:
 
-    - httpx transparently decodes `Content-Encoding: gzip`, so a server that
-      sets that header on a .gz path hands us PLAIN bytes at a .gz URL.
-      `gzip.decompress` then raised `BadGzipFile: Not a gzipped file (b'<?')`,
-      which no caller caught, so the whole tool crashed on a sitemap that was
-      perfectly valid. Same crash when a .gz URL redirects to plain XML.
-    - A .xml URL that redirects to genuinely gzipped content was never
-      decompressed at all, and the caller was told it "is not valid sitemap
-      XML" -- pointing at the sitemap, when the sitemap was fine.
+async def _revalidate_stale(
+    app: "AppContext", stale: dict[str, tuple[str, object]]
+) -> dict[str, object]:
+    """Conditional-GET every stale entry and return the ones still current.
 
-    Both disappear once the bytes decide. A decompression that still fails is
-    returned as-is so the XML parser can produce the error the caller can act
-    on, rather than a gzip error about a file they never said was gzipped.
+    stale maps url -> (key, page). Bounded so a re-crawl of a large sitemap
+    does not open thousands of connections to one host at once; these are
+    header-sized requests, so a modest cap still finishes quickly.
     """
-    if not content.startswith(_GZIP_MAGIC):
-        return content
-    try:
-        return gzip.decompress(content)
-    except (OSError, EOFError) as exc:  # BadGzipFile is an OSError subclass
-        logger.warning("Sitemap looked gzipped but would not decompress: %s", exc)
-        return content
+    if not stale:
+        return {}
+    gate = asyncio.Semaphore(REVALIDATE_CONCURRENCY)
+
+    async def check(client: httpx.AsyncClient, url: str, page) -> bool:
+        async with gate, _host_scheduler.slot(url):
+            return await revalidate(client, url, page)
+
+    async with client_or_own(
+        app.http,
+        lambda: httpx.AsyncClient(follow_redirects=True, timeout=REVALIDATE_TIMEOUT_S),
+    ) as client:
+        unchanged = await asyncio.gather(
+            *(check(client, url, page) for url, (_key, page) in stale.items())
+        )
+    current: dict[str, object] = {}
+    for (url, (key, _page)), same in zip(stale.items(), unchanged):
+        if same:
+            page = app.result_cache.refresh(key)
+            if page is not None:
+                current[url] = page
+    return current
+
+
+async def _cache_lookup(
+    app: "AppContext", urls: list[str], settings: dict
+) -> tuple[list, list[str], dict[str, str]]:
+    """Split a batch into pages the result cache can answer and URLs to crawl.
+
+    Returns (hits, misses, keys). keys maps every URL to its cache key so the
+    caller can store the fresh results under the same key without rebuilding
+    the merge. A stale entry with an ETag or Last-Modified is revalidated
+    first, and counts as a hit when the origin answers 304.
+    """
+    hits: list = []
+    misses: list[str] = []
+    keys: dict[str, str] = {}
+    stale: dict[str, tuple[str, object]] = {}
+    for url in urls:
+        key = keys.setdefault(url, cache_key(url, settings))
+        page = app.result_cache.get(key)
+        if page is not None:
+            hits.append(page)
+            continue
+        misses.append(url)
+        old = app.result_cache.stale(key)
+        if old is not None:
+            stale[url] = (key, old)
+    current = await _revalidate_stale(app, stale)
+    if current:
+        hits.extend(current[u] for u in misses if u in current)
+        misses = [u for u in misses if u not in current]
+    return hits, misses, keys
+
+
+def _cache_store(app: "AppContext", results: list, keys: dict[str, str]) -> None:
+    """Store every cacheable fresh result under the key its URL was looked up by.
+
+    Keyed by the URL the caller asked for, not result.url: crawl4ai reports the
+    requested URL there, but a redirect target showing up instead would file
+    the page where no later lookup can find it.
+    """
+    for result in results:
+        key = keys.get(result.url)
+        if key is not None:
+            app.result_cache.put(key, result)
 
 
-async def _fetch_sitemap_urls(
-    sitemap_url: str, _depth: int = 0, _seen: set[str] | None = None
-) -> list[str]:
-    """Fetch and parse a sitemap XML, returning all <loc> URLs.
+def _cache_note(hits: list, total: int) -> str | None:
+    """Say how much of a batch never touched the browser, when any of it did."""
+    if not hits:
+        return None
+    note = f"{len(hits)} of {total} pages served from the result cache"
+    revalidated = sum(1 for page in hits if getattr(page, "revalidated", False))
+    if revalidated:
+        note += f" ({revalidated} revalidated with a 304)"
+    return note + "."
+
+
+def _check_canonical(canonicalize: str, rel_canonical: bool) -> str | None:
+    """Refuse an unknown canonicalize mode, or rel_canonical with it off."""
+    if canonicalize not in CANONICALIZE_MODES:
+        return _bad_choice("canonicalize", canonicalize, CANONICALIZE_MODES)
+    if rel_canonical and canonicalize == "off":
+        return (
+            "rel_canonical=True needs canonicalize='standard' or 'loose': "
+            "canonicalize='off' fetches every URL as given."
+        )
+    return None
 
-    Handles:
-    - Regular sitemaps (<urlset> with <url><loc>)
-    - Sitemap indexes (<sitemapindex> with <sitemap><loc>) -- resolved concurrently
-    - Gzipped sitemaps (.xml.gz) -- automatically decompressed
-    - Any sitemap XML namespace, or none
 
-    Namespaces are matched with ElementTree's `{*}` wildcard rather than the
-    sitemaps.org 0.9 URI. Pinning that URI meant a sitemap declaring any other
-    namespace -- the older google.com/schemas/sitemap/0.84 among them -- parsed
-    to zero URLs and was reported to the caller as an empty sitemap.
+def _replaced_pages(canonical: Canonicalizer | None) -> list[PageResult]:
+    """A page for each URL not fetched because another URL is the same page.
+
+    So every URL the caller passed is in the result: a duplicate is listed
+    with duplicate_of naming the URL that was fetched, and nothing else.
     """
-    seen = _seen if _seen is not None else set()
-    seen.add(sitemap_url)
+    if canonical is None:
+        return []
+    return [
+        PageResult(url=url, success=True, duplicate_of=fetched)
+        for url, fetched in canonical.replaced.items()
+    ]
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-        resp = await client.get(sitemap_url)
-        resp.raise_for_status()
 
-    content = _maybe_gunzip(resp.content)
+def _check_render(render: str, settings: dict) -> str | None:
+    """Refuse an unknown render mode, or render="http" with browser-only settings.
+
+    Refused rather than quietly upgraded to the browser: a caller who asked
+    for http did so for the cost, and should learn that js_code or a js_heavy
+    profile puts the browser back, not discover it from the timings.
+    """
+    if render not in RENDER_MODES:
+        return _bad_choice("render", render, RENDER_MODES)
+    needs = browser_only_settings(settings)
+    if render == "http" and needs:
+        return (
+            f"render='http' cannot apply {', '.join(needs)}: they only work "
+            "inside a browser page. Use render='auto' to let pages that need "
+            "them go to the browser, or render='browser'."
+        )
+    return None
 
-    root = ET.fromstring(content)
-    # Resolve relative <loc> against the final URL after redirects, not the one
-    # requested, so a sitemap that redirected resolves against where it landed.
-    base_url = str(resp.url) if getattr(resp, "url", None) else sitemap_url
 
-    # A sitemap index: <sitemapindex><sitemap><loc>
-    sub_locs = [
-        loc for elem in root.findall("{*}sitemap") for loc in elem.findall("{*}loc")
-    ]
-    if sub_locs:
-        if _depth >= MAX_SITEMAP_DEPTH:
-            logger.warning(
-                "Sitemap index nesting exceeded %d levels at %s -- not descending further",
-                MAX_SITEMAP_DEPTH,
-                sitemap_url,
+async def _crawl_over_http(
+    app: "AppContext",
+    urls: list[str],
+    run_cfg: CrawlerRunConfig,
+    settings: dict,
+    render: str,
+    max_concurrent: int = 10,
+    delay: float = 0,
+    on_result=None,
+) -> tuple[list, list[str], str | None]:
+    """Fetch pages with httpx and render them without the browser.
+
+    Returns (results, for_browser, note). Under render="auto", pages whose
+    body looks like it needs JavaScript land in for_browser for the caller to
+    crawl normally. Under render="http" nothing escalates: a fetch failure or
+    a non-HTML response becomes a failed result that says so.
+
+    on_result, a coroutine function, is handed each page as it finishes
+    instead of it being collected, and results comes back empty.
+
+    The leased crawler is only used for crawl4ai's raw: processing, which
+    never opens a page; it is leased so the tools keep reaching crawl4ai
+    through the pool and so the pool counts the work.
+    """
+    needs = browser_only_settings(settings)
+    if needs:  # only reachable under auto: _check_render refused it for http
+        return (
+            [],
+            list(urls),
+            f"render='auto' sent every page to the browser: {', '.join(needs)} "
+            "needs one.",
+        )
+    gate = asyncio.Semaphore(max(max_concurrent, 1))
+    results: list = []
+    fetched = 0
+    for_browser: list[str] = []
+    reasons: dict[str, int] = {}
+
+    async def finished(result) -> None:
+        nonlocal fetched
+        fetched += 1
+        if on_result is None:
+            results.append(result)
+        else:
+            await on_result(result)
+
+    async def one(crawler: AsyncWebCrawler, client: httpx.AsyncClient, url: str):
+        async with gate:
+            if delay > 0:
+                await asyncio.sleep(delay)
+            timer = start_page(url)
+            fetched_at = time.perf_counter()
+            async with admitted(url) as sample, _host_scheduler.slot(url):
+                page, error = await fetch_page(client, url, headers)
+                if page is not None:
+                    sample.record(page.status_code, page.headers)
+            if timer is not None:
+                timer.fetch_s = time.perf_counter() - fetched_at
+        reason = escalation_reason(page) if page is not None else "fetch failed"
+        if render == "auto" and reason:
+            for_browser.append(url)
+            reasons[reason] = reasons.get(reason, 0) + 1
+            return
+        if page is None or reason == "non-HTML content":
+            await finished(
+                CrawlResult(
+                    url=url,
+                    html="",
+                    success=False,
+                    status_code=page.status_code if page else None,
+                    error_message=(
+                        f"Plain-HTTP fetch failed: {error}"
+                        if page is None
+                        else f"render='http' cannot convert {page.content_type}; "
+                        "crawl it with render='browser'."
+                    ),
+                )
             )
-            return []
-
-        targets = []
-        for loc in sub_locs:
-            child = _clean_loc(loc.text, base_url)
-            if child and child not in seen:
-                seen.add(child)
-                targets.append(child)
-
-        # Concurrent rather than sequential: a large index can reference
-        # hundreds of sub-sitemaps, and fetching them one at a time dominates
-        # the runtime of the whole crawl.
-        results = await asyncio.gather(
-            *(_fetch_sitemap_urls(t, _depth + 1, seen) for t in targets),
-            return_exceptions=True,
+            return
+        await finished(await render_page(crawler, page, run_cfg))
+
+    headers = page_headers(settings.get("user_agent"))
+    async with _lease_crawler(app) as crawler:
+        async with client_or_own(
+            app.http, lambda: make_client(max_concurrent, settings.get("user_agent"))
+        ) as client:
+            await asyncio.gather(*(one(crawler, client, url) for url in urls))
+
+    note = f"{fetched} of {len(urls)} pages fetched over plain HTTP"
+    if for_browser:
+        why = ", ".join(f"{n} {reason}" for reason, n in sorted(reasons.items()))
+        note += f"; {len(for_browser)} needed the browser ({why})"
+    return results, for_browser, note + "."
+
+
+async def _list_sitemap(
+    sitemap_url: str,
+    client: httpx.AsyncClient | None = None,
+    limit: int | None = None,
+    selection: SitemapSelection | None = None,
+    canonical: Canonicalizer | None = None,
+) -> tuple[list[str], bool, str | None]:
+    """The first limit page URLs a sitemap lists, whether it lists more, and a note.
+
+    Reading stops at limit + 1 URLs: the extra one is how a truncated list
+    is told from one that happened to be exactly limit long. Child sitemaps
+    of an index that were not needed by then are never fetched. The note
+    is SitemapReader's account of the files it read, None for a single one.
+
+    selection, when given, drops the pages it does not keep before they
+    count towards limit. One with order_by reads the whole sitemap, orders
+    what it kept, and then cuts at limit.
+
+    canonical, when given, drops a page whose URL is another listed page's
+    once canonicalized, also before it counts towards limit.
+
+    client is the server's shared one. Without it, one client is opened here
+    for the whole index, so its children still share connections rather than
+    each paying for a handshake of its own.
+    """
+    async with client_or_own(
+        client,
+        lambda: httpx.AsyncClient(follow_redirects=True, timeout=SITEMAP_TIMEOUT_S),
+    ) as c:
+        reader = SitemapReader(
+            c, sitemap_url, _host_scheduler.slot, sitemap_concurrency_from_env()
         )
         urls: list[str] = []
-        for target, result in zip(targets, results):
-            if isinstance(result, BaseException):
-                # One bad sub-sitemap must not discard the others.
-                logger.warning("Sub-sitemap %s failed: %s", target, result)
-                continue
-            urls.extend(result)
-        return urls
+        kept: list[SitemapEntry] = []
+        truncated = False
+        ordered = selection is not None and selection.order_by is not None
+        async with aclosing(reader.entries()) as stream:
+            async for entry in stream:
+                if selection is not None and not selection.keep(entry):
+                    continue
+                if canonical is not None and not canonical.claim(entry.loc):
+                    continue
+                if ordered:
+                    kept.append(entry)
+                    continue
+                if limit is not None and len(urls) >= limit:
+                    truncated = True
+                    break
+                urls.append(entry.loc)
+    if ordered:
+        kept = selection.order(kept)
+        truncated = limit is not None and len(kept) > limit
+        urls = [entry.loc for entry in kept[:limit]]
+    return urls, truncated, reader.note()
+
+
+async def _fetch_sitemap_urls(
+    sitemap_url: str, client: httpx.AsyncClient | None = None
+) -> list[str]:
+    """Fetch and parse a sitemap XML, returning all <loc> URLs.
 
-    # A regular sitemap: <urlset><url><loc>
-    locs = [loc for elem in root.findall("{*}url") for loc in elem.findall("{*}loc")]
-    cleaned = (_clean_loc(loc.text, base_url) for loc in locs)
-    return [u for u in cleaned if u]
+    Handles:
+    - Regular sitemaps (<urlset> with <url><loc>)
+    - Sitemap indexes (<sitemapindex> with <sitemap><loc>) -- resolved concurrently
+    - Gzipped sitemaps (.xml.gz) -- decompressed as they stream in
+    - Any sitemap XML namespace, or none
+
+    The sitemap is streamed and parsed a chunk at a time; see
+    crawl4ai_mcp.sitemap for how that keeps a 50MB sitemap out of memory.
+    """
+    urls, _truncated, _note = await _list_sitemap(sitemap_url, client)
+    return urls
 
 
-async def _get_latest_pypi_version() -> tuple[str, dict]:
+async def _get_latest_pypi_version(
+    client: httpx.AsyncClient | None = None,
+) -> tuple[str, dict]:
     """Query PyPI for the latest crawl4ai release version.
 
     Returns a tuple of (version_string, full_json_data) from PyPI's JSON API.
     Raises httpx.HTTPError or httpx.TimeoutException on failure (caller handles).
     """
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get("https://pypi.org/pypi/crawl4ai/json")
+    async with client_or_own(client, lambda: httpx.AsyncClient(timeout=10.0)) as c:
+        resp = await c.get("https://pypi.org/pypi/crawl4ai/json", timeout=10.0)
         resp.raise_for_status()
         data = resp.json()
         return data["info"]["version"], data
 
 
-async def _fetch_changelog_summary(version: str) -> str:
+async def _fetch_changelog_summary(
+    version: str, client: httpx.AsyncClient | None = None
+) -> str:
     """Fetch and extract changelog highlights for a specific crawl4ai version.
 
     Fetches CHANGELOG.md from the crawl4ai GitHub repo and extracts the section
@@ -1273,9 +2150,10 @@ async def _fetch_changelog_summary(version: str) -> str:
         f"https://github.com/unclecode/crawl4ai/releases/tag/v{version}"
     )
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(
-                "https://raw.githubusercontent.com/unclecode/crawl4ai/main/CHANGELOG.md"
+        async with client_or_own(client, lambda: httpx.AsyncClient(timeout=10.0)) as c:
+            resp = await c.get(
+                "https://raw.githubusercontent.com/unclecode/crawl4ai/main/CHANGELOG.md",
+                timeout=10.0,
             )
             resp.raise_for_status()
 
@@ -1306,7 +2184,7 @@ async def _fetch_changelog_summary(version: str) -> str:
         return fallback
 
 
-async def _startup_version_check() -> None:
+async def _startup_version_check(client: httpx.AsyncClient | None = None) -> None:
     """Fire-and-forget check for crawl4ai updates at server startup.
 
     Logs a warning to stderr if a newer version is available on PyPI.
@@ -1315,8 +2193,8 @@ async def _startup_version_check() -> None:
     """
     try:
         installed = importlib.metadata.version("crawl4ai")
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get("https://pypi.org/pypi/crawl4ai/json")
+        async with client_or_own(client, lambda: httpx.AsyncClient(timeout=5.0)) as c:
+            resp = await c.get("https://pypi.org/pypi/crawl4ai/json", timeout=5.0)
             resp.raise_for_status()
             data = resp.json()
             latest = data["info"]["version"]
@@ -1346,24 +2224,58 @@ _call_overrides: contextvars.ContextVar[dict] = contextvars.ContextVar(
 )
 
 
+@contextmanager
+def _call_scope(**overrides):
+    """Publish this call's overrides to the hooks for the duration of a crawl.
+
+    Anything that spawns tasks -- arun_many's dispatcher, deep crawl's
+    strategy, _await_with_heartbeat -- must be started INSIDE the scope:
+    a task copies the context when it is created, not when it first runs.
+    """
+    token = _call_overrides.set(overrides)
+    try:
+        yield
+    finally:
+        _call_overrides.reset(token)
+
+
 async def _override_before_goto(page, context, url, config, **kwargs):
-    """Apply this task's headers. Installed once; a no-op when none are set."""
-    headers = _call_overrides.get().get("headers")
+    """Apply this task's headers and resource blocking. Installed once.
+
+    A no-op for a fresh page when neither is set. route_page also runs when
+    blocking is NOT set, so a reused session page sheds the route an earlier
+    call installed.
+    """
+    overrides = _call_overrides.get()
+    headers = overrides.get("headers")
     if headers:
         await page.set_extra_http_headers(headers)
+    await route_page(page, overrides.get("blocker"))
+    timings.navigation_started(url)
 
 
 async def _override_on_context(page, context, **kwargs):
     """Apply this task's cookies. Installed once; a no-op when none are set."""
+    timings.page_opened()
+    page_started()
     cookies = _call_overrides.get().get("cookies")
     if cookies:
         await context.add_cookies(cookies)
 
 
 def _install_override_hooks(crawler: AsyncWebCrawler) -> None:
-    """Install the override hooks once, at startup."""
-    crawler.crawler_strategy.set_hook("before_goto", _override_before_goto)
-    crawler.crawler_strategy.set_hook("on_page_context_created", _override_on_context)
+    """Install the override and timing hooks once, at startup.
+
+    The timing hooks sit in slots nothing else here uses. They return at once
+    unless the running call asked for include_timings.
+    """
+    strategy = crawler.crawler_strategy
+    strategy.set_hook("before_goto", _override_before_goto)
+    strategy.set_hook("on_page_context_created", _override_on_context)
+    strategy.set_hook("after_goto", timings.after_goto)
+    strategy.set_hook("before_retrieve_html", timings.before_retrieve_html)
+    strategy.set_hook("on_execution_started", timings.on_execution_started)
+    strategy.set_hook("before_return_html", timings.before_return_html)
 
 
 async def _clear_injected_cookies(crawler: AsyncWebCrawler, cookies: list) -> None:
@@ -1426,8 +2338,9 @@ async def _crawl_with_overrides(
     config: CrawlerRunConfig,
     headers: dict | None = None,
     cookies: list | None = None,
+    blocker: ResourceBlocker | None = None,
 ):
-    """Run arun with per-request header and cookie injection.
+    """Run arun with per-request header, cookie and blocking injection.
 
     CrawlerRunConfig still has no headers or cookies parameters in crawl4ai
     0.9.2 (verified against the installed signature; they exist only on
@@ -1439,11 +2352,10 @@ async def _crawl_with_overrides(
     Injected cookies are cleared afterwards unless the call is part of a named
     session, where persisting them across calls is the entire point.
     """
-    token = _call_overrides.set({"headers": headers, "cookies": cookies})
     try:
-        return await crawler.arun(url=url, config=config)
+        with _call_scope(headers=headers, cookies=cookies, blocker=blocker):
+            return await crawler.arun(url=url, config=config)
     finally:
-        _call_overrides.reset(token)
         if cookies and not getattr(config, "session_id", None):
             await _clear_injected_cookies(crawler, cookies)
 
@@ -1472,11 +2384,18 @@ async def _emit_progress(
         logger.debug("progress notification failed: %s", exc)
 
 
+async def _aiter_list(items: list):
+    for item in items:
+        yield item
+
+
 async def _collect_with_progress(
     stream,
     ctx: "Context[AppContext]",
     total: int | None,
     label: str,
+    on_result=None,
+    keep: bool = True,
 ) -> list:
     """Drain a streaming crawl into a list, reporting each completed page.
 
@@ -1488,14 +2407,27 @@ async def _collect_with_progress(
     each page resets that timer, and it is the only reason deep_crawl runs
     in streaming mode rather than awaiting the batch.
 
-    Used only by deep_crawl. The two arun_many-based tools heartbeat instead,
-    because streaming there would require swapping the dispatcher; see the
-    note at that call site.
+    deep_crawl streams through crawl4ai's strategy; crawl_many and
+    crawl_sitemap through StreamingSemaphoreDispatcher. on_result, when
+    given, is called with each page as it arrives, so per-page work such as
+    caching happens while the slowest page is still loading; it may be a
+    coroutine function. keep=False hands each page to on_result and then lets
+    it go, for callers writing pages to disk that must not hold the batch. A
+    plain list (arun_many's return when the config does not stream) is
+    accepted too.
     """
     results: list = []
+    done = 0
+    if isinstance(stream, list):
+        stream = _aiter_list(stream)
     async for result in stream:
-        results.append(result)
-        done = len(results)
+        if keep:
+            results.append(result)
+        if on_result is not None:
+            outcome = on_result(result)
+            if inspect.isawaitable(outcome):
+                await outcome
+        done += 1
         suffix = f"/{total}" if total else ""
         await _emit_progress(
             ctx,
@@ -1534,6 +2466,56 @@ async def _await_with_heartbeat(
         )
 
 
+def _metered(fn):
+    """Count and time every call of a tool, under the tool's name.
+
+    Applied under @mcp.tool so the registered handler is the wrapper; the
+    SDK reads the signature through functools.wraps, so the schema is the
+    tool's own. A returned model with `error` set counts as an error, a raise
+    as an exception. Tools that answer a failure with a plain string count as
+    ok here; their pages still count by status class.
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        ctx = kwargs.get("ctx")
+        request = getattr(ctx, "request_context", None)
+        metrics = getattr(getattr(request, "lifespan_context", None), "metrics", None)
+        if not isinstance(metrics, Metrics):
+            return await fn(*args, **kwargs)
+        with metrics.call(name) as record:
+            result = await fn(*args, **kwargs)
+            record.outcome = "error" if getattr(result, "error", None) else "ok"
+            return result
+
+    return wrapper
+
+
+def _metrics_gauges(app: "AppContext") -> dict[str, float]:
+    """Point-in-time values read from the server's state, not counted."""
+    pool = app.pool if isinstance(app.pool, CrawlerPool) else None
+    return {
+        "active_sessions": len(app.sessions),
+        "dispatcher_queue_depth": app.metrics.queue_depth,
+        "pages_in_flight": sum(s.outstanding for s in pool.slots) if pool else 0,
+        "browsers_running": len(pool.slots) if pool else int(app.crawler is not None),
+        "host_slot_waiters": _host_scheduler.waiting,
+    }
+
+
+def _pool_restarts(app: "AppContext") -> dict[str, int]:
+    """Restarts the pool counts itself: recycles, and crashed browsers replaced."""
+    pool = app.pool if isinstance(app.pool, CrawlerPool) else None
+    if pool is None:
+        return {}
+    return {"recycle": pool.recycled, "crash": pool.replaced}
+
+
+def _metrics_exposition(app: "AppContext") -> str:
+    return app.metrics.exposition(_metrics_gauges(app), _pool_restarts(app))
+
+
 @mcp.tool(
     title="Server health check",
     annotations=ToolAnnotations(
@@ -1541,6 +2523,7 @@ async def _await_with_heartbeat(
         open_world_hint=False,  # inspects in-process state only
     ),
 )
+@_metered
 async def ping(ctx: Context[AppContext]) -> str:
     """Verify the MCP server is running and the browser is ready.
 
@@ -1580,6 +2563,7 @@ async def ping(ctx: Context[AppContext]) -> str:
         open_world_hint=True,  # downloads from Playwright's CDN
     ),
 )
+@_metered
 async def repair_browser(ctx: Context[AppContext]) -> str:
     """Install the Chromium build the crawler needs, then bring the browser up.
 
@@ -1621,6 +2605,7 @@ async def repair_browser(ctx: Context[AppContext]) -> str:
         open_world_hint=False,  # reads profiles loaded into memory at startup
     ),
 )
+@_metered
 async def list_profiles(ctx: Context[AppContext]) -> str:
     """List all available crawl profiles and their configuration settings.
 
@@ -1673,6 +2658,7 @@ async def list_profiles(ctx: Context[AppContext]) -> str:
         open_world_hint=False,  # two fixed endpoints; the caller cannot steer them
     ),
 )
+@_metered
 async def check_update(ctx: Context[AppContext]) -> str:
     """Check if a newer version of crawl4ai is available on PyPI.
 
@@ -1680,10 +2666,11 @@ async def check_update(ctx: Context[AppContext]) -> str:
     info and changelog highlights. Never performs the upgrade itself -- use
     scripts/update.sh for that.
     """
+    app: AppContext = ctx.request_context.lifespan_context
     installed = importlib.metadata.version("crawl4ai")
 
     try:
-        latest, _data = await _get_latest_pypi_version()
+        latest, _data = await _get_latest_pypi_version(app.http)
     except (httpx.HTTPError, httpx.TimeoutException) as exc:
         return (
             f"Version check failed\n"
@@ -1697,7 +2684,7 @@ async def check_update(ctx: Context[AppContext]) -> str:
         return f"crawl4ai is up to date\nInstalled: {installed}\nLatest: {latest}"
 
     # Update available — fetch changelog summary
-    changelog = await _fetch_changelog_summary(latest)
+    changelog = await _fetch_changelog_summary(latest, app.http)
 
     return (
         f"Update available\n"
@@ -1710,6 +2697,41 @@ async def check_update(ctx: Context[AppContext]) -> str:
     )
 
 
+@mcp.tool(
+    title="Server metrics",
+    annotations=ToolAnnotations(
+        read_only_hint=True,
+        open_world_hint=False,  # reads in-process counters only
+    ),
+)
+@_metered
+async def metrics(output: str = "text", ctx: Context[AppContext] = None) -> str:
+    """Report what this server has done since it started.
+
+    Per tool: calls by outcome, latency percentiles (p50/p90/p99 over the last
+    1,024 calls), pages returned by HTTP status class, failed pages, anti-bot
+    blocks crawl4ai recorded in crawl_stats, and bytes of markdown returned.
+    Server-wide: browser restarts (repair, recycle, crash), active sessions,
+    pages waiting in a dispatcher for a slot, pages held by calls in progress,
+    and browsers running.
+
+    A call counts as an error when it returned a structured error, and as an
+    exception when it raised. Tools that report a failure as text count as ok;
+    the failed page is still counted under its status class.
+
+    Args:
+        output: "text" (default) for a readable summary, or "prometheus" for
+            the text exposition format, the same document the optional
+            /metrics endpoint serves (set CRAWL4AI_MCP_METRICS_PORT).
+    """
+    if output not in ("text", "prometheus"):
+        return _bad_choice("output", output, ["text", "prometheus"])
+    app: AppContext = ctx.request_context.lifespan_context
+    if output == "prometheus":
+        return _metrics_exposition(app)
+    return app.metrics.snapshot(_metrics_gauges(app), _pool_restarts(app))
+
+
 @mcp.tool(
     title="Crawl a URL to markdown",
     annotations=ToolAnnotations(
@@ -1719,12 +2741,15 @@ async def check_update(ctx: Context[AppContext]) -> str:
         open_world_hint=True,  # fetches a caller-supplied URL
     ),
 )
+@_metered
 async def crawl_url(
     url: str,
     profile: str | None = None,
     session_id: str | None = None,
     query: str | None = None,
     cache_mode: str | None = None,
+    result_cache: bool = False,
+    render: str = DEFAULT_RENDER,
     css_selector: str | None = None,
     target_elements: list[str] | None = None,
     excluded_selector: str | None = None,
@@ -1736,6 +2761,9 @@ async def crawl_url(
     cookies: list | None = None,
     page_timeout: int | None = None,
     word_count_threshold: int | None = None,
+    block_resources: list[str] | None = None,
+    include_timings: bool = False,
+    max_chars: int | None = None,
     ctx: Context[AppContext] = None,
 ) -> str:
     """Crawl a URL and return clean, filtered markdown content.
@@ -1777,6 +2805,34 @@ async def crawl_url(
               on cache_mode, so a miss quietly fetches the page normally.
             - "write_only" — fetch fresh and overwrite cache; ignore existing cached
 
+        result_cache: Answer from the server's own cache of finished pages when
+            an identical crawl ran recently, and store this one when it did not
+            (default False). This is not crawl4ai's cache: that one keeps the
+            raw HTML and loses the filtered markdown, which is why cache_mode
+            defaults to bypass. This one keeps exactly what the call returns,
+            keyed on the URL plus every setting that shapes the markdown --
+            profile, query, selectors, js_code, wait_for, word_count_threshold.
+            Change any of them and it is a different entry. Only 2xx pages are
+            stored. Entries live for CRAWL4AI_MCP_RESULT_CACHE_TTL seconds
+            (default 3600) within CRAWL4AI_MCP_RESULT_CACHE_MB (default 256).
+            Refused together with session_id, headers or cookies, which make
+            the page depend on who is asking.
+
+        render: How the page is fetched (default "browser").
+            - "browser" — Chromium, as always.
+            - "http"    — a plain HTTP GET, then the same markdown generator
+              and content filter a browser crawl uses, run over the response
+              body. No browser at all, so it is far cheaper, and it only
+              sees what the server sent: anything JavaScript adds is missing.
+              Refused with js_code, js_code_before_wait, wait_for,
+              session_id, headers, cookies, or a profile such as js_heavy
+              or stealth that needs a real page.
+            - "auto"    — try HTTP first and fall back to the browser when
+              the body looks like it needs JavaScript: empty, a <noscript>
+              wall asking for JavaScript, under 50 visible words, an error
+              status, or not HTML. Uses the browser outright whenever a
+              setting needs one.
+
         css_selector: Restrict extraction to elements matching this CSS selector
             (include scope). Example: "article.main-content" extracts only the
             article element. Without this, the full page body is extracted.
@@ -1891,13 +2947,51 @@ async def crawl_url(
         word_count_threshold: Minimum word count for a content block to survive
             PruningContentFilter (default 10). Lower values retain more short
             blocks; higher values prune more aggressively.
+
+        block_resources: Subresources the browser should never request. A list
+            of Playwright resource types ("image", "font", "media",
+            "stylesheet", "script", ...), "trackers" for common analytics and
+            ad hosts, and URL globs such as "*.mp4" or "*://cdn.example.com/*".
+            The markdown comes from the DOM, so blocking images, fonts and
+            media leaves it unchanged while skipping most of a page's bytes;
+            blocking scripts or stylesheets can change what renders. The
+            "fast" profile blocks image, font, media and trackers; pass []
+            to turn that off. When anything was blocked, a "Blocked requests"
+            footer counts it.
+
+        include_timings: Append a "Timings" footer giving the milliseconds
+            spent in each phase of the crawl (default False): navigation (up
+            to wait_until), wait_for (with scrolling and js_code_before_wait),
+            js_code, delay (delay_before_return_html), capture (reading the
+            HTML out of the page), filter, markdown, and total. A page taken
+            over plain HTTP reports fetch instead of the browser phases. Use
+            it to find out why a crawl is slow before changing settings: a
+            wait_for running out its timeout and a 2MB page in the content
+            filter look the same from the outside. Not reported for a
+            result_cache hit, which did no crawling.
+
+        max_chars: Most characters of markdown to return (default None, no
+            limit). A longer page is cut at the last markdown block boundary
+            that fits, never inside a code fence or just after a heading,
+            and a "Truncated" footer says how much was left out.
     """
     resolved_cache, cache_error = _resolve_cache_mode(cache_mode)
     if cache_error:
         return cache_error
+    if max_chars is not None and max_chars < 1:
+        return f"max_chars must be 1 or more, got {max_chars}."
     profile_error = _check_profile(ctx.request_context.lifespan_context, profile)
     if profile_error:
         return profile_error
+    if result_cache and (session_id or headers or cookies):
+        # The key covers the settings, not the identity. A page fetched with a
+        # session or a credential is that caller's view of it, and serving it
+        # to the next caller with the same URL would hand it over.
+        return (
+            "result_cache cannot be combined with session_id, headers or "
+            "cookies: the page would depend on who asked for it, and the cache "
+            "key does not. Drop one or the other."
+        )
 
     logger.info("crawl_url: %s (cache=%s, profile=%s)", url, cache_mode, profile)
 
@@ -1927,13 +3021,45 @@ async def crawl_url(
         per_call_kwargs["word_count_threshold"] = word_count_threshold
     if query is not None:
         per_call_kwargs["query"] = query
+    if block_resources is not None:
+        per_call_kwargs["block_resources"] = block_resources
 
     app: AppContext = ctx.request_context.lifespan_context
+    settings = merged_settings(app.profile_manager, profile, **per_call_kwargs)
+    render_error = _check_render(
+        render, {**settings, "headers": headers, "cookies": cookies}
+    )
+    if render_error:
+        return render_error
+    blocker, block_error = ResourceBlocker.parse(settings.get("block_resources"))
+    if block_error:
+        return block_error
+    key = None
+    if result_cache:
+        key = cache_key(url, settings)
+        cached = app.result_cache.get(key)
+        if cached is not None:
+            return _capped(cached.content, max_chars)
+        stale = app.result_cache.stale(key)
+        current = await _revalidate_stale(app, {url: (key, stale)} if stale else {})
+        if url in current:
+            return _capped(current[url].content, max_chars)
     run_cfg = build_run_config(app.profile_manager, profile, **per_call_kwargs)
 
-    result = await _crawl_with_overrides(
-        _require_crawler(app), url, run_cfg, headers, cookies
-    )
+    result = None
+    with collect_timings(include_timings) as timing_sink:
+        if render != "browser" and not (session_id or headers or cookies):
+            fetched, _escalated, _note = await _crawl_over_http(
+                app, [url], run_cfg, settings, render, max_concurrent=1
+            )
+            result = fetched[0] if fetched else None
+        if result is None:
+            async with _lease_crawler(app, session_id) as crawler:
+                result = await _crawl_with_overrides(
+                    crawler, url, run_cfg, headers, cookies, blocker
+                )
+    if key is not None:
+        app.result_cache.put(key, result)
 
     # Register the session on ANY outcome, not just success.
     #
@@ -1948,10 +3074,18 @@ async def crawl_url(
         app.sessions[session_id] = time.time()
 
     if not result.success:
+        observe_pages([result])
         return _format_crawl_error(url, result)
 
     md = result.markdown
-    content = (md.fit_markdown or md.raw_markdown) if md else ""
+    content = _capped((md.fit_markdown or md.raw_markdown) if md else "", max_chars)
+    observe_pages([result], len(content.encode()))
+    blocked = blocker.summary() if blocker else None
+    if blocked:
+        content += f"\n\n--- Blocked requests ---\n{blocked}"
+    phases = _page_phases(result, timing_sink)
+    if phases:
+        content += f"\n\n--- Timings ---\n{timings.summary(phases)}"
     return content
 
 
@@ -1964,6 +3098,7 @@ async def crawl_url(
         open_world_hint=True,  # optionally navigates to a caller-supplied URL
     ),
 )
+@_metered
 async def create_session(
     session_id: str | None = None,
     url: str | None = None,
@@ -2020,9 +3155,8 @@ async def create_session(
             session_id=sid,
             cache_mode=CacheMode.BYPASS,
         )
-        result = await _crawl_with_overrides(
-            _require_crawler(app), url, config, headers, cookies
-        )
+        async with _lease_crawler(app, sid) as crawler:
+            result = await _crawl_with_overrides(crawler, url, config, headers, cookies)
 
         app.sessions[sid] = time.time()
 
@@ -2065,6 +3199,7 @@ async def create_session(
         open_world_hint=False,  # reads the in-memory session table
     ),
 )
+@_metered
 async def list_sessions(
     ctx: Context[AppContext] = None,
 ) -> str:
@@ -2085,14 +3220,18 @@ async def list_sessions(
     # so a session used a minute ago but created ninety minutes ago rendered as
     # "created 90 min ago" right next to a documented 30-minute TTL, implying it
     # was dead when it was live. The TTL is measured from last use, not creation.
+    #
+    # With a browser pool each session lives in one browser's registry, so all
+    # of them are read; session names are unique across the server.
     native: dict = {}
     ttl = 1800.0
-    try:
-        manager = app.crawler.crawler_strategy.browser_manager
-        native = getattr(manager, "sessions", {}) or {}
-        ttl = float(getattr(manager, "session_ttl", 1800))
-    except AttributeError:  # pragma: no cover - upstream layout change
-        pass
+    for crawler in _all_crawlers(app):
+        try:
+            manager = crawler.crawler_strategy.browser_manager
+            native.update(getattr(manager, "sessions", {}) or {})
+            ttl = float(getattr(manager, "session_ttl", 1800))
+        except AttributeError:  # pragma: no cover - upstream layout change
+            pass
 
     lines = ["Active sessions:"]
     now = time.time()
@@ -2127,6 +3266,7 @@ async def list_sessions(
         open_world_hint=False,  # acts on server-side state only
     ),
 )
+@_metered
 async def destroy_session(
     session_id: str,
     ctx: Context[AppContext] = None,
@@ -2146,9 +3286,13 @@ async def destroy_session(
 
     logger.info("destroy_session: %s", session_id)
     try:
-        await _require_crawler(app).crawler_strategy.kill_session(session_id)
+        await _session_crawler(app, session_id).crawler_strategy.kill_session(
+            session_id
+        )
     except Exception as exc:
         logger.warning("Error killing session %s: %s", session_id, exc)
+    if isinstance(app.pool, CrawlerPool):
+        app.pool.forget_session(session_id)
     del app.sessions[session_id]
     return f"Session destroyed: {session_id}"
 
@@ -2162,16 +3306,29 @@ async def destroy_session(
         open_world_hint=True,  # fetches caller-supplied URLs
     ),
 )
+@_metered
 async def crawl_many(
     urls: list[str],
     max_concurrent: int = 10,
     delay: float = 0,
+    adaptive_concurrency: bool = False,
     output_dir: str | None = None,
+    stream_to_disk: bool = False,
+    job_id: str | None = None,
+    page_size: int | None = None,
+    max_total_chars: int | None = None,
+    max_chars_per_page: int | None = None,
     include_links: bool = False,
     include_tables: bool = False,
+    include_timings: bool = False,
     profile: str | None = None,
     query: str | None = None,
     cache_mode: str | None = None,
+    result_cache: bool = False,
+    render: str = DEFAULT_RENDER,
+    canonicalize: str = DEFAULT_CANONICALIZE,
+    rel_canonical: bool = False,
+    near_duplicates: str = "off",
     css_selector: str | None = None,
     target_elements: list[str] | None = None,
     excluded_selector: str | None = None,
@@ -2181,6 +3338,7 @@ async def crawl_many(
     user_agent: str | None = None,
     page_timeout: int | None = None,
     word_count_threshold: int | None = None,
+    block_resources: list[str] | None = None,
     ctx: Context[AppContext] = None,
 ) -> CrawlBatchResult:
     """Crawl multiple URLs concurrently and return all results.
@@ -2207,6 +3365,13 @@ async def crawl_many(
             delay). When > 0, a RateLimiter paces requests to avoid
             overwhelming target servers.
 
+        adaptive_concurrency: Treat max_concurrent as a ceiling and let each
+            host set the working limit (default False). Starts at 2 pages per
+            host, adds about one per round of pages while the host's latency
+            stays flat, and halves on a 429 or 503, an anti-bot block, or a
+            Retry-After header, which also pauses that host for as long as it
+            asks (up to 2 minutes). The note reports where each host settled.
+
         output_dir: Directory to write per-page .md files and a manifest.json.
             When set, returns a metadata summary (file paths) instead of page
             content. When None (default), returns full content inline.
@@ -2214,6 +3379,43 @@ async def crawl_many(
             collide — manifest.json always is. Point this at a directory you
             own, not one holding files you need.
 
+        stream_to_disk: Write each page to output_dir the moment it finishes,
+            and append a line for it to manifest.jsonl (one JSON object per
+            page) instead of writing manifest.json at the end (default False;
+            needs output_dir). A crash or timeout partway through leaves every
+            page finished so far on disk and listed, and the server holds only
+            a summary of each page rather than the whole batch. Use it for
+            crawls of thousands of pages.
+
+        job_id: Name this crawl so it can be resumed (default None). Pages are
+            checkpointed as they finish; calling again with the same job_id
+            and the same arguments returns the pages already done without
+            fetching them and crawls only the rest, failures included. The
+            checkpoint lives under output_dir/.jobs/ when output_dir is set,
+            and under the server's state directory otherwise. With
+            output_dir, pages are written as stream_to_disk writes them.
+
+        page_size: Return at most this many pages inline (default None, all
+            of them). The rest stay in the server for
+            CRAWL4AI_MCP_RESULT_STORE_TTL seconds after they were last read
+            (default 1800), and next_cursor reads on through get_pages. Every
+            page is also the resource crawl://<batch>/<index>, which reads its
+            markdown. crawled and total still count the whole batch. Use it
+            on large crawls to keep each response small.
+
+        max_total_chars: Most characters of content the whole result may
+            return inline (default None, no limit). Markdown, links and
+            tables all draw on it, in the order pages are returned. The page
+            that crosses the limit is cut at a markdown block boundary, and
+            every page after it comes back without content. Files under
+            output_dir are never cut.
+
+        max_chars_per_page: Most characters of markdown any one page may
+            return (default None, no limit), cut at a block boundary: a
+            blank line outside a code fence, and never just after a heading.
+            Each cut page's truncated field and the note say what was left
+            out.
+
         include_links: Also return each page's outgoing links, split into
             internal and external (default False). crawl4ai collects these on
             every crawl regardless; they are off by default because they are
@@ -2230,6 +3432,13 @@ async def crawl_many(
             the same size reason — a single reference table can run to hundreds
             of rows — but nothing is truncated when it is on.
 
+        include_timings: Give each page a `timings` dict of milliseconds per
+            crawl phase (default False): queue (waiting for a dispatcher slot
+            and the delay), navigation, wait_for, js_code, delay, capture,
+            filter, markdown and total, or fetch for a page taken over plain
+            HTTP. Sort by total to find the slow pages, then read across to
+            see which phase made them slow.
+
         profile: Name of a crawl profile to use as base configuration.
             Per-call parameters take precedence over profile values.
             Use list_profiles to see available profiles.
@@ -2250,6 +3459,51 @@ async def crawl_many(
               on cache_mode, so a miss quietly fetches the page normally.
             - "write_only" — fetch fresh and overwrite cache; ignore existing cached
 
+        result_cache: Serve pages from the server's own cache of finished
+            results, and store the freshly crawled ones (default False). Unlike
+            crawl4ai's cache it keeps the filtered markdown, keyed on the URL
+            plus every setting that shapes it, so a hit is exactly what a fresh
+            crawl with these arguments would return. Only the misses are sent
+            to the browser; the note says how many pages were cache hits. See
+            crawl_url for the TTL and size limits.
+
+        render: "browser" (default), "http" or "auto". "http" fetches each
+            page with a plain HTTP GET and runs the same markdown generator
+            and filter over the body, with no browser; "auto" does that and
+            sends pages that look JavaScript-dependent to the browser. Worth
+            turning on for documentation sites, which are mostly static. The
+            note says how many pages went each way. See crawl_url for what
+            counts as JavaScript-dependent and which settings refuse "http".
+
+        canonicalize: Which URLs count as the same page and are fetched once
+            (default "standard"). "standard" merges URLs that differ only in
+            scheme or host case, a default port, the #fragment, tracking
+            parameters (utm_*, fbclid, gclid, ...) or the order of query
+            parameters; the first URL of each group is the one fetched.
+            "loose" also merges /path and /path/. "off" fetches every URL
+            as given. Each URL not fetched still comes back as a page with
+            duplicate_of naming the URL fetched in its place, and the note
+            says how many fetches that saved.
+
+        rel_canonical: Also skip a URL that a page fetched earlier in the
+            batch names as its <link rel=canonical> (default False; needs
+            canonicalize on). Which of two such URLs is fetched depends on
+            which is reached first, so with max_concurrent above 1 it can
+            change from run to run, and the one fetched may be a print or
+            AMP view rather than the page it names. A skipped URL comes back
+            with duplicate_of like any other duplicate.
+
+        near_duplicates: What to do with a page whose content nearly repeats
+            an earlier page's (default "off"). Faceted listings, print views
+            and paginated archives produce many. Pages are compared by a
+            SimHash fingerprint of their markdown; pages of under 30 words
+            never count. "flag" returns every page and sets duplicate_of on
+            the repeats, "collapse" returns a repeat with duplicate_of and
+            nothing else (no markdown, links, tables or file), and "drop"
+            leaves repeats out of pages and the manifest. crawled and total
+            still count every page fetched, and the note says how many
+            repeats there were.
+
         css_selector: Restrict extraction to elements matching this CSS selector
             (include scope). Applied to ALL URLs in the batch.
 
@@ -2283,6 +3537,10 @@ async def crawl_many(
 
         word_count_threshold: Minimum word count for a content block to survive
             PruningContentFilter (default 10).
+
+        block_resources: Subresources the browser should never request, for
+            every page in the batch: resource types, "trackers", or URL globs.
+            See crawl_url. The note counts what was blocked.
     """
     resolved_cache, cache_error = _resolve_cache_mode(cache_mode)
     if cache_error:
@@ -2290,6 +3548,27 @@ async def crawl_many(
     profile_error = _check_profile(ctx.request_context.lifespan_context, profile)
     if profile_error:
         return CrawlBatchResult(crawled=0, total=0, pages=[], error=profile_error)
+    disk_error = _check_stream_to_disk(stream_to_disk, output_dir)
+    if disk_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=disk_error)
+    limit_error = _check_page_size(page_size) or _check_char_limits(
+        max_total_chars, max_chars_per_page
+    )
+    if limit_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=limit_error)
+    budget = CharBudget.of(max_total_chars, max_chars_per_page)
+    canonical_error = _check_canonical(canonicalize, rel_canonical)
+    if canonical_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=canonical_error)
+    canonical = Canonicalizer.of(canonicalize, rel_canonical)
+    if near_duplicates not in NEAR_DUPLICATE_MODES:
+        return CrawlBatchResult(
+            crawled=0,
+            total=0,
+            pages=[],
+            error=_bad_choice("near_duplicates", near_duplicates, NEAR_DUPLICATE_MODES),
+        )
+    near = NearDuplicates.of(near_duplicates)
 
     logger.info(
         "crawl_many: %d URLs (max_concurrent=%d, delay=%.1f, profile=%s)",
@@ -2321,42 +3600,151 @@ async def crawl_many(
         per_call_kwargs["word_count_threshold"] = word_count_threshold
     if query is not None:
         per_call_kwargs["query"] = query
+    if block_resources is not None:
+        per_call_kwargs["block_resources"] = block_resources
 
     app: AppContext = ctx.request_context.lifespan_context
     run_cfg = build_run_config(app.profile_manager, profile, **per_call_kwargs)
+    settings = merged_settings(app.profile_manager, profile, **per_call_kwargs)
+    render_error = _check_render(render, settings)
+    if render_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=render_error)
+    blocker, block_error = ResourceBlocker.parse(settings.get("block_resources"))
+    if block_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=block_error)
 
     rate_limiter = RateLimiter(base_delay=(delay, delay)) if delay > 0 else None
-    dispatcher = SemaphoreDispatcher(
+    dispatcher = StreamingSemaphoreDispatcher(
         semaphore_count=max_concurrent,
         rate_limiter=rate_limiter,
+        canonical=canonical,
         # NO monitor — CrawlerMonitor uses Rich Console -> stdout corruption
     )
 
-    # Heartbeat while the batch runs, so a long crawl is not aborted for
-    # idleness. Per-page progress would need a streaming dispatcher, and the
-    # only one crawl4ai ships that streams is MemoryAdaptiveDispatcher, which
-    # stalls dispatch above a system-memory threshold; that is not a failure
-    # mode worth adding to every user's crawls for a nicer progress message.
-    results = await _await_with_heartbeat(
-        _require_crawler(app).arun_many(
-            urls=urls,
-            config=run_cfg,
-            dispatcher=dispatcher,
-        ),
-        ctx,
-        f"Crawling {len(urls)} URLs",
+    checkpoint, job_error = await _open_checkpoint(
+        job_id,
+        output_dir,
+        "crawl_many",
+        {"urls": urls, "render": render, "settings": settings_digest(settings)},
+    )
+    if job_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=job_error)
+    # The checkpoint is of the caller's list; what is fetched is its uniques.
+    unique = canonical.dedupe(urls) if canonical else urls
+    pending = checkpoint.pending(unique) if checkpoint else unique
+    cached, to_crawl, keys = [], pending, {}
+    if result_cache:
+        cached, to_crawl, keys = await _cache_lookup(app, pending, settings)
+
+    results = []
+    render_note = None
+    sink = None
+    controller = AdaptiveConcurrency(max_concurrent) if adaptive_concurrency else None
+    async with _checkpointed(checkpoint):
+        with (
+            collect_timings(include_timings) as timing_sink,
+            adaptive_scope(controller),
+        ):
+            if stream_to_disk or checkpoint:
+                sink = await _IncrementalOutput(
+                    output_dir,
+                    include_links,
+                    include_tables,
+                    timing_sink,
+                    checkpoint=checkpoint,
+                    budget=budget,
+                    near_duplicates=near,
+                ).open()
+                for page in cached:
+                    await sink.add(page)
+
+            async def on_page(page) -> None:
+                _cache_store(app, [page], keys)
+                if sink is not None:
+                    await sink.add(page)
+
+            if to_crawl and render != "browser":
+                results, to_crawl, render_note = await _await_with_heartbeat(
+                    _crawl_over_http(
+                        app,
+                        to_crawl,
+                        run_cfg,
+                        settings,
+                        render,
+                        max_concurrent,
+                        delay,
+                        on_result=on_page if sink else None,
+                    ),
+                    ctx,
+                    f"Fetching {len(to_crawl)} URLs over HTTP",
+                )
+                if sink is None:
+                    _cache_store(app, results, keys)
+            if to_crawl:
+                async with _lease_crawler(app, weight=len(to_crawl)) as crawler:
+                    with (
+                        _call_scope(blocker=blocker),
+                        app.metrics.queued(len(to_crawl)),
+                    ):
+                        # Progress per finished page, so a long crawl is not
+                        # aborted for idleness and the client sees how far a
+                        # 500-URL batch has got. crawl4ai's only streaming
+                        # dispatcher, MemoryAdaptiveDispatcher, stalls above a
+                        # system memory threshold; StreamingSemaphoreDispatcher
+                        # streams without that.
+                        stream = await crawler.arun_many(
+                            urls=to_crawl,
+                            config=run_cfg.clone(stream=True),
+                            dispatcher=dispatcher,
+                        )
+                        crawled = await _collect_with_progress(
+                            stream,
+                            ctx,
+                            len(to_crawl),
+                            f"Crawling {len(to_crawl)} URLs",
+                            on_result=on_page,
+                            keep=sink is None,
+                        )
+                results += crawled
+    results = cached + results
+    note = _join_notes(
+        _cache_note(cached, len(urls)),
+        canonical.note() if canonical else None,
+        render_note,
+        blocker.summary() if blocker else None,
+        controller.summary() if controller else None,
+        checkpoint.note() if checkpoint else None,
     )
 
-    if output_dir:
-        return _persist_results(
+    if sink is not None:
+        result = await sink.finish(note)
+    elif output_dir:
+        result = _persist_results(
             results,
             output_dir,
+            note=note,
             include_links=include_links,
             include_tables=include_tables,
+            timing_sink=timing_sink,
+            budget=budget,
+            near_duplicates=near,
         )
-    return _batch_result(
-        results, include_links=include_links, include_tables=include_tables
-    )
+    else:
+        result = _batch_result(
+            results,
+            note=note,
+            include_links=include_links,
+            include_tables=include_tables,
+            timing_sink=timing_sink,
+            budget=budget,
+            near_duplicates=near,
+        )
+    result.pages += _replaced_pages(canonical)
+    if near is not None:
+        result.note = _join_notes(result.note, near.note())
+    if budget is not None:
+        result.note = _join_notes(result.note, budget.note())
+    return _paginated(ctx.request_context.lifespan_context, result, page_size)
 
 
 @mcp.tool(
@@ -2368,6 +3756,7 @@ async def crawl_many(
         open_world_hint=True,  # fetches a caller-supplied URL and calls an external LLM
     ),
 )
+@_metered
 async def extract_structured(
     url: str,
     schema: dict,
@@ -2463,7 +3852,8 @@ async def extract_structured(
         run_cfg.js_code = js_code
 
     app: AppContext = ctx.request_context.lifespan_context
-    result = await _crawl_with_overrides(_require_crawler(app), url, run_cfg)
+    async with _lease_crawler(app) as crawler:
+        result = await _crawl_with_overrides(crawler, url, run_cfg)
 
     if not result.success:
         return _format_crawl_error(url, result)
@@ -2520,6 +3910,7 @@ async def extract_structured(
         open_world_hint=True,  # fetches a caller-supplied URL
     ),
 )
+@_metered
 async def extract_css(
     url: str,
     schema: dict,
@@ -2655,7 +4046,8 @@ async def extract_css(
         run_cfg.js_code = js_code
 
     app: AppContext = ctx.request_context.lifespan_context
-    result = await _crawl_with_overrides(_require_crawler(app), url, run_cfg)
+    async with _lease_crawler(app) as crawler:
+        result = await _crawl_with_overrides(crawler, url, run_cfg)
 
     if not result.success:
         return ExtractionResult(
@@ -2712,6 +4104,7 @@ async def extract_css(
         open_world_hint=True,  # fetches a caller-supplied URL
     ),
 )
+@_metered
 async def extract_patterns(
     url: str,
     patterns: list[str] | None = None,
@@ -2837,7 +4230,8 @@ async def extract_patterns(
         run_cfg.js_code = js_code
 
     app: AppContext = ctx.request_context.lifespan_context
-    result = await _crawl_with_overrides(_require_crawler(app), url, run_cfg)
+    async with _lease_crawler(app) as crawler:
+        result = await _crawl_with_overrides(crawler, url, run_cfg)
 
     if not result.success:
         return ExtractionResult(
@@ -2881,12 +4275,18 @@ async def extract_patterns(
         open_world_hint=True,  # follows links discovered at crawl time
     ),
 )
+@_metered
 async def deep_crawl(
     url: str,
     max_depth: int = 3,
     max_pages: int = 100,
     scope: str = "same-domain",
     strategy: str = "bfs",
+    engine: str = "frontier",
+    frontier_store: str = "memory",
+    canonicalize: str = DEFAULT_CANONICALIZE,
+    rel_canonical: bool = False,
+    near_duplicates: str = "off",
     relevance_keywords: list[str] | None = None,
     include_pattern: str | None = None,
     exclude_pattern: str | None = None,
@@ -2894,12 +4294,20 @@ async def deep_crawl(
     blocked_domains: list[str] | None = None,
     max_concurrent: int = 5,
     delay: float = 0,
+    adaptive_concurrency: bool = False,
     output_dir: str | None = None,
+    stream_to_disk: bool = False,
+    job_id: str | None = None,
+    page_size: int | None = None,
+    max_total_chars: int | None = None,
+    max_chars_per_page: int | None = None,
     include_links: bool = False,
     include_tables: bool = False,
+    include_timings: bool = False,
     profile: str | None = None,
     query: str | None = None,
     cache_mode: str | None = None,
+    result_cache: bool = False,
     css_selector: str | None = None,
     target_elements: list[str] | None = None,
     excluded_selector: str | None = None,
@@ -2909,6 +4317,7 @@ async def deep_crawl(
     user_agent: str | None = None,
     page_timeout: int | None = None,
     word_count_threshold: int | None = None,
+    block_resources: list[str] | None = None,
     ctx: Context[AppContext] = None,
 ) -> CrawlBatchResult:
     """Crawl a site by following links from a start URL using BFS (breadth-first search).
@@ -2917,6 +4326,10 @@ async def deep_crawl(
     discovers their links, and repeats up to max_depth levels deep. Stops when
     max_pages total pages have been crawled or no more links are found.
 
+    The server runs the crawl itself as a continuous work queue: each free
+    slot takes the next URL at once, instead of waiting for the slowest page
+    of a depth level, and URLs are taken from each host in turn.
+
     Each URL is crawled at most once (automatic deduplication). Results include
     depth (how many links away from the start URL) and parent_url metadata.
 
@@ -2930,7 +4343,8 @@ async def deep_crawl(
         max_pages: Hard cap on total pages crawled (default 100). The crawl
             stops when this many pages have been successfully crawled, even if
             more links exist. Large values take proportionally longer — the
-            agent controls this.
+            agent controls this. Exact: no more pages are started than can
+            still be needed. Failed pages are returned too and do not count.
 
         scope: Domain scope for link following.
             - "same-domain" (default): Only follow links within the start URL's
@@ -2971,21 +4385,64 @@ async def deep_crawl(
             already permits, so it can carve a host out of a same-domain crawl
             without widening anything.
 
+        engine: "frontier" (default) or "crawl4ai". The frontier engine is
+            the server's own: a continuous queue that refills each slot as
+            soon as a page finishes, round-robin across hosts, with exact
+            max_pages, dispatched the same way as crawl_many. "crawl4ai"
+            hands the crawl to crawl4ai's deep-crawl strategy instead, which
+            waits for each depth level to finish before starting the next and
+            is dispatched by its MemoryAdaptiveDispatcher; it is kept for
+            comparison and as a fallback.
+
+        frontier_store: "memory" (default) or "disk". With "disk" the
+            frontier engine keeps its queue and every URL it has seen in a
+            SQLite file instead of memory, with a Bloom filter in front of
+            the visited check, and every page goes straight to output_dir
+            as stream_to_disk writes it. Memory then stays flat however
+            large the crawl: use it for crawls of tens of thousands of
+            pages. Needs output_dir and engine="frontier". With job_id the
+            file lives in the job's checkpoint and a second call resumes
+            from it; without one it is deleted when the crawl ends.
+
+        canonicalize: "standard" (default), "loose" or "off": which links
+            count as the same page, as in crawl_many. Each link is queued
+            under its canonical form. Applies to the frontier engine;
+            engine="crawl4ai" follows links as crawl4ai finds them.
+
+        rel_canonical: Also skip a link that a crawled page names as its
+            <link rel=canonical> (default False), as in crawl_many. Frontier
+            engine only.
+
+        near_duplicates: "off" (default), "flag", "collapse" or "drop": what
+            to do with a page whose content nearly repeats an earlier one's,
+            as in crawl_many. With the frontier engine no links are followed
+            from such a page either, so pagination and facet pages stop
+            spending max_pages on more of themselves. engine="crawl4ai"
+            still follows them; only the output is affected.
+
         max_concurrent: Maximum pages fetched simultaneously (default 5,
-            crawl4ai's own default for a deep crawl). Unlike crawl_many, a
-            deep crawl cannot use a custom dispatcher — crawl4ai's deep-crawl
-            strategy takes none — so this sets semaphore_count on the run
-            config, which is what its internal dispatcher reads.
+            crawl4ai's own default for a deep crawl). With engine="crawl4ai"
+            the strategy takes no dispatcher, so this sets semaphore_count on
+            the run config, which is what its internal dispatcher reads.
 
         delay: Politeness delay in seconds between page fetches (default 0 —
-            no delay). Sets mean_delay, the inter-request pacing crawl4ai's
-            internal dispatcher applies at every BFS level.
-
-            Note: a deep crawl is dispatched by crawl4ai's MemoryAdaptiveDispatcher,
-            which crawl_many and crawl_sitemap deliberately avoid because it
-            pauses dispatch above a system-memory threshold. There is no way to
-            substitute a dispatcher here, so a deep crawl on a memory-pressured
-            machine can stall where a flat batch crawl would not.
+            no delay). Paces requests through a RateLimiter, as in
+            crawl_many. With engine="crawl4ai" it sets mean_delay, the
+            inter-request pacing crawl4ai's internal dispatcher applies at
+            every BFS level.
+
+            Note: with engine="crawl4ai" a deep crawl is dispatched by
+            crawl4ai's MemoryAdaptiveDispatcher, which crawl_many and
+            crawl_sitemap deliberately avoid because it pauses dispatch above
+            a system-memory threshold, so on a memory-pressured machine it
+            can stall where the frontier engine would not.
+
+        adaptive_concurrency: Treat max_concurrent as a ceiling and let each
+            host set the working limit (default False). Starts at 2 pages per
+            host, adds about one per round of pages while the host's latency
+            stays flat, and halves on a 429 or 503, an anti-bot block, or a
+            Retry-After header, which also pauses that host for as long as it
+            asks (up to 2 minutes). The note reports where each host settled.
 
         output_dir: Directory to write per-page .md files and a manifest.json.
             When set, returns a metadata summary (file paths) instead of page
@@ -2994,6 +4451,43 @@ async def deep_crawl(
             collide — manifest.json always is. Point this at a directory you
             own, not one holding files you need.
 
+        stream_to_disk: Write each page to output_dir the moment it finishes,
+            and append a line for it to manifest.jsonl (one JSON object per
+            page) instead of writing manifest.json at the end (default False;
+            needs output_dir). A crash or timeout partway through leaves every
+            page finished so far on disk and listed, and the server holds only
+            a summary of each page rather than the whole batch. Use it for
+            crawls of thousands of pages.
+
+        job_id: Name this crawl so it can be resumed (default None). Pages are
+            checkpointed as they finish; calling again with the same job_id
+            and the same arguments returns the pages already done without
+            fetching them and crawls only the rest, failures included. The
+            checkpoint lives under output_dir/.jobs/ when output_dir is set,
+            and under the server's state directory otherwise. With
+            output_dir, pages are written as stream_to_disk writes them.
+
+        page_size: Return at most this many pages inline (default None, all
+            of them). The rest stay in the server for
+            CRAWL4AI_MCP_RESULT_STORE_TTL seconds after they were last read
+            (default 1800), and next_cursor reads on through get_pages. Every
+            page is also the resource crawl://<batch>/<index>, which reads its
+            markdown. crawled and total still count the whole batch. Use it
+            on large crawls to keep each response small.
+
+        max_total_chars: Most characters of content the whole result may
+            return inline (default None, no limit). Markdown, links and
+            tables all draw on it, in the order pages are returned. The page
+            that crosses the limit is cut at a markdown block boundary, and
+            every page after it comes back without content. Files under
+            output_dir are never cut.
+
+        max_chars_per_page: Most characters of markdown any one page may
+            return (default None, no limit), cut at a block boundary: a
+            blank line outside a code fence, and never just after a heading.
+            Each cut page's truncated field and the note say what was left
+            out.
+
         include_links: Also return each page's outgoing links, split into
             internal and external (default False). Off by default because the
             links frequently outweigh the page content: measured at 997
@@ -3005,10 +4499,18 @@ async def deep_crawl(
             tables crawl4ai scored as real data are included, so page-layout
             tables are already filtered out. Nothing is truncated when on.
 
+        include_timings: Give each page a `timings` dict of milliseconds per
+            crawl phase (default False). See crawl_many for the phases.
+
         query: Filter each page to the parts relevant to this question,
             using BM25 scoring instead of the default density filter. Free.
         profile: Named crawl profile for per-page configuration.
         cache_mode: Cache behavior (same as crawl_url).
+        result_cache: Store every crawled page in the server's result cache so
+            later crawl_url/crawl_many calls with the same settings are served
+            without a browser (default False). Writes only: a page's links
+            are what the crawl follows next, so each page is fetched rather
+            than served from the cache.
         css_selector: Restrict extraction to matching elements on each page.
             Narrows the DOCUMENT: title, description and out-of-scope links are
             lost with it. Prefer target_elements to keep them.
@@ -3027,6 +4529,9 @@ async def deep_crawl(
             different one are ignored, and calls passing none inherit it.
         page_timeout: Page load timeout in seconds (default 60).
         word_count_threshold: Minimum word count for content blocks (default 10).
+        block_resources: Subresources never to request on any page: resource
+            types, "trackers", or URL globs. See crawl_url. The note counts
+            what was blocked.
 
     Note:
         Per-request headers and cookies are not supported for deep_crawl in v1.
@@ -3038,6 +4543,27 @@ async def deep_crawl(
     profile_error = _check_profile(ctx.request_context.lifespan_context, profile)
     if profile_error:
         return CrawlBatchResult(crawled=0, total=0, pages=[], error=profile_error)
+    disk_error = _check_stream_to_disk(stream_to_disk, output_dir)
+    if disk_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=disk_error)
+    limit_error = _check_page_size(page_size) or _check_char_limits(
+        max_total_chars, max_chars_per_page
+    )
+    if limit_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=limit_error)
+    budget = CharBudget.of(max_total_chars, max_chars_per_page)
+    canonical_error = _check_canonical(canonicalize, rel_canonical)
+    if canonical_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=canonical_error)
+    canonical = Canonicalizer.of(canonicalize, rel_canonical)
+    if near_duplicates not in NEAR_DUPLICATE_MODES:
+        return CrawlBatchResult(
+            crawled=0,
+            total=0,
+            pages=[],
+            error=_bad_choice("near_duplicates", near_duplicates, NEAR_DUPLICATE_MODES),
+        )
+    near = NearDuplicates.of(near_duplicates)
 
     logger.info(
         "deep_crawl: %s (depth=%d, max_pages=%d, scope=%s, delay=%.1f)",
@@ -3146,7 +4672,112 @@ async def deep_crawl(
             pages=[],
             error=_bad_choice("strategy", strategy, ["bfs", "best-first"]),
         )
+    if engine not in ("frontier", "crawl4ai"):
+        return CrawlBatchResult(
+            crawled=0,
+            total=0,
+            pages=[],
+            error=_bad_choice("engine", engine, ["frontier", "crawl4ai"]),
+        )
+    if frontier_store not in ("memory", "disk"):
+        return CrawlBatchResult(
+            crawled=0,
+            total=0,
+            pages=[],
+            error=_bad_choice("frontier_store", frontier_store, ["memory", "disk"]),
+        )
+    on_disk = frontier_store == "disk"
+    if on_disk and (engine != "frontier" or not output_dir):
+        return CrawlBatchResult(
+            crawled=0,
+            total=0,
+            pages=[],
+            error=(
+                "frontier_store='disk' needs engine='frontier' and an output_dir: "
+                "the pages are written there as they finish instead of being "
+                "held for the response."
+            ),
+        )
+    # Holding every page for the response would undo the point of it.
+    stream_to_disk = stream_to_disk or on_disk
+
+    # Build per-call kwargs — only include optional params when explicitly set
+    per_call_kwargs: dict = {"cache_mode": resolved_cache}
+    if page_timeout is not None:
+        per_call_kwargs["page_timeout"] = page_timeout * 1000
+    # Politeness for a crawl4ai deep crawl is set on the run config, NOT via a
+    # dispatcher. crawl4ai's DeepCrawlStrategy.arun() takes no dispatcher, and
+    # BFS internally calls arun_many() without one, so crawl4ai builds its own
+    # from mean_delay / max_range / semaphore_count on this config. Those three
+    # fields are the only pacing controls that reach a deep crawl.
+    #
+    # This used to set delay_before_return_html instead, which is a per-page
+    # "let JS settle" sleep that happens AFTER the page has already been
+    # fetched. So delay=5 waited 5s per page while still firing requests at
+    # crawl4ai's default ~0.1-0.4s cadence: the documented politeness delay hit
+    # the target site far harder than the caller asked for.
+    per_call_kwargs["semaphore_count"] = max_concurrent
+    if delay > 0:
+        per_call_kwargs["mean_delay"] = delay
+        per_call_kwargs["max_range"] = 0.0
+    if css_selector is not None:
+        per_call_kwargs["css_selector"] = css_selector
+    if target_elements is not None:
+        per_call_kwargs["target_elements"] = target_elements
+    if excluded_selector is not None:
+        per_call_kwargs["excluded_selector"] = excluded_selector
+    if wait_for is not None:
+        per_call_kwargs["wait_for"] = wait_for
+    if js_code is not None:
+        per_call_kwargs["js_code"] = js_code
+    if js_code_before_wait is not None:
+        per_call_kwargs["js_code_before_wait"] = js_code_before_wait
+    if user_agent is not None:
+        per_call_kwargs["user_agent"] = user_agent
+    if word_count_threshold is not None:
+        per_call_kwargs["word_count_threshold"] = word_count_threshold
+    if query is not None:
+        per_call_kwargs["query"] = query
+    if block_resources is not None:
+        per_call_kwargs["block_resources"] = block_resources
 
+    app: AppContext = ctx.request_context.lifespan_context
+    settings = merged_settings(app.profile_manager, profile, **per_call_kwargs)
+    blocker, block_error = ResourceBlocker.parse(settings.get("block_resources"))
+    if block_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=block_error)
+
+    # Resuming hands the engine back the frontier it reported last time,
+    # through the resume_state / on_state_change hooks crawl4ai's strategies
+    # already have and FrontierCrawl takes too. So the identity holds what
+    # decides which links are in it and what its pages say.
+    identity = {
+        "url": url,
+        "strategy": strategy,
+        "max_depth": max_depth,
+        "scope": scope,
+        "include_pattern": include_pattern,
+        "exclude_pattern": exclude_pattern,
+        "allowed_domains": allowed_domains,
+        "blocked_domains": blocked_domains,
+        "settings": settings_digest(settings),
+    }
+    if on_disk:
+        # Its state is the file, not job.json: the two do not resume each other.
+        identity["frontier_store"] = frontier_store
+    checkpoint, job_error = await _open_checkpoint(
+        job_id, output_dir, "deep_crawl", identity
+    )
+    if job_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=job_error)
+    resume = {}
+    if checkpoint and not on_disk:
+        resume = {
+            "resume_state": checkpoint.resume_state(),
+            "on_state_change": checkpoint.save_frontier,
+        }
+
+    scorer = None
     if strategy == "best-first":
         scorer = (
             KeywordRelevanceScorer(keywords=relevance_keywords)
@@ -3158,12 +4789,38 @@ async def deep_crawl(
                 "strategy='best-first' without relevance_keywords has nothing to "
                 "rank by and degrades to an unordered crawl; pass keywords or use bfs"
             )
+
+    crawl_strategy = frontier = store = None
+    if on_disk:
+        store, store_error = await _open_disk_frontier(
+            checkpoint, output_dir, best_first=scorer is not None
+        )
+        if store_error:
+            if checkpoint:
+                await checkpoint.close(complete=False)
+            return CrawlBatchResult(crawled=0, total=0, pages=[], error=store_error)
+        resume = {"frontier": store}
+    if engine == "frontier":
+        # Fresh per call, like the strategies: it holds the crawl's frontier.
+        frontier = FrontierCrawl(
+            url,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            include_external=include_external,
+            filter_chain=filter_chain,
+            url_scorer=scorer,
+            canonical=canonical,
+            near_duplicates=near,
+            **resume,
+        )
+    elif strategy == "best-first":
         crawl_strategy = BestFirstCrawlingStrategy(
             max_depth=max_depth,
             max_pages=max_pages,
             include_external=include_external,
             filter_chain=filter_chain,
             url_scorer=scorer,
+            **resume,
         )
     else:
         # +1 compensates an upstream off-by-one, and the truncation below is
@@ -3190,58 +4847,76 @@ async def deep_crawl(
             max_pages=max_pages + 1,
             include_external=include_external,
             filter_chain=filter_chain,
+            **resume,
         )
 
-    # Build per-call kwargs — only include optional params when explicitly set
-    per_call_kwargs: dict = {
-        "cache_mode": resolved_cache,
-        "deep_crawl_strategy": crawl_strategy,
-    }
-    if page_timeout is not None:
-        per_call_kwargs["page_timeout"] = page_timeout * 1000
-    # Politeness for a deep crawl is set on the run config, NOT via a
-    # dispatcher. crawl4ai's DeepCrawlStrategy.arun() takes no dispatcher, and
-    # BFS internally calls arun_many() without one, so crawl4ai builds its own
-    # from mean_delay / max_range / semaphore_count on this config. Those three
-    # fields are the only pacing controls that reach a deep crawl.
-    #
-    # This used to set delay_before_return_html instead, which is a per-page
-    # "let JS settle" sleep that happens AFTER the page has already been
-    # fetched. So delay=5 waited 5s per page while still firing requests at
-    # crawl4ai's default ~0.1-0.4s cadence: the documented politeness delay hit
-    # the target site far harder than the caller asked for.
-    per_call_kwargs["semaphore_count"] = max_concurrent
-    if delay > 0:
-        per_call_kwargs["mean_delay"] = delay
-        per_call_kwargs["max_range"] = 0.0
-    if css_selector is not None:
-        per_call_kwargs["css_selector"] = css_selector
-    if target_elements is not None:
-        per_call_kwargs["target_elements"] = target_elements
-    if excluded_selector is not None:
-        per_call_kwargs["excluded_selector"] = excluded_selector
-    if wait_for is not None:
-        per_call_kwargs["wait_for"] = wait_for
-    if js_code is not None:
-        per_call_kwargs["js_code"] = js_code
-    if js_code_before_wait is not None:
-        per_call_kwargs["js_code_before_wait"] = js_code_before_wait
-    if user_agent is not None:
-        per_call_kwargs["user_agent"] = user_agent
-    if word_count_threshold is not None:
-        per_call_kwargs["word_count_threshold"] = word_count_threshold
-    if query is not None:
-        per_call_kwargs["query"] = query
-
-    app: AppContext = ctx.request_context.lifespan_context
+    if crawl_strategy is not None:
+        per_call_kwargs["deep_crawl_strategy"] = crawl_strategy
     run_cfg = build_run_config(app.profile_manager, profile, **per_call_kwargs)
 
     # With deep_crawl_strategy + stream, arun() returns an async generator that
     # yields each page as it is crawled, so progress can be reported. max_pages
     # is the cap rather than a known total, so it is the best "total" available.
     run_cfg.stream = True
-    stream = await _require_crawler(app).arun(url=url, config=run_cfg)
-    results = await _collect_with_progress(stream, ctx, max_pages, "Deep crawling")
+    # The frontier engine's pages go through crawl_many's dispatcher.
+    dispatcher = StreamingSemaphoreDispatcher(
+        semaphore_count=max_concurrent,
+        rate_limiter=RateLimiter(base_delay=(delay, delay)) if delay > 0 else None,
+    )
+    controller = AdaptiveConcurrency(max_concurrent) if adaptive_concurrency else None
+    sink = None
+    async with (
+        _checkpointed(checkpoint),
+        _closing_frontier(store, scratch=checkpoint is None),
+        _lease_crawler(app, weight=max_pages) as crawler,
+    ):
+        with (
+            _call_scope(blocker=blocker),
+            collect_timings(include_timings) as timing_sink,
+            adaptive_scope(controller),
+        ):
+            if stream_to_disk or checkpoint:
+                sink = await _IncrementalOutput(
+                    output_dir,
+                    include_links,
+                    include_tables,
+                    timing_sink,
+                    # The frontier never fetches past max_pages successes,
+                    # and the failures it also returns are not capped.
+                    limit=max_pages if frontier is None else None,
+                    checkpoint=checkpoint,
+                    budget=budget,
+                    near_duplicates=near,
+                ).open()
+
+            async def on_page(page) -> None:
+                if sink is None:
+                    return
+                if result_cache and sink.accepted < max_pages:
+                    _cache_store(app, [page], {page.url: cache_key(page.url, settings)})
+                await sink.add(page)
+
+            restored = len(checkpoint.finished) if checkpoint and frontier else 0
+            if checkpoint and (
+                checkpoint.complete
+                or (frontier is None and sink.accepted >= max_pages)
+                or restored >= max_pages
+            ):
+                # A finished job asked again returns what it found, unfetched.
+                results = []
+            else:
+                if frontier is not None:
+                    stream = frontier.run(crawler, run_cfg, dispatcher)
+                else:
+                    stream = await crawler.arun(url=url, config=run_cfg)
+                results = await _collect_with_progress(
+                    stream,
+                    ctx,
+                    max_pages,
+                    "Deep crawling",
+                    on_result=on_page,
+                    keep=sink is None,
+                )
     # Streaming yields in completion order; a stable sort by depth restores the
     # level-by-level grouping batch mode produced, without reordering within a level.
     results.sort(
@@ -3252,24 +4927,50 @@ async def deep_crawl(
     # Enforce the caller's cap ourselves. Sorting first means the pages kept are
     # the shallowest ones, which is what breadth-first is for. See the +1 on the
     # BFS strategy above: this is the half that stops it over-delivering if the
-    # upstream off-by-one is ever fixed.
-    if len(results) > max_pages:
-        results = results[:max_pages]
+    # upstream off-by-one is ever fixed. The frontier engine needs neither.
+    if frontier is None:
+        if len(results) > max_pages:
+            results = results[:max_pages]
+
+    if result_cache:
+        _cache_store(app, results, {r.url: cache_key(r.url, settings) for r in results})
+    note = _join_notes(
+        scope_note,
+        blocker.summary() if blocker else None,
+        controller.summary() if controller else None,
+        store.note() if store else None,
+        canonical.note() if canonical and frontier else None,
+        checkpoint.note() if checkpoint else None,
+    )
 
-    if output_dir:
-        return _persist_results(
+    if sink is not None:
+        result = await sink.finish(note)
+    elif output_dir:
+        result = _persist_results(
             results,
             output_dir,
-            note=scope_note,
+            note=note,
             include_links=include_links,
             include_tables=include_tables,
+            timing_sink=timing_sink,
+            budget=budget,
+            near_duplicates=near,
         )
-    return _batch_result(
-        results,
-        note=scope_note,
-        include_links=include_links,
-        include_tables=include_tables,
-    )
+    else:
+        result = _batch_result(
+            results,
+            note=note,
+            include_links=include_links,
+            include_tables=include_tables,
+            timing_sink=timing_sink,
+            budget=budget,
+            near_duplicates=near,
+        )
+    if near is not None:
+        result.note = _join_notes(result.note, near.note())
+    if budget is not None:
+        result.note = _join_notes(result.note, budget.note())
+    return _paginated(ctx.request_context.lifespan_context, result, page_size)
 
 
 @mcp.tool(
@@ -3281,17 +4982,33 @@ async def deep_crawl(
         open_world_hint=True,  # crawls whatever URLs the sitemap lists
     ),
 )
+@_metered
 async def crawl_sitemap(
     sitemap_url: str,
     max_urls: int = 500,
+    modified_since: str | None = None,
+    only_changed: bool = False,
+    order_by: str | None = None,
     max_concurrent: int = 10,
     delay: float = 0,
+    adaptive_concurrency: bool = False,
     output_dir: str | None = None,
+    stream_to_disk: bool = False,
+    job_id: str | None = None,
+    page_size: int | None = None,
+    max_total_chars: int | None = None,
+    max_chars_per_page: int | None = None,
     include_links: bool = False,
     include_tables: bool = False,
+    include_timings: bool = False,
     profile: str | None = None,
     query: str | None = None,
     cache_mode: str | None = None,
+    result_cache: bool = False,
+    render: str = DEFAULT_RENDER,
+    canonicalize: str = DEFAULT_CANONICALIZE,
+    rel_canonical: bool = False,
+    near_duplicates: str = "off",
     css_selector: str | None = None,
     target_elements: list[str] | None = None,
     excluded_selector: str | None = None,
@@ -3301,6 +5018,7 @@ async def crawl_sitemap(
     user_agent: str | None = None,
     page_timeout: int | None = None,
     word_count_threshold: int | None = None,
+    block_resources: list[str] | None = None,
     ctx: Context[AppContext] = None,
 ) -> CrawlBatchResult:
     """Crawl all pages listed in an XML sitemap.
@@ -3309,8 +5027,10 @@ async def crawl_sitemap(
     extracts all <loc> URLs, and crawls them concurrently via arun_many.
 
     Sitemap index files (<sitemapindex>) are automatically resolved by recursively
-    fetching each referenced sub-sitemap. Gzipped sitemaps (.xml.gz) are
-    automatically decompressed.
+    fetching each referenced sub-sitemap, CRAWL4AI_MCP_SITEMAP_CONCURRENCY
+    (default 8) at a time. For an index, the note says how many files were
+    read, their size and time, and the slowest of them. Gzipped sitemaps
+    (.xml.gz) are automatically decompressed.
 
     Individual URL failures never fail the entire batch -- the result always
     includes both successes and failures so you can reason about partial results.
@@ -3320,7 +5040,30 @@ async def crawl_sitemap(
 
         max_urls: Maximum number of sitemap URLs to crawl (default 500). Large
             sitemaps can contain 50,000+ URLs -- this prevents runaway crawls.
-            URLs beyond this limit are silently truncated with a note in the output.
+            The sitemap is read only until max_urls are found: the rest of
+            it, and the child sitemaps of an index not needed by then, are
+            never fetched. The note says when the limit cut the list short.
+
+        modified_since: Crawl only pages whose <lastmod> is at or after this
+            date or datetime (ISO 8601, e.g. "2026-10-01" or
+            "2026-10-01T06:00:00Z"; no zone means UTC). Default None, no
+            filter. Pages without a lastmod are crawled: nothing says they
+            did not change. Skipped pages do not count towards max_urls.
+
+        only_changed: Crawl only pages whose <lastmod> moved past the one
+            recorded for them on the last only_changed run of this sitemap
+            (default False). The record is kept per sitemap URL under the
+            server's state directory, and a page is recorded once it has
+            been crawled successfully, so failed pages and pages max_urls
+            left out are crawled next time. The first run crawls everything
+            and records it. Made for scheduled re-indexing: a nightly run
+            over a 20,000-page sitemap fetches only the pages that changed.
+
+        order_by: "priority" (highest <priority> first; missing counts as
+            0.5) or "lastmod" (most recently modified first), applied before
+            max_urls so the limit drops the least important pages. Default
+            None keeps sitemap order. Ordering reads the whole sitemap, where
+            sitemap order stops reading at max_urls.
 
         max_concurrent: Maximum number of URLs to crawl simultaneously
             (default 10). Higher values are faster but use more memory.
@@ -3329,6 +5072,13 @@ async def crawl_sitemap(
             delay). When > 0, a RateLimiter paces requests to avoid
             overwhelming target servers.
 
+        adaptive_concurrency: Treat max_concurrent as a ceiling and let each
+            host set the working limit (default False). Starts at 2 pages per
+            host, adds about one per round of pages while the host's latency
+            stays flat, and halves on a 429 or 503, an anti-bot block, or a
+            Retry-After header, which also pauses that host for as long as it
+            asks (up to 2 minutes). The note reports where each host settled.
+
         output_dir: Directory to write per-page .md files and a manifest.json.
             When set, returns a metadata summary (file paths) instead of page
             content. When None (default), returns full content inline.
@@ -3336,6 +5086,43 @@ async def crawl_sitemap(
             collide — manifest.json always is. Point this at a directory you
             own, not one holding files you need.
 
+        stream_to_disk: Write each page to output_dir the moment it finishes,
+            and append a line for it to manifest.jsonl (one JSON object per
+            page) instead of writing manifest.json at the end (default False;
+            needs output_dir). A crash or timeout partway through leaves every
+            page finished so far on disk and listed, and the server holds only
+            a summary of each page rather than the whole batch. Use it for
+            crawls of thousands of pages.
+
+        job_id: Name this crawl so it can be resumed (default None). Pages are
+            checkpointed as they finish; calling again with the same job_id
+            and the same arguments returns the pages already done without
+            fetching them and crawls only the rest, failures included. The
+            checkpoint lives under output_dir/.jobs/ when output_dir is set,
+            and under the server's state directory otherwise. With
+            output_dir, pages are written as stream_to_disk writes them.
+
+        page_size: Return at most this many pages inline (default None, all
+            of them). The rest stay in the server for
+            CRAWL4AI_MCP_RESULT_STORE_TTL seconds after they were last read
+            (default 1800), and next_cursor reads on through get_pages. Every
+            page is also the resource crawl://<batch>/<index>, which reads its
+            markdown. crawled and total still count the whole batch. Use it
+            on large crawls to keep each response small.
+
+        max_total_chars: Most characters of content the whole result may
+            return inline (default None, no limit). Markdown, links and
+            tables all draw on it, in the order pages are returned. The page
+            that crosses the limit is cut at a markdown block boundary, and
+            every page after it comes back without content. Files under
+            output_dir are never cut.
+
+        max_chars_per_page: Most characters of markdown any one page may
+            return (default None, no limit), cut at a block boundary: a
+            blank line outside a code fence, and never just after a heading.
+            Each cut page's truncated field and the note say what was left
+            out.
+
         include_links: Also return each page's outgoing links, split into
             internal and external (default False). Off by default because the
             links frequently outweigh the page content: measured at 997
@@ -3347,10 +5134,29 @@ async def crawl_sitemap(
             tables crawl4ai scored as real data are included, so page-layout
             tables are already filtered out. Nothing is truncated when on.
 
+        include_timings: Give each page a `timings` dict of milliseconds per
+            crawl phase (default False). See crawl_many for the phases.
+
         query: Filter each page to the parts relevant to this question,
             using BM25 scoring instead of the default density filter. Free.
         profile: Named crawl profile for per-page configuration.
         cache_mode: Cache behavior (same as crawl_url).
+        result_cache: Serve sitemap pages from the server's result cache and
+            store the fresh ones (default False). Same semantics as crawl_many:
+            only misses reach the browser, and the note counts the hits.
+        render: "browser" (default), "http" or "auto" -- plain-HTTP fetching
+            with browser fallback, as in crawl_many. Sitemaps of documentation
+            sites are the case this is for.
+        canonicalize: "standard" (default), "loose" or "off": which sitemap
+            URLs count as the same page, as in crawl_many. Sitemaps from a
+            CMS often list a page two or three ways; duplicates are dropped
+            as the sitemap is read, so they do not count towards max_urls,
+            and come back as pages with duplicate_of set.
+        rel_canonical: Also skip a URL that a page fetched earlier names as
+            its <link rel=canonical> (default False), as in crawl_many.
+        near_duplicates: "off" (default), "flag", "collapse" or "drop": what
+            to do with a page whose content nearly repeats an earlier one's,
+            as in crawl_many.
         css_selector: Restrict extraction to matching elements on each page.
             Narrows the DOCUMENT: title, description and out-of-scope links are
             lost with it. Prefer target_elements to keep them.
@@ -3369,6 +5175,9 @@ async def crawl_sitemap(
             different one are ignored, and calls passing none inherit it.
         page_timeout: Page load timeout in seconds (default 60).
         word_count_threshold: Minimum word count for content blocks (default 10).
+        block_resources: Subresources never to request on any page: resource
+            types, "trackers", or URL globs. See crawl_url. The note counts
+            what was blocked.
 
     Note:
         Per-call headers and cookies are not supported for sitemap crawls.
@@ -3380,60 +5189,55 @@ async def crawl_sitemap(
     profile_error = _check_profile(ctx.request_context.lifespan_context, profile)
     if profile_error:
         return CrawlBatchResult(crawled=0, total=0, pages=[], error=profile_error)
-
-    logger.info(
-        "crawl_sitemap: %s (max_urls=%d, max_concurrent=%d, delay=%.1f)",
-        sitemap_url,
-        max_urls,
-        max_concurrent,
-        delay,
+    disk_error = _check_stream_to_disk(stream_to_disk, output_dir)
+    if disk_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=disk_error)
+    limit_error = _check_page_size(page_size) or _check_char_limits(
+        max_total_chars, max_chars_per_page
     )
-
-    # Fetch and parse sitemap XML via httpx (not the browser).
-    # These two paths must return the model, not a string: the tool declares
-    # CrawlBatchResult, so returning a string here fails validation and the
-    # caller gets an opaque tool crash instead of the reason the sitemap failed.
-    try:
-        urls = await _fetch_sitemap_urls(sitemap_url)
-    except httpx.HTTPError as e:
+    if limit_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=limit_error)
+    budget = CharBudget.of(max_total_chars, max_chars_per_page)
+    canonical_error = _check_canonical(canonicalize, rel_canonical)
+    if canonical_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=canonical_error)
+    canonical = Canonicalizer.of(canonicalize, rel_canonical)
+    if near_duplicates not in NEAR_DUPLICATE_MODES:
         return CrawlBatchResult(
             crawled=0,
             total=0,
             pages=[],
-            error=f"Could not fetch the sitemap at {sitemap_url}: {e}",
+            error=_bad_choice("near_duplicates", near_duplicates, NEAR_DUPLICATE_MODES),
         )
-    except ET.ParseError as e:
-        # Distinct from a fetch failure on purpose. The usual cause is an HTML
-        # page passed as the sitemap URL, and "fetch failed" would send someone
-        # checking the network when the request actually succeeded.
-        return CrawlBatchResult(
-            crawled=0,
-            total=0,
-            pages=[],
-            error=(
-                f"{sitemap_url} was fetched but is not valid sitemap XML ({e}). "
-                "If this is an HTML page, look for the real sitemap in "
-                "robots.txt or try /sitemap.xml on the same host."
-            ),
-        )
-
-    if not urls:
+    near = NearDuplicates.of(near_duplicates)
+    since = None
+    if modified_since is not None:
+        since = parse_lastmod(modified_since)
+        if since is None:
+            return CrawlBatchResult(
+                crawled=0,
+                total=0,
+                pages=[],
+                error=(
+                    f"modified_since {modified_since!r} is not a date. Use ISO "
+                    '8601, e.g. "2026-10-01" or "2026-10-01T06:00:00Z".'
+                ),
+            )
+    if order_by is not None and order_by not in ORDERS:
         return CrawlBatchResult(
             crawled=0,
             total=0,
             pages=[],
-            error=(
-                f"No URLs found in sitemap {sitemap_url}. It may be empty, or "
-                "in a format this server does not parse. Sitemap indexes and "
-                ".xml.gz are supported; an HTML page is not a sitemap."
-            ),
+            error=f"order_by must be one of {', '.join(ORDERS)}, not {order_by!r}.",
         )
 
-    # Truncate if over max_urls
-    total_sitemap_urls = len(urls)
-    truncated = total_sitemap_urls > max_urls
-    if truncated:
-        urls = urls[:max_urls]
+    logger.info(
+        "crawl_sitemap: %s (max_urls=%d, max_concurrent=%d, delay=%.1f)",
+        sitemap_url,
+        max_urls,
+        max_concurrent,
+        delay,
+    )
 
     # Build per-call kwargs -- only include optional params when explicitly set
     per_call_kwargs: dict = {"cache_mode": resolved_cache}
@@ -3457,52 +5261,736 @@ async def crawl_sitemap(
         per_call_kwargs["word_count_threshold"] = word_count_threshold
     if query is not None:
         per_call_kwargs["query"] = query
+    if block_resources is not None:
+        per_call_kwargs["block_resources"] = block_resources
 
     app: AppContext = ctx.request_context.lifespan_context
     run_cfg = build_run_config(app.profile_manager, profile, **per_call_kwargs)
+    settings = merged_settings(app.profile_manager, profile, **per_call_kwargs)
+    render_error = _check_render(render, settings)
+    if render_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=render_error)
+    blocker, block_error = ResourceBlocker.parse(settings.get("block_resources"))
+    if block_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=block_error)
+
+    identity = {
+        "sitemap_url": sitemap_url,
+        "max_urls": max_urls,
+        "render": render,
+        "settings": settings_digest(settings),
+    }
+    # The selection options are added only when set.
+    for key, value in (
+        ("modified_since", modified_since),
+        ("only_changed", only_changed or None),
+        ("order_by", order_by),
+    ):
+        if value is not None:
+            identity[key] = value
+    checkpoint, job_error = await _open_checkpoint(
+        job_id, output_dir, "crawl_sitemap", identity
+    )
+    if job_error:
+        return CrawlBatchResult(crawled=0, total=0, pages=[], error=job_error)
+
+    state = await SitemapState.open(sitemap_url) if only_changed else None
+    selection = None
+    if since is not None or state is not None or order_by is not None:
+        selection = SitemapSelection(
+            modified_since=since,
+            previous=state.lastmods if state else None,
+            order_by=order_by,
+        )
+
+    if checkpoint and "urls" in checkpoint.spec:
+        # A resumed job works through the list it started with. Fetching the
+        # sitemap again would cost the round trips, and a sitemap that changed
+        # in between would leave the checkpoint describing a different crawl.
+        urls = checkpoint.spec["urls"]
+        truncated = checkpoint.spec.get(
+            "truncated", checkpoint.spec.get("total", len(urls)) > len(urls)
+        )
+        sitemap_note = None
+        selection = None
+        lastmods = checkpoint.spec.get("lastmods") or {}
+    else:
+        # Fetch and parse sitemap XML via httpx (not the browser).
+        # These two paths must return the model, not a string: the tool declares
+        # CrawlBatchResult, so returning a string here fails validation and the
+        # caller gets an opaque tool crash instead of the reason the sitemap failed.
+        try:
+            urls, truncated, sitemap_note = await _list_sitemap(
+                sitemap_url,
+                ctx.request_context.lifespan_context.http,
+                max_urls,
+                selection,
+                canonical,
+            )
+        except httpx.HTTPError as e:
+            return CrawlBatchResult(
+                crawled=0,
+                total=0,
+                pages=[],
+                error=f"Could not fetch the sitemap at {sitemap_url}: {e}",
+            )
+        except ET.ParseError as e:
+            # Distinct from a fetch failure on purpose. The usual cause is an HTML
+            # page passed as the sitemap URL, and "fetch failed" would send someone
+            # checking the network when the request actually succeeded.
+            return CrawlBatchResult(
+                crawled=0,
+                total=0,
+                pages=[],
+                error=(
+                    f"{sitemap_url} was fetched but is not valid sitemap XML ({e}). "
+                    "If this is an HTML page, look for the real sitemap in "
+                    "robots.txt or try /sitemap.xml on the same host."
+                ),
+            )
+
+        lastmods = selection.lastmods if selection else {}
+        if not urls and selection is not None and selection.skipped:
+            # Not an error: on a scheduled re-index, nothing having changed
+            # is the expected answer.
+            return CrawlBatchResult(
+                crawled=0,
+                total=0,
+                pages=[],
+                note=_join_notes(
+                    f"No page of {sitemap_url} changed; nothing was crawled.",
+                    selection.note(),
+                ),
+            )
+        if not urls:
+            return CrawlBatchResult(
+                crawled=0,
+                total=0,
+                pages=[],
+                error=(
+                    f"No URLs found in sitemap {sitemap_url}. It may be empty, or "
+                    "in a format this server does not parse. Sitemap indexes and "
+                    ".xml.gz are supported; an HTML page is not a sitemap."
+                ),
+            )
+
+        if checkpoint:
+            spec = {"urls": urls, "truncated": truncated}
+            if state is not None:
+                # A resumed run records what this one read, not a re-read.
+                spec["lastmods"] = {url: lastmods.get(url) for url in urls}
+            await checkpoint.save_spec(**spec)
 
     rate_limiter = RateLimiter(base_delay=(delay, delay)) if delay > 0 else None
-    dispatcher = SemaphoreDispatcher(
+    dispatcher = StreamingSemaphoreDispatcher(
         semaphore_count=max_concurrent,
         rate_limiter=rate_limiter,
+        canonical=canonical,
         # NO monitor -- CrawlerMonitor uses Rich Console -> stdout corruption
     )
 
-    # Heartbeat while the batch runs; see the note in crawl_many for why this
-    # is a heartbeat rather than per-page streaming progress.
-    results = await _await_with_heartbeat(
-        _require_crawler(app).arun_many(
-            urls=urls,
-            config=run_cfg,
-            dispatcher=dispatcher,
-        ),
-        ctx,
-        f"Crawling {len(urls)} sitemap URLs",
-    )
+    # Per-page progress through the streaming dispatcher; see crawl_many.
+    pending = checkpoint.pending(urls) if checkpoint else urls
+    cached, to_crawl, keys = [], pending, {}
+    if result_cache:
+        cached, to_crawl, keys = await _cache_lookup(app, pending, settings)
+
+    results = []
+    render_note = None
+    sink = None
+    succeeded: set[str] = set(checkpoint.finished) if checkpoint else set()
+
+    def remember(page) -> None:
+        if page.success:
+            succeeded.add(page.url)
+
+    controller = AdaptiveConcurrency(max_concurrent) if adaptive_concurrency else None
+    async with _checkpointed(checkpoint):
+        with (
+            collect_timings(include_timings) as timing_sink,
+            adaptive_scope(controller),
+        ):
+            if stream_to_disk or checkpoint:
+                sink = await _IncrementalOutput(
+                    output_dir,
+                    include_links,
+                    include_tables,
+                    timing_sink,
+                    checkpoint=checkpoint,
+                    budget=budget,
+                    near_duplicates=near,
+                ).open()
+                for page in cached:
+                    await sink.add(page)
+
+            async def on_page(page) -> None:
+                _cache_store(app, [page], keys)
+                remember(page)
+                if sink is not None:
+                    await sink.add(page)
+
+            if to_crawl and render != "browser":
+                results, to_crawl, render_note = await _await_with_heartbeat(
+                    _crawl_over_http(
+                        app,
+                        to_crawl,
+                        run_cfg,
+                        settings,
+                        render,
+                        max_concurrent,
+                        delay,
+                        on_result=on_page if sink else None,
+                    ),
+                    ctx,
+                    f"Fetching {len(to_crawl)} URLs over HTTP",
+                )
+                if sink is None:
+                    _cache_store(app, results, keys)
+            if to_crawl:
+                async with _lease_crawler(app, weight=len(to_crawl)) as crawler:
+                    with (
+                        _call_scope(blocker=blocker),
+                        app.metrics.queued(len(to_crawl)),
+                    ):
+                        stream = await crawler.arun_many(
+                            urls=to_crawl,
+                            config=run_cfg.clone(stream=True),
+                            dispatcher=dispatcher,
+                        )
+                        crawled = await _collect_with_progress(
+                            stream,
+                            ctx,
+                            len(to_crawl),
+                            f"Crawling {len(to_crawl)} sitemap URLs",
+                            on_result=on_page,
+                            keep=sink is None,
+                        )
+                results += crawled
+    results = cached + results
+    state_note = None
+    if state is not None:
+        for page in results:
+            remember(page)
+        for url in urls:
+            if url in succeeded:
+                state.record(url, lastmods.get(url))
+        state_note = await state.save() or state.note()
 
     note = None
     if truncated:
         note = (
-            f"Sitemap contained {total_sitemap_urls} URLs; crawled the first "
-            f"{max_urls} (max_urls limit)."
+            f"Sitemap lists more than {max_urls} URLs; crawled the first "
+            f"{max_urls} (max_urls limit) and stopped reading it there."
         )
+    note = _join_notes(
+        note,
+        sitemap_note,
+        selection.note() if selection else None,
+        state_note,
+        _cache_note(cached, len(urls)),
+        canonical.note() if canonical else None,
+        render_note,
+        blocker.summary() if blocker else None,
+        controller.summary() if controller else None,
+        checkpoint.note() if checkpoint else None,
+    )
 
-    if output_dir:
-        return _persist_results(
+    if sink is not None:
+        result = await sink.finish(note)
+    elif output_dir:
+        result = _persist_results(
             results,
             output_dir,
             note=note,
             include_links=include_links,
             include_tables=include_tables,
+            timing_sink=timing_sink,
+            budget=budget,
+            near_duplicates=near,
         )
-    return _batch_result(
-        results,
-        note=note,
-        include_links=include_links,
-        include_tables=include_tables,
+    else:
+        result = _batch_result(
+            results,
+            note=note,
+            include_links=include_links,
+            include_tables=include_tables,
+            timing_sink=timing_sink,
+            budget=budget,
+            near_duplicates=near,
+        )
+    result.pages += _replaced_pages(canonical)
+    if near is not None:
+        result.note = _join_notes(result.note, near.note())
+    if budget is not None:
+        result.note = _join_notes(result.note, budget.note())
+    return _paginated(ctx.request_context.lifespan_context, result, page_size)
+
+
+# --- Reading a held-back batch ------------------------------------------------
+
+# The most pages get_pages or job_results hands back in one response.
+MAX_PAGES_PER_READ = 500
+
+
+class PageSlice(BaseModel):
+    """A slice of a batch that page_size held back."""
+
+    pages: list[PageResult] = []
+    offset: int = 0
+    """Index of the first page here within the whole batch."""
+    total: int = 0
+    """Pages in the whole batch."""
+    next_cursor: str | None = None
+    """Pass to get_pages for the next slice. None when this is the last."""
+    error: str | None = None
+    """Why nothing could be read: a malformed cursor, or an expired batch."""
+
+
+_EXPIRED = (
+    "That batch is no longer held: it expired or was evicted. Crawl again, "
+    "or use output_dir for results that need to outlive the server's memory."
+)
+
+
+@mcp.tool(
+    title="Read more pages of a batch crawl",
+    annotations=ToolAnnotations(
+        read_only_hint=True,
+        open_world_hint=False,  # reads pages the server already holds
+    ),
+)
+@_metered
+async def get_pages(
+    cursor: str,
+    limit: int = 50,
+    ctx: Context[AppContext] = None,
+) -> PageSlice:
+    """Read the next pages of a crawl that returned a next_cursor.
+
+    crawl_many, crawl_sitemap and deep_crawl called with page_size return
+    their first pages and a next_cursor. Each call here returns up to limit
+    more, in the same order, and the cursor for the slice after them.
+
+    Args:
+        cursor: next_cursor from the crawl, or from the previous get_pages.
+        limit: Most pages to return (default 50, up to 500).
+    """
+    app: AppContext = ctx.request_context.lifespan_context
+    parsed = parse_cursor(cursor)
+    if parsed is None:
+        return PageSlice(error=f"{cursor!r} is not a cursor from this server.")
+    if not 1 <= limit <= MAX_PAGES_PER_READ:
+        return PageSlice(error=f"limit must be 1-{MAX_PAGES_PER_READ}, got {limit}.")
+    batch_id, offset = parsed
+    pages = app.results.get(batch_id)
+    if pages is None:
+        return PageSlice(error=_EXPIRED)
+    end = min(offset + limit, len(pages))
+    return PageSlice(
+        pages=pages[offset:end],
+        offset=offset,
+        total=len(pages),
+        next_cursor=make_cursor(batch_id, end) if end < len(pages) else None,
     )
 
 
+@mcp.resource(
+    "crawl://{batch_id}/{index}",
+    title="One page of a batch crawl",
+    description=(
+        "The markdown of page <index> (from 0) of a batch that page_size held "
+        "back, in the order the crawl returned its pages."
+    ),
+    mime_type="text/markdown",
+)
+async def crawl_page(batch_id: str, index: int, ctx: Context[AppContext]) -> str:
+    app: AppContext = ctx.request_context.lifespan_context
+    pages = app.results.get(batch_id)
+    if pages is None:
+        raise ResourceError(_EXPIRED)
+    if not 0 <= index < len(pages):
+        raise ResourceError(f"The batch has pages 0-{len(pages) - 1}; no page {index}.")
+    page = pages[index]
+    if page.markdown is None:
+        # A failure has no content, and output_dir put the content on disk.
+        reason = page.error or f"its content was written to {page.file}"
+        raise ResourceError(f"{page.url} has no markdown here: {reason}")
+    return page.markdown
+
+
+# --- Background jobs ---------------------------------------------------------
+#
+# start_crawl_job runs crawl_many, crawl_sitemap or deep_crawl as a task owned
+# by the server rather than by a request. The crawl is the same function
+# called with the same arguments; what changes is who waits for it. See
+# jobs.py for the table that tracks them.
+
+# How long cancel_job waits for a job to wind down before answering. The
+# crawl stops at its next await; this only covers writing its checkpoint.
+CANCEL_WAIT_S = 10.0
+
+
+class JobStatus(BaseModel):
+    """Where a background crawl job stands."""
+
+    job_id: str
+    tool: str | None = None
+    """crawl_many, crawl_sitemap or deep_crawl."""
+    state: str
+    """running, done, failed, cancelled or interrupted.
+
+    interrupted means the server stopped while the job was running. Starting
+    it again with the same job_id resumes it from its checkpoint, as does
+    starting a cancelled or failed one. rejected and unknown only appear
+    with error set, for a job that was never started or is not in the table.
+    """
+    progress: float = 0
+    """Pages finished so far, as the tool's progress notifications count them."""
+    total: float | None = None
+    """Pages the job expects to attempt, once it knows."""
+    message: str | None = None
+    """The latest progress message."""
+    crawled: int | None = None
+    """Pages that succeeded. Set once the job is done."""
+    pages: int | None = None
+    """Pages attempted. Set once the job is done."""
+    created: float | None = None
+    """When the job was started, in seconds since the epoch."""
+    finished: float | None = None
+    """When it stopped running, in seconds since the epoch."""
+    error: str | None = None
+    """Why the job failed, or why the call could not act on it."""
+
+
+class JobResults(BaseModel):
+    """One page of a background job's results."""
+
+    job_id: str
+    state: str
+    """The job's state when the results were read; see JobStatus.state."""
+    offset: int = 0
+    next_offset: int | None = None
+    """Pass as offset to read the next page. None when this is the last."""
+    total: int = 0
+    """Pages available to read so far."""
+    pages: list[PageResult] = []
+    crawled: int | None = None
+    """Pages that succeeded, of those available so far."""
+    output_dir: str | None = None
+    manifest: str | None = None
+    note: str | None = None
+    """The job's own note once it is done, or what a partial read means."""
+    error: str | None = None
+
+
+def _job_status(job: Job) -> JobStatus:
+    return JobStatus(**job.to_json())
+
+
+class _JobContext:
+    """Stands in for the MCP Context a crawl tool is normally called with.
+
+    The crawl tools only reach the lifespan context and report_progress.
+    Here progress goes into the job, where job_status reads it, instead of
+    to a client that is no longer waiting.
+    """
+
+    def __init__(self, app: AppContext, job: Job) -> None:
+        self.request_context = SimpleNamespace(lifespan_context=app)
+        self._job = job
+
+    async def report_progress(
+        self,
+        progress: float,
+        total: float | None = None,
+        message: str | None = None,
+    ) -> None:
+        self._job.progress = progress
+        self._job.total = total
+        self._job.message = message
+
+
+def _bind_job_arguments(tool: str, arguments: dict) -> tuple[dict, str | None]:
+    """Validate arguments against the tool's signature, as the SDK would.
+
+    Over MCP the SDK validates a tool's arguments before calling it. A job
+    calls the tool directly, so the same check is made here, up front,
+    rather than the job failing a moment after start_crawl_job said it had
+    started. Returns the validated arguments, or the reason they are not.
+    """
+    reserved = sorted({"job_id", "ctx", "page_size"} & set(arguments))
+    if reserved:
+        return arguments, (
+            f"arguments may not set {', '.join(reserved)}: the job's own "
+            "job_id is the crawl's job_id, and job_results does the paging."
+        )
+    params = inspect.signature(_JOB_FUNCS[tool]).parameters
+    unknown = sorted(set(arguments) - set(params))
+    if unknown:
+        return arguments, f"{tool} has no parameter {', '.join(map(repr, unknown))}."
+    missing = [
+        name
+        for name, param in params.items()
+        if param.default is inspect.Parameter.empty and name not in arguments
+    ]
+    if missing:
+        return arguments, f"{tool} needs {', '.join(map(repr, missing))} in arguments."
+    validated = {}
+    for name, value in arguments.items():
+        try:
+            validated[name] = TypeAdapter(params[name].annotation).validate_python(
+                value
+            )
+        except ValidationError as exc:
+            return arguments, f"{tool} argument {name!r}: {exc.errors()[0]['msg']}."
+    return validated, None
+
+
+async def _run_job(app: AppContext, job: Job) -> None:
+    """Run one job to the end and record how it ended."""
+    fn = _JOB_FUNCS[job.tool]
+    try:
+        result = await fn(**job.arguments, job_id=job.job_id, ctx=_JobContext(app, job))
+    except asyncio.CancelledError:
+        job.state = "cancelled" if job.cancel_requested else "interrupted"
+        raise
+    except Exception as exc:
+        logger.exception("background job %s failed", job.job_id)
+        job.state = "failed"
+        job.error = _one_line(f"{type(exc).__name__}: {exc}")
+    else:
+        job.state = "failed" if result.error else "done"
+        job.error = result.error
+        job.crawled = result.crawled
+        job.pages = result.total
+        await app.jobs.store_result(job.job_id, result.model_dump(exclude_none=True))
+    finally:
+        job.finished = time.time()
+        job.task = None
+        await app.jobs.save()
+
+
+@mcp.tool(
+    title="Start a background crawl job",
+    annotations=ToolAnnotations(
+        read_only_hint=False,  # the job's arguments may carry js_code
+        destructive_hint=False,  # additive, like the crawl it runs
+        idempotent_hint=False,  # a second start of a finished job crawls again
+        open_world_hint=True,  # the job fetches caller-supplied URLs
+    ),
+)
+@_metered
+async def start_crawl_job(
+    tool: str,
+    arguments: dict,
+    job_id: str | None = None,
+    ctx: Context[AppContext] = None,
+) -> JobStatus:
+    """Start crawl_many, crawl_sitemap or deep_crawl in the background.
+
+    Returns at once with the job's id. The crawl runs in the server, not in
+    this request, so it is not bound by the client's request timeout. Poll
+    job_status for progress, read pages with job_results, stop it with
+    cancel_job.
+
+    Every job is checkpointed under its id, exactly as the tool's own job_id
+    parameter does. A job that was cancelled, failed, or interrupted by a
+    server restart is resumed by starting it again with the same job_id and
+    the same arguments: pages it already finished are not fetched again.
+
+    The server remembers at most CRAWL4AI_MCP_MAX_JOBS jobs (default 100).
+    When the table is full the oldest finished job is forgotten; when every
+    job in it is still running, a new one is refused.
+
+    Args:
+        tool: crawl_many, crawl_sitemap or deep_crawl.
+        arguments: The tool's arguments, as they would be passed to it
+            directly, e.g. {"urls": [...], "max_concurrent": 5}. Checked
+            against the tool's parameters before the job starts. job_id is
+            not allowed here; use the job_id parameter.
+        job_id: A name for the job: 1-128 letters, digits, '.', '_' or '-'.
+            Generated when omitted. Reusing the id of a finished job resumes
+            it; reusing a running job's id is refused.
+    """
+    app: AppContext = ctx.request_context.lifespan_context
+    job_id = job_id or uuid.uuid4().hex[:12]
+
+    def rejected(error: str) -> JobStatus:
+        return JobStatus(job_id=job_id, tool=tool, state="rejected", error=error)
+
+    if tool not in JOB_TOOLS:
+        return rejected(_bad_choice("tool", tool, list(JOB_TOOLS)))
+    arguments, problem = _bind_job_arguments(tool, arguments)
+    problem = job_id_error(job_id) or problem
+    if problem:
+        return rejected(problem)
+    job = Job(job_id=job_id, tool=tool, arguments=arguments)
+    problem = await app.jobs.add(job)
+    if problem:
+        return rejected(problem)
+    # A fresh context: the job must not inherit this request's per-call
+    # overrides, and it outlives the request that started it.
+    job.task = asyncio.create_task(
+        _run_job(app, job), name=f"job-{job_id}", context=contextvars.Context()
+    )
+    logger.info("start_crawl_job: %s (%s)", job_id, tool)
+    return _job_status(job)
+
+
+@mcp.tool(
+    title="Check a background crawl job",
+    annotations=ToolAnnotations(
+        read_only_hint=True,
+        open_world_hint=False,  # reads the server's job table
+    ),
+)
+@_metered
+async def job_status(
+    job_id: str,
+    ctx: Context[AppContext] = None,
+) -> JobStatus:
+    """Report a background job's state and progress.
+
+    progress and total count pages the same way the tool's own progress
+    notifications do. crawled and pages are set once the job is done.
+
+    Args:
+        job_id: The id start_crawl_job returned.
+    """
+    app: AppContext = ctx.request_context.lifespan_context
+    job = app.jobs.get(job_id)
+    if job is None:
+        return JobStatus(job_id=job_id, state="unknown", error="No such job.")
+    return _job_status(job)
+
+
+@mcp.tool(
+    title="Read a background crawl job's pages",
+    annotations=ToolAnnotations(
+        read_only_hint=True,
+        open_world_hint=False,  # reads results the server already holds
+    ),
+)
+@_metered
+async def job_results(
+    job_id: str,
+    offset: int = 0,
+    limit: int = 50,
+    ctx: Context[AppContext] = None,
+) -> JobResults:
+    """Read a background job's pages, a slice at a time.
+
+    Works while the job is still running: the pages finished so far are
+    read from its checkpoint, in the order they finished. Once the job is
+    done the slice comes from its final result, ordered as the tool orders
+    it (successes first), with the tool's note, output_dir and manifest.
+
+    Args:
+        job_id: The id start_crawl_job returned.
+        offset: Index of the first page to return. Follow next_offset to
+            read on.
+        limit: Most pages to return, up to 500. Page markdown is the bulk of
+            a response, so keep this small for pages crawled inline.
+    """
+    app: AppContext = ctx.request_context.lifespan_context
+    job = app.jobs.get(job_id)
+    if job is None:
+        return JobResults(job_id=job_id, state="unknown", error="No such job.")
+    if offset < 0 or not 1 <= limit <= MAX_PAGES_PER_READ:
+        return JobResults(
+            job_id=job_id,
+            state=job.state,
+            error=(
+                f"offset must be 0 or more and limit 1-{MAX_PAGES_PER_READ}; "
+                f"got offset={offset}, limit={limit}."
+            ),
+        )
+
+    stored = None if job.state == RUNNING else await app.jobs.load_result(job_id)
+    if stored is not None:
+        pages = stored.get("pages") or []
+        extra = {
+            "crawled": stored.get("crawled"),
+            "output_dir": stored.get("output_dir"),
+            "manifest": stored.get("manifest"),
+            "note": stored.get("note"),
+            "error": stored.get("error"),
+        }
+    else:
+        # No final result yet, or none ever: the checkpoint has every page
+        # the job finished, whether it is running or was stopped.
+        directory = checkpoint_dir(job_id, job.arguments.get("output_dir"))
+        pages = await asyncio.to_thread(read_pages, directory)
+        extra = {
+            "crawled": sum(1 for page in pages if page.get("success")),
+            "note": (
+                "The job is still running; these are the pages finished so far."
+                if job.state == RUNNING
+                else f"The job is {job.state}; these are the pages it finished. "
+                "Start it again with the same job_id to resume it."
+            ),
+            "error": job.error,
+        }
+
+    window = pages[offset : offset + limit]
+    end = offset + len(window)
+    return JobResults(
+        job_id=job_id,
+        state=job.state,
+        offset=offset,
+        next_offset=end if end < len(pages) else None,
+        total=len(pages),
+        pages=[PageResult(**page) for page in window],
+        **extra,
+    )
+
+
+@mcp.tool(
+    title="Cancel a background crawl job",
+    annotations=ToolAnnotations(
+        read_only_hint=False,
+        # Stops the crawl but keeps its checkpoint and pages; starting the
+        # job again resumes it. Nothing is thrown away.
+        destructive_hint=False,
+        idempotent_hint=True,  # cancelling a stopped job changes nothing
+        open_world_hint=False,  # acts on server-side state only
+    ),
+)
+@_metered
+async def cancel_job(
+    job_id: str,
+    ctx: Context[AppContext] = None,
+) -> JobStatus:
+    """Stop a running background job.
+
+    The crawl stops where it is and its checkpoint is kept, so the pages it
+    finished stay readable through job_results, and start_crawl_job with the
+    same job_id and arguments resumes it later. A job that is not running is
+    reported as it is.
+
+    Args:
+        job_id: The id start_crawl_job returned.
+    """
+    app: AppContext = ctx.request_context.lifespan_context
+    job = app.jobs.get(job_id)
+    if job is None:
+        return JobStatus(job_id=job_id, state="unknown", error="No such job.")
+    task = job.task
+    if job.state == RUNNING and task is not None:
+        logger.info("cancel_job: %s", job_id)
+        job.cancel_requested = True
+        task.cancel()
+        await asyncio.wait({task}, timeout=CANCEL_WAIT_S)
+    return _job_status(job)
+
+
+_JOB_FUNCS = {
+    "crawl_many": crawl_many,
+    "crawl_sitemap": crawl_sitemap,
+    "deep_crawl": deep_crawl,
+}
+
+
 def _preflight_playwright() -> None:
     """Warn early when the Chromium build is missing. Never exits.
 
@@ -0,0 +1,585 @@
+"""Reading sitemaps a chunk at a time.
+
+Sitemaps used to be read whole: the response body held in memory, gunzipped
+in one go, and parsed into a full ElementTree before a single <loc> was
+taken out of it. A 50MB sitemap with 50,000 entries is an ordinary size for
+a shop, and it peaked at several hundred MB: the compressed body, the
+decompressed body and a tree of every <url>, <loc> and <lastmod> element,
+all alive at once.
+
+iter_sitemap_urls reads it as a pipeline instead:
+
+- the response body is streamed and never held whole;
+- gzip is undone incrementally, and only when the bytes start with gzip's
+  magic number, whatever the URL or Content-Encoding claimed;
+- an XMLPullParser takes each chunk, and each <url> or <sitemap> entry is
+  dropped from the tree as soon as its end tag has been read, so the tree
+  never holds more than the entry in progress;
+- URLs come out of an async generator as they are parsed, so a caller can
+  act on the first ones while the rest are still arriving, and stop reading
+  once it has enough.
+
+A sitemap index is read the same way, by SitemapReader: a bounded number
+of children at a time, in the order the index lists them, and no further
+than the caller reads.
+
+Each page entry keeps its <lastmod>, <changefreq> and <priority> alongside
+the <loc>. SitemapSelection uses them to skip pages that have not changed
+and to put the pages that matter most first.
+"""
+
+import asyncio
+import logging
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, aclosing, nullcontext
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from itertools import islice
+from urllib.parse import urljoin
+
+import httpx
+
+from crawl4ai_mcp.env import env_int
+
+logger = logging.getLogger(__name__)
+
+# Bounds sitemap-index recursion. A sitemap index that references itself, or two
+# that reference each other, would otherwise recurse until the process dies.
+MAX_SITEMAP_DEPTH = 5
+
+SITEMAP_TIMEOUT_S = 30.0
+
+SITEMAP_CONCURRENCY_ENV = "CRAWL4AI_MCP_SITEMAP_CONCURRENCY"
+DEFAULT_SITEMAP_CONCURRENCY = 8
+
+# Zero-width and BOM characters seen inside real <loc> elements. They survive
+# .strip() and produce a URL that looks right and does not resolve.
+_INVISIBLE_CHARS = "​‌‍﻿⁠"
+
+# The two bytes every gzip stream starts with. Checking these is what makes
+# decompression depend on what actually arrived rather than on the URL.
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# The sitemap elements whose <loc> is an entry: a page, or a child sitemap.
+_ENTRIES = ("url", "sitemap")
+
+# The other children of an entry that are kept, besides <loc>.
+_FIELDS = ("lastmod", "changefreq", "priority")
+
+# What the sitemap protocol says a page without <priority> is worth.
+DEFAULT_PRIORITY = 0.5
+
+ORDERS = ("priority", "lastmod")
+
+
+def sitemap_concurrency_from_env() -> int:
+    """Sitemap files fetched at once while reading an index."""
+    return env_int(SITEMAP_CONCURRENCY_ENV, DEFAULT_SITEMAP_CONCURRENCY, 1)
+
+
+def clean_loc(text: str | None, base_url: str) -> str | None:
+    """Normalize one <loc> value, or None if there is nothing usable in it.
+
+    Strips invisible characters and resolves relative paths against the sitemap
+    that contained them. The sitemap protocol requires absolute URLs, but
+    relative ones appear in the wild and are unusable if passed through as-is.
+    """
+    if not text:
+        return None
+    cleaned = text.strip().strip(_INVISIBLE_CHARS).strip()
+    if not cleaned:
+        return None
+    return urljoin(base_url, cleaned)
+
+
+def parse_lastmod(text: str | None) -> datetime | None:
+    """A <lastmod> as an aware UTC datetime, or None if it is not a W3C date.
+
+    The protocol allows the W3C Datetime profile: a year, a year and month, a
+    date, or a date and time with a zone. A time without a zone, which the
+    profile forbids and sitemaps carry anyway, is taken to be UTC.
+    """
+    text = (text or "").strip()
+    try:
+        if len(text) == 4:
+            value = datetime(int(text), 1, 1)
+        elif len(text) == 7:
+            value = datetime(int(text[:4]), int(text[5:7]), 1)
+        else:
+            value = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+def parse_priority(text: str | None) -> float | None:
+    """A <priority> between 0.0 and 1.0, or None when absent or malformed."""
+    try:
+        value = float((text or "").strip())
+    except ValueError:
+        return None
+    return value if 0.0 <= value <= 1.0 else None
+
+
+class Gunzip:
+    """Undo gzip a chunk at a time, if and only if the bytes are gzip.
+
+    Deciding from the first two bytes rather than the URL matters in both
+    directions. httpx already undoes `Content-Encoding: gzip`, so a server
+    that sets it on a .gz path hands over plain XML at a .gz URL; and a .xml
+    URL can redirect to a genuinely gzipped file. Decompressing by the name
+    crashed on the first and misreported the second as invalid XML.
+
+    A body that starts as gzip and then will not decompress, or stops short,
+    raises ET.ParseError: to the caller it is a sitemap that could not be
+    read, which is what a parse failure already reports.
+    """
+
+    def __init__(self) -> None:
+        self._head = b""
+        self._plain = False
+        self._inflate = None
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._plain:
+            return chunk
+        if self._inflate is None:
+            self._head += chunk
+            if len(self._head) < len(_GZIP_MAGIC):
+                return b""
+            chunk, self._head = self._head, b""
+            if not chunk.startswith(_GZIP_MAGIC):
+                self._plain = True
+                return chunk
+            self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return self._decompress(chunk)
+
+    def flush(self) -> bytes:
+        """What is left once the body has ended."""
+        if self._inflate is None:
+            head, self._head = self._head, b""
+            return head
+        if not self._inflate.eof:
+            raise ET.ParseError("the gzipped sitemap ended before its gzip stream did")
+        return b""
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        out = []
+        while chunk:
+            try:
+                out.append(self._inflate.decompress(chunk))
+            except zlib.error as exc:
+                raise ET.ParseError(
+                    f"the sitemap looked gzipped but would not decompress: {exc}"
+                ) from exc
+            if not self._inflate.eof:
+                break
+            # gzip allows several members back to back; anything else after
+            # the end of the stream is padding.
+            chunk = self._inflate.unused_data
+            if not chunk.startswith(_GZIP_MAGIC):
+                break
+            self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return b"".join(out)
+
+
+@dataclass
+class SitemapEntry:
+    """One <url> or <sitemap> entry, reduced to what a crawl uses.
+
+    lastmod and changefreq are the text the sitemap gave, trimmed; priority
+    is parsed, and None when missing or outside 0.0-1.0.
+    """
+
+    loc: str
+    is_sitemap: bool = False
+    lastmod: str | None = None
+    changefreq: str | None = None
+    priority: float | None = None
+
+    @property
+    def modified(self) -> datetime | None:
+        return parse_lastmod(self.lastmod)
+
+
+class SitemapParser:
+    """Bytes of one sitemap in, finished entries out.
+
+    Namespaces are matched by local name rather than by the sitemaps.org 0.9
+    URI. Pinning that URI meant a sitemap declaring any other namespace --
+    the older google.com/schemas/sitemap/0.84 among them -- parsed to zero
+    URLs and was reported to the caller as an empty sitemap.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        # Relative <loc> values resolve against the URL the sitemap was
+        # actually served from, after redirects.
+        self.base_url = base_url
+        self._gunzip = Gunzip()
+        self._xml = ET.XMLPullParser(events=("start", "end"))
+        self._path: list[str] = []
+        self._root: ET.Element | None = None
+        self._loc: str | None = None
+        self._fields: dict[str, str] = {}
+
+    def feed(self, chunk: bytes) -> list[SitemapEntry]:
+        self._xml.feed(self._gunzip.feed(chunk))
+        return self._drain()
+
+    def close(self) -> list[SitemapEntry]:
+        """The last entries. Raises ET.ParseError if the XML is incomplete."""
+        self._xml.feed(self._gunzip.flush())
+        self._xml.close()
+        return self._drain()
+
+    def _drain(self) -> list[SitemapEntry]:
+        entries = []
+        for event, elem in self._xml.read_events():
+            name = elem.tag.rpartition("}")[2] if isinstance(elem.tag, str) else ""
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                self._path.append(name)
+                continue
+            self._path.pop()
+            depth = len(self._path)
+            if depth == 2 and self._path[1] in _ENTRIES:
+                if name == "loc" and self._loc is None:
+                    self._loc = elem.text
+                elif name in _FIELDS and elem.text and elem.text.strip():
+                    self._fields.setdefault(name, elem.text.strip())
+            elif depth == 1:
+                loc = clean_loc(self._loc, self.base_url)
+                if name in _ENTRIES and loc:
+                    fields = self._fields
+                    entries.append(
+                        SitemapEntry(
+                            loc,
+                            is_sitemap=name == "sitemap",
+                            lastmod=fields.get("lastmod"),
+                            changefreq=fields.get("changefreq"),
+                            priority=parse_priority(fields.get("priority")),
+                        )
+                    )
+                self._loc = None
+                self._fields = {}
+                # The entry is read: drop it, and everything under it, from
+                # the tree. This is what keeps a 50,000-entry sitemap at the
+                # memory of one entry.
+                self._root.clear()
+        return entries
+
+
+@dataclass
+class SitemapFetch:
+    """How reading one sitemap file went, for the note on the result."""
+
+    url: str
+    seconds: float = 0.0
+    bytes: int = 0
+    urls: int = 0
+    sitemaps: int = 0
+    error: str | None = None
+
+    def describe(self) -> str:
+        listed = f"{self.sitemaps} sitemaps" if self.sitemaps else f"{self.urls} URLs"
+        return f"{self.url} ({self.seconds:.1f}s, {_size(self.bytes)}, {listed})"
+
+
+async def read_entries(
+    client: httpx.AsyncClient, url: str, fetch: SitemapFetch | None = None
+) -> AsyncIterator[SitemapEntry]:
+    """Stream one sitemap document and yield its entries as they parse.
+
+    fetch, when given, is kept up to date with the bytes read so far, as
+    they are after any Content-Encoding is undone.
+    """
+    async with client.stream("GET", url, timeout=SITEMAP_TIMEOUT_S) as response:
+        response.raise_for_status()
+        parser = SitemapParser(str(response.url))
+        async for chunk in response.aiter_bytes():
+            if fetch is not None:
+                fetch.bytes += len(chunk)
+            for entry in parser.feed(chunk):
+                yield entry
+        for entry in parser.close():
+            yield entry
+
+
+_DONE = object()
+
+
+@dataclass
+class _Document:
+    url: str
+    depth: int
+    fetch: SitemapFetch
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    task: asyncio.Task | None = None
+
+
+class SitemapReader:
+    """Page URLs of a sitemap or sitemap index, read as they are needed.
+
+    A sitemap index can list a thousand child sitemaps. Fetching them all at
+    once fired a thousand requests at one host, and collecting every URL
+    from every child before max_urls was applied downloaded all of them for
+    a crawl that wanted fifty. The reader instead:
+
+    - fetches at most `concurrency` sitemap files at a time, and starts a
+      child only when it is among the next `concurrency` in reading order;
+    - yields URLs in the order the indexes list them;
+    - stops fetching when the caller stops reading. Closing urls() cancels
+      the children in flight, and the ones not yet started never are.
+
+    Each file read is recorded in fetches, and note() sums them up.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        sitemap_url: str,
+        slot: Callable[[str], AbstractAsyncContextManager] | None = None,
+        concurrency: int = DEFAULT_SITEMAP_CONCURRENCY,
+    ) -> None:
+        self.client = client
+        self.sitemap_url = sitemap_url
+        self.slot = slot
+        self.concurrency = max(int(concurrency), 1)
+        self.fetches: list[SitemapFetch] = []
+        # Child sitemaps listed but not read, because reading stopped first.
+        self.unread = 0
+        self.complete = False
+        self.seconds = 0.0
+
+    async def urls(self) -> AsyncIterator[str]:
+        """Yield every page URL, in order. Close it to stop early."""
+        async with aclosing(self.entries()) as entries:
+            async for entry in entries:
+                yield entry.loc
+
+    async def entries(self) -> AsyncIterator[SitemapEntry]:
+        """Yield every page entry, in order. Close it to stop early.
+
+        A failure reading sitemap_url itself is raised (httpx.HTTPError, or
+        ET.ParseError for a body that is not sitemap XML); a failed child of
+        an index is recorded and skipped, so one bad sub-sitemap does not
+        discard the others.
+        """
+        gate = asyncio.Semaphore(self.concurrency)
+        seen = {self.sitemap_url}
+        began = time.perf_counter()
+
+        async def pump(doc: _Document) -> None:
+            try:
+                async with gate, self.slot(doc.url) if self.slot else nullcontext():
+                    started = time.perf_counter()
+                    try:
+                        async for entry in read_entries(
+                            self.client, doc.url, doc.fetch
+                        ):
+                            doc.queue.put_nowait(entry)
+                    finally:
+                        doc.fetch.seconds = time.perf_counter() - started
+            except Exception as exc:
+                # httpx appends a second line pointing at MDN; the first says it.
+                first = str(exc).splitlines()[0] if str(exc) else ""
+                doc.fetch.error = f"{type(exc).__name__}: {first}"
+                doc.queue.put_nowait(exc)
+            doc.queue.put_nowait(_DONE)
+
+        def window() -> None:
+            # Only the next few files in reading order are started, so
+            # stopping early leaves the rest of a large index unfetched.
+            for doc in islice(order, self.concurrency):
+                if doc.task is None:
+                    self.fetches.append(doc.fetch)
+                    doc.task = asyncio.create_task(pump(doc))
+
+        def document(url: str, depth: int) -> _Document:
+            return _Document(url, depth, SitemapFetch(url))
+
+        root = document(self.sitemap_url, 0)
+        order: deque[_Document] = deque([root])
+        try:
+            while order:
+                window()
+                doc = order[0]
+                children: list[str] = []
+                while (item := await doc.queue.get()) is not _DONE:
+                    if isinstance(item, Exception):
+                        if doc is root:
+                            raise item
+                        logger.warning("Sub-sitemap %s failed: %s", doc.url, item)
+                    elif not item.is_sitemap:
+                        doc.fetch.urls += 1
+                        yield item
+                    elif item.loc not in seen:
+                        doc.fetch.sitemaps += 1
+                        seen.add(item.loc)
+                        children.append(item.loc)
+                order.popleft()
+                if children and doc.depth >= MAX_SITEMAP_DEPTH:
+                    logger.warning(
+                        "Sitemap index nesting exceeded %d levels at %s -- not "
+                        "descending further",
+                        MAX_SITEMAP_DEPTH,
+                        doc.url,
+                    )
+                    continue
+                # Children are read before the documents after their index, so
+                # the URLs come out in the order the indexes list them.
+                order.extendleft(
+                    reversed([document(c, doc.depth + 1) for c in children])
+                )
+            self.complete = True
+        finally:
+            self.seconds = time.perf_counter() - began
+            pending = [d.task for d in order if d.task and not d.task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            stopped = [d for d in order if d is not root]
+            self.unread = len(stopped)
+            # A file cut off mid-read is not a record of a finished one.
+            cut = {id(d.fetch) for d in stopped}
+            self.fetches = [f for f in self.fetches if id(f) not in cut]
+
+    def note(self) -> str | None:
+        """What reading an index cost, or None for a single sitemap file."""
+        if len(self.fetches) <= 1 and not self.unread:
+            return None
+        read = [f for f in self.fetches if f.error is None]
+        failed = [f for f in self.fetches if f.error is not None]
+        total = sum(f.bytes for f in self.fetches)
+        parts = [
+            f"Sitemap: read {len(read)} sitemap file(s), {_size(total)} in "
+            f"{self.seconds:.1f}s, {self.concurrency} at a time"
+        ]
+        slowest = sorted(read, key=lambda f: f.seconds, reverse=True)[:3]
+        if len(read) > 1:
+            parts.append("slowest " + ", ".join(f.describe() for f in slowest))
+        if failed:
+            parts.append(
+                f"{len(failed)} failed and were skipped: "
+                + ", ".join(f"{f.url} ({f.error})" for f in failed[:3])
+            )
+        if self.unread:
+            parts.append(
+                f"{self.unread} listed child sitemap(s) were not fetched once "
+                "enough URLs had been read"
+            )
+        return "; ".join(parts) + "."
+
+
+@dataclass
+class SitemapSelection:
+    """Which of a sitemap's pages to crawl, and in what order.
+
+    A nightly re-index of a 20,000-page docs site used to crawl all 20,000
+    pages to pick up the few hundred that changed, though the sitemap said
+    which ones had. keep() drops a page whose <lastmod> says it has not
+    changed:
+
+    - modified_since: it was last modified before this moment;
+    - previous: it was last modified no later than it was on the last run,
+      going by the lastmod recorded then (url -> lastmod, from SitemapState).
+
+    A page without a usable lastmod is kept: nothing says it did not change.
+    Neither is a page absent from previous, which the last run never crawled.
+
+    order() puts the pages that matter most first, so that max_urls cuts the
+    least important ones: by <priority>, highest first, or by <lastmod>,
+    newest first. Ties keep sitemap order. Ordering needs every entry, so a
+    selection with order_by reads the whole sitemap before max_urls applies.
+
+    The counts are for the note; lastmods holds each kept page's lastmod, to
+    be recorded once the page has been crawled.
+    """
+
+    modified_since: datetime | None = None
+    previous: dict[str, str | None] | None = None
+    order_by: str | None = None
+    older: int = 0
+    unchanged: int = 0
+    undated: int = 0
+    lastmods: dict[str, str | None] = field(default_factory=dict)
+
+    def keep(self, entry: SitemapEntry) -> bool:
+        if self.modified_since is None and self.previous is None:
+            return True
+        modified = entry.modified
+        if modified is None:
+            self.undated += 1
+        elif self.modified_since is not None and modified < self.modified_since:
+            self.older += 1
+            return False
+        elif self.previous is not None and entry.loc in self.previous:
+            before = parse_lastmod(self.previous[entry.loc])
+            if before is not None and modified <= before:
+                self.unchanged += 1
+                return False
+        self.lastmods[entry.loc] = entry.lastmod
+        return True
+
+    def order(self, entries: list[SitemapEntry]) -> list[SitemapEntry]:
+        if self.order_by == "priority":
+            return sorted(
+                entries,
+                key=lambda e: DEFAULT_PRIORITY if e.priority is None else e.priority,
+                reverse=True,
+            )
+        if self.order_by == "lastmod":
+            undated = datetime.min.replace(tzinfo=UTC)
+            return sorted(entries, key=lambda e: e.modified or undated, reverse=True)
+        return entries
+
+    @property
+    def skipped(self) -> int:
+        return self.older + self.unchanged
+
+    def note(self) -> str | None:
+        """What the selection left out and why, or None when it kept all."""
+        parts = []
+        if self.older:
+            since = self.modified_since.isoformat()
+            parts.append(f"{self.older} last modified before {since} were skipped")
+        if self.unchanged:
+            parts.append(f"{self.unchanged} unchanged since the last run were skipped")
+        if self.undated:
+            parts.append(
+                f"{self.undated} with no usable lastmod were kept, as nothing "
+                "says they did not change"
+            )
+        if self.order_by:
+            parts.append(
+                f"the whole sitemap was read to order it by {self.order_by} "
+                "before max_urls applied"
+            )
+        if not parts:
+            return None
+        return "Sitemap pages: " + "; ".join(parts) + "."
+
+
+def _size(n: int) -> str:
+    if n >= 1024 * 1024:
+        return f"{n / (1024 * 1024):.1f} MB"
+    if n >= 1024:
+        return f"{n / 1024:.0f} KB"
+    return f"{n} B"
+
+
+def iter_sitemap_urls(
+    client: httpx.AsyncClient,
+    sitemap_url: str,
+    slot: Callable[[str], AbstractAsyncContextManager] | None = None,
+) -> AsyncIterator[str]:
+    """Every page URL a sitemap or sitemap index lists, as it is read."""
+    return SitemapReader(client, sitemap_url, slot).urls()
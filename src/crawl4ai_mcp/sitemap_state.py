@@ -0,0 +1,106 @@
+"""What the last only_changed crawl of a sitemap saw, kept between runs.
+
+crawl_sitemap(only_changed=True) crawls a page only when its <lastmod> has
+moved past the one recorded for it last time. The record is one JSON file
+per sitemap URL under CRAWL4AI_MCP_STATE_DIR/sitemaps/, mapping each page
+that was crawled successfully to the lastmod it had then:
+
+- A page is recorded only once it has been crawled and succeeded. One that
+  failed, or that max_urls left for later, has no record to be unchanged
+  against, so the next run crawls it.
+- Records are merged, never replaced wholesale. A run that reads only part
+  of a sitemap leaves the other pages' records as they were.
+- The file is written whole, through a temporary file and a rename, so a
+  crash leaves the last run's record rather than half of this one's.
+
+A missing or unreadable file is an empty record: everything is crawled,
+which is what a first run does anyway.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+
+from crawl4ai_mcp.checkpoint import state_dir
+from crawl4ai_mcp.output import write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+def state_path(sitemap_url: str, directory: Path | None = None) -> Path:
+    # Hashed: a URL is not a file name, and two URLs must not share a file.
+    name = hashlib.sha256(sitemap_url.encode()).hexdigest()[:32]
+    return (directory or state_dir() / "sitemaps") / f"{name}.json"
+
+
+class SitemapState:
+    """The recorded lastmod of each page of one sitemap."""
+
+    def __init__(self, sitemap_url: str, directory: Path | None = None) -> None:
+        self.sitemap_url = sitemap_url
+        self.path = state_path(sitemap_url, directory)
+        self.lastmods: dict[str, str | None] = {}
+        # Whether an earlier run left a record; the first run has none.
+        self.found = False
+        self.recorded = 0
+
+    @classmethod
+    async def open(
+        cls, sitemap_url: str, directory: Path | None = None
+    ) -> "SitemapState":
+        state = cls(sitemap_url, directory)
+        await asyncio.to_thread(state._load)
+        return state
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logger.warning("could not read %s, crawling everything: %s", self.path, exc)
+            return
+        pages = data.get("pages") if isinstance(data, dict) else None
+        if isinstance(pages, dict):
+            self.lastmods = pages
+            self.found = True
+
+    def record(self, url: str, lastmod: str | None) -> None:
+        self.lastmods[url] = lastmod
+        self.recorded += 1
+
+    async def save(self) -> str | None:
+        """Write the record, or say why it could not be written."""
+        text = json.dumps(
+            {
+                "sitemap_url": self.sitemap_url,
+                "updated": time.time(),
+                "pages": self.lastmods,
+            }
+        )
+
+        def write() -> None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(str(self.path), text)
+
+        try:
+            await asyncio.to_thread(write)
+        except OSError as exc:
+            logger.warning("could not save %s: %s", self.path, exc)
+            return (
+                f"The sitemap's lastmod record could not be saved ({exc}), so the "
+                "next only_changed run will crawl these pages again."
+            )
+        return None
+
+    def note(self) -> str:
+        if not self.found:
+            return (
+                "No earlier only_changed run of this sitemap was recorded, so no "
+                f"page was skipped as unchanged; recorded the lastmod of "
+                f"{self.recorded}."
+            )
+        return f"Recorded the lastmod of {self.recorded} crawled page(s)."
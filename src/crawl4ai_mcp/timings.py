@@ -0,0 +1,286 @@
+"""Per-page phase timings: where the seconds of a crawl actually went.
+
+A slow crawl has half a dozen possible causes, and the total time tells you
+none of them apart: a page queued behind nine others, a slow navigation, a
+wait_for that never matched and ran out its timeout, a js_code scroll, a
+delay_before_return_html someone set in a profile and forgot, or a
+content filter chewing through a 2MB DOM. Each needs a different fix.
+
+crawl4ai logs a fetch and a scrape time per page but returns neither, and
+neither splits the fetch. The phases here are taken from the strategy's own
+hooks, which fire at the boundaries between them:
+
+    on_page_context_created   page ready              (end of queue)
+    before_goto               navigation starts
+    after_goto                load event / wait_until
+    before_retrieve_html      wait_for and scrolling done; the delay follows
+    on_execution_started      js_code done            (only with js_code)
+    before_return_html        HTML captured
+
+and the markdown generator, which build_run_config wraps so the content
+filter and the markdown conversion are timed separately.
+
+Recording is opt-in per call. A call that does not ask installs no sink, and
+every hook returns at its first line.
+"""
+
+import contextvars
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+
+# Where this call's timings go, keyed by URL. None when the call did not ask.
+# A ContextVar for the same reason _call_overrides is one: the hooks are
+# installed once on a shared strategy and must not see each other's calls.
+_sink: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "crawl4ai_timing_sink", default=None
+)
+
+# The timer of the page being crawled by this task. The dispatcher runs each
+# page in a task of its own, so a value set by one page's hook is only seen
+# by the rest of that page's crawl.
+_current: contextvars.ContextVar["PageTimings | None"] = contextvars.ContextVar(
+    "crawl4ai_page_timer", default=None
+)
+
+# The order phases are reported in, which is the order they happen in.
+PHASES = (
+    "queue",
+    "fetch",
+    "navigation",
+    "wait_for",
+    "js_code",
+    "delay",
+    "capture",
+    "filter",
+    "markdown",
+)
+
+
+@dataclass
+class PageTimings:
+    """Timestamps for one page, turned into phase durations on demand.
+
+    Marks are perf_counter() values; opened is wall-clock time because the
+    dispatcher records its start that way and the queue phase is the
+    difference between the two.
+    """
+
+    opened: float = field(default_factory=time.time)
+    marks: dict[str, float] = field(default_factory=dict)
+    delay_s: float = 0.0
+    filter_s: float = 0.0
+    fetch_s: float | None = None
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = time.perf_counter()
+
+    def _span(self, start: str, end: str) -> float | None:
+        if start in self.marks and end in self.marks:
+            return max(self.marks[end] - self.marks[start], 0.0)
+        return None
+
+    def phases(self, dispatch_start: float | None = None) -> dict[str, float]:
+        """Phase durations in milliseconds, leaving out phases that did not run.
+
+        dispatch_start is when the dispatcher picked the URL up, before its
+        rate limiter and concurrency gate. Without it (a single crawl_url)
+        there was no queue to wait in and the phase is left out.
+        """
+        seconds: dict[str, float | None] = {
+            "queue": (
+                max(self.opened - dispatch_start, 0.0)
+                if dispatch_start is not None
+                else None
+            ),
+            "fetch": self.fetch_s,
+            "navigation": self._span("goto", "loaded"),
+            "wait_for": self._span("loaded", "retrieve"),
+        }
+        after_wait = self._span("retrieve", "js_done")
+        if after_wait is not None:
+            # The delay sleeps between before_retrieve_html and js_code, so
+            # the span to on_execution_started holds both.
+            seconds["js_code"] = max(after_wait - self.delay_s, 0.0)
+            seconds["capture"] = self._span("js_done", "captured")
+        else:
+            captured = self._span("retrieve", "captured")
+            seconds["capture"] = (
+                max(captured - self.delay_s, 0.0) if captured is not None else None
+            )
+        if self.delay_s:
+            seconds["delay"] = self.delay_s
+        generated = self._span("markdown_start", "markdown_end")
+        if generated is not None:
+            seconds["filter"] = self.filter_s
+            seconds["markdown"] = max(generated - self.filter_s, 0.0)
+        out = {
+            name: round(seconds[name] * 1000, 1)
+            for name in PHASES
+            if seconds.get(name) is not None
+        }
+        first = "goto" if "goto" in self.marks else "markdown_start"
+        if first in self.marks and "markdown_end" in self.marks:
+            out["total"] = round(
+                (self.marks["markdown_end"] - self.marks[first]) * 1000
+                + (self.fetch_s or 0.0) * 1000
+                + out.get("queue", 0.0),
+                1,
+            )
+        return out
+
+
+def summary(phases: dict[str, float]) -> str:
+    """One line for crawl_url's footer: "navigation 812 ms, wait_for 35 ms, ..."."""
+    return ", ".join(f"{name} {ms:g} ms" for name, ms in phases.items())
+
+
+@contextmanager
+def collect_timings(enabled: bool) -> Iterator[dict[str, PageTimings] | None]:
+    """Record phase timings for the crawls made inside this block.
+
+    Yields the dict the timings land in, keyed by the URL crawl4ai navigated
+    to, or None when not enabled. Like _call_scope, anything that spawns
+    tasks has to be started inside the block.
+    """
+    sink: dict[str, PageTimings] | None = {} if enabled else None
+    sink_token = _sink.set(sink)
+    current_token = _current.set(None)
+    try:
+        yield sink
+    finally:
+        _current.reset(current_token)
+        _sink.reset(sink_token)
+
+
+def current_page() -> PageTimings | None:
+    """The timer of the page this task is crawling, or None when not recording."""
+    return _current.get()
+
+
+@contextmanager
+def page(timer: PageTimings) -> Iterator[PageTimings]:
+    """Time the work inside this block to timer, e.g. in a markdown worker."""
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+def start_page(url: str) -> PageTimings | None:
+    """Begin timing a page that does not go through the browser hooks.
+
+    The plain-HTTP path has no page and no navigation, so it opens its own
+    timer and records the fetch as one phase. Returns None when the call is
+    not recording.
+    """
+    sink = _sink.get()
+    if sink is None:
+        return None
+    timer = PageTimings()
+    sink[url] = timer
+    _current.set(timer)
+    return timer
+
+
+# --- Hook bodies ---------------------------------------------------------
+# Called from the server's hooks rather than installed directly, because
+# crawl4ai keeps one slot per hook and the server's header and cookie
+# overrides already occupy two of them.
+
+
+def page_opened() -> None:
+    """on_page_context_created: the page exists, so the queue wait is over."""
+    if _sink.get() is not None:
+        _current.set(PageTimings())
+
+
+def navigation_started(url: str) -> None:
+    """before_goto. Also starts a timer for a reused session page, and a new
+    one when crawl4ai retries the navigation, so a retry is not timed as the
+    sum of both attempts.
+    """
+    sink = _sink.get()
+    if sink is None:
+        return
+    timer = _current.get()
+    if timer is None or "goto" in timer.marks:
+        timer = PageTimings()
+        _current.set(timer)
+    timer.mark("goto")
+    sink[url] = timer
+
+
+def _mark(name: str) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.mark(name)
+
+
+async def after_goto(page, context=None, url=None, response=None, **kwargs):
+    _mark("loaded")
+
+
+async def before_retrieve_html(page, context=None, config=None, **kwargs):
+    timer = _current.get()
+    if timer is not None:
+        timer.mark("retrieve")
+        timer.delay_s = float(getattr(config, "delay_before_return_html", 0) or 0)
+
+
+async def on_execution_started(page, context=None, config=None, **kwargs):
+    _mark("js_done")
+
+
+async def before_return_html(page=None, html=None, context=None, **kwargs):
+    _mark("captured")
+
+
+class _TimedFilter:
+    """Times a content filter's filter_content and otherwise stands in for it."""
+
+    def __init__(self, inner, timer: PageTimings) -> None:
+        self._inner = inner
+        self._timer = timer
+
+    def filter_content(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._inner.filter_content(*args, **kwargs)
+        finally:
+            self._timer.filter_s += time.perf_counter() - start
+
+    def __getattr__(self, name: str):
+        return getattr(self._inner, name)
+
+
+class TimedMarkdownGenerator(DefaultMarkdownGenerator):
+    """DefaultMarkdownGenerator that reports its time to the page's timer.
+
+    The filter is wrapped per call rather than at construction, so
+    self.content_filter stays the real PruningContentFilter or
+    BM25ContentFilter for anything that inspects it. With no timer running
+    this is one ContextVar read on top of the normal generation.
+    """
+
+    def generate_markdown(self, input_html, *args, content_filter=None, **kwargs):
+        timer = _current.get()
+        if timer is None:
+            return super().generate_markdown(
+                input_html, *args, content_filter=content_filter, **kwargs
+            )
+        active = content_filter or self.content_filter
+        timer.mark("markdown_start")
+        try:
+            return super().generate_markdown(
+                input_html,
+                *args,
+                content_filter=_TimedFilter(active, timer) if active else None,
+                **kwargs,
+            )
+        finally:
+            timer.mark("markdown_end")
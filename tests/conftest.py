@@ -0,0 +1,104 @@
+"""Fixtures shared by the tool tests."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.profiles import ProfileManager
+
+
+@pytest.fixture(autouse=True)
+def _state_dir(tmp_path, monkeypatch):
+    """Keep jobs, checkpoints and sitemap state out of ~/.crawl4ai-mcp."""
+    monkeypatch.setenv("CRAWL4AI_MCP_STATE_DIR", str(tmp_path / "state"))
+
+
+@pytest.fixture
+def make_ctx():
+    """Builds the Context a tool is called with, over a fresh AppContext.
+
+    Each call is a new server as far as the tool can tell: its own job table,
+    result store and metrics, with only the state directory in common.
+    """
+
+    def make() -> MagicMock:
+        app = srv.AppContext(
+            crawler=MagicMock(), profile_manager=ProfileManager(), sessions={}
+        )
+        ctx = MagicMock()
+        ctx.request_context.lifespan_context = app
+        ctx.report_progress = AsyncMock()
+        return ctx
+
+    return make
+
+
+@pytest.fixture
+def make_result():
+    """Builds a CrawlResult stand-in with the fields the batch tools read.
+
+    A failure has no status and "timeout" as its error, the common case.
+    Any other field is set from fields, e.g. links, tables or crawl_stats.
+    """
+
+    def make(
+        url: str,
+        success: bool = True,
+        content: str | None = None,
+        *,
+        depth: int | None = None,
+        **fields,
+    ) -> MagicMock:
+        r = MagicMock()
+        r.url, r.success, r.status_code = url, success, 200 if success else None
+        r.metadata = {} if depth is None else {"depth": depth}
+        r.markdown.fit_markdown = f"content of {url}" if content is None else content
+        r.error_message = None if success else "timeout"
+        r.response_headers = {}
+        r.crawl_stats = None
+        for name, value in fields.items():
+            setattr(r, name, value)
+        return r
+
+    return make
+
+
+@pytest.fixture
+def make_streaming_crawler(make_result):
+    """Builds a crawler whose arun_many streams one page per URL.
+
+    pages_for(urls) replaces the default pages, which succeed unless their
+    URL is in fail. asked collects each list arun_many was given, and
+    on_yield sees every page once the tool has taken it; raising there is
+    how a test kills the crawl partway.
+    """
+
+    def make(
+        pages_for=None,
+        *,
+        fail: set[str] = frozenset(),
+        asked: list | None = None,
+        on_yield=None,
+    ) -> MagicMock:
+        async def arun_many(urls, config, dispatcher):
+            if asked is not None:
+                asked.append(list(urls))
+
+            async def pages():
+                if pages_for is not None:
+                    results = pages_for(urls)
+                else:
+                    results = (make_result(u, success=u not in fail) for u in urls)
+                for page in results:
+                    yield page
+                    if on_yield is not None:
+                        on_yield(page)
+
+            return pages()
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        return crawler
+
+    return make
@@ -0,0 +1,310 @@
+"""Tests for adaptive (AIMD) concurrency.
+
+The controller is only worth having if it widens on a host that copes and
+backs off on one that pushes back. The failures guarded here:
+
+- a limit that never grows past its starting point on a fast host
+- one burst of 429s halving the limit once per page already in flight
+- a Retry-After being logged and then ignored
+- a 404 being read as the host struggling
+- the outer deep-crawl call holding a slot its own pages need
+- a host paused by Retry-After holding the batch's slots while another host
+  has pages to fetch
+- a call that did not ask for it being throttled at all
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from crawl4ai import CrawlerRunConfig
+from crawl4ai.deep_crawling import DeepCrawlDecorator
+
+from crawl4ai_mcp import adaptive
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.adaptive import (
+    AdaptiveConcurrency,
+    adapt_crawler,
+    adaptive_scope,
+    retry_after_seconds,
+    throttle_reason,
+)
+from crawl4ai_mcp.dispatch import StreamingSemaphoreDispatcher
+from crawl4ai_mcp.frontier import FrontierCrawl
+
+
+async def _fetch(controller, url, status=200, headers=None, blocked=0, seconds=0.0):
+    async with controller.slot(url) as sample:
+        if seconds:
+            await asyncio.sleep(seconds)
+        sample.record(status, headers or {}, blocked)
+
+
+class TestSignals:
+    def test_retry_after_as_seconds_and_as_a_date(self) -> None:
+        assert retry_after_seconds({"Retry-After": "30"}) == 30.0
+        assert (
+            retry_after_seconds({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+        )
+        assert retry_after_seconds({"Retry-After": "soon"}) is None
+        assert retry_after_seconds(None) is None
+
+    def test_what_counts_as_pushing_back(self) -> None:
+        assert throttle_reason(429, {}, 0) == "429"
+        assert throttle_reason(503, {}, 0) == "503"
+        assert throttle_reason(200, {}, 2) == "anti-bot"
+        assert throttle_reason(200, {"Retry-After": "5"}, 0) == "Retry-After"
+        assert throttle_reason(404, {}, 0) is None
+        assert throttle_reason(500, {}, 0) is None
+
+
+class TestLimits:
+    async def test_the_limit_grows_while_latency_is_flat(self) -> None:
+        controller = AdaptiveConcurrency(ceiling=6)
+
+        async def round_of_pages(n: int) -> None:
+            await asyncio.gather(
+                *(
+                    _fetch(controller, f"https://a.test/{i}", seconds=0.01)
+                    for i in range(n)
+                )
+            )
+
+        for _ in range(15):
+            await round_of_pages(8)
+        host = controller._hosts["a.test"]
+        assert host.limit == 6.0
+        assert "a.test ended at 6 of 6" in controller.summary()
+
+    async def test_rising_latency_stops_growth(self) -> None:
+        controller = AdaptiveConcurrency(ceiling=10)
+        clock = [0.0]
+        with patch.object(adaptive.time, "monotonic", lambda: clock[0]):
+            # Two pages at a steady 100 ms set the baseline...
+            for seconds in (0.1, 0.1, 1.0, 1.0, 1.0):
+                async with controller.slot("https://a.test/") as sample:
+                    clock[0] += seconds
+                    sample.record(200, {})
+        # ...and nothing after the climb widens a limit that was never used.
+        assert controller._hosts["a.test"].limit == 2.0
+
+    async def test_a_burst_of_429s_is_one_cut(self) -> None:
+        controller = AdaptiveConcurrency(ceiling=10)
+        controller._host("a.test").limit = 8.0
+        await asyncio.gather(
+            *(_fetch(controller, f"https://a.test/{i}", status=429) for i in range(6))
+        )
+        host = controller._hosts["a.test"]
+        assert host.limit == 4.0
+        assert host.cuts == {"429": 1}
+        assert "cut back on 429 ×1" in controller.summary()
+
+    async def test_the_limit_never_drops_below_one(self) -> None:
+        controller = AdaptiveConcurrency(ceiling=4)
+        clock = [0.0]
+        with patch.object(adaptive.time, "monotonic", lambda: clock[0]):
+            for _ in range(5):
+                clock[0] += 10
+                await _fetch(controller, "https://a.test/", status=503)
+        assert controller._hosts["a.test"].limit == 1.0
+
+    async def test_retry_after_pauses_the_host(self) -> None:
+        controller = AdaptiveConcurrency(ceiling=4)
+        await _fetch(controller, "https://a.test/", headers={"Retry-After": "0.05"})
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await _fetch(controller, "https://a.test/next")
+        assert loop.time() - started >= 0.04
+        # Other hosts are not paused.
+        started = loop.time()
+        await _fetch(controller, "https://b.test/")
+        assert loop.time() - started < 0.04
+
+    async def test_a_404_is_not_pushback(self) -> None:
+        controller = AdaptiveConcurrency(ceiling=4)
+        await _fetch(controller, "https://a.test/", status=404)
+        host = controller._hosts["a.test"]
+        assert host.limit == 2.0 and not host.cuts and host.latency is None
+
+    async def test_pages_wait_for_room_under_the_limit(self) -> None:
+        controller = AdaptiveConcurrency(ceiling=10)
+        peak = now = 0
+
+        async def page(i: int) -> None:
+            nonlocal peak, now
+            async with controller.slot(f"https://a.test/{i}"):
+                now += 1
+                peak = max(peak, now)
+                await asyncio.sleep(0.01)
+                now -= 1
+
+        # Unrecorded samples leave the starting limit of 2 in place.
+        await asyncio.gather(*(page(i) for i in range(6)))
+        assert peak == 2
+
+
+class TestCrawlerWrapping:
+    async def test_calls_without_a_controller_are_untouched(self) -> None:
+        crawler = SimpleNamespace(arun=AsyncMock(return_value="page"))
+        adapt_crawler(crawler)
+        assert await crawler.arun("https://a.test/", config=None) == "page"
+
+    async def test_results_feed_the_controller(self) -> None:
+        result = SimpleNamespace(
+            status_code=429, response_headers={"Retry-After": "0"}, crawl_stats=None
+        )
+        crawler = SimpleNamespace(arun=AsyncMock(return_value=result))
+        adapt_crawler(crawler)
+        controller = AdaptiveConcurrency(ceiling=4)
+        with adaptive_scope(controller):
+            await crawler.arun("https://a.test/", config=None)
+        assert controller._hosts["a.test"].cuts == {"429": 1}
+
+    async def test_the_outer_deep_crawl_call_holds_no_slot(self) -> None:
+        crawler = SimpleNamespace()
+        controller = AdaptiveConcurrency(ceiling=1)
+
+        async def arun(url, config=None, **kwargs):
+            if config is not None and not DeepCrawlDecorator.deep_crawl_active.get():
+                token = DeepCrawlDecorator.deep_crawl_active.set(True)
+                try:
+                    return await crawler.arun(url, config=config)
+                finally:
+                    DeepCrawlDecorator.deep_crawl_active.reset(token)
+            return SimpleNamespace(status_code=200, response_headers={})
+
+        crawler.arun = arun
+        adapt_crawler(crawler)
+        deep = SimpleNamespace(deep_crawl_strategy=object())
+        with adaptive_scope(controller):
+            async with asyncio.timeout(1):
+                await crawler.arun("https://a.test/", config=deep)
+        assert controller._hosts["a.test"].in_flight == 0
+
+
+class _TwoHosts:
+    """a.test's first page asks for a pause; b.test answers every page."""
+
+    PAUSE_S = 0.5
+
+    def __init__(self, links: dict | None = None) -> None:
+        self.links = links or {}
+        self.paused = False
+        self.finished: dict[str, float] = {}
+
+    def crawler(self) -> SimpleNamespace:
+        loop = asyncio.get_running_loop()
+
+        async def arun(url, config=None, **kwargs):
+            await asyncio.sleep(0.01)
+            headers = {}
+            if url.startswith("https://a.test/") and not self.paused:
+                self.paused = True
+                headers = {"Retry-After": str(self.PAUSE_S)}
+            self.finished[url] = loop.time()
+            html = "".join(f'<a href="{u}">x</a>' for u in self.links.get(url, []))
+            return SimpleNamespace(
+                url=url,
+                success=True,
+                status_code=429 if headers else 200,
+                response_headers=headers,
+                crawl_stats=None,
+                error_message="",
+                html=html,
+                links={
+                    "internal": [{"href": u} for u in self.links.get(url, [])],
+                    "external": [],
+                },
+                metadata={},
+            )
+
+        crawler = SimpleNamespace(arun=arun)
+        adapt_crawler(crawler)
+        return crawler
+
+    def last(self, host: str) -> float:
+        return max(t for u, t in self.finished.items() if host in u)
+
+
+class TestPausedHosts:
+    async def test_a_paused_host_does_not_hold_the_batch(self) -> None:
+        site = _TwoHosts()
+        urls = [f"https://a.test/{i}" for i in range(4)]
+        urls += [f"https://b.test/{i}" for i in range(8)]
+        dispatcher = StreamingSemaphoreDispatcher(semaphore_count=2)
+        started = asyncio.get_running_loop().time()
+        with adaptive_scope(AdaptiveConcurrency(ceiling=2)):
+            async with asyncio.timeout(5):
+                done = [
+                    r.url
+                    async for r in dispatcher.run_urls_stream(
+                        site.crawler(), urls, CrawlerRunConfig()
+                    )
+                ]
+        assert sorted(done) == sorted(urls)
+        # b.test finished while a.test waited out its Retry-After.
+        assert site.last("b.test") - started < site.PAUSE_S / 2
+        assert site.last("a.test") - started >= site.PAUSE_S
+
+    async def test_the_frontier_skips_a_paused_host(self) -> None:
+        root = "https://a.test/"
+        links = {root: [f"https://a.test/{i}" for i in range(3)]}
+        links[root] += [f"https://b.test/{i}" for i in range(6)]
+        site = _TwoHosts(links)
+        engine = FrontierCrawl(root, max_depth=1, max_pages=20, include_external=True)
+        dispatcher = StreamingSemaphoreDispatcher(semaphore_count=2)
+        started = asyncio.get_running_loop().time()
+        with adaptive_scope(AdaptiveConcurrency(ceiling=2)):
+            async with asyncio.timeout(5):
+                pages = [
+                    p.url
+                    async for p in engine.run(
+                        site.crawler(), CrawlerRunConfig(), dispatcher
+                    )
+                ]
+        assert len(pages) == 10
+        assert site.last("b.test") - started < site.PAUSE_S / 2
+        assert site.last("a.test") - started >= site.PAUSE_S
+
+
+class TestTools:
+    def test_crawl_many_reports_where_each_host_settled(self, make_ctx) -> None:
+        def result(url):
+            r = MagicMock()
+            r.url, r.success, r.status_code, r.metadata = url, True, 200, {}
+            r.markdown.fit_markdown = "content"
+            return r
+
+        async def arun_many(urls, config, dispatcher):
+            controller = adaptive._controller.get()
+            assert controller is not None and controller.ceiling == 4
+            for url in urls:
+                await _fetch(controller, url)
+            return [result(u) for u in urls]
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://a.test/1", "https://a.test/2"],
+                    max_concurrent=4,
+                    adaptive_concurrency=True,
+                    ctx=make_ctx(),
+                )
+            )
+        assert "Adaptive concurrency: a.test ended at" in out.note
+
+    def test_off_by_default(self, make_ctx) -> None:
+        seen = []
+
+        async def arun_many(urls, config, dispatcher):
+            seen.append(adaptive._controller.get())
+            return []
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(srv.crawl_many(urls=["https://a.test/1"], ctx=make_ctx()))
+        assert seen == [None]
+        assert out.note is None
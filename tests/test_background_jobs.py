@@ -0,0 +1,200 @@
+"""Tests for background crawl jobs: start_crawl_job, job_status, job_results
+and cancel_job.
+
+A job is only useful if start answers at once and nothing about the crawl is
+lost by not waiting for it. The failures guarded here:
+
+- start_crawl_job waiting for the crawl it was meant to hand off
+- arguments the tool would reject being accepted, so the job fails later
+- pages finished by a running job being unreadable until it ends
+- cancel_job leaving the crawl running, or throwing its pages away
+- the job table growing without limit, or evicting a running job
+- a restart losing the table, or reporting a dead job as running
+"""
+
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.jobs import Job, JobTable
+
+
+@pytest.fixture
+def gated_crawler(make_result):
+    """Builds a crawler that yields release_after pages, then waits for gate."""
+
+    def make(gate: asyncio.Event, release_after: int) -> MagicMock:
+        async def arun_many(urls, config, dispatcher):
+            async def pages():
+                for i, url in enumerate(urls):
+                    if i == release_after:
+                        await gate.wait()
+                    yield make_result(url)
+
+            return pages()
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        return crawler
+
+    return make
+
+
+URLS = [f"https://a.test/{i}" for i in range(5)]
+
+
+async def _until(predicate, timeout: float = 5.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+class TestStart:
+    async def test_answers_before_the_crawl_ends(self, make_ctx, gated_crawler) -> None:
+        ctx, gate = make_ctx(), asyncio.Event()
+        with patch.object(srv, "_require_crawler", return_value=gated_crawler(gate, 2)):
+            started = await srv.start_crawl_job(
+                tool="crawl_many", arguments={"urls": URLS}, job_id="j1", ctx=ctx
+            )
+            assert started.state == "running" and started.job_id == "j1"
+            job = ctx.request_context.lifespan_context.jobs.get("j1")
+            await _until(lambda: job.progress >= 2)
+            status = await srv.job_status(job_id="j1", ctx=ctx)
+            assert status.state == "running" and status.total == 5
+
+            partial = await srv.job_results(job_id="j1", ctx=ctx)
+            assert [p.url for p in partial.pages] == URLS[:2]
+            assert "still running" in partial.note
+
+            gate.set()
+            await job.task
+        status = await srv.job_status(job_id="j1", ctx=ctx)
+        assert status.state == "done" and status.crawled == 5 and status.pages == 5
+
+    async def test_bad_arguments_are_refused_up_front(self, make_ctx) -> None:
+        ctx = make_ctx()
+        cases = {
+            "crawl_url": ({"url": "https://a.test/"}, "is not recognised"),
+            "crawl_many": ({}, "needs 'urls'"),
+        }
+        for tool, (arguments, expected) in cases.items():
+            out = await srv.start_crawl_job(tool=tool, arguments=arguments, ctx=ctx)
+            assert out.state == "rejected" and expected in out.error
+        for arguments, expected in [
+            ({"urls": URLS, "nope": 1}, "no parameter 'nope'"),
+            ({"urls": "https://a.test/"}, "argument 'urls'"),
+            ({"urls": URLS, "job_id": "x"}, "may not set job_id"),
+        ]:
+            out = await srv.start_crawl_job(
+                tool="crawl_many", arguments=arguments, ctx=ctx
+            )
+            assert out.state == "rejected" and expected in out.error, out.error
+        out = await srv.start_crawl_job(
+            tool="crawl_many", arguments={"urls": URLS}, job_id="../x", ctx=ctx
+        )
+        assert "is not usable" in out.error
+        assert ctx.request_context.lifespan_context.jobs.jobs() == []
+
+
+class TestResults:
+    async def test_pages_come_in_slices(self, make_ctx, gated_crawler) -> None:
+        ctx, gate = make_ctx(), asyncio.Event()
+        gate.set()
+        with patch.object(srv, "_require_crawler", return_value=gated_crawler(gate, 0)):
+            await srv.start_crawl_job(
+                tool="crawl_many", arguments={"urls": URLS}, job_id="r", ctx=ctx
+            )
+            await ctx.request_context.lifespan_context.jobs.get("r").task
+        first = await srv.job_results(job_id="r", limit=2, ctx=ctx)
+        assert first.total == 5 and first.next_offset == 2 and len(first.pages) == 2
+        last = await srv.job_results(job_id="r", offset=4, limit=2, ctx=ctx)
+        assert last.next_offset is None and len(last.pages) == 1
+        assert last.pages[0].markdown
+        bad = await srv.job_results(job_id="r", limit=0, ctx=ctx)
+        assert "limit 1-500" in bad.error
+        missing = await srv.job_results(job_id="nope", ctx=ctx)
+        assert missing.state == "unknown"
+
+
+class TestCancel:
+    async def test_cancel_stops_the_crawl_and_keeps_its_pages(
+        self, make_ctx, gated_crawler
+    ) -> None:
+        ctx, gate = make_ctx(), asyncio.Event()
+        with patch.object(srv, "_require_crawler", return_value=gated_crawler(gate, 3)):
+            await srv.start_crawl_job(
+                tool="crawl_many", arguments={"urls": URLS}, job_id="c", ctx=ctx
+            )
+            job = ctx.request_context.lifespan_context.jobs.get("c")
+            await _until(lambda: job.progress >= 3)
+            out = await srv.cancel_job(job_id="c", ctx=ctx)
+        assert out.state == "cancelled" and out.finished is not None
+        kept = await srv.job_results(job_id="c", ctx=ctx)
+        assert [p.url for p in kept.pages] == URLS[:3]
+        assert "Start it again" in kept.note
+        again = await srv.cancel_job(job_id="c", ctx=ctx)
+        assert again.state == "cancelled"
+
+    async def test_starting_it_again_resumes(self, make_ctx, gated_crawler) -> None:
+        ctx, gate = make_ctx(), asyncio.Event()
+        asked = []
+        crawler = gated_crawler(gate, 2)
+        inner = crawler.arun_many
+
+        async def arun_many(urls, config, dispatcher):
+            asked.append(list(urls))
+            return await inner(urls, config, dispatcher)
+
+        crawler.arun_many = arun_many
+        jobs = ctx.request_context.lifespan_context.jobs
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            await srv.start_crawl_job(
+                tool="crawl_many", arguments={"urls": URLS}, job_id="again", ctx=ctx
+            )
+            await _until(lambda: jobs.get("again").progress >= 2)
+            await srv.cancel_job(job_id="again", ctx=ctx)
+            gate.set()
+            await srv.start_crawl_job(
+                tool="crawl_many", arguments={"urls": URLS}, job_id="again", ctx=ctx
+            )
+            await jobs.get("again").task
+        assert asked == [URLS, URLS[2:]]
+        assert jobs.get("again").state == "done"
+
+
+class TestTable:
+    async def test_full_table_forgets_the_oldest_finished_job(self, tmp_path) -> None:
+        table = JobTable(tmp_path, limit=2)
+        await table.add(Job("a", "crawl_many", {}, state="done", created=1))
+        await table.add(Job("b", "crawl_many", {}, created=2))
+        await table.store_result("a", {"pages": []})
+        assert await table.add(Job("c", "crawl_many", {}, created=3)) is None
+        assert [j.job_id for j in table.jobs()] == ["b", "c"]
+        assert not table.result_path("a").exists()
+        refused = await table.add(Job("d", "crawl_many", {}, created=4))
+        assert "All 2 job slots are running" in refused
+        assert "already running" in await table.add(Job("b", "crawl_many", {}))
+
+    async def test_a_restart_finds_the_table_with_running_jobs_interrupted(
+        self, tmp_path
+    ) -> None:
+        table = JobTable(tmp_path)
+        await table.add(Job("done", "crawl_many", {"urls": []}, state="done"))
+        await table.add(Job("live", "deep_crawl", {"url": "https://a.test/"}))
+        reloaded = JobTable(tmp_path)
+        reloaded.load()
+        assert reloaded.get("done").state == "done"
+        live = reloaded.get("live")
+        assert live.state == "interrupted" and live.finished is not None
+        assert live.arguments == {"url": "https://a.test/"}
+        saved = json.loads((tmp_path / "jobs.json").read_text())
+        assert "task" not in saved[0] and "cancel_requested" not in saved[0]
+
+    async def test_an_unreadable_table_starts_empty(self, tmp_path) -> None:
+        (tmp_path / "jobs.json").write_text("{not json")
+        table = JobTable(tmp_path)
+        table.load()
+        assert table.jobs() == []
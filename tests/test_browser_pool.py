@@ -0,0 +1,330 @@
+"""Tests for the browser pool.
+
+A pool only helps if calls actually spread across it, and it is only safe if
+a session never moves between browsers. The failures guarded here:
+
+- every call landing on the first browser, which is a pool of one with extra
+  processes
+- a session's second call going to a different browser, where crawl4ai would
+  silently start a fresh session without its cookies
+- a batch weighing the same as a single page, so the next call piles on to
+  the browser already running 500 pages
+- a crashed browser staying in rotation, failing every call routed to it
+- the tools no longer taking their crawler through the pool
+- a recycle closing a browser a call is still using, or one holding a session
+"""
+
+import asyncio
+import inspect
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.pool import CrawlerPool, RecyclePolicy, pool_size_from_env
+
+
+def _crawler(connected: bool = True) -> MagicMock:
+    c = MagicMock()
+    c.close = AsyncMock()
+    c.crawler_strategy.kill_session = AsyncMock()
+    c.crawler_strategy.browser_manager.browser.is_connected.return_value = connected
+    return c
+
+
+def _starter(crawlers: list | None = None):
+    """A start coroutine handing out fresh mock crawlers, like _start_crawler."""
+    made = crawlers if crawlers is not None else []
+
+    async def start():
+        c = _crawler()
+        made.append(c)
+        return c, ""
+
+    return start, made
+
+
+async def _full_pool(size: int) -> CrawlerPool:
+    start, _ = _starter()
+    pool = CrawlerPool(size, start)
+    await pool.start()
+    return pool
+
+
+class TestSizing:
+    def test_default_is_one_browser(self, monkeypatch) -> None:
+        monkeypatch.delenv("CRAWL4AI_MCP_BROWSERS", raising=False)
+        assert pool_size_from_env() == 1
+
+    def test_env_sets_the_size(self, monkeypatch) -> None:
+        monkeypatch.setenv("CRAWL4AI_MCP_BROWSERS", "4")
+        assert pool_size_from_env() == 4
+
+    def test_nonsense_falls_back(self, monkeypatch) -> None:
+        monkeypatch.setenv("CRAWL4AI_MCP_BROWSERS", "lots")
+        assert pool_size_from_env() == 1
+
+    async def test_start_launches_every_browser(self) -> None:
+        pool = await _full_pool(3)
+        assert len(pool.slots) == 3
+
+    async def test_a_failed_launch_is_reported_and_the_rest_still_run(self) -> None:
+        calls = {"n": 0}
+
+        async def start():
+            calls["n"] += 1
+            if calls["n"] == 2:
+                return None, "no chromium"
+            return _crawler(), ""
+
+        pool = CrawlerPool(3, start)
+        assert await pool.start() == "no chromium"
+        assert len(pool.slots) == 2
+
+
+class TestLeastOutstanding:
+    async def test_concurrent_calls_spread_across_browsers(self) -> None:
+        pool = await _full_pool(2)
+        async with pool.lease() as first:
+            async with pool.lease() as second:
+                assert first is not second
+
+    async def test_a_batch_weighs_its_page_count(self) -> None:
+        pool = await _full_pool(2)
+        async with pool.lease(weight=500) as busy:
+            for _ in range(3):
+                async with pool.lease() as other:
+                    assert other is not busy
+
+    async def test_outstanding_returns_to_zero(self) -> None:
+        pool = await _full_pool(2)
+        async with pool.lease(weight=7):
+            pass
+        assert [s.outstanding for s in pool.slots] == [0, 0]
+        assert sum(s.pages for s in pool.slots) == 7
+
+
+class TestSessionPinning:
+    async def test_a_session_stays_on_its_browser(self) -> None:
+        pool = await _full_pool(3)
+        async with pool.lease("auth") as first:
+            pass
+        # Load up the session's browser so least-outstanding would move away.
+        async with pool.lease(weight=100) as _:
+            for _ in range(3):
+                async with pool.lease("auth") as again:
+                    assert again is first
+        assert pool.owner("auth") is first
+
+    async def test_forgetting_a_session_unpins_it(self) -> None:
+        pool = await _full_pool(2)
+        async with pool.lease("auth"):
+            pass
+        pool.forget_session("auth")
+        assert pool.owner("auth") is None
+
+
+class TestHealthChecks:
+    async def test_a_disconnected_browser_is_replaced(self) -> None:
+        start, made = _starter()
+        pool = CrawlerPool(2, start)
+        await pool.start()
+        dead = pool.slots[1].crawler
+        dead.crawler_strategy.browser_manager.browser.is_connected.return_value = False
+
+        assert await pool.check() == 1
+        assert dead not in pool.crawlers
+        dead.close.assert_awaited()
+        assert pool.slots[1].restarts == 1
+        assert len(made) == 3
+
+    async def test_sessions_on_a_replaced_browser_are_unpinned(self) -> None:
+        """Their pages died with the browser; pinning to the new one would
+        pretend the cookies survived."""
+        pool = await _full_pool(1)
+        async with pool.lease("auth"):
+            pass
+        await pool.replace(pool.slots[0], "test")
+        assert pool.owner("auth") is None
+
+    async def test_a_healthy_pool_is_left_alone(self) -> None:
+        pool = await _full_pool(2)
+        assert await pool.check() == 0
+
+    async def test_a_failed_replacement_keeps_the_slot(self) -> None:
+        pool = await _full_pool(1)
+
+        async def broken():
+            return None, "launch failed"
+
+        pool._start = broken
+        assert await pool.replace(pool.slots[0], "test") is False
+        assert len(pool.slots) == 1 and not pool.slots[0].draining
+
+
+class TestServerWiring:
+    async def test_lease_without_a_pool_uses_the_single_crawler(self) -> None:
+        crawler = _crawler()
+        app = srv.AppContext(crawler=crawler, profile_manager=MagicMock(), sessions={})
+        async with srv._lease_crawler(app) as leased:
+            assert leased is crawler
+
+    async def test_lease_with_a_pool_goes_through_it(self) -> None:
+        pool = await _full_pool(2)
+        app = srv.AppContext(
+            crawler=pool.primary, profile_manager=MagicMock(), sessions={}, pool=pool
+        )
+        async with srv._lease_crawler(app):
+            async with srv._lease_crawler(app) as second:
+                assert second is pool.slots[1].crawler
+
+    async def test_destroy_session_kills_it_on_its_own_browser(self) -> None:
+        pool = await _full_pool(2)
+        app = srv.AppContext(
+            crawler=pool.primary, profile_manager=MagicMock(), sessions={}, pool=pool
+        )
+        async with pool.lease(weight=5):
+            async with pool.lease("auth") as owner:
+                pass
+        app.sessions["auth"] = 0.0
+        ctx = MagicMock()
+        ctx.request_context.lifespan_context = app
+        await srv.destroy_session(session_id="auth", ctx=ctx)
+        owner.crawler_strategy.kill_session.assert_awaited_once_with("auth")
+        assert pool.owner("auth") is None
+
+    def test_crawl_tools_take_their_crawler_from_the_pool(self) -> None:
+        for name in (
+            "crawl_url",
+            "create_session",
+            "crawl_many",
+            "crawl_sitemap",
+            "deep_crawl",
+            "extract_structured",
+            "extract_css",
+            "extract_patterns",
+        ):
+            source = inspect.getsource(getattr(srv, name))
+            assert "_lease_crawler(" in source, name
+            assert "_require_crawler(app)" not in source, name
+
+    async def test_repair_hands_the_new_browser_to_the_pool(self, monkeypatch) -> None:
+        start, _ = _starter()
+        pool = CrawlerPool(1, start)
+        app = srv.AppContext(
+            crawler=None, profile_manager=MagicMock(), sessions={}, pool=pool
+        )
+        sentinel = _crawler()
+        monkeypatch.setattr(srv, "_install_browser", lambda: (True, "/chrome"))
+
+        async def fake_start():
+            return sentinel, ""
+
+        monkeypatch.setattr(srv, "_start_crawler", fake_start)
+        ok, _ = await srv._repair_browser(app)
+        await asyncio.sleep(0)
+        assert ok and pool.primary is sentinel
+        assert len(pool.slots) == 1
+
+
+# ---------------------------------------------------------------------------
+# Recycling
+# ---------------------------------------------------------------------------
+
+
+async def _recycling_pool(policy: RecyclePolicy, size: int = 1, rss=None):
+    start, made = _starter()
+    pool = CrawlerPool(size, start, policy=policy, rss_probe=rss or (lambda c: None))
+    await pool.start()
+    return pool, made
+
+
+class TestRecyclePolicy:
+    def test_off_unless_configured(self, monkeypatch) -> None:
+        for name in ("PAGES", "HOURS", "RSS_MB"):
+            monkeypatch.delenv(f"CRAWL4AI_MCP_RECYCLE_{name}", raising=False)
+        assert not RecyclePolicy.from_env().enabled
+
+    def test_env_sets_every_limit(self, monkeypatch) -> None:
+        monkeypatch.setenv("CRAWL4AI_MCP_RECYCLE_PAGES", "5000")
+        monkeypatch.setenv("CRAWL4AI_MCP_RECYCLE_HOURS", "12")
+        monkeypatch.setenv("CRAWL4AI_MCP_RECYCLE_RSS_MB", "2048")
+        policy = RecyclePolicy.from_env()
+        assert policy.max_pages == 5000
+        assert policy.max_age_s == 12 * 3600
+        assert policy.max_rss_bytes == 2048 * 1024 * 1024
+
+    def test_without_psutil_the_rss_limit_is_off(self, monkeypatch) -> None:
+        monkeypatch.setenv("CRAWL4AI_MCP_RECYCLE_PAGES", "5000")
+        monkeypatch.setenv("CRAWL4AI_MCP_RECYCLE_RSS_MB", "2048")
+        monkeypatch.setattr("crawl4ai_mcp.pool.psutil_available", lambda: False)
+        policy = RecyclePolicy.from_env()
+        assert policy.max_pages == 5000 and policy.max_rss_bytes == 0
+
+
+class TestRecycling:
+    async def test_page_count_triggers_a_recycle(self) -> None:
+        pool, made = await _recycling_pool(RecyclePolicy(max_pages=10))
+        async with pool.lease(weight=10):
+            pass
+        assert await pool.recycle_due() == 1
+        assert pool.primary is made[1]
+        assert pool.slots[0].pages == 0
+
+    async def test_age_triggers_a_recycle(self) -> None:
+        pool, _ = await _recycling_pool(RecyclePolicy(max_age_s=60))
+        pool.slots[0].started_at -= 61
+        assert "up" in pool.recycle_reason(pool.slots[0])
+
+    async def test_rss_triggers_a_recycle(self) -> None:
+        pool, _ = await _recycling_pool(
+            RecyclePolicy(max_rss_bytes=100), rss=lambda c: 500
+        )
+        assert "RSS" in pool.recycle_reason(pool.slots[0])
+
+    async def test_an_unreadable_rss_never_recycles(self) -> None:
+        pool, _ = await _recycling_pool(RecyclePolicy(max_rss_bytes=100))
+        assert pool.recycle_reason(pool.slots[0]) is None
+
+    async def test_in_flight_calls_finish_on_the_old_browser(self) -> None:
+        """A recycle must not close a browser a call is still crawling with."""
+        pool, made = await _recycling_pool(RecyclePolicy(max_pages=1))
+        async with pool.lease(weight=1):
+            pass
+        async with pool.lease() as held:
+            await pool.recycle_due()
+            # New calls already go to the replacement...
+            async with pool.lease() as fresh:
+                assert fresh is made[1]
+            await asyncio.sleep(0.6)
+            # ...while the old one stays open for the call still using it.
+            held.close.assert_not_awaited()
+        await asyncio.sleep(0.6)
+        held.close.assert_awaited_once()
+
+    async def test_a_live_session_blocks_the_recycle(self) -> None:
+        pool, made = await _recycling_pool(RecyclePolicy(max_pages=1))
+        async with pool.lease("auth", weight=5) as owner:
+            pass
+        manager = owner.crawler_strategy.browser_manager
+        manager.sessions = {"auth": (None, None, time.time())}
+        manager.session_ttl = 1800
+        assert await pool.recycle_due() == 0
+        assert pool.primary is owner
+
+    async def test_an_expired_session_does_not_block_forever(self) -> None:
+        pool, made = await _recycling_pool(RecyclePolicy(max_pages=1))
+        async with pool.lease("auth", weight=5) as owner:
+            pass
+        manager = owner.crawler_strategy.browser_manager
+        manager.sessions = {"auth": (None, None, time.time() - 3600)}
+        manager.session_ttl = 1800
+        assert await pool.recycle_due() == 1
+
+    async def test_shutdown_closes_a_browser_still_draining(self) -> None:
+        pool, made = await _recycling_pool(RecyclePolicy(max_pages=1))
+        async with pool.lease(weight=1):
+            pass
+        async with pool.lease() as held:
+            await pool.recycle_due()
+            await pool.close()
+        held.close.assert_awaited()
@@ -0,0 +1,278 @@
+"""Tests for URL canonicalization across the batch tools and deep_crawl.
+
+The point is that one page listed or linked several ways costs one browser
+render, not three. The failures guarded here:
+
+- two URLs for one page both fetched, or two pages merged into one
+- a tracking parameter kept, or a parameter that selects content dropped
+- a URL a fetched page names as rel=canonical fetched anyway under
+  rel_canonical, or skipped without it
+- a URL the caller passed missing from the result because it was not fetched
+- sitemap duplicates counted towards max_urls
+- canonicalize="off" not fetching every URL as given
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+from crawl4ai import CrawlerRunConfig
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.canonical import Canonicalizer, declared_canonical
+from crawl4ai_mcp.dispatch import StreamingSemaphoreDispatcher
+
+# Kept before any test patches httpx.AsyncClient to hand out a fake site.
+_AsyncClient = httpx.AsyncClient
+
+
+class TestKey:
+    def test_one_page_many_ways(self) -> None:
+        key = Canonicalizer().key
+        same = {
+            key("https://Docs.Example.com:443/guide/?utm_source=feed#install"),
+            key("https://docs.example.com/guide/"),
+            key("HTTPS://docs.example.com/guide/?fbclid=x&utm_medium=y"),
+        }
+        assert same == {"https://docs.example.com/guide/"}
+        assert key("https://a.test/p?b=2&a=1") == key("https://a.test/p?a=1&b=2")
+        assert key("http://a.test:80") == "http://a.test/"
+
+    def test_what_selects_content_is_kept(self) -> None:
+        key = Canonicalizer().key
+        assert key("https://a.test:8443/p") == "https://a.test:8443/p"
+        assert key("https://a.test/p?ref=x&page=2") == "https://a.test/p?page=2&ref=x"
+        # A repeated parameter keeps its values' order; the encoding is untouched.
+        assert (
+            key("https://a.test/?t=b&t=a&q=a%20b") == "https://a.test/?q=a%20b&t=b&t=a"
+        )
+        assert key("https://a.test/guide") != key("https://a.test/guide/")
+        assert key("mailto:x@a.test") == "mailto:x@a.test"
+
+    def test_loose_merges_trailing_slashes(self) -> None:
+        key = Canonicalizer("loose").key
+        assert key("https://a.test/guide/") == key("https://a.test/guide")
+        assert key("https://a.test") == "https://a.test/"
+
+    def test_extra_tracking_params_from_the_environment(self, monkeypatch) -> None:
+        monkeypatch.setenv("CRAWL4AI_MCP_TRACKING_PARAMS", "src, cmp_*")
+        key = Canonicalizer().key
+        assert key("https://a.test/?src=x&cmp_id=1&id=2") == "https://a.test/?id=2"
+
+
+class TestDeclaredCanonical:
+    def test_finds_the_link_however_written(self) -> None:
+        base = "https://a.test/p?x=1"
+        assert (
+            declared_canonical('<link href="/p" rel="canonical">', base)
+            == "https://a.test/p"
+        )
+        assert (
+            declared_canonical("<LINK REL='Canonical' HREF='https://b.test/'>", base)
+            == "https://b.test/"
+        )
+        assert declared_canonical('<link rel="stylesheet" href="/s.css">', base) is None
+        assert declared_canonical(None, base) is None
+
+
+class _Pages:
+    """A crawler whose pages may declare a canonical URL."""
+
+    def __init__(self, canonical: dict | None = None, links: dict | None = None):
+        self.canonical = canonical or {}
+        self.links = links or {}
+        self.fetched: list[str] = []
+
+    async def arun(self, url, config=None, **_):
+        self.fetched.append(url)
+        await asyncio.sleep(0.001)
+        r = MagicMock()
+        r.url, r.status_code, r.success, r.error_message = url, 200, True, None
+        r.metadata, r.crawl_stats, r.response_headers = {}, None, {}
+        r.html = ""
+        if url in self.canonical:
+            r.html = f'<head><link rel="canonical" href="{self.canonical[url]}">'
+        r.links = {"internal": [{"href": h} for h in self.links.get(url, [])]}
+        r.markdown.fit_markdown = "x"
+        return r
+
+    async def arun_many(self, urls, config, dispatcher):
+        async def results():
+            async for task in dispatcher.run_urls_stream(self, urls, config):
+                yield task.result
+
+        return results()
+
+    def crawler(self) -> MagicMock:
+        crawler = MagicMock()
+        crawler.arun = self.arun
+        crawler.arun_many = self.arun_many
+        return crawler
+
+
+class TestDispatcherSkip:
+    async def test_a_declared_canonical_is_not_fetched(self) -> None:
+        pages = _Pages(canonical={"https://a.test/print": "https://a.test/article"})
+        canonical = Canonicalizer(rel_canonical=True)
+        dispatcher = StreamingSemaphoreDispatcher(
+            semaphore_count=1, canonical=canonical
+        )
+        urls = ["https://a.test/print", "https://a.test/article", "https://a.test/x"]
+        results = []
+        async for task in dispatcher.run_urls_stream(pages, urls, CrawlerRunConfig()):
+            results.append(task.result.url)
+        assert results == ["https://a.test/print", "https://a.test/x"]
+        assert canonical.canonical_skips == 1
+
+
+def _run(ctx, pages: _Pages, tool, **kwargs):
+    with patch.object(srv, "_require_crawler", return_value=pages.crawler()):
+        return asyncio.run(tool(ctx=ctx, **kwargs))
+
+
+class TestCrawlMany:
+    URLS = [
+        "https://a.test/guide/",
+        "https://A.test/guide/?utm_source=x",
+        "https://a.test/guide/#top",
+        "https://a.test/other",
+        "https://a.test/other",
+    ]
+
+    def test_duplicates_are_fetched_once(self, make_ctx) -> None:
+        pages = _Pages()
+        out = _run(make_ctx(), pages, srv.crawl_many, urls=self.URLS)
+        assert pages.fetched == ["https://a.test/guide/", "https://a.test/other"]
+        assert out.crawled == 2
+        assert "3 duplicate URL(s) were not fetched" in out.note
+        # Every URL passed is in the result; the exact repeat is the page itself.
+        assert {p.url: p.duplicate_of for p in out.pages} == {
+            "https://a.test/guide/": None,
+            "https://a.test/other": None,
+            "https://A.test/guide/?utm_source=x": "https://a.test/guide/",
+            "https://a.test/guide/#top": "https://a.test/guide/",
+        }
+
+    def test_off_fetches_every_url(self, make_ctx) -> None:
+        pages = _Pages()
+        out = _run(
+            make_ctx(), pages, srv.crawl_many, urls=self.URLS, canonicalize="off"
+        )
+        assert len(pages.fetched) == 5 and out.note is None
+
+    def test_a_page_naming_another_as_canonical(self, make_ctx) -> None:
+        urls = ["https://a.test/p?print=1", "https://a.test/p"]
+        pages = _Pages(canonical={urls[0]: urls[1]})
+        out = _run(make_ctx(), pages, srv.crawl_many, urls=urls, max_concurrent=1)
+        # Off by default: both URLs the caller listed are fetched.
+        assert pages.fetched == urls and out.note is None
+
+        pages = _Pages(canonical={urls[0]: urls[1]})
+        out = _run(
+            make_ctx(),
+            pages,
+            srv.crawl_many,
+            urls=urls,
+            max_concurrent=1,
+            rel_canonical=True,
+        )
+        assert pages.fetched == ["https://a.test/p?print=1"]
+        assert "1 were named by a fetched page's rel=canonical" in out.note
+        skipped = next(p for p in out.pages if p.url == "https://a.test/p")
+        assert skipped.duplicate_of == "https://a.test/p?print=1"
+        assert skipped.markdown is None and out.crawled == 1
+
+    def test_an_unknown_mode_is_refused(self, make_ctx) -> None:
+        out = _run(
+            make_ctx(),
+            _Pages(),
+            srv.crawl_many,
+            urls=["https://a.test/"],
+            canonicalize="x",
+        )
+        assert "canonicalize" in out.error
+        out = _run(
+            make_ctx(),
+            _Pages(),
+            srv.crawl_many,
+            urls=["https://a.test/"],
+            canonicalize="off",
+            rel_canonical=True,
+        )
+        assert "rel_canonical" in out.error
+
+
+class TestCrawlSitemap:
+    def test_duplicates_do_not_count_towards_max_urls(self, make_ctx) -> None:
+        locs = [
+            "https://a.test/1",
+            "https://a.test/1?utm_campaign=z",
+            "https://a.test/2",
+            "https://a.test/2#x",
+            "https://a.test/3",
+        ]
+        body = (
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            + "".join(f"<url><loc>{loc}</loc></url>" for loc in locs)
+            + "</urlset>"
+        ).encode()
+
+        def client(**_):
+            return _AsyncClient(
+                transport=httpx.MockTransport(
+                    lambda r: httpx.Response(200, content=body)
+                )
+            )
+
+        pages = _Pages()
+        with patch.object(srv.httpx, "AsyncClient", side_effect=client):
+            out = _run(
+                make_ctx(),
+                pages,
+                srv.crawl_sitemap,
+                sitemap_url="https://a.test/sitemap.xml",
+                max_urls=3,
+            )
+        assert pages.fetched == [
+            "https://a.test/1",
+            "https://a.test/2",
+            "https://a.test/3",
+        ]
+        assert "2 duplicate URL(s)" in out.note
+        assert sorted(p.duplicate_of for p in out.pages if p.duplicate_of) == [
+            "https://a.test/1",
+            "https://a.test/2",
+        ]
+
+
+class TestDeepCrawl:
+    def test_links_are_followed_once_per_canonical_url(self, make_ctx) -> None:
+        pages = _Pages(
+            links={
+                "https://a.test/": [
+                    "https://a.test/a?utm_source=nav",
+                    "https://a.test/a",
+                    "https://a.test/b?y=2&x=1",
+                    "https://a.test/b?x=1&y=2",
+                    "https://a.test/print",
+                ],
+                "https://a.test/print": ["https://a.test/c"],
+            },
+            canonical={"https://a.test/print": "https://a.test/c"},
+        )
+        out = _run(
+            make_ctx(),
+            pages,
+            srv.deep_crawl,
+            url="https://a.test/?utm_medium=x",
+            max_concurrent=1,
+            rel_canonical=True,
+        )
+        assert sorted(pages.fetched) == [
+            "https://a.test/",
+            "https://a.test/a",
+            "https://a.test/b?x=1&y=2",
+            "https://a.test/print",
+        ]
+        assert out.crawled == 4
+        assert "duplicate URL(s) were not fetched" in out.note
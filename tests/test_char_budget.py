@@ -0,0 +1,157 @@
+"""Tests for max_total_chars, max_chars_per_page and crawl_url's max_chars.
+
+A budget is only worth setting if what comes back is still readable and the
+caller can tell what was left out. The failures guarded here:
+
+- a cut landing inside a code fence, or leaving a heading with no body
+- the total overrun by the page that crosses it
+- pages after the budget still carrying content, links or tables
+- a cut nobody reports, so a truncated page reads as the whole page
+- output_dir files cut along with the inline result
+"""
+
+import asyncio
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.budget import CharBudget, truncate_markdown
+
+DOC = (
+    "# Title\n\n"
+    "Intro paragraph.\n\n"
+    "## Code\n\n"
+    "```python\nx = 1\n\ny = 2\n```\n\n"
+    "## Next\n\n"
+    "Closing paragraph that is fairly long."
+)
+
+
+class TestTruncateMarkdown:
+    def test_cuts_between_blocks(self) -> None:
+        assert truncate_markdown(DOC, 30) == "# Title\n\nIntro paragraph."
+
+    def test_never_inside_a_fence(self) -> None:
+        inside = DOC.index("y = 2")
+        out = truncate_markdown(DOC, inside)
+        assert out.count("```") % 2 == 0
+        assert out == "# Title\n\nIntro paragraph."
+
+    def test_a_trailing_heading_goes_with_its_body(self) -> None:
+        end_of_code = DOC.index("## Next") + len("## Next")
+        out = truncate_markdown(DOC, end_of_code)
+        assert out.endswith("```") and "## Next" not in out
+
+    def test_one_long_block_falls_back_to_a_hard_cut(self) -> None:
+        assert truncate_markdown("x" * 50, 10) == "x" * 10
+
+    def test_short_text_is_untouched(self) -> None:
+        assert truncate_markdown(DOC, len(DOC)) == DOC
+
+
+class TestCharBudget:
+    def test_the_total_is_never_exceeded(self) -> None:
+        budget = CharBudget(max_total=40)
+        first, cut = budget.markdown(DOC)
+        assert len(first) <= 40 and cut == len(DOC) - len(first)
+        second, cut = budget.markdown(DOC)
+        assert budget.used <= 40
+        assert second is None or len(first) + len(second) <= 40
+        assert "Character budget" in budget.note()
+
+    def test_a_per_page_cut_leaves_the_total_open(self) -> None:
+        budget = CharBudget(max_total=10_000, max_per_page=3_000)
+        page = ("Paragraph of text.\n\n" * 252)[:5_040]
+        kept = [budget.markdown(page)[0] for _ in range(3)]
+        assert budget.used == sum(map(len, kept)) < 10_000
+        # The fourth page is cut by what is left of the total, not emptied.
+        fourth, _ = budget.markdown(page)
+        assert fourth and len(fourth) <= 10_000 - sum(map(len, kept))
+        assert budget.emptied == 0
+        assert budget.markdown(page) == (None, len(page))
+
+    def test_no_limits_is_no_budget(self) -> None:
+        assert CharBudget.of(None, None) is None
+
+
+@pytest.fixture
+def doc_result(make_result):
+    """A page whose markdown is DOC, with 20 links and no tables."""
+
+    def make(url: str):
+        links = [{"href": f"{url}/{i}", "text": "x"} for i in range(20)]
+        return make_result(
+            url, content=DOC, links={"internal": links, "external": []}, tables=[]
+        )
+
+    return make
+
+
+URLS = [f"https://a.test/{i}" for i in range(4)]
+
+
+def _crawl_many(ctx, crawler, **kwargs):
+    with patch.object(srv, "_require_crawler", return_value=crawler):
+        return asyncio.run(srv.crawl_many(urls=URLS, ctx=ctx, **kwargs))
+
+
+class TestBatchTools:
+    @pytest.fixture
+    def crawler(self, doc_result, make_streaming_crawler):
+        return make_streaming_crawler(lambda urls: map(doc_result, urls))
+
+    def test_per_page_limit_cuts_every_page(self, make_ctx, crawler) -> None:
+        out = _crawl_many(make_ctx(), crawler, max_chars_per_page=30)
+        assert all(p.markdown == "# Title\n\nIntro paragraph." for p in out.pages)
+        assert all(p.truncated == len(DOC) - 25 for p in out.pages)
+        assert "4 page(s) cut short" in out.note
+
+    def test_total_limit_empties_the_pages_after_it(self, make_ctx, crawler) -> None:
+        out = _crawl_many(
+            make_ctx(), crawler, max_total_chars=len(DOC) + 30, include_links=True
+        )
+        first, *rest = out.pages
+        assert first.markdown == DOC and first.truncated is None
+        # The first page's links spent the rest: one fit, and nothing after.
+        assert len(first.links.internal) == 1
+        assert all(p.markdown is None and p.links is None for p in rest)
+        assert all(p.truncated == len(DOC) for p in rest)
+        assert out.crawled == 4 and "without content" in out.note
+
+    def test_output_dir_files_are_whole(self, tmp_path, make_ctx, crawler) -> None:
+        out = _crawl_many(
+            make_ctx(), crawler, max_chars_per_page=10, output_dir=str(tmp_path)
+        )
+        for page in out.pages:
+            with open(os.path.join(tmp_path, page.file), encoding="utf-8") as f:
+                assert f.read() == DOC
+
+    def test_limits_must_be_positive(self, make_ctx, crawler) -> None:
+        out = _crawl_many(make_ctx(), crawler, max_total_chars=0)
+        assert "max_total_chars must be 1 or more" in out.error
+
+
+class TestCrawlUrl:
+    @pytest.fixture
+    def run(self, doc_result):
+        def run(ctx, **kwargs) -> str:
+            crawler = MagicMock()
+            crawler.arun = AsyncMock(return_value=doc_result("https://a.test/"))
+            with patch.object(srv, "_require_crawler", return_value=crawler):
+                return asyncio.run(
+                    srv.crawl_url(
+                        url="https://a.test/", render="browser", ctx=ctx, **kwargs
+                    )
+                )
+
+        return run
+
+    def test_max_chars_cuts_and_says_so(self, make_ctx, run) -> None:
+        out = run(make_ctx(), max_chars=30)
+        assert out.startswith("# Title\n\nIntro paragraph.\n\n--- Truncated ---")
+        assert f"of {len(DOC)} characters left out" in out
+
+    def test_without_max_chars_the_page_is_whole(self, make_ctx, run) -> None:
+        assert run(make_ctx()) == DOC
@@ -0,0 +1,301 @@
+"""Tests for job_id: checkpointed crawls that resume instead of restarting.
+
+A resume is only worth anything if it skips exactly the work already done.
+The failures guarded here:
+
+- a second call fetching every page again
+- a page that failed last time being treated as done
+- a job_id reused for a different crawl mixing two crawls' pages, including
+  the same URLs fetched under different settings
+- a job_id that escapes the state directory
+- a deep crawl resuming with the rest of a half-fetched level forgotten
+- a crash that cut the last checkpoint line short making the job unreadable
+"""
+
+import asyncio
+import json
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.checkpoint import (
+    PAGES_FILE,
+    Checkpoint,
+    checkpoint_dir,
+    job_id_error,
+    resumable_state,
+)
+
+
+class _Died(Exception):
+    pass
+
+
+def _dies_after(pages: int):
+    """An on_yield that kills the crawl once it has handed over pages."""
+    taken = []
+
+    def on_yield(page) -> None:
+        taken.append(page)
+        if len(taken) == pages:
+            raise _Died
+
+    return on_yield
+
+
+URLS = [f"https://a.test/{i}" for i in range(4)]
+
+
+class TestCrawlMany:
+    def _run(self, ctx, crawler, **kwargs):
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            return asyncio.run(srv.crawl_many(urls=URLS, ctx=ctx, **kwargs))
+
+    def test_a_resumed_job_fetches_only_what_is_left(
+        self, make_ctx, make_streaming_crawler
+    ) -> None:
+        asked: list = []
+        with pytest.raises(_Died):
+            self._run(
+                make_ctx(),
+                make_streaming_crawler(asked=asked, on_yield=_dies_after(2)),
+                job_id="docs",
+            )
+        out = self._run(make_ctx(), make_streaming_crawler(asked=asked), job_id="docs")
+        assert asked == [URLS, URLS[2:]]
+        assert out.crawled == 4
+        assert sorted(p.url for p in out.pages) == URLS
+        assert all(p.markdown for p in out.pages)
+        assert "Resumed job 'docs': 2 pages" in out.note
+
+    def test_failures_are_tried_again(self, make_ctx, make_streaming_crawler) -> None:
+        asked: list = []
+        first = self._run(
+            make_ctx(),
+            make_streaming_crawler(asked=asked, fail={URLS[1]}),
+            job_id="docs",
+        )
+        assert first.crawled == 3
+        out = self._run(make_ctx(), make_streaming_crawler(asked=asked), job_id="docs")
+        assert asked[1] == [URLS[1]]
+        assert out.crawled == 4 and out.total == 4
+
+    def test_with_output_dir_the_files_and_manifest_carry_over(
+        self, tmp_path, make_ctx, make_streaming_crawler
+    ):
+        asked: list = []
+        out_dir = str(tmp_path / "out")
+        with pytest.raises(_Died):
+            self._run(
+                make_ctx(),
+                make_streaming_crawler(asked=asked, on_yield=_dies_after(1)),
+                job_id="j",
+                output_dir=out_dir,
+            )
+        out = self._run(
+            make_ctx(),
+            make_streaming_crawler(asked=asked),
+            job_id="j",
+            output_dir=out_dir,
+        )
+        with open(out.manifest, encoding="utf-8") as f:
+            assert sorted(json.loads(line)["url"] for line in f) == URLS
+        assert all(os.path.exists(os.path.join(out_dir, p.file)) for p in out.pages)
+        assert os.path.isdir(os.path.join(out_dir, ".jobs", "j"))
+
+    def test_a_job_id_names_one_crawl(self, make_ctx, make_streaming_crawler) -> None:
+        self._run(make_ctx(), make_streaming_crawler(), job_id="docs")
+        with patch.object(
+            srv, "_require_crawler", return_value=make_streaming_crawler()
+        ):
+            out = asyncio.run(
+                srv.crawl_many(urls=["https://b.test/"], job_id="docs", ctx=make_ctx())
+            )
+        assert out.total == 0 and "belongs to a different crawl" in out.error
+        out = self._run(
+            make_ctx(), make_streaming_crawler(), job_id="docs", query="pricing"
+        )
+        assert out.total == 0 and "belongs to a different crawl" in out.error
+
+    def test_job_ids_stay_inside_the_state_directory(
+        self, make_ctx, make_streaming_crawler
+    ) -> None:
+        assert job_id_error("../../etc") is not None
+        assert job_id_error(".hidden") is not None
+        assert job_id_error("docs-2026.10_a") is None
+        out = self._run(make_ctx(), make_streaming_crawler(), job_id="../x")
+        assert "is not usable" in out.error
+
+
+class TestSitemap:
+    def test_a_resumed_sitemap_is_not_fetched_again(
+        self, make_ctx, make_streaming_crawler
+    ) -> None:
+        fetch = AsyncMock(return_value=(list(URLS[:3]), True, None))
+        asked: list = []
+        with (
+            patch.object(srv, "_list_sitemap", fetch),
+            patch.object(
+                srv,
+                "_require_crawler",
+                return_value=make_streaming_crawler(asked=asked),
+            ),
+        ):
+            for _ in range(2):
+                out = asyncio.run(
+                    srv.crawl_sitemap(
+                        sitemap_url="https://a.test/sitemap.xml",
+                        job_id="sm",
+                        max_urls=3,
+                        ctx=make_ctx(),
+                    )
+                )
+        assert fetch.await_count == 1
+        assert asked == [URLS[:3]]
+        assert out.crawled == 3
+        assert "crawled the first 3" in out.note
+
+
+class TestCheckpointFile:
+    async def test_a_torn_last_line_is_ignored(self) -> None:
+        checkpoint = await Checkpoint.open("t", None, "crawl_many", {"urls": []})
+        await checkpoint.record({"url": "u", "success": True})
+        await checkpoint.close(complete=False)
+        with open(os.path.join(checkpoint.path, PAGES_FILE), "a") as f:
+            f.write('{"url": "v", "succ')
+        again = await Checkpoint.open("t", None, "crawl_many", {"urls": []})
+        assert again.finished == {"u"}
+        await again.close(complete=False)
+
+    async def test_a_frontier_is_built_only_when_it_is_written(self) -> None:
+        checkpoint = await Checkpoint.open("t", None, "deep_crawl", {"url": "x"})
+        built = []
+
+        def state() -> dict:
+            built.append(len(built))
+            return {"visited": [], "pending": [], "pages_crawled": len(built)}
+
+        for _ in range(50):
+            await checkpoint.save_frontier(state)
+        assert len(built) == 1
+        await checkpoint.close(complete=False)
+        assert len(built) == 2 and checkpoint.frontier["pages_crawled"] == 2
+
+    def test_output_dir_decides_where_it_lives(self, tmp_path) -> None:
+        assert checkpoint_dir("j", "/out") == os.path.join("/out", ".jobs", "j")
+        assert checkpoint_dir("j", None) == str(tmp_path / "state" / "jobs" / "j")
+
+
+class TestDeepCrawlFrontier:
+    def test_unfinished_pages_go_back_in_the_frontier(self) -> None:
+        bfs = {
+            "strategy_type": "bfs",
+            "visited": ["a", "b", "c"],
+            "pending": [{"url": "d", "parent_url": "a"}],
+            "depths": {"a": 0, "b": 1, "c": 1, "d": 2},
+            "pages_crawled": 3,
+        }
+        state = resumable_state(bfs, finished={"a"})
+        assert state["visited"] == ["a"]
+        assert [p["url"] for p in state["pending"]] == ["b", "c", "d"]
+        assert state["pages_crawled"] == 1
+
+        best = {
+            "strategy_type": "best_first",
+            "visited": ["a", "b"],
+            "queue_items": [],
+            "depths": {"a": 0, "b": 1},
+        }
+        state = resumable_state(best, finished={"a"})
+        assert state["queue_items"] == [
+            {"score": 0.0, "depth": 1, "url": "b", "parent_url": None}
+        ]
+
+    def test_a_deep_crawl_resumes_only_with_the_same_scope(
+        self, make_ctx, make_result
+    ) -> None:
+        async def arun(url, config, **_):
+            async def pages():
+                yield make_result(url, depth=0)
+
+            return pages()
+
+        crawler = MagicMock()
+        crawler.arun = arun
+
+        def run(**kwargs):
+            with patch.object(srv, "_require_crawler", return_value=crawler):
+                return asyncio.run(
+                    srv.deep_crawl(
+                        url="https://a.test/0",
+                        job_id="deep",
+                        engine="crawl4ai",
+                        ctx=make_ctx(),
+                        **kwargs,
+                    )
+                )
+
+        assert run().error is None
+        for changed in (
+            {"max_depth": 1},
+            {"exclude_pattern": "*/old/*"},
+            {"query": "x"},
+        ):
+            assert "belongs to a different crawl" in run(**changed).error
+        assert run().error is None
+
+    def test_a_deep_crawl_resumes_from_its_saved_frontier(
+        self, make_ctx, make_result
+    ) -> None:
+        strategies = []
+
+        def crawler(die: bool):
+            async def arun(url, config, **_):
+                strategy = config.deep_crawl_strategy
+                strategies.append(strategy)
+
+                async def pages():
+                    yield make_result(url, depth=0)
+                    await strategy._on_state_change(
+                        {
+                            "strategy_type": "bfs",
+                            "visited": [url, "https://a.test/1"],
+                            "pending": [{"url": "https://a.test/2", "parent_url": url}],
+                            "depths": {url: 0, "https://a.test/1": 1},
+                            "pages_crawled": 1,
+                        }
+                    )
+                    if die:
+                        raise _Died
+                    yield make_result("https://a.test/1", depth=1)
+
+                return pages()
+
+            c = MagicMock()
+            c.arun = arun
+            return c
+
+        def run(die: bool):
+            with patch.object(srv, "_require_crawler", return_value=crawler(die)):
+                return asyncio.run(
+                    srv.deep_crawl(
+                        url="https://a.test/0",
+                        job_id="deep",
+                        engine="crawl4ai",
+                        ctx=make_ctx(),
+                    )
+                )
+
+        with pytest.raises(_Died):
+            run(die=True)
+        assert strategies[0]._resume_state is None
+        out = run(die=False)
+        resumed = strategies[1]._resume_state
+        assert resumed["visited"] == ["https://a.test/0"]
+        assert [p["url"] for p in resumed["pending"]] == [
+            "https://a.test/1",
+            "https://a.test/2",
+        ]
+        assert "Resumed job 'deep': 1 pages" in out.note
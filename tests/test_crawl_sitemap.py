@@ -10,13 +10,32 @@ Tests cover:
 - any sitemap XML namespace parses, not just sitemaps.org 0.9
 """
 
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import patch
 
+import httpx
 import pytest
 
 from crawl4ai_mcp.server import _fetch_sitemap_urls, mcp
 
 
+def _serve(xml: bytes | dict[str, bytes]):
+    """Patch httpx so _fetch_sitemap_urls reads these exact bodies.
+
+    One body answers every URL; a dict answers by URL. The client is real and
+    only its transport is not, so the body is streamed the way a server's is.
+    """
+    real = httpx.AsyncClient
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = xml if isinstance(xml, bytes) else xml[str(request.url)]
+        return httpx.Response(200, content=body)
+
+    def make(**kwargs):
+        return real(transport=httpx.MockTransport(handler), **kwargs)
+
+    return patch("crawl4ai_mcp.server.httpx.AsyncClient", side_effect=make)
+
+
 # ---------------------------------------------------------------------------
 # crawl_sitemap -- tool registration
 # ---------------------------------------------------------------------------
@@ -45,16 +64,7 @@ class TestFetchSitemapUrlsRegular:
   <url><loc>https://example.com/page2</loc></url>
 </urlset>"""
 
-        mock_response = MagicMock()
-        mock_response.content = sitemap_xml
-        mock_response.raise_for_status = MagicMock()
-
-        mock_client = AsyncMock()
-        mock_client.get = AsyncMock(return_value=mock_response)
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=False)
-
-        with patch("crawl4ai_mcp.server.httpx.AsyncClient", return_value=mock_client):
+        with _serve(sitemap_xml):
             urls = await _fetch_sitemap_urls("https://example.com/sitemap.xml")
 
         assert urls == ["https://example.com/page1", "https://example.com/page2"]
@@ -75,16 +85,7 @@ class TestFetchSitemapUrlsNoNamespace:
   <url><loc>https://example.com/page1</loc></url>
 </urlset>"""
 
-        mock_response = MagicMock()
-        mock_response.content = sitemap_xml
-        mock_response.raise_for_status = MagicMock()
-
-        mock_client = AsyncMock()
-        mock_client.get = AsyncMock(return_value=mock_response)
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=False)
-
-        with patch("crawl4ai_mcp.server.httpx.AsyncClient", return_value=mock_client):
+        with _serve(sitemap_xml):
             urls = await _fetch_sitemap_urls("https://example.com/sitemap.xml")
 
         assert urls == ["https://example.com/page1"]
@@ -112,28 +113,11 @@ class TestFetchSitemapUrlsIndex:
   <url><loc>https://example.com/from-sub-2</loc></url>
 </urlset>"""
 
-        def make_response(content: bytes):
-            resp = MagicMock()
-            resp.content = content
-            resp.raise_for_status = MagicMock()
-            return resp
-
-        # First call returns index, second returns sub-sitemap
-        call_count = 0
-
-        async def mock_get(url):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                return make_response(index_xml)
-            return make_response(sub_sitemap_xml)
-
-        mock_client = AsyncMock()
-        mock_client.get = mock_get
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=False)
-
-        with patch("crawl4ai_mcp.server.httpx.AsyncClient", return_value=mock_client):
+        bodies = {
+            "https://example.com/sitemap_index.xml": index_xml,
+            "https://example.com/sitemap1.xml": sub_sitemap_xml,
+        }
+        with _serve(bodies):
             urls = await _fetch_sitemap_urls("https://example.com/sitemap_index.xml")
 
         assert urls == [
@@ -156,16 +140,7 @@ class TestFetchSitemapUrlsEmpty:
 <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
 </urlset>"""
 
-        mock_response = MagicMock()
-        mock_response.content = sitemap_xml
-        mock_response.raise_for_status = MagicMock()
-
-        mock_client = AsyncMock()
-        mock_client.get = AsyncMock(return_value=mock_response)
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=False)
-
-        with patch("crawl4ai_mcp.server.httpx.AsyncClient", return_value=mock_client):
+        with _serve(sitemap_xml):
             urls = await _fetch_sitemap_urls("https://example.com/sitemap.xml")
 
         assert urls == []
@@ -176,19 +151,6 @@ class TestFetchSitemapUrlsEmpty:
 # ---------------------------------------------------------------------------
 
 
-def _serve(xml: bytes):
-    """Patch httpx so _fetch_sitemap_urls sees this exact body."""
-    resp = MagicMock()
-    resp.content = xml
-    resp.url = "https://example.com/sitemap.xml"
-    resp.raise_for_status = MagicMock()
-    client = AsyncMock()
-    client.get = AsyncMock(return_value=resp)
-    client.__aenter__ = AsyncMock(return_value=client)
-    client.__aexit__ = AsyncMock(return_value=False)
-    return patch("crawl4ai_mcp.server.httpx.AsyncClient", return_value=client)
-
-
 class TestLocParsingRobustness:
     """These guard three ways a valid sitemap used to come back wrong.
 
@@ -195,10 +195,20 @@ class TestOverridesAreScopedToTheirTask:
         crawler = MagicMock()
         srv._install_override_hooks(crawler)
 
-        installed = {
+        installed = [
             c.args[0] for c in crawler.crawler_strategy.set_hook.call_args_list
-        }
-        assert installed == {"before_goto", "on_page_context_created"}
+        ]
+        assert sorted(installed) == sorted(
+            {
+                "before_goto",
+                "on_page_context_created",
+                # Phase timing; inert unless a call asked for include_timings.
+                "after_goto",
+                "before_retrieve_html",
+                "on_execution_started",
+                "before_return_html",
+            }
+        )
 
     @pytest.mark.asyncio
     async def test_hooks_are_a_no_op_when_nothing_was_supplied(self) -> None:
@@ -0,0 +1,214 @@
+"""Tests for deep_crawl's on-disk frontier and visited set.
+
+The point is that a very large deep crawl runs without holding its frontier
+or its pages in memory, and picks up where it stopped. The failures guarded
+here:
+
+- a URL the crawl has seen reported unseen, by the Bloom filter or SQLite
+- the disk frontier handing URLs out in a different order from the memory one
+- a resumed crawl losing the pages that were in flight or failed, or
+  fetching again the ones it finished
+- pages held for the response instead of written as they finish
+- the scratch file of a crawl without a job_id left behind
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from crawl4ai import CrawlerRunConfig
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.dispatch import StreamingSemaphoreDispatcher
+from crawl4ai_mcp.frontier import Frontier, FrontierCrawl
+from crawl4ai_mcp.frontier_store import BloomFilter, DiskFrontier
+
+
+class _Site:
+    """A crawler over a dict of url -> links."""
+
+    def __init__(self, links: dict) -> None:
+        self.links = links
+        self.fetched: list[str] = []
+        # The crawl dies on this fetch, like a server restarted mid-crawl.
+        self.stop_after: int | None = None
+
+    async def arun(self, url, config=None, **_):
+        self.fetched.append(url)
+        if len(self.fetched) == self.stop_after:
+            raise asyncio.CancelledError
+        await asyncio.sleep(0.001)
+        r = MagicMock()
+        r.url, r.status_code, r.success, r.error_message = url, 200, True, None
+        r.metadata, r.crawl_stats, r.response_headers = {}, None, {}
+        r.links = {"internal": [{"href": h} for h in self.links.get(url, [])]}
+        r.markdown.fit_markdown = f"# {url}"
+        return r
+
+    def crawler(self) -> MagicMock:
+        crawler = MagicMock()
+        crawler.arun = self.arun
+        return crawler
+
+
+def _tree(fanout: int, depth: int, root: str = "https://a.test/") -> dict:
+    links, level = {}, [root]
+    for _ in range(depth):
+        nxt = []
+        for url in level:
+            links[url] = [f"{url.rstrip('/')}/{i}" for i in range(fanout)]
+            nxt += links[url]
+        level = nxt
+    return links
+
+
+class TestBloomFilter:
+    def test_no_false_negatives_and_few_false_positives(self) -> None:
+        bloom = BloomFilter(5000)
+        for i in range(5000):
+            bloom.add(f"https://a.test/{i}")
+        assert all(f"https://a.test/{i}" in bloom for i in range(5000))
+        false = sum(f"https://b.test/{i}" in bloom for i in range(5000))
+        assert false < 5000 * 0.03
+
+
+class TestDiskFrontier:
+    def test_same_order_as_the_memory_frontier(self, tmp_path) -> None:
+        urls = [
+            ("https://a.test/1", 0.1),
+            ("https://a.test/2", 0.9),
+            ("https://b.test/1", 0.5),
+            ("https://a.test/3", 0.5),
+            ("https://c.test/1", 0.0),
+        ]
+        for best_first in (False, True):
+            memory = Frontier(best_first=best_first)
+            disk = DiskFrontier.open(tmp_path / f"{best_first}.db", best_first)
+            for url, score in urls:
+                assert memory.add(url, 1, score=score) == disk.add(url, 1, score=score)
+            assert not disk.add("https://a.test/1", 2)
+            order = [disk.pop().url for _ in range(len(disk))]
+            assert order == [memory.pop().url for _ in range(len(memory))]
+            assert disk.pop() is None
+            disk.close()
+
+    def test_a_reopened_file_resumes(self, tmp_path) -> None:
+        path = tmp_path / "frontier.sqlite3"
+        disk = DiskFrontier.open(path)
+        for i in range(5):
+            disk.add(f"https://a.test/{i}", 1)
+        done, failed, in_flight, late = (disk.pop() for _ in range(4))
+        disk.done(done, True)
+        disk.done(failed, False)
+        disk.close()
+
+        # late finished after the last commit; the job checkpoint has it.
+        disk = DiskFrontier.open(path, finished={late.url})
+        assert disk.crawled == 2
+        assert "https://a.test/0" in disk and not disk.add(late.url, 1)
+        assert {disk.pop().url for _ in range(len(disk))} == {
+            failed.url,
+            in_flight.url,
+            "https://a.test/4",
+        }
+        disk.close()
+
+    def test_the_bloom_filter_spares_lookups_of_new_urls(self, tmp_path) -> None:
+        disk = DiskFrontier.open(tmp_path / "f.db", bloom_capacity=1000)
+        for i in range(100):
+            disk.add(f"https://a.test/{i}", 1)
+        assert disk.bloom_skips >= 95
+        assert all(f"https://a.test/{i}" in disk for i in range(100))
+        disk.close()
+
+        without = DiskFrontier.open(tmp_path / "g.db", bloom_capacity=0)
+        assert without.bloom is None and without.add("https://a.test/", 0)
+        without.close()
+
+
+class TestFrontierCrawl:
+    async def test_crawls_what_the_memory_frontier_crawls(self, tmp_path) -> None:
+        links = _tree(fanout=3, depth=3)
+        fetched = []
+        for store in (None, DiskFrontier.open(tmp_path / "f.db")):
+            site = _Site(links)
+            engine = FrontierCrawl(
+                "https://a.test/", max_depth=2, max_pages=10, frontier=store
+            )
+            dispatcher = StreamingSemaphoreDispatcher(semaphore_count=1)
+            pages = [
+                p
+                async for p in engine.run(
+                    site.crawler(), CrawlerRunConfig(), dispatcher
+                )
+            ]
+            assert len(pages) == 10
+            fetched.append(site.fetched)
+        assert fetched[0] == fetched[1]
+        store.close()
+
+
+def _deep_crawl(ctx, site: _Site, **kwargs):
+    kwargs.setdefault("frontier_store", "disk")
+    with patch.object(srv, "_require_crawler", return_value=site.crawler()):
+        return asyncio.run(srv.deep_crawl(url="https://a.test/", ctx=ctx, **kwargs))
+
+
+class TestDeepCrawl:
+    def test_pages_stream_to_output_dir(self, tmp_path, make_ctx) -> None:
+        site = _Site(_tree(fanout=3, depth=2))
+        out = _deep_crawl(make_ctx(), site, max_pages=8, output_dir=str(tmp_path))
+        assert out.error is None and out.crawled == 8
+        assert all(p.markdown is None and p.file for p in out.pages)
+        lines = (tmp_path / "manifest.jsonl").read_text().splitlines()
+        assert len(lines) == 8
+        assert "Frontier kept on disk" in out.note
+        # Scratch without a job_id.
+        assert not list(tmp_path.glob(".frontier.sqlite3*"))
+
+    def test_a_job_resumes_from_the_file(self, tmp_path, make_ctx) -> None:
+        site = _Site(_tree(fanout=3, depth=2))
+        site.stop_after = 5
+        with pytest.raises(asyncio.CancelledError):
+            _deep_crawl(
+                make_ctx(), site, max_pages=9, output_dir=str(tmp_path), job_id="j"
+            )
+        assert (tmp_path / ".jobs" / "j" / "frontier.sqlite3").exists()
+
+        second = _Site(site.links)
+        out = _deep_crawl(
+            make_ctx(), second, max_pages=9, output_dir=str(tmp_path), job_id="j"
+        )
+        assert out.crawled == 9
+        done = set(site.fetched) - set(second.fetched)
+        assert len(done) == 4 and len(second.fetched) == 5
+        entries = [
+            json.loads(line)
+            for line in (tmp_path / "manifest.jsonl").read_text().splitlines()
+        ]
+        assert len({e["url"] for e in entries}) == 9
+
+    def test_needs_output_dir_and_the_frontier_engine(self, tmp_path, make_ctx) -> None:
+        site = _Site({})
+        assert "output_dir" in _deep_crawl(make_ctx(), site).error
+        out = _deep_crawl(make_ctx(), site, engine="crawl4ai", output_dir=str(tmp_path))
+        assert "engine='frontier'" in out.error
+        assert (
+            "frontier_store"
+            in _deep_crawl(make_ctx(), site, frontier_store="lmdb").error
+        )
+        assert site.fetched == []
+
+
+def test_a_large_frontier_stays_on_disk(tmp_path) -> None:
+    """100,000 queued URLs cost the file, not the process."""
+    disk = DiskFrontier.open(tmp_path / "big.db", bloom_capacity=200_000)
+    began = time.perf_counter()
+    for i in range(100_000):
+        disk.add(f"https://a.test/{i}", 1)
+    assert len(disk) == 100_000
+    assert time.perf_counter() - began < 30
+    assert disk.pop().url == "https://a.test/0"
+    disk.close()
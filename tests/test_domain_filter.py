@@ -58,6 +58,9 @@ def _run_deep_crawl(**kwargs):
     ctx.request_context.lifespan_context = MagicMock()
     ctx.report_progress = MagicMock(return_value=asyncio.sleep(0))
 
+    # The strategy is crawl4ai's engine; the frontier engine's handling of the
+    # same parameters is covered in test_frontier.py.
+    kwargs.setdefault("engine", "crawl4ai")
     with patch("crawl4ai_mcp.server._require_crawler", return_value=crawler):
         out = asyncio.run(deep_crawl(ctx=ctx, **kwargs))
     return captured["strategy"], out
@@ -0,0 +1,27 @@
+"""Tests for reading numbers from the environment.
+
+The failures guarded here: a bad value stopping the server instead of
+falling back, and a value below the floor getting through.
+"""
+
+from crawl4ai_mcp.env import env_int, env_number
+
+
+def test_numbers(monkeypatch) -> None:
+    assert env_number("CRAWL4AI_MCP_TEST_N", 2.5) == 2.5
+    monkeypatch.setenv("CRAWL4AI_MCP_TEST_N", " 0.25 ")
+    assert env_number("CRAWL4AI_MCP_TEST_N", 2.5) == 0.25
+    monkeypatch.setenv("CRAWL4AI_MCP_TEST_N", "-3")
+    assert env_number("CRAWL4AI_MCP_TEST_N", 2.5) == 0.0
+    assert env_number("CRAWL4AI_MCP_TEST_N", 2.5, minimum=1.0) == 1.0
+    monkeypatch.setenv("CRAWL4AI_MCP_TEST_N", "fast")
+    assert env_number("CRAWL4AI_MCP_TEST_N", 2.5) == 2.5
+
+
+def test_integers(monkeypatch) -> None:
+    assert env_int("CRAWL4AI_MCP_TEST_N", 4) == 4
+    monkeypatch.setenv("CRAWL4AI_MCP_TEST_N", "0")
+    assert env_int("CRAWL4AI_MCP_TEST_N", 4) == 0
+    assert env_int("CRAWL4AI_MCP_TEST_N", 4, minimum=1) == 1
+    monkeypatch.setenv("CRAWL4AI_MCP_TEST_N", "1.5")
+    assert env_int("CRAWL4AI_MCP_TEST_N", 4) == 4
@@ -0,0 +1,209 @@
+"""Tests for the server's own deep-crawl frontier.
+
+The point is that no slot waits on a depth level's slowest page, and that
+max_pages means exactly that many. The failures guarded here:
+
+- a fast page's links waiting for a slow sibling to finish
+- more pages fetched than max_pages successes need, or fewer returned
+- one host taking every turn while another has URLs queued
+- links followed that crawl4ai's rules would not follow, or the reverse
+- a resumed crawl fetching again what its checkpoint says was fetched
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+from crawl4ai import CrawlerRunConfig
+from crawl4ai.deep_crawling.filters import DomainFilter, FilterChain
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.dispatch import StreamingSemaphoreDispatcher
+from crawl4ai_mcp.frontier import Frontier, FrontierCrawl
+
+
+class _Site:
+    """A crawler over a dict of url -> links, with per-URL latency."""
+
+    def __init__(self, links: dict, slow: dict | None = None, fail=()) -> None:
+        self.links = links
+        self.slow = slow or {}
+        self.fail = set(fail)
+        self.fetched: list[str] = []
+        self.finished: dict[str, float] = {}
+        self.began = time.perf_counter()
+
+    async def arun(self, url, config=None, **_):
+        self.fetched.append(url)
+        await asyncio.sleep(self.slow.get(url, 0.001))
+        self.finished[url] = time.perf_counter() - self.began
+        r = MagicMock()
+        r.url, r.status_code = url, 200
+        r.success = url not in self.fail
+        r.error_message = None if r.success else "boom"
+        r.metadata = {}
+        r.links = {
+            "internal": [{"href": h} for h in self.links.get(url, []) if "a.test" in h],
+            "external": [
+                {"href": h} for h in self.links.get(url, []) if "a.test" not in h
+            ],
+        }
+        r.markdown.fit_markdown = "x"
+        r.crawl_stats, r.response_headers = None, {}
+        return r
+
+    def crawler(self) -> MagicMock:
+        crawler = MagicMock()
+        crawler.arun = self.arun
+        return crawler
+
+
+def _tree(fanout: int, depth: int, root: str = "https://a.test/") -> dict:
+    links, level = {}, [root]
+    for _ in range(depth):
+        nxt = []
+        for url in level:
+            links[url] = [f"{url.rstrip('/')}/{i}" for i in range(fanout)]
+            nxt += links[url]
+        level = nxt
+    return links
+
+
+async def _crawl(site: _Site, start="https://a.test/", concurrency=4, **kwargs):
+    kwargs.setdefault("max_depth", 3)
+    kwargs.setdefault("max_pages", 100)
+    engine = FrontierCrawl(start, **kwargs)
+    dispatcher = StreamingSemaphoreDispatcher(semaphore_count=concurrency)
+    pages = [
+        p async for p in engine.run(site.crawler(), CrawlerRunConfig(), dispatcher)
+    ]
+    return engine, pages
+
+
+class TestFrontier:
+    def test_hosts_take_turns(self) -> None:
+        frontier = Frontier()
+        for url in ("https://a.test/1", "https://a.test/2", "https://a.test/3"):
+            frontier.add(url, 1)
+        frontier.add("https://b.test/1", 1)
+        assert not frontier.add("https://a.test/1", 2)
+        order = [frontier.pop().url for _ in range(len(frontier))]
+        assert order == [
+            "https://a.test/1",
+            "https://b.test/1",
+            "https://a.test/2",
+            "https://a.test/3",
+        ]
+        assert frontier.pop() is None
+
+    def test_best_first_takes_the_highest_score(self) -> None:
+        frontier = Frontier(best_first=True)
+        for url, score in (("low", 0.1), ("high", 0.9), ("mid", 0.5)):
+            frontier.add(f"https://a.test/{url}", 1, score=score)
+        assert [frontier.pop().url[15:] for _ in range(3)] == ["high", "mid", "low"]
+
+
+class TestFrontierCrawl:
+    async def test_a_slow_page_does_not_hold_back_the_next_level(self) -> None:
+        links = {
+            "https://a.test/": ["https://a.test/slow", "https://a.test/fast"],
+            "https://a.test/fast": ["https://a.test/fast/child"],
+        }
+        site = _Site(links, slow={"https://a.test/slow": 0.3})
+        _, pages = await _crawl(site)
+        assert len(pages) == 4
+        # A level barrier would start the child only after slow finished.
+        assert (
+            site.finished["https://a.test/fast/child"]
+            < site.finished["https://a.test/slow"]
+        )
+
+    async def test_max_pages_is_exact(self) -> None:
+        site = _Site(_tree(fanout=5, depth=3))
+        engine, pages = await _crawl(site, max_pages=7)
+        assert len(pages) == 7 and len(site.fetched) == 7
+        assert engine.pages_crawled == 7
+
+    async def test_failures_do_not_count_and_their_slots_are_reused(self) -> None:
+        site = _Site(_tree(fanout=5, depth=2), fail={"https://a.test/1"})
+        _, pages = await _crawl(site, max_pages=4)
+        assert sum(p.success for p in pages) == 4
+        assert len(pages) == 5
+
+    async def test_depth_parent_and_max_depth(self) -> None:
+        site = _Site(_tree(fanout=2, depth=3))
+        _, pages = await _crawl(site, max_depth=1)
+        by_url = {p.url: p.metadata for p in pages}
+        assert by_url["https://a.test/"] == {"depth": 0, "parent_url": None}
+        assert by_url["https://a.test/1"] == {
+            "depth": 1,
+            "parent_url": "https://a.test/",
+        }
+        assert len(pages) == 3
+
+    async def test_external_links_and_filters(self) -> None:
+        links = {
+            "https://a.test/": [
+                "https://a.test/1",
+                "https://b.test/1",
+                "https://c.test/1",
+            ]
+        }
+        _, pages = await _crawl(_Site(links))
+        assert {p.url for p in pages} == {"https://a.test/", "https://a.test/1"}
+
+        chain = FilterChain([DomainFilter(blocked_domains=["c.test"])])
+        _, pages = await _crawl(_Site(links), include_external=True, filter_chain=chain)
+        assert {p.url for p in pages} == {
+            "https://a.test/",
+            "https://a.test/1",
+            "https://b.test/1",
+        }
+
+    async def test_a_resume_fetches_only_what_was_pending(self) -> None:
+        site = _Site(_tree(fanout=2, depth=2))
+        state = {
+            "strategy_type": "frontier",
+            "visited": ["https://a.test/", "https://a.test/0"],
+            "pending": [{"url": "https://a.test/1", "parent_url": "https://a.test/"}],
+            "depths": {"https://a.test/": 0, "https://a.test/1": 1},
+            "pages_crawled": 2,
+        }
+        engine, _ = await _crawl(site, resume_state=state, max_pages=10)
+        assert site.fetched[0] == "https://a.test/1"
+        assert "https://a.test/" not in site.fetched
+        assert "https://a.test/0" not in site.fetched
+        assert engine.pages_crawled == 2 + len(site.fetched)
+
+    async def test_state_is_reported_after_each_page(self) -> None:
+        states: list[dict] = []
+
+        async def save(build) -> None:
+            states.append(build())
+
+        site = _Site(_tree(fanout=2, depth=1))
+        await _crawl(site, on_state_change=save)
+        assert len(states) == 3
+        assert states[0]["strategy_type"] == "frontier"
+        assert {p["url"] for p in states[0]["pending"]} <= {
+            "https://a.test/0",
+            "https://a.test/1",
+        }
+        assert states[-1]["pending"] == [] and states[-1]["pages_crawled"] == 3
+
+
+class TestDeepCrawl:
+    def test_the_frontier_engine_is_the_default(self, make_ctx) -> None:
+        site = _Site(_tree(fanout=3, depth=3))
+        with patch.object(srv, "_require_crawler", return_value=site.crawler()):
+            out = asyncio.run(
+                srv.deep_crawl(url="https://a.test/", max_pages=5, ctx=make_ctx())
+            )
+        assert out.crawled == 5 and len(site.fetched) == 5
+        assert [p.depth for p in out.pages] == [0, 1, 1, 1, 2]
+
+    def test_an_unknown_engine_is_refused(self, make_ctx) -> None:
+        out = asyncio.run(
+            srv.deep_crawl(url="https://a.test/", engine="dfs", ctx=make_ctx())
+        )
+        assert "engine" in out.error and "frontier" in out.error
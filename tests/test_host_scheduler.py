@@ -0,0 +1,242 @@
+"""Tests for the process-wide per-host scheduler.
+
+The scheduler exists so that load on an origin is bounded however many calls
+are aimed at it. The failures guarded here:
+
+- two calls against one host each getting the full cap
+- one slow host holding up fetches to every other host
+- the token bucket letting a burst through, or a cancelled waiter keeping
+  the token it never used
+- the call that starts a deep crawl holding a slot for the whole crawl, so
+  its own pages on that host can never get one
+- the plain-HTTP path going around it
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from crawl4ai.deep_crawling import DeepCrawlDecorator
+
+from crawl4ai_mcp import scheduler as sched
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.profiles import ProfileManager, build_run_config
+from crawl4ai_mcp.scheduler import HostScheduler, host_key, schedule_crawler
+
+
+class _Peak:
+    """Counts concurrent holders per host and remembers the highest."""
+
+    def __init__(self) -> None:
+        self.now: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+
+    async def hold(self, url: str, seconds: float = 0.01) -> None:
+        host = host_key(url)
+        self.now[host] = self.now.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.now[host])
+        await asyncio.sleep(seconds)
+        self.now[host] -= 1
+
+
+class TestHostKey:
+    def test_hosts_are_keyed_by_hostname(self) -> None:
+        assert host_key("https://Docs.Example.com:8443/a") == "docs.example.com"
+        assert host_key("http://docs.example.com/b") == "docs.example.com"
+
+    def test_non_network_urls_are_not_scheduled(self) -> None:
+        assert host_key("raw:<html></html>") is None
+        assert host_key("file:///tmp/a.html") is None
+
+
+class TestSlots:
+    async def test_the_cap_is_shared_by_every_caller(self) -> None:
+        scheduler = HostScheduler(concurrency=2)
+        peak = _Peak()
+
+        async def fetch(url: str) -> None:
+            async with scheduler.slot(url):
+                await peak.hold(url)
+
+        async def one_call(prefix: str) -> None:
+            await asyncio.gather(
+                *(fetch(f"https://a.test/{prefix}{i}") for i in range(4))
+            )
+
+        await asyncio.gather(one_call("x"), one_call("y"), one_call("z"))
+        assert peak.peak == {"a.test": 2}
+
+    async def test_a_busy_host_does_not_hold_up_another(self) -> None:
+        scheduler = HostScheduler(concurrency=1)
+        release = asyncio.Event()
+
+        async def slow() -> None:
+            async with scheduler.slot("https://slow.test/"):
+                await release.wait()
+
+        blocker = asyncio.create_task(slow())
+        await asyncio.sleep(0)
+        async with asyncio.timeout(1):
+            async with scheduler.slot("https://fast.test/"):
+                pass
+        release.set()
+        await blocker
+
+    async def test_idle_hosts_are_forgotten(self) -> None:
+        scheduler = HostScheduler()
+        async with scheduler.slot("https://a.test/"):
+            assert "a.test" in scheduler._hosts
+        assert scheduler._hosts == {}
+        assert scheduler.waiting == 0
+
+    async def test_raw_urls_pass_straight_through(self) -> None:
+        scheduler = HostScheduler(concurrency=1)
+        async with scheduler.slot("raw:<p>a</p>"), scheduler.slot("raw:<p>b</p>"):
+            assert scheduler._hosts == {}
+
+
+class TestTokenBucket:
+    async def test_waiters_are_spaced_by_the_rate(self) -> None:
+        scheduler = HostScheduler(rate=10, burst=2)
+        sleeps: list[float] = []
+
+        async def fake_sleep(seconds: float) -> None:
+            sleeps.append(round(seconds, 6))
+
+        with (
+            patch.object(sched.time, "monotonic", return_value=100.0),
+            patch.object(sched.asyncio, "sleep", fake_sleep),
+        ):
+            for i in range(5):
+                async with scheduler.slot(f"https://a.test/{i}"):
+                    pass
+        # Two tokens of burst, then one every 100 ms, reserved in arrival order.
+        assert sleeps == [0.1, 0.2, 0.3]
+
+    async def test_the_bucket_refills_over_time(self) -> None:
+        scheduler = HostScheduler(rate=2, burst=1)
+        clock = iter([0.0, 0.0, 10.0])
+        with patch.object(sched.time, "monotonic", lambda: next(clock)):
+            async with scheduler.slot("https://a.test/"):
+                pass
+            async with scheduler.slot("https://a.test/"):
+                pass
+        assert scheduler._hosts["a.test"].tokens == 0.0
+
+    async def test_a_cancelled_waiter_gives_its_token_back(self) -> None:
+        scheduler = HostScheduler(rate=1, burst=1)
+        async with scheduler.slot("https://a.test/"):
+            pass
+        waiter = asyncio.create_task(scheduler.slot("https://a.test/").__aenter__())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        assert scheduler._hosts["a.test"].tokens > -0.5
+        assert scheduler.waiting == 0
+
+
+class TestFromEnv:
+    def test_defaults(self, monkeypatch) -> None:
+        for name in ("HOST_CONCURRENCY", "HOST_RATE", "HOST_BURST"):
+            monkeypatch.delenv(f"CRAWL4AI_MCP_{name}", raising=False)
+        scheduler = HostScheduler.from_env()
+        assert scheduler.concurrency == sched.DEFAULT_HOST_CONCURRENCY
+        assert scheduler.rate == 0.0
+
+    def test_values_and_bad_values(self, monkeypatch) -> None:
+        monkeypatch.setenv("CRAWL4AI_MCP_HOST_CONCURRENCY", "3")
+        monkeypatch.setenv("CRAWL4AI_MCP_HOST_RATE", "0.5")
+        monkeypatch.setenv("CRAWL4AI_MCP_HOST_BURST", "lots")
+        scheduler = HostScheduler.from_env()
+        assert (scheduler.concurrency, scheduler.rate, scheduler.burst) == (3, 0.5, 1.0)
+
+
+class TestCrawlerWrapping:
+    def _crawler(self, peak: _Peak) -> SimpleNamespace:
+        async def arun(url, config=None, **kwargs):
+            await peak.hold(url)
+            return url
+
+        return SimpleNamespace(arun=arun)
+
+    async def test_every_page_takes_a_slot(self) -> None:
+        peak = _Peak()
+        crawler = self._crawler(peak)
+        schedule_crawler(crawler, HostScheduler(concurrency=1))
+        await asyncio.gather(
+            *(crawler.arun(url=f"https://a.test/{i}", config=None) for i in range(3))
+        )
+        assert peak.peak == {"a.test": 1}
+
+    async def test_wrapping_twice_wraps_once(self) -> None:
+        crawler = self._crawler(_Peak())
+        scheduler = HostScheduler()
+        schedule_crawler(crawler, scheduler)
+        first = crawler.arun
+        schedule_crawler(crawler, scheduler)
+        assert crawler.arun is first
+
+    async def test_the_outer_deep_crawl_call_holds_no_slot(self) -> None:
+        scheduler = HostScheduler(concurrency=1)
+        crawler = SimpleNamespace()
+
+        async def arun(url, config=None, **kwargs):
+            if config is not None and not DeepCrawlDecorator.deep_crawl_active.get():
+                # What crawl4ai's decorator does: mark the crawl active and
+                # fetch the start page through the same arun.
+                token = DeepCrawlDecorator.deep_crawl_active.set(True)
+                try:
+                    return await crawler.arun(url, config=config)
+                finally:
+                    DeepCrawlDecorator.deep_crawl_active.reset(token)
+            return url
+
+        crawler.arun = arun
+        schedule_crawler(crawler, scheduler)
+        deep = SimpleNamespace(deep_crawl_strategy=object())
+        async with asyncio.timeout(1):
+            assert (
+                await crawler.arun("https://a.test/", config=deep) == "https://a.test/"
+            )
+
+
+class TestServerWiring:
+    def test_the_http_path_goes_through_the_scheduler(self) -> None:
+        peak = _Peak()
+
+        async def fetch_page(client, url, headers=None):
+            await peak.hold(url)
+            return None, "refused"
+
+        app = srv.AppContext(
+            crawler=MagicMock(), profile_manager=ProfileManager(), sessions={}
+        )
+        run_cfg = build_run_config(ProfileManager(), None)
+        with (
+            patch.object(srv, "_host_scheduler", HostScheduler(concurrency=1)),
+            patch.object(srv, "fetch_page", fetch_page),
+        ):
+            results, _, _ = asyncio.run(
+                srv._crawl_over_http(
+                    app,
+                    [f"https://a.test/{i}" for i in range(4)],
+                    run_cfg,
+                    {},
+                    "http",
+                    max_concurrent=4,
+                )
+            )
+        assert len(results) == 4
+        assert peak.peak == {"a.test": 1}
+
+    def test_waiters_are_a_metrics_gauge(self) -> None:
+        app = srv.AppContext(
+            crawler=MagicMock(), profile_manager=ProfileManager(), sessions={}
+        )
+        waiting = HostScheduler()
+        waiting.waiting = 3
+        with patch.object(srv, "_host_scheduler", waiting):
+            assert srv._metrics_gauges(app)["host_slot_waiters"] == 3
@@ -0,0 +1,147 @@
+"""Tests for the shared HTTP client behind every non-browser fetch.
+
+The point of one client is that connections outlive a single fetch. The
+failures guarded here:
+
+- a sitemap index opening a client, and so a handshake, per child
+- a plain-HTTP batch building its own client when the server has one
+- per-call headers lost once the client is no longer per batch
+- a cookie one call's site set being sent on another call's request
+- the shared client quietly speaking HTTP/1.1 when HTTP/2 is available
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.http_client import client_or_own, shared_client
+from crawl4ai_mcp.profiles import ProfileManager, build_run_config
+
+INDEX = "https://a.test/sitemap_index.xml"
+CHILDREN = [f"https://a.test/sitemap-{i}.xml" for i in range(30)]
+
+
+def _sitemaps(request: httpx.Request) -> httpx.Response:
+    url = str(request.url)
+    if url == INDEX:
+        locs = "".join(f"<sitemap><loc>{c}</loc></sitemap>" for c in CHILDREN)
+        return httpx.Response(200, text=f"<sitemapindex>{locs}</sitemapindex>")
+    return httpx.Response(
+        200, text=f"<urlset><url><loc>{url}.page</loc></url></urlset>"
+    )
+
+
+class TestSitemapIndex:
+    async def test_every_child_goes_through_one_client(self) -> None:
+        real = httpx.AsyncClient
+        made: list[httpx.AsyncClient] = []
+
+        def make(**kwargs):
+            client = real(transport=httpx.MockTransport(_sitemaps), **kwargs)
+            made.append(client)
+            return client
+
+        with patch("crawl4ai_mcp.server.httpx.AsyncClient", side_effect=make):
+            urls = await srv._fetch_sitemap_urls(INDEX)
+        assert len(urls) == len(CHILDREN)
+        assert len(made) == 1
+
+    async def test_a_given_client_is_used_and_left_open(self) -> None:
+        seen: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(str(request.url))
+            return _sitemaps(request)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch("crawl4ai_mcp.server.httpx.AsyncClient") as own:
+            urls = await srv._fetch_sitemap_urls(INDEX, client)
+        own.assert_not_called()
+        assert len(urls) == len(CHILDREN) and len(seen) == len(CHILDREN) + 1
+        assert not client.is_closed
+        await client.aclose()
+
+
+class TestPlainHttp:
+    def test_pages_use_the_shared_client_with_the_calls_headers(self) -> None:
+        sent: list[httpx.Headers] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent.append(request.headers)
+            return httpx.Response(
+                200, text="{}", headers={"content-type": "application/json"}
+            )
+
+        async def run():
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                app = srv.AppContext(
+                    crawler=MagicMock(),
+                    profile_manager=ProfileManager(),
+                    sessions={},
+                    http=client,
+                )
+                return await srv._crawl_over_http(
+                    app,
+                    ["https://a.test/1", "https://a.test/2"],
+                    build_run_config(ProfileManager(), None),
+                    {"user_agent": "probe/1.0"},
+                    "http",
+                )
+
+        with patch.object(srv, "make_client", side_effect=AssertionError):
+            results, _, _ = asyncio.run(run())
+        assert len(results) == 2 and len(sent) == 2
+        assert all(h["user-agent"] == "probe/1.0" for h in sent)
+        assert all(h["accept"].startswith("text/html") for h in sent)
+
+
+class TestUpdateCheck:
+    async def test_check_update_uses_the_shared_client(self) -> None:
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"info": {"version": "0.0.1"}})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        ctx = MagicMock()
+        ctx.request_context.lifespan_context = srv.AppContext(
+            crawler=MagicMock(),
+            profile_manager=ProfileManager(),
+            sessions={},
+            http=client,
+        )
+        with patch("crawl4ai_mcp.server.httpx.AsyncClient") as own:
+            out = await srv.check_update(ctx)
+        own.assert_not_called()
+        assert "up to date" in out
+        await client.aclose()
+
+
+class TestSharedClient:
+    def test_it_pools_over_http2(self) -> None:
+        client = shared_client(max_connections=8)
+        pool = client._transport._pool
+        assert pool._http2 is True and pool._max_connections == 8
+
+    def test_it_keeps_no_cookies(self) -> None:
+        client = shared_client()
+        response = httpx.Response(
+            200,
+            headers={"set-cookie": "sid=abc; Path=/"},
+            request=httpx.Request("GET", "https://a.test/"),
+        )
+        client.cookies.extract_cookies(response)
+        assert len(client.cookies) == 0
+
+    async def test_an_owned_client_is_closed_a_given_one_is_not(self) -> None:
+        given = AsyncMock()
+        async with client_or_own(given, MagicMock()) as client:
+            assert client is given
+        given.aclose.assert_not_called()
+
+        own = httpx.AsyncClient()
+        async with client_or_own(None, lambda: own) as client:
+            assert client is own
+        assert own.is_closed
@@ -0,0 +1,263 @@
+"""Tests for the plain-HTTP render path.
+
+The fast path is only worth having if it never quietly returns less than the
+browser would have. The failures guarded here:
+
+- an app shell, a noscript wall or an empty body being accepted as the page
+  under render="auto" instead of going to the browser
+- a static page that happens to carry a "please enable JavaScript" notice
+  for its search box being sent to the browser anyway
+- js_code, wait_for or a js_heavy profile being silently dropped under
+  render="http"
+- the rendered result still carrying crawl4ai's raw: string as its URL
+- the batch tools sending already-fetched pages to the browser a second time
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.http_render import (
+    HttpPage,
+    browser_only_settings,
+    escalation_reason,
+    fetch_page,
+    render_page,
+    visible_words,
+)
+from crawl4ai_mcp.profiles import ProfileManager, merged_settings
+
+_PROSE = "<p>" + "Install the package and configure the client. " * 40 + "</p>"
+_STATIC = (
+    f"<html><head><title>Docs</title></head><body><main>{_PROSE}</main></body></html>"
+)
+_SHELL = (
+    "<html><head><script src='/app.js'></script></head>"
+    "<body><div id='root'></div></body></html>"
+)
+_WALL = (
+    "<html><body><noscript>You need to enable JavaScript to run this app."
+    "</noscript><div id='root'>Loading…</div></body></html>"
+)
+
+
+def _page(html: str, status: int = 200, ctype: str = "text/html; charset=utf-8"):
+    return HttpPage(
+        url="https://docs.test/a",
+        final_url="https://docs.test/a",
+        status_code=status,
+        headers={"content-type": ctype},
+        html=html,
+    )
+
+
+def _result(url: str, content: str = "rendered") -> MagicMock:
+    r = MagicMock()
+    r.url = url
+    r.success = True
+    r.status_code = 200
+    r.error_message = ""
+    r.metadata = {"title": "T"}
+    r.markdown.fit_markdown = content
+    r.markdown.raw_markdown = content
+    return r
+
+
+class TestEscalation:
+    def test_a_static_page_stays_on_http(self) -> None:
+        assert escalation_reason(_page(_STATIC)) is None
+
+    def test_an_app_shell_escalates(self) -> None:
+        assert escalation_reason(_page(_SHELL)) == "too little text"
+
+    def test_an_empty_body_escalates(self) -> None:
+        assert escalation_reason(_page("   ")) == "empty body"
+
+    def test_a_noscript_wall_escalates(self) -> None:
+        assert escalation_reason(_page(_WALL)) == "noscript wall"
+
+    def test_a_noscript_notice_on_a_real_page_does_not(self) -> None:
+        """Docs sites print this for their search widget above the whole page."""
+        html = _STATIC.replace(
+            "<main>", "<main><noscript>Please enable JavaScript to search.</noscript>"
+        )
+        assert escalation_reason(_page(html)) is None
+
+    def test_error_statuses_and_non_html_escalate(self) -> None:
+        assert escalation_reason(_page(_STATIC, status=403)) == "error status"
+        assert escalation_reason(_page("%PDF", ctype="application/pdf")) == (
+            "non-HTML content"
+        )
+
+    def test_script_text_is_not_counted_as_words(self) -> None:
+        html = "<script>" + "var x = 1; " * 500 + "</script><p>two words</p>"
+        assert visible_words(html) == 2
+
+
+class TestBrowserOnlySettings:
+    def test_js_heavy_and_stealth_profiles_need_the_browser(self) -> None:
+        pm = ProfileManager()
+        assert browser_only_settings(merged_settings(pm, "js_heavy"))
+        assert browser_only_settings(merged_settings(pm, "stealth"))
+
+    def test_the_default_and_fast_profiles_do_not(self) -> None:
+        pm = ProfileManager()
+        assert browser_only_settings(merged_settings(pm, None)) == []
+        assert browser_only_settings(merged_settings(pm, "fast")) == []
+
+
+class TestFetchAndRender:
+    async def test_fetch_follows_redirects_and_keeps_the_landing_url(self) -> None:
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/old":
+                return httpx.Response(301, headers={"location": "/docs/new"})
+            return httpx.Response(200, text=_STATIC, headers={"ETag": '"v1"'})
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), follow_redirects=True
+        ) as client:
+            page, error = await fetch_page(client, "https://docs.test/old")
+        assert error == ""
+        assert page.url == "https://docs.test/old"
+        assert page.final_url == "https://docs.test/docs/new"
+        assert page.headers["etag"] == '"v1"'
+
+    async def test_a_network_error_is_returned_not_raised(self) -> None:
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            page, error = await fetch_page(client, "https://docs.test/")
+        assert page is None and "ConnectError" in error
+
+    async def test_render_goes_through_raw_and_is_relabelled(self) -> None:
+        crawler = MagicMock()
+        crawler.arun = AsyncMock(return_value=_result("raw:<html>..."))
+        page = _page(_STATIC, status=203)
+        page.final_url = "https://docs.test/docs/a"
+        config = srv.build_run_config(ProfileManager(), None)
+
+        result = await render_page(crawler, page, config)
+
+        call = crawler.arun.await_args.kwargs
+        assert call["url"] == "raw:" + _STATIC
+        assert call["config"].base_url == "https://docs.test/docs/a"
+        assert call["config"].cache_mode == srv.CacheMode.BYPASS
+        assert result.url == "https://docs.test/a"
+        assert result.status_code == 203
+        assert result.redirected_url == "https://docs.test/docs/a"
+
+
+# ---------------------------------------------------------------------------
+# Tool wiring
+# ---------------------------------------------------------------------------
+
+
+def _site(pages: dict[str, str]):
+    """A make_client stand-in serving fixed bodies by path."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = pages.get(request.url.path)
+        if body is None:
+            return httpx.Response(404, text="not found")
+        return httpx.Response(200, text=body, headers={"content-type": "text/html"})
+
+    def make(max_connections, user_agent=None):
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    return make
+
+
+def _crawler() -> MagicMock:
+    crawler = MagicMock()
+    crawler.arun = AsyncMock(side_effect=lambda url, config: _result(url))
+    crawler.arun_many = AsyncMock(
+        side_effect=lambda urls, config, dispatcher: [
+            _result(u, "browser") for u in urls
+        ]
+    )
+    return crawler
+
+
+class TestToolsRender:
+    def test_auto_sends_only_the_shells_to_the_browser(self, make_ctx) -> None:
+        crawler = _crawler()
+        site = _site({"/static": _STATIC, "/app": _SHELL})
+        with (
+            patch.object(srv, "_require_crawler", return_value=crawler),
+            patch.object(srv, "make_client", site),
+        ):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://docs.test/static", "https://docs.test/app"],
+                    render="auto",
+                    ctx=make_ctx(),
+                )
+            )
+        assert crawler.arun_many.await_args.kwargs["urls"] == ["https://docs.test/app"]
+        assert (out.crawled, out.total) == (2, 2)
+        assert "1 of 2 pages fetched over plain HTTP" in out.note
+        assert "1 too little text" in out.note
+
+    def test_http_never_touches_the_browser(self, make_ctx) -> None:
+        crawler = _crawler()
+        with (
+            patch.object(srv, "_require_crawler", return_value=crawler),
+            patch.object(srv, "make_client", _site({"/a": _SHELL})),
+        ):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://docs.test/a"], render="http", ctx=make_ctx()
+                )
+            )
+        crawler.arun_many.assert_not_called()
+        assert out.pages[0].url == "https://docs.test/a"
+
+    def test_http_refuses_settings_that_need_a_page(self, make_ctx) -> None:
+        out = asyncio.run(
+            srv.crawl_many(
+                urls=["https://docs.test/a"],
+                render="http",
+                js_code="window.scrollTo(0, 1e6)",
+                ctx=make_ctx(),
+            )
+        )
+        assert "render='http' cannot apply js_code" in out.error
+
+    def test_auto_with_a_js_heavy_profile_uses_the_browser_for_everything(
+        self, make_ctx
+    ) -> None:
+        crawler = _crawler()
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://docs.test/a"],
+                    render="auto",
+                    profile="js_heavy",
+                    ctx=make_ctx(),
+                )
+            )
+        assert crawler.arun_many.await_count == 1
+        assert "scan_full_page" in out.note
+
+    def test_an_unknown_mode_is_refused(self, make_ctx) -> None:
+        out = asyncio.run(
+            srv.crawl_url(url="https://docs.test/a", render="fast", ctx=make_ctx())
+        )
+        assert "render 'fast' is not recognised" in out
+
+    def test_crawl_url_over_http(self, make_ctx) -> None:
+        crawler = _crawler()
+        browser = AsyncMock()
+        with (
+            patch.object(srv, "_require_crawler", return_value=crawler),
+            patch.object(srv, "make_client", _site({"/a": _STATIC})),
+            patch.object(srv, "_crawl_with_overrides", browser),
+        ):
+            out = asyncio.run(
+                srv.crawl_url(url="https://docs.test/a", render="auto", ctx=make_ctx())
+            )
+        assert out == "rendered"
+        browser.assert_not_called()
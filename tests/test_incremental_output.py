@@ -0,0 +1,202 @@
+"""Tests for stream_to_disk: output_dir written page by page.
+
+The point of the mode is that a crawl killed partway keeps what it had done,
+and that the server stops holding the whole batch. The failures guarded here:
+
+- nothing on disk until the last page arrives, which is the old behaviour
+- a manifest line for a file that was never written
+- fsync on every line, or never
+- the batch kept in memory anyway
+- a disk that fails partway throwing away the pages after it
+- deep_crawl writing more than max_pages
+"""
+
+import asyncio
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+from crawl4ai_mcp import output
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.output import MANIFEST_JSONL, ManifestWriter
+
+
+def _lines(directory) -> list[dict]:
+    with open(os.path.join(directory, MANIFEST_JSONL), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestManifestWriter:
+    async def test_file_then_line(self, tmp_path) -> None:
+        writer = await ManifestWriter(str(tmp_path / "out")).open()
+        await writer.write({"url": "u", "file": "u.md", "success": True}, "# hi")
+        await writer.write({"url": "v", "success": False, "error": "x"})
+        await writer.close()
+        assert (tmp_path / "out" / "u.md").read_text() == "# hi"
+        assert [e["url"] for e in _lines(tmp_path / "out")] == ["u", "v"]
+
+    async def test_fsync_is_batched(self, tmp_path) -> None:
+        synced = []
+        writer = await ManifestWriter(str(tmp_path), sync_every=3).open()
+        with patch.object(output.os, "fsync", synced.append):
+            for i in range(7):
+                await writer.write({"url": str(i), "success": False})
+            assert len(synced) == 2
+            await writer.close()
+        # The seventh line is synced on close, not left to chance.
+        assert len(synced) == 3
+
+    async def test_a_quiet_crawl_still_syncs_on_the_clock(self, tmp_path) -> None:
+        synced = []
+        writer = await ManifestWriter(str(tmp_path), sync_interval=0).open()
+        with patch.object(output.os, "fsync", synced.append):
+            await writer.write({"url": "u", "success": False})
+        assert len(synced) == 1
+        await writer.close()
+
+
+class TestCrawlMany:
+    def test_pages_are_on_disk_before_the_batch_ends(
+        self, tmp_path, make_ctx, make_streaming_crawler
+    ) -> None:
+        seen_on_disk = []
+        crawler = make_streaming_crawler(
+            on_yield=lambda page: seen_on_disk.append(len(_lines(tmp_path))),
+        )
+        urls = [f"https://a.test/{i}" for i in range(3)]
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=urls,
+                    output_dir=str(tmp_path),
+                    stream_to_disk=True,
+                    ctx=make_ctx(),
+                )
+            )
+        assert seen_on_disk == [1, 2, 3]
+        assert out.crawled == 3 and out.total == 3
+        assert out.manifest == os.path.join(str(tmp_path), MANIFEST_JSONL)
+        assert not (tmp_path / "manifest.json").exists()
+        for page in out.pages:
+            assert page.markdown is None
+            assert (tmp_path / page.file).read_text() == f"content of {page.url}"
+
+    def test_failures_are_listed_and_come_last(
+        self, tmp_path, make_ctx, make_streaming_crawler
+    ) -> None:
+        crawler = make_streaming_crawler(fail={"https://a.test/bad"})
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://a.test/bad", "https://a.test/good"],
+                    output_dir=str(tmp_path),
+                    stream_to_disk=True,
+                    ctx=make_ctx(),
+                )
+            )
+        assert [p.success for p in out.pages] == [True, False]
+        assert _lines(tmp_path)[0] == {
+            "url": "https://a.test/bad",
+            "success": False,
+            "error": "timeout",
+        }
+
+    def test_stream_to_disk_needs_an_output_dir(self, make_ctx) -> None:
+        out = asyncio.run(
+            srv.crawl_many(
+                urls=["https://a.test/"], stream_to_disk=True, ctx=make_ctx()
+            )
+        )
+        assert out.total == 0 and "set output_dir" in out.error
+
+    def test_a_failing_disk_keeps_the_rest_inline(
+        self, tmp_path, make_ctx, make_streaming_crawler
+    ) -> None:
+        real_write = ManifestWriter.write
+
+        async def write(self, entry, content=None):
+            if self.written >= 1:
+                raise OSError(28, "No space left on device")
+            await real_write(self, entry, content)
+
+        crawler = make_streaming_crawler()
+        with (
+            patch.object(srv, "_require_crawler", return_value=crawler),
+            patch.object(ManifestWriter, "write", write),
+        ):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=[f"https://a.test/{i}" for i in range(3)],
+                    output_dir=str(tmp_path),
+                    stream_to_disk=True,
+                    ctx=make_ctx(),
+                )
+            )
+        assert out.crawled == 3
+        assert [p.file is not None for p in out.pages] == [True, False, False]
+        assert [p.markdown is None for p in out.pages] == [True, False, False]
+        assert "failed after 1 pages" in out.note
+        assert "No space left on device" in out.note
+
+    def test_an_unusable_output_dir_returns_everything_inline(
+        self, tmp_path, make_ctx, make_streaming_crawler
+    ) -> None:
+        not_a_dir = tmp_path / "file"
+        not_a_dir.write_text("")
+        crawler = make_streaming_crawler()
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://a.test/1"],
+                    output_dir=str(not_a_dir),
+                    stream_to_disk=True,
+                    ctx=make_ctx(),
+                )
+            )
+        assert out.crawled == 1 and out.pages[0].markdown
+        assert out.manifest is None and out.output_dir is None
+        assert "returned inline" in out.note
+
+
+class TestCollect:
+    async def test_keep_false_lets_each_page_go(self, make_ctx, make_result) -> None:
+        handed = []
+
+        async def on_result(page) -> None:
+            handed.append(page)
+
+        pages = [make_result(f"https://a.test/{i}") for i in range(3)]
+        kept = await srv._collect_with_progress(
+            pages, make_ctx(), 3, "Crawling", on_result=on_result, keep=False
+        )
+        assert kept == [] and handed == pages
+
+
+class TestDeepCrawl:
+    def test_writes_stop_at_max_pages(self, tmp_path, make_ctx, make_result) -> None:
+        async def arun(url, config, **_):
+            async def pages():
+                for i in range(3):
+                    yield make_result(f"https://a.test/{i}", depth=min(i, 1))
+
+            return pages()
+
+        crawler = MagicMock()
+        crawler.arun = arun
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(
+                srv.deep_crawl(
+                    url="https://a.test/0",
+                    max_pages=2,
+                    engine="crawl4ai",
+                    output_dir=str(tmp_path),
+                    stream_to_disk=True,
+                    ctx=make_ctx(),
+                )
+            )
+        assert out.total == 2
+        assert [e["url"] for e in _lines(tmp_path)] == [
+            "https://a.test/0",
+            "https://a.test/1",
+        ]
+        assert len(list(tmp_path.glob("*.md"))) == 2
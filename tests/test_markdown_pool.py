@@ -0,0 +1,137 @@
+"""Tests for moving content filtering and markdown into worker processes.
+
+The point is that a page's markdown is made off the event loop and comes
+back exactly as it would have been made on it. The failures guarded here:
+
+- a page returned with the empty stand-in markdown instead of the real one
+- the markdown made off the loop differing from the markdown made on it
+- the work deferred for a page crawl4ai caches or extracts from, which read
+  the markdown before arun returns
+- a dead worker failing the page instead of only the pool
+- the filter and markdown phases lost from include_timings
+"""
+
+import asyncio
+import os
+import signal
+
+import pytest
+from crawl4ai import CacheMode, CrawlResult
+from crawl4ai.extraction_strategy import NoExtractionStrategy
+
+from crawl4ai_mcp import timings
+from crawl4ai_mcp.markdown_pool import (
+    MarkdownPool,
+    markdown_workers_from_env,
+    offload_markdown,
+)
+from crawl4ai_mcp.profiles import ProfileManager, build_run_config
+
+_HTML = (
+    "<html><body><nav>Home | Docs | Blog</nav><article>"
+    + "<h2>Install</h2><p>"
+    + "Install the package and configure the client before you start. " * 30
+    + "</p><pre><code>pip install crawl4ai-mcp</code></pre></article></body></html>"
+)
+
+
+class _Crawler:
+    """A crawler whose arun makes markdown the way crawl4ai's aprocess_html does."""
+
+    def __init__(self) -> None:
+        self.seen = []
+
+    async def arun(self, url, config=None, **_):
+        markdown = config.markdown_generator.generate_markdown(
+            input_html=_HTML, base_url=url
+        )
+        self.seen.append(markdown)
+        return CrawlResult(url=url, html=_HTML, success=True, markdown=markdown)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = MarkdownPool(2)
+    yield pool
+    pool.close()
+
+
+def _inline() -> str:
+    cfg = build_run_config(ProfileManager(), None)
+    return cfg.markdown_generator.generate_markdown(input_html=_HTML).fit_markdown
+
+
+class TestWorkersFromEnv:
+    def test_values(self, monkeypatch) -> None:
+        assert markdown_workers_from_env() == 0
+        monkeypatch.setenv("CRAWL4AI_MCP_MARKDOWN_WORKERS", "3")
+        assert markdown_workers_from_env() == 3
+        monkeypatch.setenv("CRAWL4AI_MCP_MARKDOWN_WORKERS", "auto")
+        assert markdown_workers_from_env() == (os.cpu_count() or 1)
+        monkeypatch.setenv("CRAWL4AI_MCP_MARKDOWN_WORKERS", "many")
+        assert markdown_workers_from_env() == 0
+
+
+class TestOffload:
+    async def test_the_markdown_is_made_in_a_worker(self, pool) -> None:
+        crawler = _Crawler()
+        offload_markdown(crawler, pool)
+        cfg = build_run_config(ProfileManager(), None)
+        results = await asyncio.gather(
+            *(crawler.arun(f"https://a.test/{i}", config=cfg) for i in range(6))
+        )
+        # Inside arun the generator only took note of the HTML...
+        assert all(m.raw_markdown == "" for m in crawler.seen)
+        # ...and what came back is what it would have made in process.
+        expected = _inline()
+        assert expected and all(r.markdown.fit_markdown == expected for r in results)
+        assert pool.pages >= 6
+
+    async def test_cached_and_extracting_pages_stay_inline(self, pool) -> None:
+        crawler = _Crawler()
+        offload_markdown(crawler, pool)
+        manager = ProfileManager()
+        for cfg in (
+            build_run_config(manager, None, cache_mode=CacheMode.ENABLED),
+            build_run_config(manager, None, extraction_strategy=NoExtractionStrategy()),
+        ):
+            assert not pool.applies(cfg)
+            result = await crawler.arun("https://a.test/", config=cfg)
+            assert crawler.seen[-1].raw_markdown != ""
+            assert result.markdown.fit_markdown == _inline()
+
+    async def test_off_installs_nothing(self) -> None:
+        crawler = _Crawler()
+        arun = crawler.arun
+        offload_markdown(crawler, MarkdownPool(0))
+        assert crawler.arun == arun
+
+    async def test_timings_keep_the_filter_and_markdown_phases(self, pool) -> None:
+        crawler = _Crawler()
+        offload_markdown(crawler, pool)
+        cfg = build_run_config(ProfileManager(), None)
+        with timings.collect_timings(True):
+            timer = timings.start_page("https://a.test/")
+            await crawler.arun("https://a.test/", config=cfg)
+        phases = timer.phases()
+        assert phases["filter"] > 0 and "markdown" in phases
+
+
+async def test_a_dead_worker_costs_the_pool_not_the_page() -> None:
+    pool = MarkdownPool(1)
+    crawler = _Crawler()
+    offload_markdown(crawler, pool)
+    cfg = build_run_config(ProfileManager(), None)
+    try:
+        await crawler.arun("https://a.test/warm", config=cfg)
+        for pid in list(pool._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        await asyncio.sleep(0.5)
+        result = await crawler.arun("https://a.test/", config=cfg)
+        assert result.markdown.fit_markdown == _inline()
+        assert pool.inline == 1
+        # The next page gets a new pool.
+        result = await crawler.arun("https://a.test/next", config=cfg)
+        assert result.markdown.fit_markdown == _inline() and pool.inline == 1
+    finally:
+        pool.close()
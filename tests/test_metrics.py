@@ -0,0 +1,205 @@
+"""Tests for the metrics tool and the /metrics endpoint.
+
+Numbers nobody checks are worse than none, because they get believed. The
+failures guarded here:
+
+- pages crawled inside the dispatcher's own tasks not reaching the tool that
+  asked for them
+- a histogram whose buckets are not cumulative, which Prometheus reads as
+  nonsense quantiles without complaint
+- the queue-depth gauge leaking pages that failed before they opened, so it
+  only ever climbs
+- a structured error or a raise being counted as a success
+- the endpoint answering on every interface by default
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.metrics import (
+    DEFAULT_METRICS_HOST,
+    Metrics,
+    metrics_port_from_env,
+    percentile,
+    serve_metrics,
+    status_class,
+)
+from crawl4ai_mcp.pool import CrawlerPool
+from crawl4ai_mcp.profiles import ProfileManager
+
+
+class TestHelpers:
+    def test_status_classes(self) -> None:
+        assert [status_class(c) for c in (200, 301, 404, 503, None)] == [
+            "2xx",
+            "3xx",
+            "4xx",
+            "5xx",
+            "none",
+        ]
+
+    def test_percentiles_are_nearest_rank(self) -> None:
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 90) == 0.0
+
+    def test_the_port_is_off_unless_set_and_valid(self, monkeypatch) -> None:
+        monkeypatch.delenv("CRAWL4AI_MCP_METRICS_PORT", raising=False)
+        assert metrics_port_from_env() is None
+        monkeypatch.setenv("CRAWL4AI_MCP_METRICS_PORT", "nine")
+        assert metrics_port_from_env() is None
+        monkeypatch.setenv("CRAWL4AI_MCP_METRICS_PORT", "9464")
+        assert metrics_port_from_env() == 9464
+
+
+class TestExposition:
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        m = Metrics()
+        for seconds in (0.01, 0.3, 0.3, 7000.0):
+            m._tool("crawl_url").observe_latency(seconds)
+        m._tool("crawl_url").calls["ok"] = 4
+        text = m.exposition({})
+        assert (
+            'crawl4ai_mcp_tool_duration_seconds_bucket{tool="crawl_url",le="0.05"} 1'
+            in text
+        )
+        assert (
+            'crawl4ai_mcp_tool_duration_seconds_bucket{tool="crawl_url",le="0.5"} 3'
+            in text
+        )
+        assert (
+            'crawl4ai_mcp_tool_duration_seconds_bucket{tool="crawl_url",le="3600"} 3'
+            in text
+        )
+        assert (
+            'crawl4ai_mcp_tool_duration_seconds_bucket{tool="crawl_url",le="+Inf"} 4'
+            in text
+        )
+        assert "# TYPE crawl4ai_mcp_tool_duration_seconds histogram" in text
+
+    def test_pool_restarts_are_merged_with_repairs(self) -> None:
+        m = Metrics()
+        m.restart("repair")
+        pool = CrawlerPool(1, AsyncMock())
+        pool.recycled, pool.replaced = 2, 1
+        app = srv.AppContext(
+            crawler=None,
+            profile_manager=ProfileManager(),
+            sessions={"s": 0.0},
+            pool=pool,
+            metrics=m,
+        )
+        text = srv._metrics_exposition(app)
+        assert 'crawl4ai_mcp_browser_restarts_total{reason="recycle"} 2' in text
+        assert 'crawl4ai_mcp_browser_restarts_total{reason="crash"} 1' in text
+        assert 'crawl4ai_mcp_browser_restarts_total{reason="repair"} 1' in text
+        assert "crawl4ai_mcp_active_sessions 1" in text
+
+
+class TestTools:
+    def test_dispatched_pages_count_against_the_calling_tool(
+        self, make_ctx, make_result
+    ) -> None:
+        stats = {"proxies_used": [{"blocked": True}, {"blocked": False}]}
+
+        async def arun_many(urls, config, dispatcher):
+            async def page(url, status, success):
+                if success:
+                    return make_result(url, content="four")
+                return make_result(url, False, status_code=status, crawl_stats=stats)
+
+            return await asyncio.gather(
+                asyncio.create_task(page(urls[0], 200, True)),
+                asyncio.create_task(page(urls[1], 403, False)),
+            )
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        ctx = make_ctx()
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            asyncio.run(
+                srv.crawl_many(urls=["https://a.test/1", "https://a.test/2"], ctx=ctx)
+            )
+        tool = ctx.request_context.lifespan_context.metrics.tools["crawl_many"]
+        assert tool.calls == {"ok": 1}
+        assert tool.pages == {"2xx": 1, "4xx": 1}
+        assert tool.failed_pages == 1
+        assert tool.antibot_blocked == 1
+        assert tool.markdown_bytes == 4
+
+    def test_structured_errors_and_raises_are_not_successes(self, make_ctx) -> None:
+        ctx = make_ctx()
+        asyncio.run(srv.crawl_many(urls=["https://a.test"], cache_mode="x", ctx=ctx))
+        with patch.object(srv, "_require_crawler", side_effect=RuntimeError("down")):
+            try:
+                asyncio.run(srv.crawl_many(urls=["https://a.test"], ctx=ctx))
+            except RuntimeError:
+                pass
+        calls = ctx.request_context.lifespan_context.metrics.tools["crawl_many"].calls
+        assert calls == {"error": 1, "exception": 1}
+
+    def test_queue_depth_drains_even_for_pages_that_never_opened(
+        self, make_ctx, make_result
+    ) -> None:
+        ctx = make_ctx()
+        metrics = ctx.request_context.lifespan_context.metrics
+        depths = []
+
+        async def arun_many(urls, config, dispatcher):
+            depths.append(metrics.queue_depth)
+            await srv._override_on_context(AsyncMock(), AsyncMock())
+            depths.append(metrics.queue_depth)
+            # The other two fail before a page is ever opened.
+            return [make_result(u) for u in urls]
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            asyncio.run(
+                srv.crawl_many(urls=[f"https://a.test/{i}" for i in range(3)], ctx=ctx)
+            )
+        assert depths == [3, 2]
+        assert metrics.queue_depth == 0
+
+    def test_the_metrics_tool(self, make_ctx, make_result) -> None:
+        ctx = make_ctx()
+        with patch.object(srv, "_require_crawler", return_value=MagicMock()):
+            with patch.object(
+                srv,
+                "_crawl_with_overrides",
+                AsyncMock(return_value=make_result("https://a.test")),
+            ):
+                asyncio.run(srv.crawl_url(url="https://a.test", ctx=ctx))
+        text = asyncio.run(srv.metrics(ctx=ctx))
+        assert "crawl_url: 1 calls (1 ok); p50" in text
+        assert "pages: 1 (1 2xx), 0 failed, 0 anti-bot blocks" in text
+        assert "Active sessions: 0" in text
+        prom = asyncio.run(srv.metrics(output="prometheus", ctx=ctx))
+        assert 'crawl4ai_mcp_pages_total{tool="crawl_url",status_class="2xx"} 1' in prom
+        assert "not recognised" in asyncio.run(srv.metrics(output="json", ctx=ctx))
+
+
+class TestEndpoint:
+    async def test_serves_metrics_on_loopback_only(self) -> None:
+        server = await serve_metrics(lambda: "crawl4ai_mcp_up 1\n", 0)
+        try:
+            host, port = server.sockets[0].getsockname()[:2]
+            assert host == DEFAULT_METRICS_HOST
+
+            async def get(path: str) -> bytes:
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+                await writer.drain()
+                body = await reader.read()
+                writer.close()
+                return body
+
+            ok = await get("/metrics")
+            assert ok.startswith(b"HTTP/1.1 200 OK")
+            assert b"version=0.0.4" in ok and ok.endswith(b"crawl4ai_mcp_up 1\n")
+            assert (await get("/")).startswith(b"HTTP/1.1 404")
+        finally:
+            server.close()
+            await server.wait_closed()
@@ -0,0 +1,250 @@
+"""Tests for near-duplicate detection across a crawl's pages.
+
+The point is that pages saying almost the same thing cost the agent one
+page of tokens, and deep_crawl one page of max_pages. The failures guarded
+here:
+
+- near-identical pages not matched, or unrelated or short pages matched
+- a duplicate's content, file or manifest line kept when the mode drops it
+- crawled and total no longer counting what was fetched
+- deep_crawl following the links of a page that repeats another
+- a resumed job not comparing its pages with the earlier run's
+"""
+
+import asyncio
+import functools
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.near_duplicates import MAX_DISTANCE, NearDuplicates, simhash
+
+
+def _text(seed: int, words: int = 200) -> str:
+    return " ".join(f"w{(seed * 7919 + i * 104729) % 5003}" for i in range(words))
+
+
+def _edited(text: str, every: int = 50) -> str:
+    words = text.split()
+    for i in range(0, len(words), every):
+        words[i] = "changed"
+    return " ".join(words)
+
+
+ARTICLE = _text(1)
+PRINT_VIEW = _edited(ARTICLE)
+OTHER = _text(2)
+
+
+class TestSimhash:
+    def test_near_identical_pages_are_close(self) -> None:
+        close = (simhash(ARTICLE) ^ simhash(PRINT_VIEW)).bit_count()
+        far = (simhash(ARTICLE) ^ simhash(OTHER)).bit_count()
+        assert close <= MAX_DISTANCE < far
+
+    def test_short_pages_are_not_judged(self) -> None:
+        assert simhash("Page 2 of 40") is None
+        assert simhash(ARTICLE) == simhash(ARTICLE.upper())
+
+
+class TestIndex:
+    def test_later_pages_point_at_the_first(self, make_result) -> None:
+        near = NearDuplicates()
+        assert near.check(make_result("https://a.test/a", content=ARTICLE)) is None
+        assert near.check(make_result("https://a.test/b", content=OTHER)) is None
+        dup = make_result("https://a.test/a?print", content=PRINT_VIEW)
+        assert near.check(dup) == "https://a.test/a"
+        # Asked again, the same answer, counted once.
+        assert near.check(dup) == "https://a.test/a" and near.found == 1
+        # A repeat of the duplicate still names the original.
+        again = make_result("https://a.test/a?amp", content=PRINT_VIEW)
+        assert near.check(again) == "https://a.test/a"
+
+    def test_failures_and_off(self, make_result) -> None:
+        near = NearDuplicates()
+        near.check(make_result("https://a.test/a", content=ARTICLE))
+        assert near.check(make_result("https://a.test/x", False, ARTICLE)) is None
+        assert NearDuplicates.of("off") is None
+
+
+class _Pages:
+    """A crawler over a dict of url -> markdown, with optional links."""
+
+    def __init__(self, make_result, content: dict, links: dict | None = None) -> None:
+        self.make_result = make_result
+        self.content = content
+        self.links = links or {}
+        self.fetched: list[str] = []
+
+    async def arun(self, url, config=None, **_):
+        self.fetched.append(url)
+        await asyncio.sleep(0.001)
+        r = self.make_result(url, content=self.content.get(url, OTHER))
+        r.links = {"internal": [{"href": h} for h in self.links.get(url, [])]}
+        return r
+
+    async def arun_many(self, urls, config, dispatcher):
+        async def results():
+            async for task in dispatcher.run_urls_stream(self, urls, config):
+                yield task.result
+
+        return results()
+
+    def crawler(self) -> MagicMock:
+        crawler = MagicMock()
+        crawler.arun = self.arun
+        crawler.arun_many = self.arun_many
+        return crawler
+
+
+@pytest.fixture
+def make_pages(make_result):
+    """Builds a _Pages over url -> markdown, with optional links."""
+    return functools.partial(_Pages, make_result)
+
+
+def _run(ctx, pages: _Pages, tool, **kwargs):
+    with patch.object(srv, "_require_crawler", return_value=pages.crawler()):
+        return asyncio.run(tool(ctx=ctx, **kwargs))
+
+
+SITE = {
+    "https://a.test/article": ARTICLE,
+    "https://a.test/article/print": PRINT_VIEW,
+    "https://a.test/other": OTHER,
+}
+
+
+def _crawl_many(ctx, make_pages, **kwargs):
+    return _run(
+        ctx,
+        make_pages(SITE),
+        srv.crawl_many,
+        urls=list(SITE),
+        max_concurrent=1,
+        **kwargs,
+    )
+
+
+class TestCrawlMany:
+    def test_flag_keeps_the_content(self, make_ctx, make_pages) -> None:
+        out = _crawl_many(make_ctx(), make_pages, near_duplicates="flag")
+        by_url = {p.url: p for p in out.pages}
+        dup = by_url["https://a.test/article/print"]
+        assert dup.duplicate_of == "https://a.test/article"
+        assert dup.markdown == PRINT_VIEW
+        assert by_url["https://a.test/other"].duplicate_of is None
+        assert "Near duplicates: 1 page(s)" in out.note
+
+    def test_collapse_keeps_only_the_pointer(self, make_ctx, make_pages) -> None:
+        out = _crawl_many(make_ctx(), make_pages, near_duplicates="collapse")
+        dup = next(p for p in out.pages if p.duplicate_of)
+        assert dup.markdown is None and dup.success
+        assert out.crawled == 3 and len(out.pages) == 3
+
+    def test_drop_leaves_it_out(self, make_ctx, make_pages) -> None:
+        out = _crawl_many(make_ctx(), make_pages, near_duplicates="drop")
+        assert [p.url for p in out.pages] == [
+            "https://a.test/article",
+            "https://a.test/other",
+        ]
+        assert out.crawled == 3 and out.total == 3
+
+    def test_off_is_the_default(self, make_ctx, make_pages) -> None:
+        out = _crawl_many(
+            make_ctx(),
+            make_pages,
+        )
+        assert all(p.duplicate_of is None for p in out.pages) and out.note is None
+
+    def test_an_unknown_mode_is_refused(self, make_ctx, make_pages) -> None:
+        assert (
+            "near_duplicates"
+            in _crawl_many(make_ctx(), make_pages, near_duplicates="minhash").error
+        )
+
+    def test_a_resumed_job_compares_with_the_earlier_run(
+        self, make_ctx, make_pages, make_result
+    ) -> None:
+        first = make_pages(SITE)
+        first.make_result = lambda url, content: make_result(
+            url, success=url != "https://a.test/article/print", content=content
+        )
+        _run(
+            make_ctx(),
+            first,
+            srv.crawl_many,
+            urls=list(SITE),
+            job_id="near",
+            near_duplicates="collapse",
+        )
+        again = make_pages(SITE)
+        out = _run(
+            make_ctx(),
+            again,
+            srv.crawl_many,
+            urls=list(SITE),
+            job_id="near",
+            near_duplicates="collapse",
+        )
+        assert again.fetched == ["https://a.test/article/print"]
+        dup = next(p for p in out.pages if p.url == "https://a.test/article/print")
+        assert dup.duplicate_of == "https://a.test/article"
+        assert "Near duplicates: 1 page(s)" in out.note
+
+
+class TestOutputDir:
+    def test_collapse_writes_no_file(self, tmp_path, make_ctx, make_pages) -> None:
+        out = _crawl_many(
+            make_ctx(), make_pages, near_duplicates="collapse", output_dir=str(tmp_path)
+        )
+        manifest = json.loads((tmp_path / "manifest.json").read_text())
+        dup = next(e for e in manifest if "duplicate_of" in e)
+        assert "file" not in dup
+        assert len(list(tmp_path.glob("*.md"))) == 2
+        assert next(p for p in out.pages if p.duplicate_of).file is None
+
+    def test_drop_under_stream_to_disk(self, tmp_path, make_ctx, make_pages) -> None:
+        out = _crawl_many(
+            make_ctx(),
+            make_pages,
+            near_duplicates="drop",
+            output_dir=str(tmp_path),
+            stream_to_disk=True,
+        )
+        lines = (tmp_path / "manifest.jsonl").read_text().splitlines()
+        assert len(lines) == 2 and len(out.pages) == 2
+        assert out.crawled == 3
+
+
+class TestDeepCrawl:
+    def test_no_links_are_followed_from_a_duplicate(self, make_ctx, make_pages) -> None:
+        pages = make_pages(
+            {
+                "https://a.test/": OTHER,
+                "https://a.test/list?page=1": ARTICLE,
+                "https://a.test/list?page=2": PRINT_VIEW,
+                "https://a.test/item/1": _text(3),
+            },
+            links={
+                "https://a.test/": [
+                    "https://a.test/list?page=1",
+                    "https://a.test/list?page=2",
+                ],
+                "https://a.test/list?page=1": ["https://a.test/item/1"],
+                "https://a.test/list?page=2": ["https://a.test/list?page=3"],
+            },
+        )
+        out = _run(
+            make_ctx(),
+            pages,
+            srv.deep_crawl,
+            url="https://a.test/",
+            max_concurrent=1,
+            near_duplicates="collapse",
+        )
+        assert "https://a.test/list?page=3" not in pages.fetched
+        assert "https://a.test/item/1" in pages.fetched
+        assert "No links were followed from 1 of them" in out.note
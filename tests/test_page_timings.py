@@ -0,0 +1,200 @@
+"""Tests for per-page phase timings.
+
+Timings are only useful if they land on the right page and mean what they
+say. The failures guarded here:
+
+- two pages crawled concurrently writing into one timer, so each reports the
+  other's navigation
+- a retried navigation timed as the sum of both attempts
+- delay_before_return_html being counted as js_code or capture time
+- the timed markdown generator replacing the content filter the rest of the
+  code inspects
+- the hooks doing anything at all for a call that did not ask
+"""
+
+import asyncio
+import itertools
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp import timings
+from crawl4ai_mcp.profiles import ProfileManager, build_run_config
+from crawl4ai_mcp.timings import (
+    PageTimings,
+    TimedMarkdownGenerator,
+    collect_timings,
+)
+
+_PROSE = "<p>" + "Install the package and configure the client. " * 40 + "</p>"
+
+
+async def _drive(url: str, delay: float = 0.0, js: bool = False) -> None:
+    """Fire the hooks in the order crawl4ai's strategy does for one page."""
+    page = AsyncMock()
+    await srv._override_on_context(page, AsyncMock())
+    await srv._override_before_goto(page, AsyncMock(), url, None)
+    await timings.after_goto(page, url=url)
+    await timings.before_retrieve_html(
+        page, config=SimpleNamespace(delay_before_return_html=delay)
+    )
+    if js:
+        await timings.on_execution_started(page)
+    await timings.before_return_html(page=page, html="<html></html>")
+
+
+def _clock(step: float = 0.1):
+    """A perf_counter that advances by step seconds on every read."""
+    ticks = itertools.count()
+    return lambda: next(ticks) * step
+
+
+class TestPhases:
+    async def test_the_hooks_split_the_crawl_into_phases(self) -> None:
+        with (
+            patch.object(timings.time, "perf_counter", _clock()),
+            collect_timings(True) as sink,
+        ):
+            await _drive("https://a.test/", delay=0.05, js=True)
+        phases = sink["https://a.test/"].phases()
+        # goto=0.0, loaded=0.1, retrieve=0.2, js_done=0.3, captured=0.4
+        assert phases == {
+            "navigation": 100.0,
+            "wait_for": 100.0,
+            "js_code": 50.0,
+            "delay": 50.0,
+            "capture": 100.0,
+        }
+
+    async def test_without_js_code_the_delay_comes_out_of_capture(self) -> None:
+        with (
+            patch.object(timings.time, "perf_counter", _clock()),
+            collect_timings(True) as sink,
+        ):
+            await _drive("https://a.test/", delay=0.04)
+        phases = sink["https://a.test/"].phases()
+        assert "js_code" not in phases
+        assert phases["capture"] == 60.0
+        assert phases["delay"] == 40.0
+
+    def test_queue_is_measured_from_the_dispatcher_start(self) -> None:
+        timer = PageTimings(opened=1000.25)
+        assert timer.phases(dispatch_start=1000.0) == {"queue": 250.0}
+        assert timer.phases() == {}
+
+    async def test_a_retried_navigation_gets_a_fresh_timer(self) -> None:
+        with collect_timings(True) as sink:
+            await srv._override_before_goto(AsyncMock(), None, "https://a.test/", None)
+            first = sink["https://a.test/"]
+            await srv._override_before_goto(AsyncMock(), None, "https://a.test/", None)
+        assert sink["https://a.test/"] is not first
+
+    async def test_concurrent_pages_keep_their_own_timers(self) -> None:
+        async def page(url: str) -> None:
+            await _drive(url)
+            await asyncio.sleep(0)
+
+        with collect_timings(True) as sink:
+            await asyncio.gather(
+                *(asyncio.create_task(page(f"https://a.test/{i}")) for i in range(3))
+            )
+        assert len({id(t) for t in sink.values()}) == 3
+        assert all("captured" in t.marks for t in sink.values())
+
+    async def test_nothing_is_recorded_unless_asked(self) -> None:
+        with collect_timings(False) as sink:
+            await _drive("https://a.test/")
+            assert timings._current.get() is None
+        assert sink is None
+
+
+class TestMarkdownGenerator:
+    def test_filter_and_markdown_are_timed_separately(self) -> None:
+        cfg = build_run_config(ProfileManager(), None)
+        with collect_timings(True):
+            timer = timings.start_page("https://a.test/")
+            cfg.markdown_generator.generate_markdown(
+                input_html=f"<html><body>{_PROSE}</body></html>"
+            )
+        phases = timer.phases()
+        assert phases["filter"] > 0
+        assert "markdown" in phases and "total" in phases
+
+    def test_the_real_content_filter_stays_in_place(self) -> None:
+        generator = build_run_config(
+            ProfileManager(), None, query="install"
+        ).markdown_generator
+        assert isinstance(generator, TimedMarkdownGenerator)
+        assert type(generator.content_filter).__name__ == "BM25ContentFilter"
+
+
+# ---------------------------------------------------------------------------
+# Tool wiring
+# ---------------------------------------------------------------------------
+
+
+class TestTools:
+    def test_crawl_url_appends_a_timings_footer(self, make_ctx, make_result) -> None:
+        async def crawl(crawler, url, config, headers, cookies, blocker):
+            await _drive(url)
+            return make_result(url)
+
+        with (
+            patch.object(srv, "_require_crawler", return_value=MagicMock()),
+            patch.object(srv, "_crawl_with_overrides", crawl),
+        ):
+            out = asyncio.run(
+                srv.crawl_url(
+                    url="https://a.test/", include_timings=True, ctx=make_ctx()
+                )
+            )
+        footer = out.split("--- Timings ---\n")[1]
+        assert footer.startswith("navigation ")
+        assert "capture " in footer
+
+    def test_crawl_url_has_no_footer_by_default(self, make_ctx, make_result) -> None:
+        async def crawl(crawler, url, config, headers, cookies, blocker):
+            await _drive(url)
+            return make_result(url)
+
+        with (
+            patch.object(srv, "_require_crawler", return_value=MagicMock()),
+            patch.object(srv, "_crawl_with_overrides", crawl),
+        ):
+            out = asyncio.run(srv.crawl_url(url="https://a.test/", ctx=make_ctx()))
+        assert out == "content of https://a.test/"
+
+    def test_crawl_many_puts_timings_on_each_page(self, make_ctx, make_result) -> None:
+        async def arun_many(urls, config, dispatcher):
+            async def page(url):
+                await _drive(url)
+                result = make_result(url)
+                result.dispatch_result = SimpleNamespace(
+                    start_time=timings._current.get().opened - 0.5
+                )
+                return result
+
+            return await asyncio.gather(*(asyncio.create_task(page(u)) for u in urls))
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://a.test/1", "https://a.test/2"],
+                    include_timings=True,
+                    ctx=make_ctx(),
+                )
+            )
+        for page in out.pages:
+            assert page.timings["queue"] == 500.0
+            assert list(page.timings)[:2] == ["queue", "navigation"]
+
+    def test_pages_carry_no_timings_by_default(self, make_ctx, make_result) -> None:
+        crawler = MagicMock()
+        crawler.arun_many = AsyncMock(
+            side_effect=lambda urls, config, dispatcher: [make_result(u) for u in urls]
+        )
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(srv.crawl_many(urls=["https://a.test/1"], ctx=make_ctx()))
+        assert out.pages[0].timings is None
@@ -0,0 +1,216 @@
+"""Tests for per-call resource blocking.
+
+Blocking is applied from a shared hook, so the same failure modes as per-call
+headers apply, plus a few of its own:
+
+- a misspelt resource type ("images") being read as a pattern that never
+  matches, so nothing is blocked and nothing says so
+- the document itself, or a frame's document, being blocked
+- a blocker leaking onto a reused session page after the call that set it
+- arun_many's tasks not seeing the blocker, because they were created outside
+  the call's scope
+- the profile key reaching CrawlerRunConfig, which would reject it
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.blocking import ResourceBlocker, route_page
+from crawl4ai_mcp.profiles import ProfileManager, build_run_config, merged_settings
+
+
+class _Route:
+    def __init__(self, resource_type: str, url: str) -> None:
+        self.request = MagicMock(resource_type=resource_type, url=url)
+        self.outcome = None
+
+    async def abort(self, reason: str = "failed") -> None:
+        self.outcome = "aborted"
+
+    async def continue_(self) -> None:
+        self.outcome = "continued"
+
+
+class _Page:
+    """Records route/unroute the way a Playwright page applies them."""
+
+    def __init__(self) -> None:
+        self.routes: list = []
+
+    async def route(self, pattern, handler) -> None:
+        self.routes.append(handler)
+
+    async def unroute(self, pattern, handler) -> None:
+        self.routes = [h for h in self.routes if h != handler]
+
+
+def _blocker(*spec: str) -> ResourceBlocker:
+    blocker, error = ResourceBlocker.parse(list(spec))
+    assert error is None
+    return blocker
+
+
+class TestParse:
+    def test_types_trackers_and_patterns(self) -> None:
+        b = _blocker("image", "Font", "trackers", "*.mp4")
+        assert b.types == {"image", "font"}
+        assert b.trackers
+        assert b.patterns == ("*.mp4",)
+
+    def test_nothing_means_no_blocker(self) -> None:
+        assert ResourceBlocker.parse([]) == (None, None)
+        assert ResourceBlocker.parse(None) == (None, None)
+
+    def test_a_misspelt_type_is_refused(self) -> None:
+        blocker, error = ResourceBlocker.parse(["images"])
+        assert blocker is None
+        assert "'images' is neither a resource type" in error
+        assert "image" in error
+
+    def test_the_document_cannot_be_blocked(self) -> None:
+        _, error = ResourceBlocker.parse(["document"])
+        assert "the page being crawled" in error
+
+
+class TestHandler:
+    async def test_matching_requests_are_aborted_and_counted(self) -> None:
+        b = _blocker("image", "trackers", "*.mp4")
+        routes = [
+            _Route("image", "https://a.test/logo.png"),
+            _Route("script", "https://www.google-analytics.com/analytics.js"),
+            _Route("media", "https://a.test/intro.mp4"),
+            _Route("script", "https://a.test/app.js"),
+        ]
+        for r in routes:
+            await b.handle(r)
+        assert [r.outcome for r in routes] == [
+            "aborted",
+            "aborted",
+            "aborted",
+            "continued",
+        ]
+        assert b.counts == {"image": 1, "trackers": 1, "pattern": 1}
+        assert b.summary() == "Blocked 3 requests (1 image, 1 trackers, 1 pattern)."
+
+    async def test_documents_always_load(self) -> None:
+        """A frame is a document too; blocking by pattern must not stop it."""
+        b = _blocker("*://a.test/*")
+        route = _Route("document", "https://a.test/embed")
+        await b.handle(route)
+        assert route.outcome == "continued"
+
+    def test_tracker_matching_is_by_host_not_substring(self) -> None:
+        b = _blocker("trackers")
+        assert b.category("script", "https://cdn.segment.com/a.js") == "trackers"
+        assert b.category("script", "https://notsegment.com/a.js") is None
+
+    def test_nothing_blocked_has_no_summary(self) -> None:
+        assert _blocker("image").summary() is None
+
+
+class TestRouting:
+    async def test_a_reused_page_gets_the_new_calls_blocker_only(self) -> None:
+        page = _Page()
+        first, second = _blocker("image"), _blocker("font")
+        await route_page(page, first)
+        await route_page(page, second)
+        assert page.routes == [second.handle]
+
+    async def test_a_call_without_blocking_clears_the_old_route(self) -> None:
+        page = _Page()
+        await route_page(page, _blocker("image"))
+        await route_page(page, None)
+        assert page.routes == []
+
+    async def test_the_hook_reads_the_calls_scope(self) -> None:
+        page = _Page()
+        b = _blocker("image")
+        with srv._call_scope(blocker=b):
+            await srv._override_before_goto(page, MagicMock(), "u", None)
+        assert page.routes == [b.handle]
+
+
+class TestProfiles:
+    def test_fast_blocks_what_markdown_cannot_contain(self) -> None:
+        settings = merged_settings(ProfileManager(), "fast")
+        assert set(settings["block_resources"]) == {
+            "image",
+            "font",
+            "media",
+            "trackers",
+        }
+
+    def test_the_key_never_reaches_crawler_run_config(self) -> None:
+        cfg = build_run_config(ProfileManager(), "fast", block_resources=["font"])
+        assert not hasattr(cfg, "block_resources")
+
+
+class TestTools:
+    def test_arun_many_tasks_see_the_blocker(self, make_ctx, make_result) -> None:
+        """The dispatcher runs pages in tasks of its own; they must inherit."""
+        seen = []
+
+        async def arun_many(urls, config, dispatcher):
+            async def page(url):
+                blocker = srv._call_overrides.get().get("blocker")
+                seen.append(blocker)
+                blocker.counts["image"] = blocker.counts.get("image", 0) + 2
+                return make_result(url)
+
+            return await asyncio.gather(*(asyncio.create_task(page(u)) for u in urls))
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://a.test/1", "https://a.test/2"],
+                    block_resources=["image"],
+                    ctx=make_ctx(),
+                )
+            )
+        assert len(seen) == 2 and all(b is seen[0] for b in seen)
+        assert out.note == "Blocked 4 requests (4 image)."
+
+    def test_crawl_url_reports_blocked_requests(self, make_ctx, make_result) -> None:
+        async def crawl(crawler, url, config, headers, cookies, blocker):
+            blocker.counts["font"] = 3
+            return make_result(url)
+
+        with (
+            patch.object(srv, "_require_crawler", return_value=MagicMock()),
+            patch.object(srv, "_crawl_with_overrides", crawl),
+        ):
+            out = asyncio.run(
+                srv.crawl_url(
+                    url="https://a.test", block_resources=["font"], ctx=make_ctx()
+                )
+            )
+        assert out.endswith("--- Blocked requests ---\nBlocked 3 requests (3 font).")
+
+    def test_an_empty_list_turns_off_a_profiles_blocking(
+        self, make_ctx, make_result
+    ) -> None:
+        crawl = AsyncMock(return_value=make_result("https://a.test"))
+        with (
+            patch.object(srv, "_require_crawler", return_value=MagicMock()),
+            patch.object(srv, "_crawl_with_overrides", crawl),
+        ):
+            asyncio.run(
+                srv.crawl_url(
+                    url="https://a.test",
+                    profile="fast",
+                    block_resources=[],
+                    ctx=make_ctx(),
+                )
+            )
+        assert crawl.await_args.args[5] is None
+
+    def test_a_bad_entry_is_refused_before_crawling(self, make_ctx) -> None:
+        out = asyncio.run(
+            srv.crawl_many(
+                urls=["https://a.test"], block_resources=["imgs"], ctx=make_ctx()
+            )
+        )
+        assert "'imgs' is neither a resource type" in out.error
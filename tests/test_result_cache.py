@@ -0,0 +1,440 @@
+"""Tests for the server-owned result cache.
+
+crawl4ai's own cache keeps raw HTML and loses the filtered markdown, so
+reading from it returned a different, much larger answer than the crawl that
+stored it. The properties pinned here are the ones that make this cache safe
+to turn on where that one was not:
+
+- a hit returns exactly what the fresh crawl returned, markdown included
+- any setting that changes the markdown changes the key
+- settings that only change pacing or timeouts do not
+- failures and non-2xx pages are never stored
+- TTL and the byte budget both actually bound it
+- a batch sends only its misses to the browser and says how many it skipped
+- session, header and cookie crawls are refused, not cached
+- an expired page with an ETag or Last-Modified is revalidated, not re-rendered
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.profiles import ProfileManager, merged_settings
+from crawl4ai_mcp.result_cache import CachedPage, ResultCache, cache_key, revalidate
+
+
+def _result(
+    url: str,
+    content: str = "page content",
+    success: bool = True,
+    status_code: int = 200,
+    metadata: dict | None = None,
+):
+    """A CrawlResult stand-in carrying every field the cache reads."""
+    r = MagicMock()
+    r.url = url
+    r.success = success
+    r.status_code = status_code
+    r.error_message = "" if success else "boom"
+    r.metadata = metadata or {"title": "T", "description": "D"}
+    r.markdown.fit_markdown = content
+    r.markdown.raw_markdown = content + " (raw)"
+    r.links = {"internal": [{"href": url + "/x", "text": "x"}], "external": []}
+    r.tables = []
+    r.response_headers = {"content-type": "text/html"}
+    return r
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# ---------------------------------------------------------------------------
+# cache_key
+# ---------------------------------------------------------------------------
+
+
+class TestCacheKey:
+    def test_content_shaping_settings_change_the_key(self) -> None:
+        base = {"word_count_threshold": 10}
+        k = cache_key("https://example.com", base)
+        for extra in (
+            {"query": "pricing"},
+            {"css_selector": "main"},
+            {"target_elements": ["article"]},
+            {"excluded_selector": "nav"},
+            {"js_code": "1"},
+            {"wait_for": "css:#x"},
+            {"word_count_threshold": 5},
+        ):
+            assert cache_key("https://example.com", {**base, **extra}) != k, extra
+
+    def test_pacing_and_timeouts_do_not(self) -> None:
+        """Raising page_timeout must not miss an entry an identical crawl stored."""
+        base = {"word_count_threshold": 10}
+        k = cache_key("https://example.com", base)
+        noisy = {
+            **base,
+            "page_timeout": 90000,
+            "cache_mode": object(),
+            "semaphore_count": 3,
+            "mean_delay": 2.0,
+        }
+        assert cache_key("https://example.com", noisy) == k
+
+    def test_the_profile_is_part_of_the_key(self) -> None:
+        """A profile changes filter thresholds and timing without the caller
+        naming any of them, so the merge is what gets keyed, not the args."""
+        pm = ProfileManager()
+        plain = merged_settings(pm, None)
+        fast = merged_settings(pm, "fast")
+        assert cache_key("https://a.test", plain) != cache_key("https://a.test", fast)
+
+
+# ---------------------------------------------------------------------------
+# ResultCache
+# ---------------------------------------------------------------------------
+
+
+class TestResultCache:
+    def test_hit_returns_the_filtered_markdown(self) -> None:
+        cache = ResultCache()
+        cache.put("k", _result("https://a.test", content="filtered"))
+        page = cache.get("k")
+        assert page.markdown.fit_markdown == "filtered"
+        assert page.metadata["title"] == "T"
+        assert page.links["internal"][0]["href"] == "https://a.test/x"
+        assert (cache.hits, cache.misses) == (1, 0)
+
+    def test_failures_and_non_2xx_are_not_stored(self) -> None:
+        """A 404 is a successful crawl to crawl4ai. Caching it would turn one
+        bad moment on the target into an hour of serving the error page."""
+        cache = ResultCache()
+        assert not cache.put("a", _result("https://a.test", success=False))
+        assert not cache.put("b", _result("https://a.test", status_code=404))
+        assert len(cache) == 0
+
+    def test_entries_expire(self) -> None:
+        clock = _Clock()
+        cache = ResultCache(ttl_s=60, clock=clock)
+        cache.put("k", _result("https://a.test"))
+        clock.now += 61
+        assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_byte_budget_evicts_least_recently_used(self) -> None:
+        one = CachedPage.from_result(_result("https://a.test", "x" * 1000), 0).size
+        cache = ResultCache(max_bytes=one * 2 + 10)
+        cache.put("a", _result("https://a.test", "x" * 1000))
+        cache.put("b", _result("https://a.test", "x" * 1000))
+        cache.get("a")  # a is now the most recent
+        cache.put("c", _result("https://a.test", "x" * 1000))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.evictions == 1
+        assert cache.size_bytes <= cache.max_bytes
+
+    def test_per_crawl_metadata_is_not_stored(self) -> None:
+        """depth and parent_url belong to one deep crawl, not to the page."""
+        cache = ResultCache()
+        cache.put(
+            "k",
+            _result("https://a.test", metadata={"title": "T", "depth": 2}),
+        )
+        assert "depth" not in cache.get("k").metadata
+
+    def test_env_configures_the_bounds(self, monkeypatch) -> None:
+        monkeypatch.setenv("CRAWL4AI_MCP_RESULT_CACHE_TTL", "5")
+        monkeypatch.setenv("CRAWL4AI_MCP_RESULT_CACHE_MB", "1")
+        cache = ResultCache.from_env()
+        assert (cache.ttl_s, cache.max_bytes) == (5, 1024 * 1024)
+
+    def test_a_bad_env_value_falls_back_to_the_default(self, monkeypatch) -> None:
+        monkeypatch.setenv("CRAWL4AI_MCP_RESULT_CACHE_TTL", "an hour")
+        assert ResultCache.from_env().ttl_s == 3600
+
+
+# ---------------------------------------------------------------------------
+# Tool wiring
+# ---------------------------------------------------------------------------
+
+
+def _app() -> srv.AppContext:
+    return srv.AppContext(
+        crawler=MagicMock(), profile_manager=ProfileManager(), sessions={}
+    )
+
+
+def _ctx(app):
+    ctx = MagicMock()
+    ctx.request_context.lifespan_context = app
+    ctx.report_progress = AsyncMock()
+    return ctx
+
+
+class TestCrawlUrlUsesTheCache:
+    def test_second_call_never_reaches_the_browser(self) -> None:
+        app = _app()
+        crawl = AsyncMock(return_value=_result("https://a.test", content="fresh"))
+        with (
+            patch.object(srv, "_require_crawler", return_value=MagicMock()),
+            patch.object(srv, "_crawl_with_overrides", crawl),
+        ):
+            first = asyncio.run(
+                srv.crawl_url(url="https://a.test", result_cache=True, ctx=_ctx(app))
+            )
+            second = asyncio.run(
+                srv.crawl_url(url="https://a.test", result_cache=True, ctx=_ctx(app))
+            )
+        assert first == second == "fresh"
+        assert crawl.await_count == 1
+
+    def test_off_by_default(self) -> None:
+        """Fresh-by-default is why cache_mode defaults to bypass; this keeps it."""
+        app = _app()
+        crawl = AsyncMock(return_value=_result("https://a.test"))
+        with (
+            patch.object(srv, "_require_crawler", return_value=MagicMock()),
+            patch.object(srv, "_crawl_with_overrides", crawl),
+        ):
+            for _ in range(2):
+                asyncio.run(srv.crawl_url(url="https://a.test", ctx=_ctx(app)))
+        assert crawl.await_count == 2
+        assert len(app.result_cache) == 0
+
+    def test_a_different_query_is_a_different_entry(self) -> None:
+        app = _app()
+        crawl = AsyncMock(return_value=_result("https://a.test"))
+        with (
+            patch.object(srv, "_require_crawler", return_value=MagicMock()),
+            patch.object(srv, "_crawl_with_overrides", crawl),
+        ):
+            for q in ("pricing", "install"):
+                asyncio.run(
+                    srv.crawl_url(
+                        url="https://a.test", query=q, result_cache=True, ctx=_ctx(app)
+                    )
+                )
+        assert crawl.await_count == 2
+
+    def test_credentials_are_refused_not_cached(self) -> None:
+        app = _app()
+        out = asyncio.run(
+            srv.crawl_url(
+                url="https://a.test",
+                headers={"Authorization": "Bearer x"},
+                result_cache=True,
+                ctx=_ctx(app),
+            )
+        )
+        assert "result_cache cannot be combined" in out
+
+
+class TestBatchToolsCrawlOnlyMisses:
+    def test_crawl_many_sends_only_misses_to_the_browser(self) -> None:
+        app = _app()
+        settings = merged_settings(
+            app.profile_manager, None, cache_mode=srv._CACHE_MAP["bypass"]
+        )
+        app.result_cache.put(
+            cache_key("https://a.test/1", settings), _result("https://a.test/1", "one")
+        )
+        crawler = MagicMock()
+        crawler.arun_many = AsyncMock(return_value=[_result("https://a.test/2")])
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://a.test/1", "https://a.test/2"],
+                    result_cache=True,
+                    ctx=_ctx(app),
+                )
+            )
+        assert crawler.arun_many.await_args.kwargs["urls"] == ["https://a.test/2"]
+        assert (out.crawled, out.total) == (2, 2)
+        assert out.note == "1 of 2 pages served from the result cache."
+        assert {p.markdown for p in out.pages} == {"one", "page content"}
+        # The miss was stored on the way through.
+        assert len(app.result_cache) == 2
+
+    def test_an_all_hit_batch_launches_nothing(self) -> None:
+        app = _app()
+        crawler = MagicMock()
+        crawler.arun_many = AsyncMock(return_value=[_result("https://a.test/1")])
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            for _ in range(2):
+                out = asyncio.run(
+                    srv.crawl_many(
+                        urls=["https://a.test/1"], result_cache=True, ctx=_ctx(app)
+                    )
+                )
+        assert crawler.arun_many.await_count == 1
+        assert out.crawled == 1
+
+    def test_deep_crawl_pages_are_reusable_by_crawl_many(self) -> None:
+        """deep_crawl only writes, so its value is entirely in whether a later
+        batch with the same settings finds what it stored."""
+
+        crawler = MagicMock()
+        # The frontier engine fetches each page with a plain arun.
+        crawler.arun = AsyncMock(
+            return_value=_result("https://a.test/", metadata={"title": "T"})
+        )
+        crawler.arun_many = AsyncMock(return_value=[])
+        app = _app()
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            asyncio.run(
+                srv.deep_crawl(url="https://a.test/", result_cache=True, ctx=_ctx(app))
+            )
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://a.test/"], result_cache=True, ctx=_ctx(app)
+                )
+            )
+        crawler.arun_many.assert_not_called()
+        assert out.pages[0].depth is None
+
+
+# ---------------------------------------------------------------------------
+# Conditional revalidation
+# ---------------------------------------------------------------------------
+
+
+def _validated(url: str, content: str = "page content"):
+    r = _result(url, content=content)
+    r.response_headers = {
+        "etag": '"v1"',
+        "last-modified": "Wed, 01 Jan 2025 00:00:00 GMT",
+    }
+    return r
+
+
+class TestStaleEntries:
+    def test_validators_come_from_the_stored_headers(self) -> None:
+        page = CachedPage.from_result(_validated("https://a.test"), 0)
+        assert page.validators == {
+            "If-None-Match": '"v1"',
+            "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT",
+        }
+
+    def test_header_case_does_not_matter(self) -> None:
+        r = _result("https://a.test")
+        r.response_headers = {"ETag": '"x"'}
+        assert CachedPage.from_result(r, 0).validators == {"If-None-Match": '"x"'}
+
+    def test_an_expired_page_with_validators_is_kept_as_stale(self) -> None:
+        clock = _Clock()
+        cache = ResultCache(ttl_s=60, clock=clock)
+        cache.put("k", _validated("https://a.test"))
+        clock.now += 61
+        assert cache.get("k") is None
+        assert cache.stale("k") is not None
+
+    def test_refresh_restarts_the_ttl(self) -> None:
+        clock = _Clock()
+        cache = ResultCache(ttl_s=60, clock=clock)
+        cache.put("k", _validated("https://a.test"))
+        clock.now += 61
+        assert cache.refresh("k").revalidated
+        assert cache.get("k") is not None
+        assert cache.revalidated == 1
+
+    def test_a_fresh_entry_is_not_stale(self) -> None:
+        cache = ResultCache()
+        cache.put("k", _validated("https://a.test"))
+        assert cache.stale("k") is None
+
+
+class TestRevalidate:
+    def _run(self, handler, page):
+        async def go():
+            transport = httpx.MockTransport(handler)
+            async with httpx.AsyncClient(transport=transport) as client:
+                return await revalidate(client, "https://a.test", page)
+
+        return asyncio.run(go())
+
+    def test_304_means_unchanged_and_sends_the_validators(self) -> None:
+        seen = {}
+
+        def handler(request):
+            seen.update(request.headers)
+            return httpx.Response(304)
+
+        page = CachedPage.from_result(_validated("https://a.test"), 0)
+        assert self._run(handler, page) is True
+        assert seen["if-none-match"] == '"v1"'
+
+    def test_200_means_changed(self) -> None:
+        page = CachedPage.from_result(_validated("https://a.test"), 0)
+        assert self._run(lambda r: httpx.Response(200, text="new"), page) is False
+
+    def test_a_network_error_falls_back_to_crawling(self) -> None:
+        def handler(request):
+            raise httpx.ConnectError("refused")
+
+        page = CachedPage.from_result(_validated("https://a.test"), 0)
+        assert self._run(handler, page) is False
+
+
+class TestToolsRevalidate:
+    def _stale_app(self, url: str) -> srv.AppContext:
+        app = _app()
+        app.result_cache = ResultCache(ttl_s=0, clock=_Clock())
+        settings = merged_settings(
+            app.profile_manager, None, cache_mode=srv._CACHE_MAP["bypass"]
+        )
+        app.result_cache.put(cache_key(url, settings), _validated(url, "stored"))
+        app.result_cache._clock.now += 1
+        return app
+
+    def test_crawl_url_serves_a_304_without_the_browser(self) -> None:
+        app = self._stale_app("https://a.test")
+        crawl = AsyncMock()
+        with (
+            patch.object(srv, "revalidate", AsyncMock(return_value=True)),
+            patch.object(srv, "_crawl_with_overrides", crawl),
+        ):
+            out = asyncio.run(
+                srv.crawl_url(url="https://a.test", result_cache=True, ctx=_ctx(app))
+            )
+        assert out == "stored"
+        crawl.assert_not_called()
+
+    def test_a_changed_page_is_crawled_again(self) -> None:
+        app = self._stale_app("https://a.test")
+        crawl = AsyncMock(return_value=_result("https://a.test", content="new"))
+        with (
+            patch.object(srv, "revalidate", AsyncMock(return_value=False)),
+            patch.object(srv, "_require_crawler", return_value=MagicMock()),
+            patch.object(srv, "_crawl_with_overrides", crawl),
+        ):
+            out = asyncio.run(
+                srv.crawl_url(url="https://a.test", result_cache=True, ctx=_ctx(app))
+            )
+        assert out == "new"
+
+    def test_crawl_many_reports_revalidated_hits(self) -> None:
+        app = self._stale_app("https://a.test/1")
+        crawler = MagicMock()
+        crawler.arun_many = AsyncMock(return_value=[_result("https://a.test/2")])
+        with (
+            patch.object(srv, "revalidate", AsyncMock(return_value=True)),
+            patch.object(srv, "_require_crawler", return_value=crawler),
+        ):
+            out = asyncio.run(
+                srv.crawl_many(
+                    urls=["https://a.test/1", "https://a.test/2"],
+                    result_cache=True,
+                    ctx=_ctx(app),
+                )
+            )
+        assert crawler.arun_many.await_args.kwargs["urls"] == ["https://a.test/2"]
+        assert out.note == (
+            "1 of 2 pages served from the result cache (1 revalidated with a 304)."
+        )
@@ -0,0 +1,124 @@
+"""Tests for page_size: batch results read a slice at a time.
+
+A caller asking for page_size gets a small response and a cursor, and must
+still be able to read every page, once, in order. The failures guarded here:
+
+- the response carrying the whole batch anyway
+- get_pages skipping or repeating a page at a slice boundary
+- crawled and total counting only the first slice
+- an expired or evicted batch read back as an empty last slice
+- the store growing past its byte budget
+- a crawl:// resource returning nothing for a page with no markdown
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from mcp.server.mcpserver.exceptions import ResourceError
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.result_store import ResultStore, make_cursor, parse_cursor
+
+
+URLS = [f"https://a.test/{i}" for i in range(7)]
+
+
+def _crawl(ctx, crawler, page_size):
+    with patch.object(srv, "_require_crawler", return_value=crawler):
+        return asyncio.run(srv.crawl_many(urls=URLS, page_size=page_size, ctx=ctx))
+
+
+class TestPageSize:
+    def test_the_response_is_the_first_slice_and_a_cursor(
+        self, make_ctx, make_streaming_crawler
+    ) -> None:
+        ctx = make_ctx()
+        out = _crawl(ctx, make_streaming_crawler(fail={URLS[0]}), page_size=3)
+        assert len(out.pages) == 3
+        assert out.crawled == 6 and out.total == 7
+        assert out.next_cursor is not None
+        assert "first 3 of 7" in out.note
+
+        read, cursor = list(out.pages), out.next_cursor
+        while cursor:
+            more = asyncio.run(srv.get_pages(cursor=cursor, limit=2, ctx=ctx))
+            assert more.error is None and more.total == 7
+            read += more.pages
+            cursor = more.next_cursor
+        assert sorted(p.url for p in read) == URLS
+        # Successes first, the same order the unpaged result has.
+        assert read[-1].url == URLS[0] and not read[-1].success
+
+    def test_a_batch_that_fits_is_returned_as_before(
+        self, make_ctx, make_streaming_crawler
+    ) -> None:
+        out = _crawl(make_ctx(), make_streaming_crawler(), page_size=50)
+        assert len(out.pages) == 7 and out.next_cursor is None
+
+    def test_page_size_must_be_positive(self, make_ctx, make_streaming_crawler) -> None:
+        out = _crawl(make_ctx(), make_streaming_crawler(), page_size=0)
+        assert out.total == 0 and "page_size must be 1 or more" in out.error
+
+
+class TestGetPages:
+    def test_a_bad_or_expired_cursor_says_so(self, make_ctx) -> None:
+        ctx = make_ctx()
+        bad = asyncio.run(srv.get_pages(cursor="nonsense", ctx=ctx))
+        assert "is not a cursor" in bad.error
+        gone = asyncio.run(srv.get_pages(cursor=make_cursor("abc", 0), ctx=ctx))
+        assert "no longer held" in gone.error and gone.pages == []
+
+    def test_limit_is_bounded(self, make_ctx) -> None:
+        out = asyncio.run(srv.get_pages(cursor="a:0", limit=501, ctx=make_ctx()))
+        assert "limit must be 1-500" in out.error
+
+
+class TestResource:
+    async def test_a_page_reads_as_markdown(self, make_ctx) -> None:
+        ctx = make_ctx()
+        app = ctx.request_context.lifespan_context
+        pages = [
+            srv.PageResult(url="u", success=True, markdown="# hi"),
+            srv.PageResult(url="v", success=False, error="timeout"),
+        ]
+        batch = app.results.put(pages)
+        assert await srv.crawl_page(batch, 0, ctx) == "# hi"
+        with pytest.raises(ResourceError, match="timeout"):
+            await srv.crawl_page(batch, 1, ctx)
+        with pytest.raises(ResourceError, match="no page 2"):
+            await srv.crawl_page(batch, 2, ctx)
+        with pytest.raises(ResourceError, match="no longer held"):
+            await srv.crawl_page("gone", 0, ctx)
+
+    async def test_the_template_is_registered(self) -> None:
+        templates = await srv.mcp.list_resource_templates()
+        assert "crawl://{batch_id}/{index}" in [t.uri_template for t in templates]
+
+
+class TestStore:
+    def test_batches_expire_after_their_last_read(self) -> None:
+        now = [0.0]
+        store = ResultStore(ttl_s=10, clock=lambda: now[0])
+        batch = store.put([srv.PageResult(url="u", success=True)])
+        now[0] = 8
+        assert store.get(batch) is not None
+        now[0] = 16
+        assert store.get(batch) is not None
+        now[0] = 27
+        assert store.get(batch) is None and len(store) == 0
+
+    def test_the_least_recently_read_batch_is_evicted(self) -> None:
+        page = srv.PageResult(url="u", success=True, markdown="x" * 1000)
+        store = ResultStore(max_bytes=3100)
+        first, second = store.put([page]), store.put([page])
+        store.get(first)
+        store.put([page])
+        assert store.get(second) is None and store.get(first) is not None
+        assert store.size_bytes <= 3100 and store.evictions == 1
+        assert store.put([page] * 10) is None
+
+    def test_cursors_round_trip(self) -> None:
+        assert parse_cursor(make_cursor("abc", 12)) == ("abc", 12)
+        assert parse_cursor("abc") is None
+        assert parse_cursor("abc:-1") is None
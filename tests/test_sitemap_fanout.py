@@ -0,0 +1,120 @@
+"""Tests for reading a sitemap index no further, and no wider, than needed.
+
+A crawl of 50 URLs from a 1,000-child index used to fetch all 1,000 children
+at once and then throw away all but 50 URLs. The failures guarded here:
+
+- more child sitemaps in flight than the concurrency limit
+- children fetched after max_urls was already satisfied
+- a list cut at max_urls not being reported as cut
+- the note not saying what reading the index cost, or which child was slow
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import httpx
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.sitemap import SitemapReader
+
+INDEX = "https://shop.test/sitemap_index.xml"
+CHILDREN = [f"https://shop.test/sitemap-{i}.xml" for i in range(200)]
+
+# Kept before any test patches httpx.AsyncClient to hand out this site.
+_AsyncClient = httpx.AsyncClient
+
+
+def _index() -> bytes:
+    locs = "".join(f"<sitemap><loc>{c}</loc></sitemap>" for c in CHILDREN)
+    return f"<sitemapindex>{locs}</sitemapindex>".encode()
+
+
+def _urlset(child: str) -> bytes:
+    stem = child.removesuffix(".xml")
+    locs = "".join(f"<url><loc>{stem}/p{i}</loc></url>" for i in range(3))
+    return f"<urlset>{locs}</urlset>".encode()
+
+
+class _Site:
+    """A MockTransport that counts fetches and how many overlap."""
+
+    def __init__(self, fail: set[str] = frozenset()) -> None:
+        self.fetched: list[str] = []
+        self.in_flight = 0
+        self.peak = 0
+        self.fail = fail
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        self.fetched.append(url)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+        finally:
+            self.in_flight -= 1
+        if url in self.fail:
+            return httpx.Response(500)
+        return httpx.Response(200, content=_index() if url == INDEX else _urlset(url))
+
+    def client(self) -> httpx.AsyncClient:
+        return _AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+class TestReader:
+    async def test_children_are_fetched_a_few_at_a_time(self) -> None:
+        site = _Site()
+        async with site.client() as client:
+            reader = SitemapReader(client, INDEX, concurrency=4)
+            urls = [u async for u in reader.urls()]
+        assert len(urls) == 3 * len(CHILDREN)
+        assert site.peak <= 4 and reader.complete
+        assert len(reader.fetches) == len(CHILDREN) + 1
+
+    async def test_stopping_early_leaves_the_rest_unfetched(self) -> None:
+        site = _Site()
+        async with site.client() as client:
+            reader = SitemapReader(client, INDEX, concurrency=4)
+            stream = reader.urls()
+            urls = [await anext(stream) for _ in range(5)]
+            await stream.aclose()
+        assert urls[:3] == [f"https://shop.test/sitemap-0/p{i}" for i in range(3)]
+        # The index, the two children the five URLs came from, and no more
+        # than the window of children that had been started alongside them.
+        assert len(site.fetched) <= 1 + 2 + 4
+        assert reader.unread >= len(CHILDREN) - 6
+        assert "were not fetched" in reader.note()
+
+    async def test_the_note_names_the_slowest_and_the_failures(self) -> None:
+        site = _Site(fail={CHILDREN[1]})
+        async with site.client() as client:
+            reader = SitemapReader(client, INDEX)
+            urls = [u async for u in reader.urls()]
+        assert len(urls) == 3 * (len(CHILDREN) - 1)
+        note = reader.note()
+        # The index and every child but the one that failed.
+        assert f"read {len(CHILDREN)} sitemap file(s)" in note
+        assert "slowest" in note and "3 URLs)" in note
+        assert f"1 failed and were skipped: {CHILDREN[1]}" in note
+
+
+class TestCrawlSitemap:
+    def test_max_urls_stops_the_reading(self, make_ctx, make_streaming_crawler) -> None:
+        site = _Site()
+        asked: list = []
+        with (
+            patch.object(
+                srv.httpx, "AsyncClient", side_effect=lambda **_: site.client()
+            ),
+            patch.object(
+                srv,
+                "_require_crawler",
+                return_value=make_streaming_crawler(asked=asked),
+            ),
+        ):
+            out = asyncio.run(
+                srv.crawl_sitemap(sitemap_url=INDEX, max_urls=4, ctx=make_ctx())
+            )
+        assert out.crawled == 4 and [len(urls) for urls in asked] == [4]
+        assert len(site.fetched) < 20
+        assert "more than 4 URLs" in out.note and "were not fetched" in out.note
@@ -0,0 +1,227 @@
+"""Tests for crawling only what a sitemap says changed, most important first.
+
+The point is that a nightly re-index touches the pages that changed and not
+the other 19,000. The failures guarded here:
+
+- <lastmod>, <changefreq> or <priority> lost in parsing
+- a page older than modified_since crawled, or an undated one dropped
+- an unchanged page crawled again, or a changed or new one skipped
+- a page that failed recorded as done, so the next run never retries it
+- order_by cutting the wrong pages at max_urls
+- nothing having changed reported as an error
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.sitemap import (
+    SitemapEntry,
+    SitemapParser,
+    SitemapSelection,
+    parse_lastmod,
+)
+from crawl4ai_mcp.sitemap_state import SitemapState
+
+SITEMAP = "https://docs.test/sitemap.xml"
+
+# Kept before any test patches httpx.AsyncClient to hand out this site.
+_AsyncClient = httpx.AsyncClient
+
+
+def _urlset(pages: dict) -> bytes:
+    """pages maps a path to its <url> children other than <loc>."""
+    entries = "".join(
+        f"<url><loc>https://docs.test/{path}</loc>{extra}</url>"
+        for path, extra in pages.items()
+    )
+    return (
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"{entries}</urlset>"
+    ).encode()
+
+
+def _lastmod(day: str) -> str:
+    return f"<lastmod>{day}</lastmod>"
+
+
+class TestParsing:
+    def test_entries_keep_lastmod_changefreq_and_priority(self) -> None:
+        parser = SitemapParser(SITEMAP)
+        body = _urlset(
+            {
+                "a": "<lastmod>2026-10-01</lastmod><changefreq>daily</changefreq>"
+                "<priority>0.8</priority>",
+                "b": "<priority>7</priority>",
+            }
+        )
+        a, b = parser.feed(body) + parser.close()
+        assert (a.lastmod, a.changefreq, a.priority) == ("2026-10-01", "daily", 0.8)
+        assert (b.lastmod, b.changefreq, b.priority) == (None, None, None)
+
+    def test_w3c_datetimes(self) -> None:
+        assert parse_lastmod("2026") == parse_lastmod("2026-01-01T00:00:00Z")
+        assert parse_lastmod("2026-10") == parse_lastmod("2026-10-01")
+        assert parse_lastmod("2026-10-01T02:00:00+02:00") == parse_lastmod(
+            "2026-10-01T00:00:00"
+        )
+        assert parse_lastmod("yesterday") is None and parse_lastmod(None) is None
+
+
+def _entry(path: str, lastmod: str | None = None, priority=None) -> SitemapEntry:
+    return SitemapEntry(f"https://docs.test/{path}", lastmod=lastmod, priority=priority)
+
+
+class TestSelection:
+    def test_modified_since_skips_older_and_keeps_undated(self) -> None:
+        selection = SitemapSelection(modified_since=parse_lastmod("2026-10-01"))
+        kept = [
+            e.loc
+            for e in [
+                _entry("old", "2026-09-30"),
+                _entry("new", "2026-10-01T08:00:00Z"),
+                _entry("undated"),
+            ]
+            if selection.keep(e)
+        ]
+        assert kept == ["https://docs.test/new", "https://docs.test/undated"]
+        assert (selection.older, selection.undated) == (1, 1)
+
+    def test_previous_skips_only_what_did_not_advance(self) -> None:
+        previous = {
+            "https://docs.test/same": "2026-10-01",
+            "https://docs.test/moved": "2026-10-01",
+        }
+        selection = SitemapSelection(previous=previous)
+        assert not selection.keep(_entry("same", "2026-10-01T00:00:00Z"))
+        assert selection.keep(_entry("moved", "2026-10-02"))
+        assert selection.keep(_entry("brand-new", "2026-01-01"))
+        assert selection.unchanged == 1
+
+    def test_orders_are_stable(self) -> None:
+        entries = [
+            _entry("a", "2026-01-01", 0.3),
+            _entry("b", None, None),
+            _entry("c", "2026-03-01", 0.9),
+            _entry("d", "2026-02-01", None),
+        ]
+        by = {
+            order: [e.loc[-1] for e in SitemapSelection(order_by=order).order(entries)]
+            for order in ("priority", "lastmod")
+        }
+        # A missing priority is the protocol's 0.5; a missing lastmod is last.
+        assert by == {"priority": list("cbda"), "lastmod": list("cdab")}
+
+
+class TestListSitemap:
+    async def test_order_by_reads_everything_then_cuts(self) -> None:
+        body = _urlset({f"p{i}": f"<priority>{i / 10}</priority>" for i in range(10)})
+        client = _AsyncClient(
+            transport=httpx.MockTransport(lambda r: httpx.Response(200, content=body))
+        )
+        urls, truncated, _ = await srv._list_sitemap(
+            SITEMAP, client, 3, SitemapSelection(order_by="priority")
+        )
+        await client.aclose()
+        assert urls == [f"https://docs.test/p{i}" for i in (9, 8, 7)]
+        assert truncated
+
+
+class _Docs:
+    """A sitemap that can change between runs, and a crawler of its pages."""
+
+    def __init__(self, pages: dict) -> None:
+        self.pages = pages
+        self.asked: list[str] = []
+        self.fail: set[str] = set()
+
+    def client(self, **_) -> httpx.AsyncClient:
+        def handler(request):
+            return httpx.Response(200, content=_urlset(self.pages))
+
+        return _AsyncClient(transport=httpx.MockTransport(handler))
+
+    def crawler(self) -> MagicMock:
+        async def arun_many(urls, config, dispatcher):
+            self.asked.extend(urls)
+
+            async def results():
+                for url in urls:
+                    r = MagicMock()
+                    r.url, r.status_code = url, 200
+                    r.success = url.rsplit("/", 1)[1] not in self.fail
+                    r.metadata, r.response_headers, r.crawl_stats = {}, {}, None
+                    r.markdown.fit_markdown = "x"
+                    r.error_message = None if r.success else "boom"
+                    yield r
+
+            return results()
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        return crawler
+
+    def run(self, ctx, **kwargs):
+        self.asked = []
+        with (
+            patch.object(srv.httpx, "AsyncClient", side_effect=self.client),
+            patch.object(srv, "_require_crawler", return_value=self.crawler()),
+        ):
+            return asyncio.run(
+                srv.crawl_sitemap(sitemap_url=SITEMAP, ctx=ctx, **kwargs)
+            )
+
+    def asked_paths(self) -> list[str]:
+        return [url.rsplit("/", 1)[1] for url in self.asked]
+
+
+class TestOnlyChanged:
+    def test_a_second_run_crawls_what_changed(self, make_ctx) -> None:
+        docs = _Docs({p: _lastmod("2026-10-01") for p in ("a", "b", "c", "d")})
+        docs.fail = {"d"}
+        first = docs.run(make_ctx(), only_changed=True)
+        assert docs.asked_paths() == ["a", "b", "c", "d"]
+        assert "No earlier only_changed run" in first.note
+
+        docs.fail = set()
+        docs.pages["b"] = _lastmod("2026-10-02")
+        docs.pages["e"] = _lastmod("2026-01-01")
+        second = docs.run(make_ctx(), only_changed=True)
+        # b changed, d failed last time, e is new.
+        assert docs.asked_paths() == ["b", "d", "e"]
+        assert "2 unchanged since the last run were skipped" in second.note
+
+        assert docs.run(make_ctx(), only_changed=True).error is None
+        assert docs.asked == []
+
+    def test_nothing_changed_is_a_note_not_an_error(self, make_ctx) -> None:
+        docs = _Docs({"a": _lastmod("2026-10-01")})
+        docs.run(make_ctx(), only_changed=True)
+        out = docs.run(make_ctx(), only_changed=True)
+        assert out.error is None and out.crawled == 0
+        assert "nothing was crawled" in out.note
+        state = asyncio.run(SitemapState.open(SITEMAP))
+        assert state.lastmods == {"https://docs.test/a": "2026-10-01"}
+
+
+class TestCrawlSitemapOptions:
+    def test_modified_since_with_max_urls(self, make_ctx) -> None:
+        docs = _Docs(
+            {
+                "old": _lastmod("2026-01-01"),
+                "x": _lastmod("2026-10-05"),
+                "y": _lastmod("2026-10-06"),
+                "z": _lastmod("2026-10-07"),
+            }
+        )
+        out = docs.run(make_ctx(), modified_since="2026-10-01", max_urls=2)
+        assert docs.asked_paths() == ["x", "y"]
+        assert "1 last modified before" in out.note
+
+    def test_bad_arguments_are_errors(self, make_ctx) -> None:
+        docs = _Docs({"a": ""})
+        assert "not a date" in docs.run(make_ctx(), modified_since="last week").error
+        assert "order_by must be" in docs.run(make_ctx(), order_by="size").error
+        assert docs.asked == []
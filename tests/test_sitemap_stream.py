@@ -0,0 +1,153 @@
+"""Tests for reading sitemaps as a stream.
+
+The point is that a sitemap's size stops mattering to memory, and that its
+first URLs are usable before its last ones have arrived. The failures
+guarded here:
+
+- the parsed tree growing with the sitemap instead of staying one entry big
+- no URL coming out until the whole body has been downloaded
+- child sitemaps left downloading after the reader was closed
+- gzip decided by anything but the bytes, or broken across chunk boundaries
+- nested indexes read out of the order they list their children in
+- one bad child sitemap losing the others, or a bad root passing silently
+"""
+
+import asyncio
+import gzip
+import xml.etree.ElementTree as ET
+
+import httpx
+import pytest
+
+from crawl4ai_mcp.sitemap import SitemapParser, iter_sitemap_urls
+
+ROOT = "https://shop.test/sitemap.xml"
+
+
+def _urlset(urls: list[str]) -> bytes:
+    locs = "".join(
+        f"<url><loc>{u}</loc><lastmod>2026-01-01</lastmod></url>" for u in urls
+    )
+    return (
+        '<?xml version="1.0"?><urlset '
+        f'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+    ).encode()
+
+
+def _index(children: list[str]) -> bytes:
+    locs = "".join(f"<sitemap><loc>{c}</loc></sitemap>" for c in children)
+    return f"<sitemapindex>{locs}</sitemapindex>".encode()
+
+
+def _client(bodies: dict, **kwargs) -> httpx.AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = bodies.get(str(request.url))
+        if body is None:
+            return httpx.Response(404)
+        if callable(body):
+            return await body(request)
+        return httpx.Response(200, content=body)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), **kwargs)
+
+
+async def _read(client: httpx.AsyncClient, url: str = ROOT) -> list[str]:
+    return [u async for u in iter_sitemap_urls(client, url)]
+
+
+class TestParser:
+    def test_the_tree_stays_one_entry_big(self) -> None:
+        # ET.fromstring of a sitemap peaks at about seven times the body's
+        # size, nearly all of it the tree. Streamed, the tree never holds
+        # more than the entry being read, however many the sitemap has.
+        body = _urlset([f"https://shop.test/p/{i}" for i in range(20_000)])
+        parser = SitemapParser(ROOT)
+        count = 0
+        for i in range(0, len(body), 16 * 1024):
+            count += len(parser.feed(body[i : i + 16 * 1024]))
+            assert len(parser._root) <= 1
+        count += len(parser.close())
+        assert count == 20_000
+
+    def test_gzip_split_at_any_byte_parses(self) -> None:
+        urls = [f"https://shop.test/p/{i}" for i in range(50)]
+        body = gzip.compress(_urlset(urls))
+        parser = SitemapParser(ROOT)
+        out = [e.loc for i in range(len(body)) for e in parser.feed(body[i : i + 1])]
+        out += [e.loc for e in parser.close()]
+        assert out == urls
+
+    def test_html_is_a_parse_error(self) -> None:
+        parser = SitemapParser(ROOT)
+        with pytest.raises(ET.ParseError):
+            parser.feed(b"<html><body>hi<br></body></html>")
+            parser.close()
+
+
+class TestReader:
+    async def test_urls_come_out_before_the_body_ends(self) -> None:
+        release = asyncio.Event()
+        head, tail = _urlset(["https://shop.test/a"]).split(b"</urlset>")
+
+        async def body():
+            yield head
+            await release.wait()
+            yield b"<url><loc>https://shop.test/b</loc></url></urlset>"
+
+        async def slow(request):
+            return httpx.Response(200, content=body())
+
+        async with _client({ROOT: slow}) as client:
+            urls = iter_sitemap_urls(client, ROOT)
+            assert await asyncio.wait_for(anext(urls), 1) == "https://shop.test/a"
+            release.set()
+            assert [u async for u in urls] == ["https://shop.test/b"]
+
+    async def test_closing_cancels_the_children_still_downloading(self) -> None:
+        cancelled = asyncio.Event()
+
+        async def never(request):
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first = "https://shop.test/1.xml"
+        bodies = {ROOT: _index([first, "https://shop.test/2.xml"])}
+        bodies[first] = _urlset(["https://shop.test/a"])
+        bodies["https://shop.test/2.xml"] = never
+        async with _client(bodies) as client:
+            urls = iter_sitemap_urls(client, ROOT)
+            assert await anext(urls) == "https://shop.test/a"
+            await urls.aclose()
+        assert cancelled.is_set()
+
+    async def test_nested_indexes_keep_their_order(self) -> None:
+        bodies = {
+            ROOT: _index(["https://shop.test/a.xml", "https://shop.test/b.xml"]),
+            "https://shop.test/a.xml": _index(
+                ["https://shop.test/a1.xml", "https://shop.test/a2.xml"]
+            ),
+            "https://shop.test/a1.xml": _urlset(["https://shop.test/a1"]),
+            "https://shop.test/a2.xml": _urlset(["https://shop.test/a2"]),
+            "https://shop.test/b.xml": _urlset(["https://shop.test/b"]),
+        }
+        async with _client(bodies) as client:
+            assert await _read(client) == [
+                "https://shop.test/a1",
+                "https://shop.test/a2",
+                "https://shop.test/b",
+            ]
+
+    async def test_a_bad_child_is_skipped_and_a_bad_root_raises(self) -> None:
+        bodies = {
+            ROOT: _index(["https://shop.test/gone.xml", "https://shop.test/ok.xml"]),
+            "https://shop.test/ok.xml": gzip.compress(
+                _urlset(["https://shop.test/ok"])
+            ),
+        }
+        async with _client(bodies) as client:
+            assert await _read(client) == ["https://shop.test/ok"]
+            with pytest.raises(httpx.HTTPStatusError):
+                await _read(client, "https://shop.test/missing.xml")
@@ -0,0 +1,130 @@
+"""Tests for the streaming semaphore dispatcher behind crawl_many and crawl_sitemap.
+
+Streaming exists so a long batch shows progress page by page and per-page
+work starts before the slowest page finishes. The failures guarded here:
+
+- results held back until the batch is done, which is the old behaviour
+- the semaphore no longer bounding how many pages are in flight
+- a consumer that stops early leaving pages crawling into the void
+- the tools going back to one opaque await with a heartbeat
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from crawl4ai import CrawlerRunConfig
+
+from crawl4ai_mcp import server as srv
+from crawl4ai_mcp.dispatch import StreamingSemaphoreDispatcher
+
+
+class _Crawler:
+    """Takes the number of seconds to crawl a page from the end of its URL."""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.peak = 0
+        self.finished: list[str] = []
+
+    async def arun(self, url, config=None, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(float(url.rsplit("/", 1)[1]))
+        finally:
+            self.in_flight -= 1
+        self.finished.append(url)
+        return SimpleNamespace(url=url, success=True, status_code=200, error_message="")
+
+
+class TestDispatcher:
+    async def test_pages_come_out_as_they_finish(self) -> None:
+        crawler = _Crawler()
+        dispatcher = StreamingSemaphoreDispatcher(semaphore_count=3)
+        urls = ["https://a.test/0.06", "https://a.test/0.01", "https://a.test/0.03"]
+        got = [
+            r.url
+            async for r in dispatcher.run_urls_stream(crawler, urls, CrawlerRunConfig())
+        ]
+        assert got == [
+            "https://a.test/0.01",
+            "https://a.test/0.03",
+            "https://a.test/0.06",
+        ]
+
+    async def test_the_semaphore_still_bounds_the_batch(self) -> None:
+        crawler = _Crawler()
+        dispatcher = StreamingSemaphoreDispatcher(semaphore_count=2)
+        urls = [f"https://a.test/0.0{i}" for i in range(1, 7)]
+        results = [
+            r
+            async for r in dispatcher.run_urls_stream(crawler, urls, CrawlerRunConfig())
+        ]
+        assert len(results) == 6
+        assert crawler.peak == 2
+        assert all(r.start_time <= r.end_time for r in results)
+
+    async def test_stopping_early_cancels_the_rest(self) -> None:
+        crawler = _Crawler()
+        dispatcher = StreamingSemaphoreDispatcher(semaphore_count=2)
+        urls = ["https://a.test/0.01", "https://a.test/5", "https://a.test/5"]
+        stream = dispatcher.run_urls_stream(crawler, urls, CrawlerRunConfig())
+        first = await anext(stream)
+        await stream.aclose()
+        assert first.url == "https://a.test/0.01"
+        assert crawler.in_flight == 0
+        assert crawler.finished == ["https://a.test/0.01"]
+
+
+class TestTools:
+    def test_crawl_many_reports_each_page(self, make_ctx, make_result) -> None:
+        seen = {}
+
+        async def arun_many(urls, config, dispatcher):
+            seen["stream"] = config.stream
+            seen["dispatcher"] = dispatcher
+
+            async def pages():
+                for url in reversed(urls):
+                    yield make_result(url)
+
+            return pages()
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        ctx = make_ctx()
+        urls = [f"https://a.test/{i}" for i in range(3)]
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            out = asyncio.run(srv.crawl_many(urls=urls, ctx=ctx))
+        assert seen["stream"] is True
+        assert isinstance(seen["dispatcher"], StreamingSemaphoreDispatcher)
+        assert out.crawled == 3
+        progress = [c.kwargs for c in ctx.report_progress.await_args_list]
+        assert [p["progress"] for p in progress] == [1, 2, 3]
+        assert progress[0]["message"] == "Crawling 3 URLs: 1/3 pages (https://a.test/2)"
+
+    def test_pages_are_cached_as_they_arrive(self, make_ctx, make_result) -> None:
+        ctx = make_ctx()
+        app = ctx.request_context.lifespan_context
+        cached_when_second_arrived = []
+
+        async def arun_many(urls, config, dispatcher):
+            async def pages():
+                yield make_result(urls[0])
+                cached_when_second_arrived.append(len(app.result_cache))
+                yield make_result(urls[1])
+
+            return pages()
+
+        crawler = MagicMock()
+        crawler.arun_many = arun_many
+        with patch.object(srv, "_require_crawler", return_value=crawler):
+            asyncio.run(
+                srv.crawl_many(
+                    urls=["https://a.test/1", "https://a.test/2"],
+                    result_cache=True,
+                    ctx=ctx,
+                )
+            )
+        assert cached_when_second_arrived == [1]
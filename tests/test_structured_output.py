@@ -220,7 +220,9 @@ class TestEveryReturnPathMatchesTheDeclaredType:
         "deep_crawl": "CrawlBatchResult",
         "extract_css": "ExtractionResult",
     }
-    HELPERS = {"_batch_result", "_persist_results"}
+    HELPERS = {"_batch_result", "_persist_results", "_paginated"}
+    # _IncrementalOutput.finish, awaited: stream_to_disk's result.
+    METHODS = {"finish"}
 
     @pytest.mark.parametrize("tool_name", sorted(RETURN_TYPES))
     def test_no_return_path_yields_a_bare_string(self, tool_name: str) -> None:
@@ -235,9 +237,12 @@ class TestEveryReturnPathMatchesTheDeclaredType:
             if not isinstance(node, ast.Return) or node.value is None:
                 continue
             value = node.value
+            if isinstance(value, ast.Await):
+                value = value.value
             ok = isinstance(value, ast.Call) and (
                 getattr(value.func, "id", "") == want
                 or getattr(value.func, "id", "") in self.HELPERS
+                or getattr(value.func, "attr", "") in self.METHODS
             )
             if not ok:
                 offenders.append(ast.unparse(value)[:70])
@@ -253,7 +258,7 @@ class TestSitemapFailuresAreReportable:
         """A real sitemap URL that 404s or times out must come back as data."""
         with patch.object(
             srv,
-            "_fetch_sitemap_urls",
+            "_list_sitemap",
             AsyncMock(side_effect=httpx.ConnectError("boom")),
         ):
             out = asyncio.run(
@@ -274,7 +279,7 @@ class TestSitemapFailuresAreReportable:
 
         with patch.object(
             srv,
-            "_fetch_sitemap_urls",
+            "_list_sitemap",
             AsyncMock(side_effect=ET.ParseError("syntax error: line 1, column 0")),
         ):
             out = asyncio.run(
@@ -290,7 +295,9 @@ class TestSitemapFailuresAreReportable:
 
     def test_a_non_sitemap_url_reports_instead_of_crashing(self) -> None:
         """Pointing the tool at an HTML page is an easy mistake to make."""
-        with patch.object(srv, "_fetch_sitemap_urls", AsyncMock(return_value=[])):
+        with patch.object(
+            srv, "_list_sitemap", AsyncMock(return_value=([], False, None))
+        ):
             out = asyncio.run(
                 srv.crawl_sitemap(
                     sitemap_url="https://example.com/", ctx=_extraction_ctx()
@@ -7,18 +7,21 @@ it guards and, where the number came from a measurement, states it.
 """
 
 import asyncio
+import gzip
 import inspect
 import os
 import stat
+import xml.etree.ElementTree as ET
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from crawl4ai_mcp.sitemap import Gunzip
+
 from crawl4ai_mcp.server import (
     DEFAULT_CACHE_MODE,
     CrawlBatchResult,
     _check_api_key,
-    _maybe_gunzip,
     _persist_results,
     _resolve_cache_mode,
     crawl_many,
@@ -61,31 +64,35 @@ class TestGzipByContentNotByUrl:
     caught it, so the tool call died. Reproduced live before the fix.
     """
 
+    @staticmethod
+    def _gunzip(content: bytes, chunk: int = 7) -> bytes:
+        """Feed content through Gunzip a few bytes at a time, as a stream arrives."""
+        g = Gunzip()
+        out = [g.feed(content[i : i + chunk]) for i in range(0, len(content), chunk)]
+        return b"".join(out) + g.flush()
+
     def test_plain_bytes_pass_through(self) -> None:
         xml = b'<?xml version="1.0"?><urlset/>'
-        assert _maybe_gunzip(xml) == xml
+        assert self._gunzip(xml) == xml
 
     def test_real_gzip_is_decompressed(self) -> None:
-        import gzip
-
         xml = b'<?xml version="1.0"?><urlset/>'
-        assert _maybe_gunzip(gzip.compress(xml)) == xml
+        assert self._gunzip(gzip.compress(xml)) == xml
 
-    def test_truncated_gzip_returns_bytes_instead_of_raising(self) -> None:
-        """A half-written .gz must reach the XML parser, not kill the tool.
+    def test_truncated_gzip_is_a_parse_error_not_a_crash(self) -> None:
+        """A half-written .gz must be reported as an unreadable sitemap.
 
-        The XML parser's error names the sitemap, which is what the caller can
-        act on; a gzip error names a compression format they never mentioned.
+        crawl_sitemap turns ET.ParseError into an error naming the sitemap,
+        which is what the caller can act on; a gzip error escaping the tool
+        names a compression format they never mentioned.
         """
-        import gzip
-
         broken = gzip.compress(b"<urlset/>")[:12]
-        assert _maybe_gunzip(broken) == broken
+        with pytest.raises(ET.ParseError):
+            self._gunzip(broken)
 
     def test_decision_ignores_the_url_entirely(self) -> None:
-        """The signature must not accept a URL, or the old bug can return."""
-        params = inspect.signature(_maybe_gunzip).parameters
-        assert list(params) == ["content"]
+        """The decoder must not accept a URL, or the old bug can return."""
+        assert list(inspect.signature(Gunzip).parameters) == []
 
 
 class TestOutputDirFailureKeepsTheCrawl:
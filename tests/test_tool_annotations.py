@@ -137,6 +137,11 @@ class TestOpenWorldMatchesReach:
             "list_sessions",
             "check_update",
             "destroy_session",
+            "metrics",
+            "job_status",
+            "job_results",
+            "cancel_job",
+            "get_pages",
         }
         closed = {t.name for t in tools if t.annotations.open_world_hint is False}
         assert closed == expected_closed
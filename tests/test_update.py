@@ -34,6 +34,7 @@ def _make_mock_ctx():
     """Create a mock Context for tool calls."""
     ctx = MagicMock()
     app = MagicMock()
+    app.http = None
     ctx.request_context.lifespan_context = app
     return ctx
 